@@ -0,0 +1,138 @@
+"""
+Benchmark of importing courses into the modulestore and contentstore.
+
+Copies each of the given courses of common/test/data (toy and simple by
+default) to a temporary directory, and scales it up with --chapters synthetic
+chapters of 5 sequentials of 4 verticals each holding an html module and a
+problem, and with --assets static files of --asset-size bytes.  Then times
+importing each course a module and a file at a time, and with bulk writes and
+--workers threads saving static content, into new courses of the 'benchmark'
+org, which are deleted afterwards.
+"""
+from __future__ import division
+
+import os
+import shutil
+import tempfile
+import time
+from optparse import make_option
+from textwrap import dedent
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from lxml import etree
+from path import path
+
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.mongo.base import location_to_query
+from xmodule.modulestore.xml_importer import import_from_xml
+
+SEQUENTIALS_PER_CHAPTER = 5
+VERTICALS_PER_SEQUENTIAL = 4
+
+
+class Command(BaseCommand):
+    """
+    Benchmark importing courses into the modulestore and contentstore.
+    """
+    args = '[<course dir>...]'
+    help = dedent(__doc__).strip()
+    option_list = BaseCommand.option_list + (
+        make_option('--chapters', type='int', default=50,
+                    help='Number of synthetic chapters to add to each course'),
+        make_option('--assets', type='int', default=500,
+                    help='Number of synthetic static files to add to each course'),
+        make_option('--asset-size', type='int', default=64 * 1024,
+                    help='Size in bytes of the synthetic static files'),
+        make_option('--workers', type='int', default=settings.COURSE_IMPORT_STATIC_CONTENT_WORKERS,
+                    help='Number of threads saving static content in bulk imports'),
+    )
+
+    def handle(self, *args, **options):
+        course_dirs = args or ['toy', 'simple']
+        data_dir = path(tempfile.mkdtemp())
+        try:
+            for course_dir in course_dirs:
+                shutil.copytree(path(settings.COMMON_ROOT) / 'test' / 'data' / course_dir, data_dir / course_dir)
+                self._scale_course(data_dir / course_dir, options['chapters'], options['assets'], options['asset_size'])
+
+                self._time_import(data_dir, course_dir, 'per item', bulk_write=False, static_content_workers=1)
+                self._time_import(
+                    data_dir, course_dir, 'bulk, {0} workers'.format(options['workers']),
+                    bulk_write=True, static_content_workers=options['workers']
+                )
+        finally:
+            shutil.rmtree(data_dir)
+
+    def _scale_course(self, course_path, num_chapters, num_assets, asset_size):
+        """
+        Adds num_chapters synthetic chapters, and num_assets static files of asset_size bytes,
+        to the course at course_path.
+        """
+        course_xml = course_path / 'course.xml'
+        course = etree.parse(course_xml).getroot()
+        if len(course) == 0 and course.get('url_name'):
+            # the content of the course is in its own file
+            course_xml = course_path / 'course' / '{0}.xml'.format(course.get('url_name'))
+            course = etree.parse(course_xml).getroot()
+
+        for chapter_index in xrange(num_chapters):
+            chapter = etree.SubElement(
+                course, 'chapter', url_name='bench_{0}'.format(chapter_index),
+                display_name='Benchmark chapter {0}'.format(chapter_index)
+            )
+            for sequential_index in xrange(SEQUENTIALS_PER_CHAPTER):
+                sequential = etree.SubElement(
+                    chapter, 'sequential', url_name='bench_{0}_{1}'.format(chapter_index, sequential_index)
+                )
+                for vertical_index in xrange(VERTICALS_PER_SEQUENTIAL):
+                    name = 'bench_{0}_{1}_{2}'.format(chapter_index, sequential_index, vertical_index)
+                    vertical = etree.SubElement(sequential, 'vertical', url_name=name)
+                    html = etree.SubElement(vertical, 'html', url_name=name + '_html')
+                    html.append(etree.fromstring(
+                        '<p>See <a href="/static/bench/asset_{0}.txt">the notes</a>.</p>'.format(
+                            vertical_index % max(num_assets, 1)
+                        )
+                    ))
+                    problem = etree.SubElement(vertical, 'problem', url_name=name + '_problem')
+                    problem.append(etree.fromstring(
+                        '<stringresponse answer="benchmark"><textline size="20"/></stringresponse>'
+                    ))
+        with open(course_xml, 'w') as course_file:
+            course_file.write(etree.tostring(course))
+
+        assets_path = course_path / 'static' / 'bench'
+        assets_path.makedirs_p()
+        for asset_index in xrange(num_assets):
+            with open(assets_path / 'asset_{0}.txt'.format(asset_index), 'wb') as asset_file:
+                asset_file.write(os.urandom(asset_size))
+
+    def _time_import(self, data_dir, course_dir, name, **kwargs):
+        """
+        Imports course_dir of data_dir into a new course with kwargs, writes how long that
+        took, and deletes the course.
+        """
+        store = modulestore('direct')
+        content_store = contentstore()
+        namespace = Location('i4x', 'benchmark', '{0}_{1}'.format(course_dir, uuid4().hex), 'course', 'run')
+        try:
+            start = time.time()
+            xml_module_store, _ = import_from_xml(
+                store, data_dir, [course_dir], load_error_modules=False, static_content_store=content_store,
+                target_location_namespace=namespace, **kwargs
+            )
+            elapsed = time.time() - start
+        finally:
+            store.collection.remove(location_to_query(namespace.replace(category=None, name=None)))
+            for asset in (content_store.get_all_content_thumbnails_for_course(namespace) +
+                          content_store.get_all_content_for_course(namespace)):
+                content_store.delete(StaticContent.get_id_from_location(Location(asset['_id'])))
+
+        num_modules = sum(len(modules) for modules in xml_module_store.modules.itervalues())
+        self.stdout.write("{0:<8} {1:<20} {2:6d} modules {3:8.3f}s  {4:8.0f} modules/s\n".format(
+            course_dir, name, num_modules, elapsed, num_modules / elapsed if elapsed else float('inf')
+        ))
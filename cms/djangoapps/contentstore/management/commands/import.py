@@ -2,6 +2,7 @@
 Script for importing courseware from XML format
 """
 
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError, make_option
 from xmodule.modulestore.xml_importer import import_from_xml
 from xmodule.modulestore.django import modulestore
@@ -36,4 +37,5 @@ class Command(BaseCommand):
             courses=course_dirs,
             dis=do_import_static))
         import_from_xml(modulestore('direct'), data_dir, course_dirs, load_error_modules=False,
-                        static_content_store=contentstore(), verbose=True, do_import_static=do_import_static)
+                        static_content_store=contentstore(), verbose=True, do_import_static=do_import_static,
+                        bulk_write=True, static_content_workers=settings.COURSE_IMPORT_STATIC_CONTENT_WORKERS)
@@ -0,0 +1,47 @@
+"""
+WE'RE USING MIGRATIONS!
+
+If you make changes to this model, be sure to create an appropriate migration
+file and check it in at the same time as your model changes. To do that,
+
+1. Go to the edx-platform dir
+2. ./manage.py cms schemamigration contentstore --auto description_of_your_change
+3. Add the migration file created in edx-platform/cms/djangoapps/contentstore/migrations/
+"""
+import hashlib
+
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class CourseJobStatus(models.Model):
+    """
+    The status of an import or export of a course by a user, which the import and export
+    tasks write and the Studio views poll. It's kept in the database, which the Studio
+    servers and the workers share.
+
+    `action` is 'import' or 'export'.
+    `name` tells apart the jobs of the same action on the same course by the same user,
+        e.g. the file name of an import.
+    `job_key` is a hash of action, user, course_id and name, as they are too long together
+        to be a unique key in MySQL.
+    `status` is the status as a JSON-serialized dict.
+    `updated` stores the date that the status was last written.
+    """
+    job_key = models.CharField(max_length=40, unique=True)
+    action = models.CharField(max_length=16)
+    user = models.ForeignKey(User, db_index=True)
+    course_id = models.CharField(max_length=255, db_index=True)
+    name = models.CharField(max_length=255, blank=True)
+    status = models.TextField()
+    updated = models.DateTimeField(auto_now=True)
+
+    @staticmethod
+    def key_for(action, user_id, course_id, name):
+        """Returns the job_key of the job of action on course_id by the user with user_id"""
+        return hashlib.sha1(
+            u'{0}/{1}/{2}/{3}'.format(action, user_id, course_id, name).encode('utf-8')
+        ).hexdigest()
+
+    def __unicode__(self):
+        return u'{0} of {1} by {2}: {3}'.format(self.action, self.course_id, self.user_id, self.status)
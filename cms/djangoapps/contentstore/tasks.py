@@ -0,0 +1,264 @@
+"""
+Celery tasks that import and export courses, so that large courses don't tie up
+Studio requests.
+
+Their progress is kept in the database, as a `CourseJobStatus`, where the
+import_status and export_status views read it from. Extracted course imports and
+course exports are kept under GITHUB_REPO_ROOT, which must be shared by the Studio
+servers and the workers.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+
+from celery import task
+from celery.result import AsyncResult
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from path import path
+
+from auth.authz import create_all_course_groups
+from contentstore.models import CourseJobStatus
+from xmodule.contentstore.django import contentstore
+from xmodule.exceptions import SerializationError
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.xml_exporter import export_to_tar
+from xmodule.modulestore.xml_importer import import_from_xml
+
+log = logging.getLogger(__name__)
+
+# Stages of imports, which the import page displays. Stages 1 and 2 happen in the request
+# that uploads the course.
+IMPORT_UNPACKING = 1
+IMPORT_VERIFYING = 2
+IMPORT_UPDATING = 3
+IMPORT_DONE = 4
+
+# Stages of exports
+EXPORT_EXPORTING = 1
+EXPORT_DONE = 2
+
+# How long the status of a job is kept for after it was last updated, in seconds
+STATUS_TIMEOUT = 24 * 60 * 60
+
+# The least time between updates of the progress of a job, in seconds
+PROGRESS_UPDATE_INTERVAL = 1.0
+
+# How long a running job may go without updating its status before it's taken to be lost,
+# e.g. with a worker that was restarted, in seconds
+JOB_STALLED_TIMEOUT = 15 * 60
+
+
+class CourseJob(object):
+    """
+    The status of an import or export of a course by a user, a dict with the stage of the
+    job, its progress, and an 'ErrMsg' if it failed, that's kept in a CourseJobStatus row.
+
+    The status is written in transactions of its own, so that the workers and the Studio
+    requests see each other's writes while the job runs.
+    """
+    def __init__(self, action, user_id, course_id, name=''):
+        self.action = action
+        self.user_id = user_id
+        self.course_id = course_id
+        self.name = name
+        self.job_key = CourseJobStatus.key_for(action, user_id, course_id, name)
+
+    def get(self):
+        """Returns the status, or None if there isn't any, or it's older than STATUS_TIMEOUT"""
+        try:
+            job_status = CourseJobStatus.objects.get(job_key=self.job_key)
+        except CourseJobStatus.DoesNotExist:
+            return None
+        if job_status.updated < timezone.now() - timedelta(seconds=STATUS_TIMEOUT):
+            return None
+        return json.loads(job_status.status)
+
+    @transaction.autocommit
+    def claim(self, is_running, **status):
+        """
+        Sets the status of a job that's about to be started to status, unless the job is
+        already running, and returns whether it did. Of concurrent callers, only one
+        claims the job.
+
+        is_running is a function that returns whether a status is the one of a running
+        job. A running job is taken to be lost if its status wasn't updated for
+        JOB_STALLED_TIMEOUT, or if the task with its TaskId has finished, and is claimed
+        again. A status older than STATUS_TIMEOUT is claimed too, like a missing one.
+        """
+        job_status, created = CourseJobStatus.objects.get_or_create(
+            job_key=self.job_key,
+            defaults={
+                'action': self.action,
+                'user_id': self.user_id,
+                'course_id': self.course_id,
+                'name': self.name,
+                'status': json.dumps(status),
+            }
+        )
+        if created:
+            return True
+
+        now = timezone.now()
+        current = json.loads(job_status.status)
+        expired = job_status.updated < now - timedelta(seconds=STATUS_TIMEOUT)
+        if not expired and not (is_running(current) and self._is_lost(current, job_status.updated)):
+            return False
+        # only replaces the status that was read, so that a concurrent claim wins at most once
+        return bool(CourseJobStatus.objects.filter(
+            job_key=self.job_key, updated=job_status.updated, status=job_status.status
+        ).update(status=json.dumps(status), updated=now))
+
+    def _is_lost(self, status, updated):
+        """Returns whether the running job with status, last updated at updated, was lost"""
+        if updated < timezone.now() - timedelta(seconds=JOB_STALLED_TIMEOUT):
+            return True
+        task_id = status.get('TaskId')
+        return task_id is not None and AsyncResult(task_id).ready()
+
+    @transaction.autocommit
+    def set(self, **status):
+        """Replaces the status"""
+        self._write(status)
+
+    @transaction.autocommit
+    def update(self, **status):
+        """Updates some fields of the status"""
+        current = self.get() or {}
+        current.update(status)
+        self._write(current)
+
+    @transaction.autocommit
+    def delete(self):
+        """Forgets the status"""
+        CourseJobStatus.objects.filter(job_key=self.job_key).delete()
+
+    def _write(self, status):
+        """Writes status to the CourseJobStatus row of the job, creating it if there's none"""
+        serialized = json.dumps(status)
+        updated = CourseJobStatus.objects.filter(job_key=self.job_key).update(
+            status=serialized, updated=timezone.now()
+        )
+        if not updated:
+            CourseJobStatus.objects.create(
+                job_key=self.job_key,
+                action=self.action,
+                user_id=self.user_id,
+                course_id=self.course_id,
+                name=self.name,
+                status=serialized,
+            )
+
+    def progress_callback(self, **fields):
+        """
+        Returns a function that updates the progress of the job, at most every
+        PROGRESS_UPDATE_INTERVAL seconds. It's called with the values of the
+        status fields named by the keys of fields, in the order of their values.
+        """
+        updated_at = [0]
+
+        def update_progress(*values):
+            """Updates the fields of the status to values"""
+            now = time.time()
+            if now - updated_at[0] >= PROGRESS_UPDATE_INTERVAL:
+                updated_at[0] = now
+                self.update(**dict((name, values[index]) for name, index in fields.iteritems()))
+
+        return update_progress
+
+
+def import_status(user_id, course_id, filename):
+    """Returns the CourseJob of the import of filename into course_id by the user"""
+    return CourseJob('import', user_id, course_id, filename)
+
+
+def export_status(user_id, course_id):
+    """Returns the CourseJob of the export of course_id by the user"""
+    return CourseJob('export', user_id, course_id)
+
+
+def export_path(user_id, course_location):
+    """Returns the path that the export of the course at course_location by the user is written to"""
+    return path(settings.GITHUB_REPO_ROOT) / 'exports' / u'{0}-{1}-{2}-{3}.tar.gz'.format(
+        user_id, course_location.org, course_location.course, course_location.name
+    )
+
+
+@task()
+def import_course(user_id, course_id, course_subdir, location_url, filename):
+    """
+    Imports the course extracted to course_subdir of GITHUB_REPO_ROOT into the course at
+    location_url, which has the locator course_id, for the user with user_id, who uploaded
+    it as filename. Then deletes course_subdir.
+    """
+    status = import_status(user_id, course_id, filename)
+    course_dir = path(settings.GITHUB_REPO_ROOT) / course_subdir
+    try:
+        _module_store, course_items = import_from_xml(
+            modulestore('direct'),
+            settings.GITHUB_REPO_ROOT,
+            [course_subdir],
+            load_error_modules=False,
+            static_content_store=contentstore(),
+            target_location_namespace=Location(location_url),
+            draft_store=modulestore(),
+            bulk_write=True,
+            static_content_workers=settings.COURSE_IMPORT_STATIC_CONTENT_WORKERS,
+            progress_callback=status.progress_callback(BlocksProcessed=0, AssetsProcessed=1),
+        )
+
+        log.debug('new course at {0}'.format(course_items[0].location))
+
+        create_all_course_groups(User.objects.get(id=user_id), course_items[0].location)
+        log.debug('created all course groups at {0}'.format(course_items[0].location))
+
+        status.update(ImportStatus=IMPORT_DONE)
+    except Exception as exception:  # pylint: disable=broad-except
+        log.exception('Error importing course to %s', location_url)
+        status.update(ErrMsg=unicode(exception))
+    finally:
+        shutil.rmtree(course_dir)
+
+
+@task()
+def export_course(user_id, course_id, location_url):
+    """
+    Exports the course at location_url, which has the locator course_id, for the user with
+    user_id, to export_path as a tar.gz.
+    """
+    status = export_status(user_id, course_id)
+    course_location = Location(location_url)
+    tar_path = export_path(user_id, course_location)
+    tar_path.dirname().makedirs_p()
+    # written next to tar_path so the export is only found once it's complete, to a file
+    # of its own in case a lost export is still running
+    partial_fd, partial_path = tempfile.mkstemp(
+        dir=tar_path.dirname(), prefix=tar_path.basename(), suffix='.partial'
+    )
+    # mkstemp makes the file private to the worker, but the Studio servers serve it
+    os.chmod(partial_path, 0o644)
+    try:
+        with os.fdopen(partial_fd, 'wb') as tar_file:
+            export_to_tar(
+                modulestore('direct'), contentstore(), course_location, tar_file, course_location.name,
+                draft_modulestore=modulestore(),
+                progress_callback=status.progress_callback(FilesExported=0, AssetsExported=1),
+            )
+        os.rename(partial_path, tar_path)
+        status.update(ExportStatus=EXPORT_DONE)
+    except SerializationError as exception:
+        log.exception('Error exporting course %s', location_url)
+        status.update(ErrMsg=unicode(exception), FailedLocation=Location(exception.location).url())
+    except Exception as exception:  # pylint: disable=broad-except
+        log.exception('Error exporting course %s', location_url)
+        status.update(ErrMsg=unicode(exception))
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
@@ -1797,6 +1797,90 @@ class ContentStoreTest(ModuleStoreTestCase):
 
         self.assertEqual(timedelta(1), new_module.graceperiod)
 
+    def test_incremental_metadata_inheritance(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_location = Location(['i4x', 'edX', 'toy', 'course', '2012_Fall', None])
+        # make sure the tree is cached, so that the writes below patch it
+        module_store.refresh_cached_metadata_inheritance_tree(course_location)
+
+        sequential = module_store.get_items(['i4x', 'edX', 'toy', 'sequential', None, None])[0]
+        sequential.graceperiod = timedelta(3)
+        module_store.update_metadata(sequential.location, own_metadata(sequential))
+
+        # move a vertical under the sequential
+        vertical = module_store.get_items(['i4x', 'edX', 'toy', 'vertical', None, None])[-1]
+        for parent_location in module_store.get_parent_locations(vertical.location, None):
+            parent = module_store.get_item(parent_location)
+            module_store.update_children(
+                parent.location, [child for child in parent.children if child != vertical.location.url()]
+            )
+        module_store.update_children(sequential.location, sequential.children + [vertical.location.url()])
+
+        self.assertEqual(timedelta(3), module_store.get_item(vertical.location).graceperiod)
+        for child in vertical.children:
+            self.assertEqual(timedelta(3), module_store.get_item(child).graceperiod)
+
+        # the patched tree is the same as a freshly computed one
+        self.assertEqual(
+            module_store.compute_metadata_inheritance_tree(course_location),
+            module_store.get_cached_metadata_inheritance_tree(course_location)
+        )
+
+    def test_interleaved_metadata_inheritance_updates(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_location = Location(['i4x', 'edX', 'toy', 'course', '2012_Fall', None])
+        module_store.refresh_cached_metadata_inheritance_tree(course_location)
+
+        sequentials = module_store.get_items(['i4x', 'edX', 'toy', 'sequential', None, None])
+        chapter = module_store.get_items(['i4x', 'edX', 'toy', 'chapter', None, None])[0]
+        write_inheritance_tree = module_store._write_inheritance_tree  # pylint: disable=protected-access
+
+        def write_after_concurrent_update(*args):
+            """Updates the chapter, as another process would, before the first update writes the tree"""
+            if not write_after_concurrent_update.interleaved:
+                write_after_concurrent_update.interleaved = True
+                chapter.graceperiod = timedelta(5)
+                module_store.update_metadata(chapter.location, own_metadata(chapter))
+            write_inheritance_tree(*args)
+        write_after_concurrent_update.interleaved = False
+
+        with mock.patch.object(module_store, '_write_inheritance_tree', side_effect=write_after_concurrent_update):
+            sequentials[0].graceperiod = timedelta(3)
+            module_store.update_metadata(sequentials[0].location, own_metadata(sequentials[0]))
+        self.assertTrue(write_after_concurrent_update.interleaved)
+
+        # neither update is lost
+        self.assertEqual(
+            module_store.compute_metadata_inheritance_tree(course_location),
+            module_store.get_cached_metadata_inheritance_tree(course_location)
+        )
+        for child in chapter.children:
+            if child != sequentials[0].location.url():
+                self.assertEqual(timedelta(5), module_store.get_item(child).graceperiod)
+
+    def test_legacy_cached_inheritance_tree(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_location = Location(['i4x', 'edX', 'toy', 'course', '2012_Fall', None])
+        cache = module_store.metadata_inheritance_cache_subsystem
+
+        # a tree cached by a server running the previous release
+        legacy_key = mongo.base.metadata_cache_key(course_location)
+        cache.set(legacy_key, {course_location.url(): {'graceperiod': '1 day'}})
+        self.assertEqual(
+            module_store.compute_metadata_inheritance_tree(course_location),
+            module_store.get_cached_metadata_inheritance_tree(course_location)
+        )
+
+        # writes make those servers recompute it
+        cache.set(legacy_key, {course_location.url(): {'graceperiod': '1 day'}})
+        sequential = module_store.get_items(['i4x', 'edX', 'toy', 'sequential', None, None])[0]
+        sequential.graceperiod = timedelta(3)
+        module_store.update_metadata(sequential.location, own_metadata(sequential))
+        self.assertIsNone(cache.get(legacy_key))
+
     def test_default_metadata_inheritance(self):
         course = CourseFactory.create()
         vertical = ItemFactory.create(parent_location=course.location)
@@ -7,6 +7,7 @@ import tarfile
 import tempfile
 import copy
 from path import path
+from datetime import timedelta
 import json
 import logging
 from uuid import uuid4
@@ -17,8 +18,11 @@ from django.test.utils import override_settings
 from django.conf import settings
 from xmodule.modulestore.django import loc_mapper
 
+from contentstore.models import CourseJobStatus
+from contentstore.tasks import JOB_STALLED_TIMEOUT, STATUS_TIMEOUT, export_status
 from xmodule.contentstore.django import _CONTENTSTORE
 from xmodule.modulestore.tests.factories import ItemFactory
+from mock import patch
 
 TEST_DATA_CONTENTSTORE = copy.deepcopy(settings.CONTENTSTORE)
 TEST_DATA_CONTENTSTORE['DOC_STORE_CONFIG']['db'] = 'test_xcontent_%s' % uuid4().hex
@@ -105,6 +109,17 @@ class ImportTestCase(CourseTestCase):
             resp = self.client.post(self.url, args)
 
         self.assertEquals(resp.status_code, 200)
+        # the import task is run eagerly in tests, so the import is done
+        self.assertEquals(json.loads(resp.content)["ImportStatus"], 4)
+        resp_status = self.client.get(
+            self.new_location.url_reverse(
+                'import_status',
+                os.path.split(self.good_tar)[1]
+            )
+        )
+        import_status = json.loads(resp_status.content)
+        self.assertEquals(import_status["ImportStatus"], 4)
+        self.assertGreater(import_status["BlocksProcessed"], 0)
 
     ## Unsafe tar methods #####################################################
     # Each of these methods creates a tarfile with a single type of unsafe
@@ -212,6 +227,7 @@ class ExportTestCase(CourseTestCase):
         super(ExportTestCase, self).setUp()
         location = loc_mapper().translate_location(self.course.location.course_id, self.course.location, False, True)
         self.url = location.url_reverse('export/', '')
+        self.status_url = location.url_reverse('export_status/', '')
 
     def test_export_html(self):
         """
@@ -242,10 +258,68 @@ class ExportTestCase(CourseTestCase):
         resp = self.client.get(self.url + '?_accept=application/x-tgz')
         self._verify_export_succeeded(resp)
 
+    def test_export_in_progress(self):
+        """
+        The export page polls for the status of an export that isn't done yet.
+        """
+        with patch('contentstore.views.import_export.export_course.apply_async') as mock_delay:
+            resp = self.client.get(self.url, HTTP_ACCEPT='application/x-tgz')
+            self.assertEquals(mock_delay.call_count, 1)
+            self.assertEquals(resp.status_code, 200)
+            self.assertIsNone(resp.get('Content-Disposition'))
+            self.assertContains(resp, self.status_url)
+            self.assertEquals(json.loads(self.client.get(self.status_url).content)["ExportStatus"], 1)
+
+            # the export isn't started again while it's in progress
+            self.client.get(self.url, HTTP_ACCEPT='application/x-tgz')
+            self.assertEquals(mock_delay.call_count, 1)
+
+    def test_export_status_expires(self):
+        """
+        The status of an export that hasn't been updated for STATUS_TIMEOUT is forgotten.
+        """
+        with patch('contentstore.views.import_export.export_course.apply_async'):
+            self.client.get(self.url, HTTP_ACCEPT='application/x-tgz')
+        self.assertEquals(json.loads(self.client.get(self.status_url).content)["ExportStatus"], 1)
+
+        job_status = CourseJobStatus.objects.get(action='export', user=self.user)
+        CourseJobStatus.objects.filter(id=job_status.id).update(
+            updated=job_status.updated - timedelta(seconds=STATUS_TIMEOUT + 1)
+        )
+        self.assertEquals(json.loads(self.client.get(self.status_url).content)["ExportStatus"], 0)
+
+    def test_lost_export_restarted(self):
+        """
+        An export whose status hasn't been updated for JOB_STALLED_TIMEOUT is started again.
+        """
+        with patch('contentstore.views.import_export.export_course.apply_async') as mock_apply_async:
+            self.client.get(self.url, HTTP_ACCEPT='application/x-tgz')
+            CourseJobStatus.objects.filter(action='export', user=self.user).update(
+                updated=CourseJobStatus.objects.get(action='export', user=self.user).updated -
+                timedelta(seconds=JOB_STALLED_TIMEOUT + 1)
+            )
+            self.client.get(self.url, HTTP_ACCEPT='application/x-tgz')
+            self.assertEquals(mock_apply_async.call_count, 2)
+            # each export has a task id of its own
+            task_ids = [call[1]['task_id'] for call in mock_apply_async.call_args_list]
+            self.assertNotEquals(task_ids[0], task_ids[1])
+
+    def test_export_claimed_once(self):
+        """
+        Of concurrent requests for an export, only one starts it.
+        """
+        status = export_status(self.user.id, self.course.location.course_id)
+        is_running = lambda current: True
+        self.assertTrue(status.claim(is_running, ExportStatus=1, TaskId='first'))
+        self.assertFalse(status.claim(is_running, ExportStatus=1, TaskId='second'))
+        self.assertEquals('first', status.get()['TaskId'])
+
     def _verify_export_succeeded(self, resp):
         """ Export success helper method. """
         self.assertEquals(resp.status_code, 200)
         self.assertTrue(resp.get('Content-Disposition').startswith('attachment'))
+        # the status is cleared once the export is downloaded
+        self.assertEquals(json.loads(self.client.get(self.status_url).content)["ExportStatus"], 0)
 
     def test_export_failure_top_level(self):
         """
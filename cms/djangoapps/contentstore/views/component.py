@@ -263,14 +263,10 @@ def edit_unit(request, location):
     # this will need to change to check permissions correctly so as
     # to pick the correct parent subsection
 
-    containing_subsection_locs = modulestore().get_parent_locations(
-            location, None
-    )
-    containing_subsection = modulestore().get_item(containing_subsection_locs[0])
-    containing_section_locs = modulestore().get_parent_locations(
-            containing_subsection.location, None
-    )
-    containing_section = modulestore().get_item(containing_section_locs[0])
+    # the subsection and section are the first two ancestors of the unit
+    ancestor_locs = modulestore().get_parent_chains([location], None)[location]
+    containing_subsection = modulestore().get_item(ancestor_locs[0])
+    containing_section = modulestore().get_item(ancestor_locs[1])
 
     # cdodge hack. We're having trouble previewing drafts via jump_to redirect
     # so let's generate the link url here
@@ -7,7 +7,7 @@ import os
 import tarfile
 import shutil
 import re
-from tempfile import mkdtemp
+from uuid import uuid4
 from path import path
 
 from django.conf import settings
@@ -16,29 +16,28 @@ from django.contrib.auth.decorators import login_required
 from django_future.csrf import ensure_csrf_cookie
 from django.core.urlresolvers import reverse
 from django.core.servers.basehttp import FileWrapper
-from django.core.files.temp import NamedTemporaryFile
 from django.core.exceptions import SuspiciousOperation, PermissionDenied
 from django.http import HttpResponseNotFound
 from django.views.decorators.http import require_http_methods, require_GET
 from django.utils.translation import ugettext as _
 
 from mitxmako.shortcuts import render_to_response
-from auth.authz import create_all_course_groups
 
-from xmodule.modulestore.xml_importer import import_from_xml
-from xmodule.contentstore.django import contentstore
-from xmodule.modulestore.xml_exporter import export_to_xml
+from xmodule.modulestore import Location
 from xmodule.modulestore.django import modulestore, loc_mapper
-from xmodule.exceptions import SerializationError
 
 from xmodule.modulestore.locator import BlockUsageLocator
 from .access import has_access
 
+from contentstore.tasks import (
+    import_course, export_course, import_status, export_status, export_path,
+    IMPORT_UNPACKING, IMPORT_VERIFYING, IMPORT_UPDATING, EXPORT_EXPORTING, EXPORT_DONE,
+)
 from util.json_request import JsonResponse
 from extract_tar import safetar_extractall
 
 
-__all__ = ['import_handler', 'import_status_handler', 'export_handler']
+__all__ = ['import_handler', 'import_status_handler', 'export_handler', 'export_status_handler']
 
 
 log = logging.getLogger(__name__)
@@ -59,7 +58,9 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
         html: return html page for import page
         json: not supported
     POST or PUT
-        json: import a course via the .tar.gz file specified in request.FILES
+        json: import a course via the .tar.gz file specified in request.FILES. Once the last chunk
+            of the file is uploaded, it is extracted and verified, and then the course is imported
+            by an import_course task, whose progress import_status_handler returns.
     """
     location = BlockUsageLocator(course_id=course_id, branch=branch, version_guid=version_guid, usage_id=block)
     if not has_access(request.user, location):
@@ -85,6 +86,7 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
                     status=415
                 )
             temp_filepath = course_dir / filename
+            status = import_status(request.user.id, location.course_id, filename)
 
             if not course_dir.isdir():
                 os.mkdir(course_dir)
@@ -102,6 +104,8 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
             # stream out the uploaded files in chunks to disk
             if int(content_range['start']) == 0:
                 mode = "wb+"
+                # forget any earlier import of the same file
+                status.delete()
             else:
                 mode = "ab+"
                 size = os.path.getsize(temp_filepath)
@@ -147,11 +151,9 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
 
             else:   # This was the last chunk.
 
-                # Use sessions to keep info about import progress
-                session_status = request.session.setdefault("import_status", {})
-                key = location.course_id + filename
-                session_status[key] = 1
-                request.session.modified = True
+                status.set(ImportStatus=IMPORT_UNPACKING)
+                # once the import task is queued, it cleans up
+                queued = False
 
                 # Do everything from now on in a try-finally block to make sure
                 # everything is properly cleaned up.
@@ -172,8 +174,7 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
                     finally:
                         tar_file.close()
 
-                    session_status[key] = 2
-                    request.session.modified = True
+                    status.update(ImportStatus=IMPORT_VERIFYING)
 
                     # find the 'course.xml' file
                     def get_all_files(directory):
@@ -216,38 +217,37 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
                         for fname in os.listdir(dirpath):
                             shutil.move(dirpath / fname, course_dir)
 
-                    _module_store, course_items = import_from_xml(
-                        modulestore('direct'),
-                        settings.GITHUB_REPO_ROOT,
-                        [course_subdir],
-                        load_error_modules=False,
-                        static_content_store=contentstore(),
-                        target_location_namespace=old_location,
-                        draft_store=modulestore()
+                    status.update(ImportStatus=IMPORT_UPDATING)
+                    import_course.delay(
+                        request.user.id, location.course_id, course_subdir, old_location.url(), filename
                     )
-
-                    logging.debug('new course at {0}'.format(course_items[0].location))
-
-                    session_status[key] = 3
-                    request.session.modified = True
-
-                    create_all_course_groups(request.user, course_items[0].location)
-                    logging.debug('created all course groups at {0}'.format(course_items[0].location))
+                    queued = True
 
                 # Send errors to client with stage at which error occured.
                 except Exception as exception:   # pylint: disable=W0703
                     return JsonResponse(
                         {
                             'ErrMsg': str(exception),
-                            'Stage': session_status[key]
+                            'Stage': (status.get() or {}).get('ImportStatus')
                         },
                         status=400
                     )
 
                 finally:
-                    shutil.rmtree(course_dir)
+                    if not queued:
+                        shutil.rmtree(course_dir)
 
-                return JsonResponse({'Status': 'OK'})
+                # the import may already be done, e.g. if tasks are run eagerly
+                current_status = status.get() or {}
+                if 'ErrMsg' in current_status:
+                    return JsonResponse(
+                        {
+                            'ErrMsg': current_status['ErrMsg'],
+                            'Stage': current_status.get('ImportStatus')
+                        },
+                        status=400
+                    )
+                return JsonResponse({'Status': 'OK', 'ImportStatus': current_status.get('ImportStatus')})
     elif request.method == 'GET':  # assume html
         course_module = modulestore().get_item(old_location)
         return render_to_response('import.html', {
@@ -264,25 +264,24 @@ def import_handler(request, tag=None, course_id=None, branch=None, version_guid=
 @login_required
 def import_status_handler(request, tag=None, course_id=None, branch=None, version_guid=None, block=None, filename=None):
     """
-    Returns an integer corresponding to the status of a file import. These are:
+    Returns the status of a file import, with an integer ImportStatus corresponding to its stage:
 
-        0 : No status info found (import done or upload still in progress)
+        0 : No status info found (upload still in progress)
         1 : Extracting file
         2 : Validating.
         3 : Importing to mongo
+        4 : Import done
 
+    While importing to mongo, BlocksProcessed and AssetsProcessed are the numbers of modules and
+    static files imported so far. If the import failed, ErrMsg is the error and ImportStatus is
+    the stage it failed at.
     """
     location = BlockUsageLocator(course_id=course_id, branch=branch, version_guid=version_guid, usage_id=block)
     if not has_access(request.user, location):
         raise PermissionDenied()
 
-    try:
-        session_status = request.session["import_status"]
-        status = session_status[location.course_id + filename]
-    except KeyError:
-        status = 0
-
-    return JsonResponse({"ImportStatus": status})
+    status = import_status(request.user.id, location.course_id, filename).get()
+    return JsonResponse(status or {"ImportStatus": 0})
 
 
 @ensure_csrf_cookie
@@ -300,6 +299,10 @@ def export_handler(request, tag=None, course_id=None, branch=None, version_guid=
     Note that there are 2 ways to request the tar.gz file. The request header can specify
     application/x-tgz via HTTP_ACCEPT, or a query parameter can be used (?_accept=application/x-tgz).
 
+    The course is exported by an export_course task. If it isn't done when the tar.gz file is
+    requested, the html page is returned, which polls export_status_handler and requests the file
+    again once the export is done.
+
     If the tar.gz file has been requested but the export operation fails, an HTML page will be returned
     which describes the error.
     """
@@ -315,66 +318,46 @@ def export_handler(request, tag=None, course_id=None, branch=None, version_guid=
 
     export_url = location.url_reverse('export/', '') + '?_accept=application/x-tgz'
     if 'application/x-tgz' in requested_format:
-        name = old_location.name
-        export_file = NamedTemporaryFile(prefix=name + '.', suffix=".tar.gz")
-        root_dir = path(mkdtemp())
-
-        try:
-            export_to_xml(modulestore('direct'), contentstore(), old_location, root_dir, name, modulestore())
-
-        except SerializationError, e:
-            logging.exception('There was an error exporting course {0}. {1}'.format(course_module.location, unicode(e)))
-            unit = None
-            failed_item = None
-            parent = None
-            try:
-                failed_item = modulestore().get_instance(course_module.location.course_id, e.location)
-                parent_locs = modulestore().get_parent_locations(failed_item.location, course_module.location.course_id)
-
-                if len(parent_locs) > 0:
-                    parent = modulestore().get_item(parent_locs[0])
-                    if parent.location.category == 'vertical':
-                        unit = parent
-            except:
-                # if we have a nested exception, then we'll show the more generic error message
-                pass
-
-            return render_to_response('export.html', {
-                'context_course': course_module,
-                'in_err': True,
-                'raw_err_msg': str(e),
-                'failed_module': failed_item,
-                'unit': unit,
-                'edit_unit_url': reverse('edit_unit', kwargs={
-                    'location': parent.location
-                }) if parent else '',
-                'course_home_url': location.url_reverse("course/", ""),
-                'export_url': export_url
-
-            })
-        except Exception, e:
-            logging.exception('There was an error exporting course {0}. {1}'.format(course_module.location, unicode(e)))
+        status = export_status(request.user.id, location.course_id)
+        task_id = str(uuid4())
+        # starts the export unless it's running, or restarts it if it was lost
+        if status.claim(_export_in_progress, ExportStatus=EXPORT_EXPORTING, TaskId=task_id):
+            export_course.apply_async(
+                (request.user.id, location.course_id, old_location.url()), task_id=task_id
+            )
+        # the export may already be done, e.g. if tasks are run eagerly
+        current_status = status.get() or {}
+
+        if _export_in_progress(current_status):
             return render_to_response('export.html', {
                 'context_course': course_module,
-                'in_err': True,
-                'unit': None,
-                'raw_err_msg': str(e),
-                'course_home_url': location.url_reverse("course/", ""),
-                'export_url': export_url
+                'export_url': export_url,
+                'export_status_url': location.url_reverse('export_status/', ''),
+                'in_progress': True,
             })
 
-        logging.debug('tar file being generated at {0}'.format(export_file.name))
-        tar_file = tarfile.open(name=export_file.name, mode='w:gz')
-        tar_file.add(root_dir / name, arcname=name)
-        tar_file.close()
+        # the next request starts a new export
+        status.delete()
+        if 'ErrMsg' in current_status:
+            return _export_error_response(
+                course_module, location, export_url, current_status['ErrMsg'], current_status.get('FailedLocation')
+            )
 
-        # remove temp dir
-        shutil.rmtree(root_dir / name)
+        tar_path = export_path(request.user.id, old_location)
+        try:
+            export_file = open(tar_path, 'rb')
+        except IOError as exception:
+            logging.exception('Could not open the export of course {0}'.format(course_module.location))
+            return _export_error_response(course_module, location, export_url, str(exception))
+        # the file stays readable until it's closed
+        os.remove(tar_path)
 
         wrapper = FileWrapper(export_file)
         response = HttpResponse(wrapper, content_type='application/x-tgz')
-        response['Content-Disposition'] = 'attachment; filename=%s' % os.path.basename(export_file.name)
-        response['Content-Length'] = os.path.getsize(export_file.name)
+        response['Content-Disposition'] = 'attachment; filename=%s' % os.path.basename(
+            u'{0}.tar.gz'.format(old_location.name).encode('utf-8')
+        )
+        response['Content-Length'] = os.fstat(export_file.fileno()).st_size
         return response
 
     elif 'text/html' in requested_format:
@@ -386,3 +369,62 @@ def export_handler(request, tag=None, course_id=None, branch=None, version_guid=
     else:
         # Only HTML or x-tgz request formats are supported (no JSON).
         return HttpResponse(status=406)
+
+
+def _export_in_progress(status):
+    """Returns whether status is the one of an export that's still running"""
+    return status.get('ExportStatus') != EXPORT_DONE and 'ErrMsg' not in status
+
+
+def _export_error_response(course_module, location, export_url, raw_err_msg, failed_location=None):
+    """
+    Returns the html page describing the failure of an export, and the module that failed to be
+    exported, at the url failed_location, if known.
+    """
+    logging.error('There was an error exporting course {0}. {1}'.format(course_module.location, raw_err_msg))
+    unit = None
+    failed_item = None
+    parent = None
+    if failed_location is not None:
+        try:
+            failed_item = modulestore().get_instance(course_module.location.course_id, Location(failed_location))
+            parent_locs = modulestore().get_parent_locations(failed_item.location, course_module.location.course_id)
+
+            if len(parent_locs) > 0:
+                parent = modulestore().get_item(parent_locs[0])
+                if parent.location.category == 'vertical':
+                    unit = parent
+        except:
+            # if we have a nested exception, then we'll show the more generic error message
+            pass
+
+    return render_to_response('export.html', {
+        'context_course': course_module,
+        'in_err': True,
+        'raw_err_msg': raw_err_msg,
+        'failed_module': failed_item,
+        'unit': unit,
+        'edit_unit_url': reverse('edit_unit', kwargs={
+            'location': parent.location
+        }) if parent else '',
+        'course_home_url': location.url_reverse("course/", ""),
+        'export_url': export_url
+    })
+
+
+@require_GET
+@ensure_csrf_cookie
+@login_required
+def export_status_handler(request, tag=None, course_id=None, branch=None, version_guid=None, block=None):
+    """
+    Returns the status of the export of a course requested by the user, with an integer
+    ExportStatus, which is 0 if there's no export, 1 while exporting and 2 once the export is
+    done, and the numbers FilesExported and AssetsExported of files exported so far. If the
+    export failed, ErrMsg is the error.
+    """
+    location = BlockUsageLocator(course_id=course_id, branch=branch, version_guid=version_guid, usage_id=block)
+    if not has_access(request.user, location):
+        raise PermissionDenied()
+
+    status = export_status(request.user.id, location.course_id).get()
+    return JsonResponse(status or {"ExportStatus": 0})
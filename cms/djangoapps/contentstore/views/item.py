@@ -130,9 +130,11 @@ def _save_item(usage_loc, item_location, data=None, children=None, metadata=None
 
     if children is not None:
         children_ids = [
-            loc_mapper().translate_locator_to_location(BlockUsageLocator(child_locator)).url()
-            for child_locator
-            in children
+            child_location.url()
+            for child_location
+            in loc_mapper().translate_locators_to_locations(
+                [BlockUsageLocator(child_locator) for child_locator in children]
+            )
         ]
         store.update_children(item_location, children_ids)
 
@@ -109,6 +109,10 @@ SITE_NAME = ENV_TOKENS['SITE_NAME']
 LOG_DIR = ENV_TOKENS['LOG_DIR']
 
 CACHES = ENV_TOKENS['CACHES']
+CONTENTSERVER_DISK_CACHE = ENV_TOKENS.get('CONTENTSERVER_DISK_CACHE', CONTENTSERVER_DISK_CACHE)
+COURSE_IMPORT_STATIC_CONTENT_WORKERS = ENV_TOKENS.get(
+    'COURSE_IMPORT_STATIC_CONTENT_WORKERS', COURSE_IMPORT_STATIC_CONTENT_WORKERS
+)
 
 SESSION_COOKIE_DOMAIN = ENV_TOKENS.get('SESSION_COOKIE_DOMAIN')
 SESSION_ENGINE = ENV_TOKENS.get('SESSION_ENGINE', SESSION_ENGINE)
@@ -172,6 +172,14 @@ MIDDLEWARE_CLASSES = (
     'ratelimitbackend.middleware.RateLimitMiddleware',
 )
 
+# Node-local disk cache for static content too large for memcached, served by
+# contentserver.middleware.StaticContentServer. Disabled if None, otherwise e.g.
+# {'DIRECTORY': '/var/tmp/contentserver', 'MAX_SIZE': 10 * 1024 ** 3}
+CONTENTSERVER_DISK_CACHE = None
+
+# Number of threads saving the static content of a course being imported to the contentstore
+COURSE_IMPORT_STATIC_CONTENT_WORKERS = 4
+
 ############# XBlock Configuration ##########
 
 # This should be moved into an XBlock Runtime/Application object
@@ -384,6 +392,7 @@ INSTALLED_APPS = (
     'course_creators',
     'student',  # misleading name due to sharing with lms
     'course_groups',  # not used in cms (yet), but tests run
+    'course_overviews',  # rebuilt when courses are edited here
 
     # Tracking
     'track',
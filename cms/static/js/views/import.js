@@ -41,7 +41,7 @@ define(
 
         /**
          * Check for import status updates every `timeout` milliseconds, and update
-         * the page accordingly.
+         * the page accordingly, until the import is done or has failed.
          * @param {string} url Url to call for status updates.
          * @param {int} timeout Number of milliseconds to wait in between ajax calls
          *     for new updates.
@@ -50,11 +50,19 @@ define(
         var getStatus = function (url, timeout, stage) {
             var currentStage = stage || 0;
             if (CourseImport.stopGetStatus) { return ;}
+            if (currentStage == 4) {
+                CourseImport.displayFinishedImport();
+                return;
+            }
             updateStage(currentStage);
-            if (currentStage == 3 ) { return ;}
             var time = timeout || 1000;
             $.getJSON(url,
                 function (data) {
+                    if (data.hasOwnProperty("ErrMsg")) {
+                        CourseImport.stopGetStatus = true;
+                        CourseImport.stageError(data.ImportStatus, data.ErrMsg);
+                        return;
+                    }
                     setTimeout(function () {
                         getStatus(url, time, data.ImportStatus);
                     }, time);
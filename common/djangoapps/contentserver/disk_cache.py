@@ -0,0 +1,333 @@
+"""
+A node-local disk cache for static content that is too large for memcached.
+
+Content is stored in files named after its location and upload date, so a
+re-uploaded asset never matches the file of its previous version. A miss fills
+the cache while the content is streamed to the client, by the one request that
+holds the lock file of the content; concurrent misses stream from the DB without
+filling it. Each process keeps a running total of the size of the cache, and once
+it exceeds the configured budget, files are evicted least recently used first
+(by file modification time, which hits update). The directory may be shared by
+all the processes on a node: files are written under a temporary name and renamed
+into place, and a file that is evicted while it is being served stays readable
+through the already opened handle.
+
+Configured with the CONTENTSERVER_DISK_CACHE setting, e.g.
+    CONTENTSERVER_DISK_CACHE = {'DIRECTORY': '/var/tmp/contentserver', 'MAX_SIZE': 10 * 1024 ** 3}
+"""
+import errno
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from dogapi import dog_stats_api
+from django.conf import settings
+
+from xmodule.contentstore.content import StaticContent, STREAM_DATA_CHUNK_SIZE
+
+log = logging.getLogger(__name__)
+
+CACHE_FILE_SUFFIX = '.asset'
+LOCK_FILE_SUFFIX = '.lock'
+TEMP_FILE_PREFIX = '.tmp'
+
+# How long a lock file or temporary file is kept before it's taken to be left over
+# from a fill that didn't finish, e.g. of a process that was killed, in seconds
+FILL_TIMEOUT = 10 * 60
+
+# The fraction of the budget that eviction brings the size of the cache down to, so
+# that the directory isn't scanned again by the next fill
+EVICT_TO = 0.9
+
+
+def content_attributes(content):
+    """
+    Returns a copy of content without its data, to be kept in memcached for
+    content whose data is in the disk cache
+    """
+    return StaticContent(
+        content.location, content.name, content.content_type, None,
+        last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+        import_path=content.import_path, length=content.length, locked=getattr(content, 'locked', False),
+        content_digest=getattr(content, 'content_digest', None)
+    )
+
+
+class DiskCachedContent(StaticContent):
+    """
+    Static content served from a file of the disk cache. The file is opened when
+    the data is streamed, and closed once the stream ends or is closed, e.g. by the
+    response it was given to.
+    """
+    def __init__(self, content, path):
+        super(DiskCachedContent, self).__init__(
+            content.location, content.name, content.content_type, None,
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=content.length, locked=getattr(content, 'locked', False),
+            content_digest=getattr(content, 'content_digest', None)
+        )
+        self._path = path
+
+    def stream_data(self):
+        return self.stream_data_in_range(0, self.length - 1)
+
+    def stream_data_in_range(self, first_byte, last_byte):
+        with open(self._path, 'rb') as cache_file:
+            cache_file.seek(first_byte)
+            remaining = last_byte - first_byte + 1
+            while remaining > 0:
+                chunk = cache_file.read(min(remaining, STREAM_DATA_CHUNK_SIZE))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+class DiskCacheFillingContent(StaticContent):
+    """
+    Static content streamed from the DB, which writes its data to the disk cache as
+    it's streamed, if no other request is filling the cache with it already
+    """
+    def __init__(self, content, disk_cache):
+        super(DiskCacheFillingContent, self).__init__(
+            content.location, content.name, content.content_type, None,
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=content.length, locked=getattr(content, 'locked', False),
+            content_digest=getattr(content, 'content_digest', None)
+        )
+        self._content = content
+        self._disk_cache = disk_cache
+
+    def stream_data(self):
+        fill = self._disk_cache.start_fill(self)
+        if fill is None:
+            for chunk in self._content.stream_data():
+                yield chunk
+            return
+
+        with fill:
+            for chunk in self._content.stream_data():
+                fill.write(chunk)
+                yield chunk
+            fill.finish()
+
+    def stream_data_in_range(self, first_byte, last_byte):
+        # only whole content fills the cache
+        return self._content.stream_data_in_range(first_byte, last_byte)
+
+
+class _Fill(object):
+    """
+    The writing of content to a temporary file of disk_cache while it's streamed,
+    which holds the lock file of the content. Used as a context manager, which
+    removes the temporary file and the lock file unless the fill finished.
+    """
+    def __init__(self, disk_cache, content, path, lock_path):
+        self.disk_cache = disk_cache
+        self.content = content
+        self.path = path
+        self.lock_path = lock_path
+        file_descriptor, self.temp_path = tempfile.mkstemp(dir=disk_cache.directory, prefix=TEMP_FILE_PREFIX)
+        self.temp_file = os.fdopen(file_descriptor, 'wb')
+        self.size = 0
+
+    def write(self, chunk):
+        """Writes chunk to the temporary file, unless writing failed before"""
+        if self.temp_file is None:
+            return
+        try:
+            self.temp_file.write(chunk)
+            self.size += len(chunk)
+        except (IOError, OSError):
+            log.exception("Unable to write %s to the disk cache", self.content.location)
+            self._abandon()
+
+    def finish(self):
+        """Renames the temporary file into place, if all of the content was written"""
+        if self.temp_file is None:
+            return
+        try:
+            self.temp_file.close()
+            self.temp_file = None
+            if self.size != self.content.length:
+                raise IOError('Wrote {0} of {1} bytes'.format(self.size, self.content.length))
+            os.rename(self.temp_path, self.path)
+        except (IOError, OSError):
+            log.exception("Unable to write %s to the disk cache", self.content.location)
+            self._abandon()
+            return
+        self.temp_path = None
+        dog_stats_api.increment('contentserver.disk_cache.fill_bytes', value=self.size)
+        self.disk_cache.added(self.size)
+
+    def _abandon(self):
+        """Closes and removes the temporary file"""
+        if self.temp_file is not None:
+            self.temp_file.close()
+            self.temp_file = None
+        if self.temp_path is not None:
+            _remove(self.temp_path)
+            self.temp_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        # e.g. the client went away before the content was streamed to it
+        self._abandon()
+        _remove(self.lock_path)
+
+
+def _remove(path):
+    """Removes the file at path, unless it was removed already, e.g. by another process"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class DiskContentCache(object):
+    """
+    A size-bounded LRU cache of static content in `directory`, holding at most
+    `max_size` bytes.
+    """
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # the size of the cache as this process knows it: as last counted, plus the
+        # fills of this process since. None until it's counted.
+        self._size = None
+        self._size_lock = threading.Lock()
+
+    def _path(self, content):
+        """
+        Returns the path of the cache file of content, which depends on its location and upload date
+        """
+        key = hashlib.sha1(u'{0}|{1}'.format(
+            content.location.url(), content.last_modified_at.isoformat()
+        ).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + CACHE_FILE_SUFFIX)
+
+    def get(self, content):
+        """
+        Returns the DiskCachedContent for content (e.g. data-less content from memcached),
+        or None if it isn't in the cache
+        """
+        path = self._path(content)
+        try:
+            # marks the file as recently used
+            os.utime(path, None)
+        except OSError:
+            dog_stats_api.increment('contentserver.disk_cache.miss')
+            return None
+
+        dog_stats_api.increment('contentserver.disk_cache.hit')
+        dog_stats_api.increment('contentserver.disk_cache.hit_bytes', value=content.length)
+        return DiskCachedContent(content, path)
+
+    def put(self, content):
+        """
+        Returns the DiskCacheFillingContent for content, a StaticContentStream, which
+        writes it to the cache as it's streamed, or None if content is too large to be cached.
+        """
+        if content.length is None or content.length > self.max_size:
+            return None
+        return DiskCacheFillingContent(content, self)
+
+    def start_fill(self, content):
+        """
+        Takes the lock file of content and returns the _Fill that writes it to the
+        cache, or None if another request holds the lock file, or if it can't be taken
+        """
+        path = self._path(content)
+        lock_path = path[:-len(CACHE_FILE_SUFFIX)] + LOCK_FILE_SUFFIX
+        for _ in range(2):
+            try:
+                os.close(os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+                break
+            except OSError as error:
+                if error.errno != errno.EEXIST:
+                    log.exception("Unable to lock %s in the disk cache", content.location)
+                    return None
+            # the lock file may be left over from a fill that didn't finish
+            try:
+                if os.stat(lock_path).st_mtime > time.time() - FILL_TIMEOUT:
+                    dog_stats_api.increment('contentserver.disk_cache.fill_locked')
+                    return None
+            except OSError:
+                # the other fill just finished
+                pass
+            _remove(lock_path)
+        else:
+            return None
+
+        try:
+            return _Fill(self, content, path, lock_path)
+        except (IOError, OSError):
+            log.exception("Unable to write %s to the disk cache", content.location)
+            _remove(lock_path)
+            return None
+
+    def added(self, size):
+        """
+        Adds size bytes to the running total of the size of the cache, and evicts
+        files if it's over budget
+        """
+        with self._size_lock:
+            if self._size is not None:
+                self._size += size
+            if self._size is None or self._size > self.max_size:
+                self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used files until the cache holds at most
+        EVICT_TO of max_size bytes, and the temporary and lock files left over
+        from fills that didn't finish. This lists the directory, so it's only
+        done when the running total of the size goes over budget, which also
+        counts the files other processes added since.
+        """
+        files = []
+        total_size = 0
+        left_over_before = time.time() - FILL_TIMEOUT
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # evicted by another process
+                continue
+            if name.endswith(CACHE_FILE_SUFFIX):
+                files.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+            elif stat.st_mtime < left_over_before and (
+                    name.startswith(TEMP_FILE_PREFIX) or name.endswith(LOCK_FILE_SUFFIX)):
+                _remove(path)
+
+        files.sort()
+        for _, size, path in files:
+            if total_size <= self.max_size * EVICT_TO:
+                break
+            _remove(path)
+            total_size -= size
+            dog_stats_api.increment('contentserver.disk_cache.evicted_bytes', value=size)
+        self._size = total_size
+
+
+_DISK_CACHE = []
+
+
+def get_disk_cache():
+    """
+    Returns the DiskContentCache configured by settings.CONTENTSERVER_DISK_CACHE, or None
+    if there isn't one
+    """
+    if not _DISK_CACHE:
+        config = getattr(settings, 'CONTENTSERVER_DISK_CACHE', None)
+        _DISK_CACHE.append(DiskContentCache(config['DIRECTORY'], config['MAX_SIZE']) if config else None)
+    return _DISK_CACHE[0]
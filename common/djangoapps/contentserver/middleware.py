@@ -1,6 +1,11 @@
+import calendar
+import re
+from uuid import uuid4
+
 from django.http import (HttpResponse, HttpResponseNotModified,
     HttpResponseForbidden)
-from student.models import CourseEnrollment
+from django.utils.http import http_date, parse_http_date_safe
+from student.models import AccessContext
 
 from xmodule.contentstore.django import contentstore
 from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
@@ -8,6 +13,72 @@ from xmodule.modulestore import InvalidLocationError
 from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.exceptions import NotFoundError
 
+from contentserver.disk_cache import content_attributes, get_disk_cache
+
+# Content smaller than this is kept in the cache, rather than streamed from the DB
+MAX_CACHED_CONTENT_LENGTH = 1048576
+
+BYTE_RANGE_RE = re.compile(r'^(\d*)-(\d*)$')
+
+
+def parse_range_header(header_value, content_length):
+    """
+    Returns the list of (first_byte, last_byte) tuples, inclusive, requested by the
+    value of a Range header for content of content_length bytes. Ranges that can't be
+    satisfied are left out, so an empty list means the request is unsatisfiable.
+
+    Raises ValueError if the header isn't a valid byte range request, in which case
+    it should be ignored.
+    """
+    unit, _, ranges = header_value.partition('=')
+    if unit.strip() != 'bytes':
+        raise ValueError('Unknown range unit: {0}'.format(unit))
+
+    byte_ranges = []
+    for byte_range in ranges.split(','):
+        match = BYTE_RANGE_RE.match(byte_range.strip())
+        if match is None:
+            raise ValueError('Invalid byte range: {0}'.format(byte_range))
+        first, last = match.groups()
+        if first:
+            first = int(first)
+            last = int(last) if last else content_length - 1
+            if last < first:
+                raise ValueError('Invalid byte range: {0}'.format(byte_range))
+        elif last:
+            # a suffix range, e.g. the last 500 bytes
+            first = max(content_length - int(last), 0)
+            if int(last) == 0:
+                continue
+            last = content_length - 1
+        else:
+            raise ValueError('Invalid byte range: {0}'.format(byte_range))
+
+        if first < content_length:
+            byte_ranges.append((first, min(last, content_length - 1)))
+    return byte_ranges
+
+
+def etag_matches(etag, header_value, weak=True):
+    """
+    Returns True if etag is one of the entity tags listed in header_value (the value of
+    an If-None-Match or If-Range header), or if that value is '*'. If weak is False,
+    weak entity tags don't match.
+    """
+    if etag is None:
+        return False
+    for tag in header_value.split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            if not weak:
+                continue
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -21,49 +92,166 @@ class StaticContentServer(object):
                 response.status_code = 400
                 return response
 
-            # first look in our cache so we don't have to round-trip to the DB
-            content = get_cached_content(loc)
-            if content is None:
-                # nope, not in cache, let's fetch from DB
-                try:
-                    content = contentstore().find(loc, as_stream=True)
-                except NotFoundError:
-                    response = HttpResponse()
-                    response.status_code = 404
-                    return response
-
-                # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
-                # this is because I haven't been able to find a means to stream data out of memcached
-                if content.length is not None:
-                    if content.length < 1048576:
-                        # since we've queried as a stream, let's read in the stream into memory to set in cache
-                        content = content.copy_to_in_mem()
-                        set_cached_content(content)
-            else:
-                # NOP here, but we may wish to add a "cache-hit" counter in the future
-                pass
+            try:
+                content = self._get_content(loc)
+            except NotFoundError:
+                response = HttpResponse()
+                response.status_code = 404
+                return response
 
             # Check that user has access to content
             if getattr(content, "locked", False):
                 if not hasattr(request, "user") or not request.user.is_authenticated():
                     return HttpResponseForbidden('Unauthorized')
                 course_partial_id = "/".join([loc.org, loc.course])
-                if not request.user.is_staff and not CourseEnrollment.is_enrolled_by_partial(
-                        request.user, course_partial_id):
+                access_context = AccessContext.for_user(request.user)
+                if not access_context.is_staff and not access_context.is_enrolled_by_partial(course_partial_id):
                     return HttpResponseForbidden('Unauthorized')
 
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            # convert over the DB persistent last modified timestamp to a HTTP compatible timestamp
+            last_modified_at = calendar.timegm(content.last_modified_at.utctimetuple())
+            # the format Last-Modified used to be sent in, which clients may still send back
+            legacy_last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
+            # a strong entity tag, from the md5 GridFS computed when the content was saved.
+            # getattr b/c caching may mean some pickled instances don't have attr
+            content_digest = getattr(content, 'content_digest', None)
+            etag = '"{0}"'.format(content_digest) if content_digest else None
+
+            # see if the client has cached this content, if so then just return a 304 (Not Modified)
+            if 'HTTP_IF_NONE_MATCH' in request.META:
+                if etag_matches(etag, request.META['HTTP_IF_NONE_MATCH']):
+                    return self._not_modified(etag, last_modified_at)
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
                 if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+                if_modified_since_at = parse_http_date_safe(if_modified_since)
+                if (if_modified_since == legacy_last_modified_at_str or
+                        (if_modified_since_at is not None and last_modified_at <= if_modified_since_at)):
+                    return self._not_modified(etag, last_modified_at)
+
+            byte_ranges = None
+            if 'HTTP_RANGE' in request.META and content.length is not None and self._if_range_matches(
+                    request, etag, last_modified_at):
+                try:
+                    byte_ranges = parse_range_header(request.META['HTTP_RANGE'], content.length)
+                except ValueError:
+                    # an invalid Range header is ignored
+                    pass
+
+            if byte_ranges is None:
+                response = HttpResponse(content.stream_data(), content_type=content.content_type)
+                if content.length is not None:
+                    response['Content-Length'] = str(content.length)
+            elif not byte_ranges:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = 'bytes */{0}'.format(content.length)
+            elif len(byte_ranges) == 1:
+                first_byte, last_byte = byte_ranges[0]
+                response = HttpResponse(
+                    content.stream_data_in_range(first_byte, last_byte), content_type=content.content_type
+                )
+                response.status_code = 206
+                response['Content-Range'] = 'bytes {0}-{1}/{2}'.format(first_byte, last_byte, content.length)
+                response['Content-Length'] = str(last_byte - first_byte + 1)
+            else:
+                response = self._multipart_byteranges(content, byte_ranges)
 
-            response = HttpResponse(content.stream_data(), content_type=content.content_type)
-            response['Last-Modified'] = last_modified_at_str
+            response['Accept-Ranges'] = 'bytes'
+            response['Last-Modified'] = http_date(last_modified_at)
+            if etag is not None:
+                response['ETag'] = etag
 
             return response
+
+    def _get_content(self, loc):
+        """
+        Returns the content at loc, from the cheapest tier that has it: memcached for
+        content under 1MB, then the local disk cache (if configured) for larger content,
+        then the DB.
+        """
+        disk_cache = get_disk_cache()
+
+        # first look in our cache so we don't have to round-trip to the DB
+        content = get_cached_content(loc)
+        if content is not None and content.data is None:
+            # only the attributes of large content are kept in memcached, its data is on the local disk
+            content = disk_cache.get(content) if disk_cache is not None else None
+
+        if content is None:
+            # nope, not in cache, let's fetch from DB
+            content = contentstore().find(loc, as_stream=True)
+
+            # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
+            # this is because I haven't been able to find a means to stream data out of memcached.
+            # Larger content is streamed from the DB in chunks, so that the memory used by a request
+            # doesn't depend on the size of the content, and is kept on the local disk as it's
+            # streamed, if there is a disk cache
+            if content.length is not None:
+                if content.length < MAX_CACHED_CONTENT_LENGTH:
+                    # since we've queried as a stream, let's read in the stream into memory to set in cache
+                    content = content.copy_to_in_mem()
+                    set_cached_content(content)
+                elif disk_cache is not None:
+                    disk_content = disk_cache.put(content)
+                    if disk_content is not None:
+                        set_cached_content(content_attributes(content))
+                        content = disk_content
+        else:
+            # NOP here, but we may wish to add a "cache-hit" counter in the future
+            pass
+
+        return content
+
+    def _not_modified(self, etag, last_modified_at):
+        """
+        Returns a 304 (Not Modified) response with the validators of the content
+        """
+        response = HttpResponseNotModified()
+        response['Last-Modified'] = http_date(last_modified_at)
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+    def _if_range_matches(self, request, etag, last_modified_at):
+        """
+        Returns False if the request has an If-Range header that doesn't match the current
+        content, in which case the whole content should be sent instead of the ranges.
+        """
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            return etag_matches(etag, if_range, weak=False)
+        return parse_http_date_safe(if_range) == last_modified_at
+
+    def _multipart_byteranges(self, content, byte_ranges):
+        """
+        Returns a 206 (Partial Content) multipart/byteranges response with the byte_ranges
+        of content, streamed one range at a time
+        """
+        boundary = uuid4().hex
+        part_headers = [
+            '\r\n--{0}\r\nContent-Type: {1}\r\nContent-Range: bytes {2}-{3}/{4}\r\n\r\n'.format(
+                boundary, content.content_type, first_byte, last_byte, content.length
+            )
+            for first_byte, last_byte in byte_ranges
+        ]
+        closing = '\r\n--{0}--\r\n'.format(boundary)
+
+        def stream_parts():
+            """Yields the parts of the response"""
+            for part_header, (first_byte, last_byte) in zip(part_headers, byte_ranges):
+                yield part_header
+                for chunk in content.stream_data_in_range(first_byte, last_byte):
+                    yield chunk
+            yield closing
+
+        response = HttpResponse(stream_parts(), content_type='multipart/byteranges; boundary={0}'.format(boundary))
+        response.status_code = 206
+        response['Content-Length'] = str(
+            sum(len(part_header) for part_header in part_headers) +
+            sum(last_byte - first_byte + 1 for first_byte, last_byte in byte_ranges) +
+            len(closing)
+        )
+        return response
@@ -9,9 +9,12 @@ from pymongo import MongoClient
 
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.test import TestCase
 from django.test.client import Client
 from django.test.utils import override_settings
 
+from contentserver.middleware import parse_range_header
+
 from student.models import CourseEnrollment
 
 from xmodule.contentstore.django import contentstore, _CONTENTSTORE
@@ -134,3 +137,82 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
 
+
+    def test_range_request(self):
+        """
+        Test that a single byte range of an asset is served.
+        """
+        self.client.logout()
+        content = self.contentstore.find(self.loc_unlocked).data
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(resp.status_code, 206) #pylint: disable=E1103
+        self.assertEqual(resp['Content-Range'], 'bytes 10-19/{0}'.format(len(content)))
+        self.assertEqual(resp.content, content[10:20])
+
+    def test_multiple_range_request(self):
+        """
+        Test that several byte ranges are served as multipart/byteranges.
+        """
+        self.client.logout()
+        content = self.contentstore.find(self.loc_unlocked).data
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=0-4,-5')
+        self.assertEqual(resp.status_code, 206) #pylint: disable=E1103
+        self.assertTrue(resp['Content-Type'].startswith('multipart/byteranges'))
+        self.assertEqual(int(resp['Content-Length']), len(resp.content))
+        self.assertIn(content[:5], resp.content)
+        self.assertIn('Content-Range: bytes {0}-{1}/{2}'.format(
+            len(content) - 5, len(content) - 1, len(content)
+        ), resp.content)
+
+    def test_unsatisfiable_range_request(self):
+        """
+        Test that ranges past the end of an asset are rejected.
+        """
+        self.client.logout()
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=100000-')
+        self.assertEqual(resp.status_code, 416) #pylint: disable=E1103
+
+    def test_if_range_mismatch(self):
+        """
+        Test that the whole asset is served if it changed since the ranges were requested.
+        """
+        self.client.logout()
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
+
+    def test_conditional_requests(self):
+        """
+        Test that clients that have the current version of an asset get a 304.
+        """
+        self.client.logout()
+        resp = self.client.get(self.url_unlocked)
+        etag = resp['ETag']
+        last_modified = resp['Last-Modified']
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304) #pylint: disable=E1103
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(resp.status_code, 304) #pylint: disable=E1103
+
+
+class ParseRangeHeaderTest(TestCase):
+    """
+    Tests of parsing Range headers
+    """
+    def test_ranges(self):
+        self.assertEqual([(0, 9)], parse_range_header('bytes=0-9', 100))
+        self.assertEqual([(90, 99)], parse_range_header('bytes=90-', 100))
+        self.assertEqual([(95, 99)], parse_range_header('bytes=-5', 100))
+        self.assertEqual([(0, 99)], parse_range_header('bytes=-500', 100))
+        self.assertEqual([(50, 99)], parse_range_header('bytes=50-500', 100))
+        self.assertEqual([(0, 0), (10, 20)], parse_range_header('bytes=0-0, 10-20', 100))
+
+    def test_unsatisfiable(self):
+        self.assertEqual([], parse_range_header('bytes=100-', 100))
+        self.assertEqual([(0, 1)], parse_range_header('bytes=200-300,0-1', 100))
+
+    def test_invalid(self):
+        for header_value in ('items=0-1', 'bytes=5-1', 'bytes=-', 'bytes=a-b', 'bytes='):
+            self.assertRaises(ValueError, parse_range_header, header_value, 100)
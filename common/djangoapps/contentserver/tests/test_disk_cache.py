@@ -0,0 +1,120 @@
+"""
+Tests for the local disk cache of large static content
+"""
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from StringIO import StringIO
+
+from django.test import TestCase
+from mock import patch
+
+from contentserver import disk_cache
+from contentserver.disk_cache import DiskContentCache, content_attributes
+from xmodule.contentstore.content import StaticContentStream
+from xmodule.modulestore import Location
+
+
+class DiskContentCacheTest(TestCase):
+    """
+    Tests of filling, reading and evicting the disk cache
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = DiskContentCache(self.directory, 250)
+        self.uploaded_at = datetime(2013, 10, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def content(self, name, data, uploaded_at=None):
+        """
+        Returns a StaticContentStream of data
+        """
+        return StaticContentStream(
+            Location('c4x', 'edX', 'toy', 'asset', name), name, 'text/plain', StringIO(data),
+            last_modified_at=uploaded_at or self.uploaded_at, length=len(data), content_digest='digest'
+        )
+
+    def fill(self, content):
+        """
+        Streams content through the cache, as a response would, and returns the streamed data
+        """
+        return ''.join(self.cache.put(content).stream_data())
+
+    def test_fill_and_hit(self):
+        content = self.content('slides.pdf', 'abcdefghij' * 10)
+        filling = self.cache.put(content)
+        self.assertEqual(content.length, filling.length)
+        self.assertIsNone(self.cache.get(content))
+        self.assertEqual('abcdefghij' * 10, ''.join(filling.stream_data()))
+
+        cached = self.cache.get(content_attributes(content))
+        self.assertEqual('digest', cached.content_digest)
+        self.assertEqual('abcdefghij' * 10, ''.join(cached.stream_data()))
+        self.assertEqual('cdef', ''.join(cached.stream_data_in_range(2, 5)))
+        self.assertEqual([os.path.basename(self.cache._path(content))], os.listdir(self.directory))  # pylint: disable=protected-access
+
+    def test_new_upload_misses(self):
+        self.fill(self.content('slides.pdf', 'old'))
+        self.assertIsNone(self.cache.get(self.content('slides.pdf', 'new', self.uploaded_at + timedelta(1))))
+
+    def test_too_large(self):
+        self.assertIsNone(self.cache.put(self.content('dataset.csv', 'x' * 300)))
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_concurrent_fill_skipped(self):
+        first = self.cache.put(self.content('slides.pdf', 'abcdefghij' * 10)).stream_data()
+        second = self.cache.put(self.content('slides.pdf', 'abcdefghij' * 10)).stream_data()
+        first.next()
+        # only the first miss writes the content, the second one just streams it
+        self.assertEqual('abcdefghij' * 10, ''.join(second))
+        self.assertIsNone(self.cache.get(self.content('slides.pdf', '')))
+        ''.join(first)
+        self.assertIsNotNone(self.cache.get(self.content('slides.pdf', '')))
+
+    def test_left_over_lock_taken(self):
+        content = self.content('slides.pdf', 'abcdefghij' * 10)
+        lock_path = self.cache._path(content)[:-len(disk_cache.CACHE_FILE_SUFFIX)] + disk_cache.LOCK_FILE_SUFFIX  # pylint: disable=protected-access
+        open(lock_path, 'w').close()
+        self.fill(content)
+        self.assertIsNone(self.cache.get(content))
+
+        os.utime(lock_path, (0, 0))
+        self.fill(self.content('slides.pdf', 'abcdefghij' * 10))
+        self.assertIsNotNone(self.cache.get(content))
+        self.assertFalse(os.path.exists(lock_path))
+
+    def test_client_gone(self):
+        stream = self.cache.put(self.content('slides.pdf', 'x' * 200)).stream_data()
+        stream.next()
+        stream.close()
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_range_not_filled(self):
+        filling = self.cache.put(self.content('slides.pdf', 'abcdefghij' * 10))
+        self.assertEqual('cdef', ''.join(filling.stream_data_in_range(2, 5)))
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_lru_eviction(self):
+        first = self.content('first', 'x' * 100)
+        second = self.content('second', 'y' * 100)
+        self.fill(first)
+        self.fill(second)
+        # make the second file the least recently used one
+        os.utime(self.cache._path(second), (0, 0))  # pylint: disable=protected-access
+        self.cache.get(first)
+
+        self.fill(self.content('third', 'z' * 100))
+        self.assertIsNone(self.cache.get(second))
+        self.assertIsNotNone(self.cache.get(first))
+
+    def test_directory_listed_when_over_budget(self):
+        with patch('contentserver.disk_cache.os.listdir', wraps=os.listdir) as mock_listdir:
+            self.fill(self.content('first', 'x' * 100))
+            self.fill(self.content('second', 'y' * 100))
+            # once to count the size of the cache
+            self.assertEqual(1, mock_listdir.call_count)
+            self.fill(self.content('third', 'z' * 100))
+            self.assertEqual(2, mock_listdir.call_count)
@@ -194,6 +194,19 @@ def get_cohort_by_id(course_id, cohort_id):
                                        id=cohort_id)
 
 
+def get_cohort_names(course_id, cohort_ids):
+    """
+    Return a dict mapping the ids of the cohorts of the given course that are in
+    cohort_ids to their names, with a single query.  Ids of cohorts that aren't
+    present are left out.
+    """
+    if not cohort_ids:
+        return {}
+    return dict(CourseUserGroup.objects.filter(course_id=course_id,
+                                               group_type=CourseUserGroup.COHORT,
+                                               id__in=set(cohort_ids)).values_list('id', 'name'))
+
+
 def add_cohort(course_id, name):
     """
     Add a cohort to a course.  Raises ValueError if a cohort of the same name already
@@ -6,7 +6,8 @@ from django.test.utils import override_settings
 
 from course_groups.models import CourseUserGroup
 from course_groups.cohorts import (get_cohort, get_course_cohorts,
-                                   is_commentable_cohorted, get_cohort_by_name)
+                                   is_commentable_cohorted, get_cohort_by_name,
+                                   get_cohort_names)
 
 from xmodule.modulestore.django import modulestore, clear_existing_modulestores
 
@@ -212,6 +213,25 @@ class TestCohorts(django.test.TestCase):
         cohorts = sorted([c.name for c in get_course_cohorts(course1_id)])
         self.assertEqual(cohorts, ['TestCohort', 'TestCohort2'])
 
+    def test_get_cohort_names(self):
+        course_id = 'a/b/c'
+        cohort1 = CourseUserGroup.objects.create(name="Cohort 1",
+                                                 course_id=course_id,
+                                                 group_type=CourseUserGroup.COHORT)
+        cohort2 = CourseUserGroup.objects.create(name="Cohort 2",
+                                                 course_id=course_id,
+                                                 group_type=CourseUserGroup.COHORT)
+        other_course_cohort = CourseUserGroup.objects.create(name="Other",
+                                                             course_id='e/f/g',
+                                                             group_type=CourseUserGroup.COHORT)
+
+        with self.assertNumQueries(1):
+            names = get_cohort_names(course_id, [cohort1.id, cohort2.id, cohort1.id, other_course_cohort.id])
+        self.assertEqual(names, {cohort1.id: "Cohort 1", cohort2.id: "Cohort 2"})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_cohort_names(course_id, []), {})
+
     def test_is_commentable_cohorted(self):
         course = modulestore().get_course("edX/toy/2012_Fall")
         self.assertFalse(course.is_cohorted)
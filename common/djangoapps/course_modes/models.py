@@ -70,6 +70,31 @@ class CourseMode(models.Model):
             modes = [cls.DEFAULT_MODE]
         return modes
 
+    @classmethod
+    def modes_for_courses(cls, course_ids):
+        """
+        Returns a dict mapping each of course_ids to the list of its non-expired
+        modes, as modes_for_course returns it, with a single query.
+        """
+        now = datetime.now(pytz.UTC)
+        modes = dict((course_id, []) for course_id in course_ids)
+        found_course_modes = cls.objects.filter(Q(course_id__in=list(modes)) &
+                                                (Q(expiration_datetime__isnull=True) |
+                                                 Q(expiration_datetime__gte=now)))
+        for mode in found_course_modes:
+            modes[mode.course_id].append(Mode(
+                mode.mode_slug,
+                mode.mode_display_name,
+                mode.min_price,
+                mode.suggested_prices,
+                mode.currency,
+                mode.expiration_datetime
+            ))
+        for course_id, course_modes in modes.iteritems():
+            if not course_modes:
+                course_modes.append(cls.DEFAULT_MODE)
+        return modes
+
     @classmethod
     def modes_for_course_dict(cls, course_id):
         """
@@ -112,3 +112,27 @@ class CourseModeModelTest(TestCase):
 
         modes = CourseMode.modes_for_course('second_test_course')
         self.assertEqual([CourseMode.DEFAULT_MODE], modes)
+
+    def test_modes_for_courses(self):
+        """
+        The modes of many courses are found at once
+        """
+        mode1 = Mode(u'honor', u'Honor Code Certificate', 0, '', 'usd', None)
+        mode2 = Mode(u'verified', u'Verified Certificate', 0, '', 'usd', None)
+        for mode in (mode1, mode2):
+            self.create_mode(mode.slug, mode.name, mode.min_price, mode.suggested_prices)
+        expired_mode, _status = CourseMode.objects.get_or_create(
+            course_id='expired_course', mode_slug='verified', mode_display_name='Verified Certificate',
+            expiration_datetime=datetime.now(pytz.UTC) + timedelta(days=-1)
+        )
+
+        with self.assertNumQueries(1):
+            modes = CourseMode.modes_for_courses([self.course_id, 'expired_course', 'second_test_course'])
+        self.assertEqual(
+            {
+                self.course_id: [mode1, mode2],
+                'expired_course': [CourseMode.DEFAULT_MODE],
+                'second_test_course': [CourseMode.DEFAULT_MODE],
+            },
+            modes
+        )
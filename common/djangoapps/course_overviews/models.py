@@ -0,0 +1,321 @@
+"""
+Compact summaries of courses, for the pages that list courses.
+
+The course listings (the index and courses pages, the dashboard) only show a
+few settings of each course, but loading the CourseDescriptors of all the
+courses of an install builds the XBlock machinery of every one of them. So the
+settings the listings need are copied into a CourseOverview row per course,
+which is rebuilt whenever the course or its short description is written to,
+or the course is imported, through `modulestore_update_signal`. Courses that
+have no overview yet are summarized from the modulestore the first time they're
+listed.
+
+Overviews are kept in memory by each process, until any overview changes: every
+change replaces a generation stamp kept in the shared cache, which makes every
+process read the overviews from the database again.
+
+Courses of XML modulestores are never written to, and are reloaded when the
+process restarts, so their overviews aren't stored, but built from the
+descriptors that the XML modulestore keeps in memory anyway.
+"""
+import threading
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import models, IntegrityError
+from django.dispatch import receiver
+
+from xmodule.course_module import CourseDescriptor
+from xmodule.modulestore import Location, XML_MODULESTORE_TYPE
+from xmodule.modulestore.django import modulestore, modulestore_update_signal
+from xmodule.modulestore.exceptions import ItemNotFoundError
+
+# Shared cache key of the generation stamp of the overviews
+GENERATION_CACHE_KEY = 'course_overviews.generation'
+
+
+class CourseOverview(models.Model):
+    """
+    The settings of a course that the course listings show, and that has_access
+    needs to check whether a user can see that the course exists.
+
+    Overviews have the same attributes as CourseDescriptors for these settings, so
+    that the listings can use either.
+    """
+    # the course this is the overview of
+    id = models.CharField(max_length=255, primary_key=True)
+
+    display_name = models.TextField()
+    display_number = models.TextField()
+    display_org = models.TextField()
+
+    start = models.DateTimeField(null=True)
+    end = models.DateTimeField(null=True)
+    advertised_start = models.TextField(null=True)
+    announcement = models.DateTimeField(null=True)
+    is_new = models.NullBooleanField()
+
+    enrollment_start = models.DateTimeField(null=True)
+    enrollment_end = models.DateTimeField(null=True)
+    enrollment_domain = models.TextField(null=True)
+    ispublic = models.NullBooleanField()
+    days_early_for_beta = models.FloatField(null=True)
+
+    course_image = models.TextField()
+    static_asset_path = models.TextField(blank=True, default='')
+    data_dir = models.TextField(blank=True, default='')
+    short_description = models.TextField(null=True)
+
+    end_of_course_survey_url = models.TextField(null=True)
+    lowest_passing_grade = models.FloatField(null=True)
+
+    # the descriptor logic that only depends on the settings above is shared as is
+    has_started = CourseDescriptor.has_started.im_func
+    has_ended = CourseDescriptor.has_ended.im_func
+    _sorting_dates = CourseDescriptor._sorting_dates.im_func  # pylint: disable=protected-access
+    is_newish = property(CourseDescriptor.is_newish.fget)
+    sorting_score = property(CourseDescriptor.sorting_score.fget)
+    start_date_text = property(CourseDescriptor.start_date_text.fget)
+    end_date_text = property(CourseDescriptor.end_date_text.fget)
+
+    def __unicode__(self):
+        return self.id
+
+    @property
+    def location(self):
+        """The Location of the course"""
+        return CourseDescriptor.id_to_location(self.id)
+
+    @property
+    def number(self):
+        return self.location.course
+
+    @property
+    def org(self):
+        return self.location.org
+
+    @property
+    def display_name_with_default(self):
+        return self.display_name
+
+    @property
+    def display_number_with_default(self):
+        return self.display_number
+
+    @property
+    def display_org_with_default(self):
+        return self.display_org
+
+    @classmethod
+    def from_course(cls, course, store):
+        """
+        Returns a new, unsaved, overview of the CourseDescriptor course of the
+        modulestore store.
+        """
+        try:
+            short_description = store.get_instance(
+                course.id, course.location.replace(category='about', name='short_description')
+            ).data
+        except ItemNotFoundError:
+            short_description = None
+
+        is_new = course.is_new
+        if isinstance(is_new, basestring):
+            is_new = is_new.lower() in ['true', 'yes', 'y']
+        elif is_new is not None:
+            is_new = bool(is_new)
+
+        try:
+            lowest_passing_grade = course.lowest_passing_grade
+        except ValueError:
+            # there are no grade cutoffs
+            lowest_passing_grade = None
+
+        return cls(
+            id=course.id,
+            display_name=course.display_name_with_default,
+            display_number=course.display_number_with_default,
+            display_org=course.display_org_with_default,
+            start=course.start,
+            end=course.end,
+            advertised_start=course.advertised_start,
+            announcement=course.announcement,
+            is_new=is_new,
+            enrollment_start=course.enrollment_start,
+            enrollment_end=course.enrollment_end,
+            enrollment_domain=course.enrollment_domain,
+            ispublic=getattr(course, 'ispublic', None),
+            days_early_for_beta=course.days_early_for_beta,
+            course_image=course.course_image,
+            static_asset_path=course.static_asset_path or '',
+            data_dir=getattr(course, 'data_dir', '') or '',
+            short_description=short_description,
+            end_of_course_survey_url=course.end_of_course_survey_url,
+            lowest_passing_grade=lowest_passing_grade,
+        )
+
+    @classmethod
+    def get_many(cls, course_ids):
+        """
+        Returns a dict mapping each of course_ids whose course exists to its overview.
+        """
+        store = modulestore()
+        overviews = {}
+        stored_ids = []
+        for course_id in course_ids:
+            if store.get_modulestore_type(course_id) == XML_MODULESTORE_TYPE:
+                overview = _build_overview(store, course_id)
+                if overview is not None:
+                    overviews[course_id] = overview
+            else:
+                stored_ids.append(course_id)
+        if not stored_ids:
+            return overviews
+
+        generation = _get_generation()
+        overviews.update(_LOCAL_OVERVIEWS.get_many(stored_ids, generation))
+        missing = [course_id for course_id in stored_ids if course_id not in overviews]
+        if missing:
+            stored = dict((overview.id, overview) for overview in cls.objects.filter(id__in=missing))
+            for course_id in missing:
+                if course_id not in stored:
+                    overview = _build_overview(store, course_id)
+                    if overview is not None:
+                        stored[course_id] = _store_new_overview(overview)
+            _LOCAL_OVERVIEWS.set_many(stored, generation)
+            overviews.update(stored)
+
+        return overviews
+
+    @classmethod
+    def get_all(cls):
+        """
+        Returns the overviews of all the courses of the modulestore, sorted by number.
+        """
+        course_ids = [
+            CourseDescriptor.location_to_id(location)
+            for location in modulestore().get_course_locations()
+        ]
+        overviews = cls.get_many(course_ids)
+        return sorted(
+            (overviews[course_id] for course_id in course_ids if course_id in overviews),
+            key=lambda overview: overview.number
+        )
+
+    @classmethod
+    def update_courses(cls, store, org, course):
+        """
+        Rebuilds the overviews of all the runs of org/course from the modulestore
+        store, and deletes those of the runs that don't exist anymore.
+        """
+        descriptors = [
+            descriptor for descriptor in store.get_items(Location('i4x', org, course, 'course', None))
+            if isinstance(descriptor, CourseDescriptor)
+        ]
+        for descriptor in descriptors:
+            cls.from_course(descriptor, store).save()
+        cls.objects.filter(id__startswith=u'{0}/{1}/'.format(org, course)).exclude(
+            id__in=[descriptor.id for descriptor in descriptors]
+        ).delete()
+        _bump_generation()
+
+
+class OverviewCache(object):
+    """
+    A thread safe in-memory cache of the overviews of one generation.
+    """
+    def __init__(self):
+        self.generation = None
+        self._overviews = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, course_ids, generation):
+        """
+        Returns a dict of the overviews of course_ids stored with generation.
+        """
+        with self._lock:
+            if generation != self.generation:
+                self.generation = generation
+                self._overviews = {}
+            return dict(
+                (course_id, self._overviews[course_id])
+                for course_id in course_ids if course_id in self._overviews
+            )
+
+    def set_many(self, overviews, generation):
+        """
+        Stores the dict of course ids to overviews, which were read from the
+        database at generation.
+        """
+        with self._lock:
+            if generation == self.generation:
+                self._overviews.update(overviews)
+
+    def clear(self):
+        """Removes all overviews"""
+        with self._lock:
+            self.generation = None
+            self._overviews = {}
+
+
+_LOCAL_OVERVIEWS = OverviewCache()
+
+
+def _get_generation():
+    """
+    Returns the generation stamp of the overviews, creating one if there is none yet.
+    """
+    generation = cache.get(GENERATION_CACHE_KEY)
+    if generation is None:
+        # Another process may be creating a generation at the same time, so only
+        # add ours if there still isn't one
+        cache.add(GENERATION_CACHE_KEY, uuid4().hex)
+        generation = cache.get(GENERATION_CACHE_KEY)
+    return generation
+
+
+def _bump_generation():
+    """Replaces the generation stamp, so that every process reads the overviews again"""
+    cache.set(GENERATION_CACHE_KEY, uuid4().hex)
+
+
+def _build_overview(store, course_id):
+    """
+    Returns a new, unsaved, overview of the course course_id of store, or None if
+    there is no such course.
+    """
+    try:
+        course = store.get_instance(course_id, CourseDescriptor.id_to_location(course_id))
+    except ItemNotFoundError:
+        return None
+    if not isinstance(course, CourseDescriptor):
+        # the course failed to load
+        return None
+    return CourseOverview.from_course(course, store)
+
+
+def _store_new_overview(overview):
+    """
+    Stores overview, unless an overview of its course was stored since the course
+    was read, from a newer version of the course. Returns the stored overview.
+    """
+    try:
+        overview.save(force_insert=True)
+    except IntegrityError:
+        overview = CourseOverview.objects.get(id=overview.id)
+    return overview
+
+
+@receiver(modulestore_update_signal)
+def update_course_overviews(sender, modulestore=None, course_id=None, location=None, **kwargs):  # pylint: disable=unused-argument, redefined-outer-name
+    """
+    Rebuilds the overviews of the runs of a course after its course item or short
+    description was written to.
+    """
+    location = Location(location)
+    if location.category != 'course' and (location.category, location.name) != ('about', 'short_description'):
+        return
+    if course_id in getattr(modulestore, 'ignore_write_events_on_courses', []):
+        # the course is being imported, which signals once it's done
+        return
+    CourseOverview.update_courses(modulestore, location.org, location.course)
@@ -0,0 +1,96 @@
+"""
+Tests of the course overviews
+"""
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.test.utils import override_settings
+from pytz import UTC
+
+from xmodule.modulestore.django import editable_modulestore, modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
+
+from course_overviews.models import CourseOverview
+
+XML_COURSE_ID = 'edX/toy/2012_Fall'
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class CourseOverviewTest(ModuleStoreTestCase):
+    """
+    Tests of building, storing and caching course overviews
+    """
+    def setUp(self):
+        # forget the overviews cached by previous tests
+        cache.clear()
+        self.course = CourseFactory.create(
+            org='edX', number='overview', display_name='Overview Course',
+            announcement=datetime.now(UTC) - timedelta(days=10),
+            enrollment_start=datetime(2013, 1, 1, tzinfo=UTC),
+            end_of_course_survey_url='http://example.com/survey',
+        )
+
+    def test_overview_of_course(self):
+        overview = CourseOverview.get_many([self.course.id])[self.course.id]
+        course = modulestore().get_instance(self.course.id, self.course.location)
+
+        for attribute in ('id', 'location', 'number', 'org', 'display_name_with_default',
+                          'display_number_with_default', 'display_org_with_default', 'start', 'end',
+                          'enrollment_start', 'enrollment_end', 'announcement', 'course_image',
+                          'static_asset_path', 'end_of_course_survey_url', 'lowest_passing_grade',
+                          'is_newish', 'sorting_score', 'start_date_text', 'end_date_text'):
+            self.assertEqual(getattr(course, attribute), getattr(overview, attribute), attribute)
+        self.assertEqual(course.has_started(), overview.has_started())
+        self.assertEqual(course.has_ended(), overview.has_ended())
+
+    def test_stored(self):
+        CourseOverview.get_many([self.course.id])
+        self.assertEqual('Overview Course', CourseOverview.objects.get(id=self.course.id).display_name)
+
+    def test_cached_in_process(self):
+        CourseOverview.get_many([self.course.id])
+        with self.assertNumQueries(0):
+            overviews = CourseOverview.get_many([self.course.id])
+        self.assertIn(self.course.id, overviews)
+
+    def test_summarized_when_missing(self):
+        CourseOverview.objects.all().delete()
+        cache.clear()
+        overview = CourseOverview.get_many([self.course.id])[self.course.id]
+        self.assertEqual('Overview Course', overview.display_name)
+        self.assertTrue(CourseOverview.objects.filter(id=self.course.id).exists())
+
+    def test_rebuilt_when_course_written(self):
+        CourseOverview.get_many([self.course.id])
+        editable_modulestore('direct').update_metadata(self.course.location, {'display_name': 'Renamed'})
+        self.assertEqual('Renamed', CourseOverview.get_many([self.course.id])[self.course.id].display_name)
+
+    def test_rebuilt_when_short_description_written(self):
+        ItemFactory.create(
+            parent_location=self.course.location, category='about', display_name='short_description',
+            data='<p>A short course</p>'
+        )
+        overview = CourseOverview.get_many([self.course.id])[self.course.id]
+        self.assertEqual('<p>A short course</p>', overview.short_description)
+
+    def test_deleted_with_course(self):
+        CourseOverview.get_many([self.course.id])
+        editable_modulestore('direct').delete_item(self.course.location)
+        self.assertFalse(CourseOverview.objects.filter(id=self.course.id).exists())
+        self.assertEqual({}, CourseOverview.get_many([self.course.id]))
+
+    def test_xml_course_not_stored(self):
+        overview = CourseOverview.get_many([XML_COURSE_ID])[XML_COURSE_ID]
+        self.assertEqual('Toy Course', overview.display_name)
+        self.assertEqual('toy', overview.data_dir)
+        self.assertFalse(CourseOverview.objects.filter(id=XML_COURSE_ID).exists())
+
+    def test_missing_course(self):
+        self.assertEqual({}, CourseOverview.get_many(['edX/missing/run']))
+
+    def test_get_all(self):
+        course_ids = [overview.id for overview in CourseOverview.get_all()]
+        self.assertIn(self.course.id, course_ids)
+        self.assertIn(XML_COURSE_ID, course_ids)
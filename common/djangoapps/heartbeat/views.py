@@ -13,6 +13,6 @@ def heartbeat(request):
     """
     output = {
         'date': datetime.now(UTC).isoformat(),
-        'courses': [course.location.url() for course in modulestore().get_courses()],
+        'courses': [location.url() for location in modulestore().get_course_locations()],
     }
     return HttpResponse(json.dumps(output, indent=4))
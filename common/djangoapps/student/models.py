@@ -15,13 +15,16 @@ from random import randint
 import hashlib
 import json
 import logging
+import threading
 import uuid
 
 from django.conf import settings
-from django.contrib.auth.models import User
+from django.contrib.auth.models import User, Group
 from django.contrib.auth.signals import user_logged_in, user_logged_out
-from django.db import models
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
 import django.dispatch
 from django.forms import ModelForm, forms
@@ -826,6 +829,7 @@ class CourseEnrollment(models.Model):
         """
         enrollment = cls.get_or_create_enrollment(user, course_id)
         enrollment.update_enrollment(is_active=True)
+        clear_access_context(user)
         return enrollment
 
     @classmethod
@@ -881,6 +885,7 @@ class CourseEnrollment(models.Model):
         try:
             record = CourseEnrollment.objects.get(user=user, course_id=course_id)
             record.update_enrollment(is_active=False)
+            clear_access_context(user)
 
         except cls.DoesNotExist:
             err_msg = u"Tried to unenroll student {} from {} but they were not enrolled"
@@ -1105,6 +1110,207 @@ def add_user_to_default_group(user, group):
     utg.save()
 
 
+# The invalidations of per-user caches to make again once the transaction of the current
+# request is committed
+_invalidations_after_commit = threading.local()
+
+
+def _invalidate_again_after_commit(invalidate, user_id):
+    """
+    Calls invalidate(user_id) again once the current request is finished, if it's made in
+    the transaction of the request. Until the transaction is committed, concurrent
+    requests still read the old rows, and may have cached them after the invalidation.
+    """
+    if transaction.is_managed() and crum.get_current_request() is not None:
+        if not hasattr(_invalidations_after_commit, 'pending'):
+            _invalidations_after_commit.pending = set()
+        _invalidations_after_commit.pending.add((invalidate, user_id))
+
+
+@receiver(request_finished)
+def make_invalidations_after_commit(sender, **kwargs):  # pylint: disable=unused-argument
+    """Makes the invalidations of the request again, now that its transaction is over"""
+    pending = getattr(_invalidations_after_commit, 'pending', None)
+    _invalidations_after_commit.pending = set()
+    for invalidate, user_id in pending or ():
+        invalidate(user_id)
+
+
+# How long the data of the dashboard of a user is cached for, in seconds, unless it's
+# invalidated before
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+
+def dashboard_cache_key(user_id):
+    """Returns the cache key of the data of the dashboard of the user with user_id"""
+    return u'student.dashboard.{0}'.format(user_id)
+
+
+def invalidate_dashboard_cache(user_id):
+    """
+    Forgets the cached data of the dashboard of the user with user_id, after their
+    enrollments, certificates or email optouts changed
+    """
+    _delete_dashboard_cache(user_id)
+    _invalidate_again_after_commit(_delete_dashboard_cache, user_id)
+
+
+def _delete_dashboard_cache(user_id):
+    """Deletes the cached data of the dashboard of the user with user_id"""
+    cache.delete(dashboard_cache_key(user_id))
+
+
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+def invalidate_enrollment_dashboard_cache(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidates the dashboard of the user after a change to one of their enrollments"""
+    invalidate_dashboard_cache(instance.user_id)
+
+
+# How long the access context of a user is cached for, in seconds, unless it's
+# invalidated before
+ACCESS_CONTEXT_CACHE_TIMEOUT = 60 * 60
+
+
+def access_context_version_key(user_id):
+    """Returns the cache key of the version of the access context of the user with user_id"""
+    return u'student.access_context_version.{0}'.format(user_id)
+
+
+def invalidate_access_context(user_id):
+    """
+    Makes the cached access context of the user with user_id stale, after their groups
+    or enrollments changed, by giving it a new version
+    """
+    _new_access_context_version(user_id)
+    _invalidate_again_after_commit(_new_access_context_version, user_id)
+
+
+def _new_access_context_version(user_id):
+    """Gives the cached access context of the user with user_id a new version"""
+    cache.set(access_context_version_key(user_id), uuid.uuid4().hex, ACCESS_CONTEXT_CACHE_TIMEOUT)
+
+
+def clear_access_context(user):
+    """Forgets the access context loaded for the django user object user"""
+    user.__dict__.pop('_access_context', None)
+
+
+class AccessContext(object):
+    """
+    What access checks need to know about a user: whether they're global staff, the
+    (lower cased) names of their groups, and the courses they're actively enrolled in.
+
+    The context is loaded once per User object, from the shared cache, where it's kept
+    under a version that changes whenever the groups or enrollments of the user change,
+    so that all processes stop using it at once. Code that changes them through another
+    User object than the one it checks access with should call clear_access_context.
+    """
+    def __init__(self, is_staff, group_names, enrolled_course_ids):
+        self.is_staff = is_staff
+        self.group_names = frozenset(group_names)
+        self.enrolled_course_ids = frozenset(enrolled_course_ids)
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        Returns the AccessContext of the django user, which may be anonymous.
+        """
+        context = getattr(user, '_access_context', None)
+        if context is None:
+            if user.is_authenticated():
+                group_names, enrolled_course_ids = cls._load(user)
+                context = cls(user.is_staff, group_names, enrolled_course_ids)
+            else:
+                context = cls(False, (), ())
+            user._access_context = context  # pylint: disable=protected-access
+        return context
+
+    @staticmethod
+    def _load(user):
+        """
+        Returns the group names and enrolled course ids of user, from the shared cache
+        if they're there with the current version.
+        """
+        version_key = access_context_version_key(user.id)
+        version = cache.get(version_key)
+        if version is None:
+            # Another process may be creating a version at the same time, so only add
+            # ours if there still isn't one
+            cache.add(version_key, uuid.uuid4().hex, ACCESS_CONTEXT_CACHE_TIMEOUT)
+            version = cache.get(version_key)
+
+        key = u'student.access_context.{0}.{1}'.format(user.id, version)
+        data = cache.get(key)
+        if data is None:
+            data = (
+                [name.lower() for name in user.groups.values_list('name', flat=True)],
+                list(CourseEnrollment.objects.filter(user=user, is_active=True).values_list('course_id', flat=True)),
+            )
+            cache.set(key, data, ACCESS_CONTEXT_CACHE_TIMEOUT)
+        return data
+
+    def in_any_group(self, group_names):
+        """Returns whether the user is in any of the (lower cased) group_names"""
+        return not self.group_names.isdisjoint(group_names)
+
+    def is_enrolled(self, course_id):
+        """As CourseEnrollment.is_enrolled"""
+        return course_id in self.enrolled_course_ids
+
+    def is_enrolled_by_partial(self, course_id_partial):
+        """As CourseEnrollment.is_enrolled_by_partial"""
+        return any(course_id.startswith(course_id_partial) for course_id in self.enrolled_course_ids)
+
+
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+def invalidate_enrollment_access_context(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidates the access context of the user after a change to one of their enrollments"""
+    invalidate_access_context(instance.user_id)
+    # the enrollment may have been saved for a User object that's then checked
+    if hasattr(instance, '_user_cache'):
+        clear_access_context(instance._user_cache)  # pylint: disable=protected-access
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_access_contexts(sender, instance, action, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidates the access contexts of the users whose groups changed, whether the
+    change was made through the users or through the groups
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if isinstance(instance, User):
+        clear_access_context(instance)
+        user_ids = [instance.id]
+    elif pk_set is not None:
+        user_ids = pk_set
+    else:
+        user_ids = instance.user_set.values_list('id', flat=True)
+    for user_id in user_ids:
+        invalidate_access_context(user_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_members_access_contexts(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidates the access contexts of the members of a group that's renamed or deleted"""
+    if not kwargs.get('created', False):
+        for user_id in instance.user_set.values_list('id', flat=True):
+            invalidate_access_context(user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_new_user_access_context(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """
+    Gives new users a new version of their access context, as their id may have been
+    used before, e.g. by users of rolled back transactions
+    """
+    if created:
+        invalidate_access_context(instance.id)
+
+
 @receiver(post_save, sender=User)
 def update_user_information(sender, instance, created, **kwargs):
     if not settings.MITX_FEATURES['ENABLE_DISCUSSION_SERVICE']:
@@ -0,0 +1,103 @@
+"""
+Tests of the access contexts of users
+"""
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.test import TestCase
+from django.test.client import RequestFactory
+from mock import patch
+
+from student.models import AccessContext, CourseEnrollment, access_context_version_key
+from student.tests.factories import AnonymousUserFactory, GroupFactory, UserFactory
+
+COURSE_ID = 'edX/Test101/2013_Fall'
+
+
+class AccessContextTest(TestCase):
+    """
+    Tests of loading, caching and invalidating access contexts
+    """
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory.create()
+
+    def fresh_user(self):
+        """Returns a new User object of self.user, as the next request would have"""
+        return User.objects.get(id=self.user.id)
+
+    def test_loaded_once_per_user_object(self):
+        AccessContext.for_user(self.user)
+        with self.assertNumQueries(0):
+            AccessContext.for_user(self.user)
+
+    def test_shared_between_user_objects(self):
+        AccessContext.for_user(self.user)
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            AccessContext.for_user(user)
+
+    def test_anonymous(self):
+        with self.assertNumQueries(0):
+            context = AccessContext.for_user(AnonymousUserFactory())
+        self.assertFalse(context.is_staff)
+        self.assertFalse(context.in_any_group(['staff_edx/test101/2013_fall']))
+        self.assertFalse(context.is_enrolled(COURSE_ID))
+
+    def test_staff(self):
+        self.assertFalse(AccessContext.for_user(self.user).is_staff)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertTrue(AccessContext.for_user(self.fresh_user()).is_staff)
+
+    def test_groups(self):
+        AccessContext.for_user(self.user)
+        GroupFactory.create(name='Staff_edX/Test101/2013_Fall').user_set.add(self.user)
+        context = AccessContext.for_user(self.fresh_user())
+        self.assertTrue(context.in_any_group(['staff_edx/test101/2013_fall']))
+        self.assertFalse(context.in_any_group(['instructor_edx/test101/2013_fall']))
+
+    def test_groups_of_user_changed(self):
+        group = GroupFactory.create(name='staff_edX')
+        self.user.groups.add(group)
+        self.assertTrue(AccessContext.for_user(self.user).in_any_group(['staff_edx']))
+        self.user.groups.remove(group)
+        self.assertFalse(AccessContext.for_user(self.user).in_any_group(['staff_edx']))
+
+    def test_group_deleted(self):
+        group = GroupFactory.create(name='staff_edX')
+        group.user_set.add(self.user)
+        self.assertTrue(AccessContext.for_user(self.fresh_user()).in_any_group(['staff_edx']))
+        group.delete()
+        self.assertFalse(AccessContext.for_user(self.fresh_user()).in_any_group(['staff_edx']))
+
+    def test_enrollments(self):
+        self.assertFalse(AccessContext.for_user(self.user).is_enrolled(COURSE_ID))
+
+        CourseEnrollment.enroll(self.user, COURSE_ID)
+        for user in (self.user, self.fresh_user()):
+            context = AccessContext.for_user(user)
+            self.assertTrue(context.is_enrolled(COURSE_ID))
+            self.assertTrue(context.is_enrolled_by_partial('edX/Test101/'))
+            self.assertFalse(context.is_enrolled_by_partial('edX/Test102/'))
+
+        CourseEnrollment.unenroll(self.user, COURSE_ID)
+        for user in (self.user, self.fresh_user()):
+            self.assertFalse(AccessContext.for_user(user).is_enrolled(COURSE_ID))
+
+    def test_enrollment_created(self):
+        AccessContext.for_user(self.user)
+        CourseEnrollment.objects.create(user=self.user, course_id=COURSE_ID)
+        self.assertTrue(AccessContext.for_user(self.user).is_enrolled(COURSE_ID))
+
+    def test_invalidated_again_after_request(self):
+        group = GroupFactory.create(name='staff_edX')
+        with patch('student.models.crum.get_current_request', return_value=RequestFactory().get('/')):
+            group.user_set.add(self.user)
+        # a concurrent request that couldn't see the uncommitted membership caches the old rows
+        version = cache.get(access_context_version_key(self.user.id))
+        cache.set(u'student.access_context.{0}.{1}'.format(self.user.id, version), ([], []))
+        self.assertFalse(AccessContext.for_user(self.fresh_user()).in_any_group(['staff_edx']))
+
+        request_finished.send(sender=self.__class__)
+        self.assertTrue(AccessContext.for_user(self.fresh_user()).in_any_group(['staff_edx']))
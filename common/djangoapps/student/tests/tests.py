@@ -20,6 +20,7 @@ from django.contrib.auth.hashers import UNUSABLE_PASSWORD
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import int_to_base36
 from django.core.urlresolvers import reverse
+from django.core.cache import cache
 
 from xmodule.modulestore.tests.factories import CourseFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
@@ -30,9 +31,11 @@ from textwrap import dedent
 
 from student.models import unique_id_for_user, CourseEnrollment
 from student.views import (process_survey_link, _cert_info, password_reset, password_reset_confirm_wrapper,
-                           change_enrollment, complete_course_mode_info)
+                           change_enrollment, complete_course_mode_info, load_dashboard_data)
 from student.tests.factories import UserFactory, CourseModeFactory
 from student.tests.test_email import mock_render_to_string
+from certificates.models import CertificateStatuses, GeneratedCertificate
+from bulk_email.models import Optout
 
 import shoppingcart
 
@@ -271,6 +274,37 @@ class DashboardTest(TestCase):
         verified_mode.save()
         self.assertFalse(enrollment.refundable())
 
+    def test_dashboard_data_cached(self):
+        cache.clear()
+        CourseEnrollment.enroll(self.user, self.course.id)
+        with self.assertNumQueries(3):
+            data = load_dashboard_data(self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(data, load_dashboard_data(self.user))
+
+        self.assertEqual([self.course.id], [enrollment.course_id for enrollment in data['enrollments']])
+        self.assertEqual({'status': CertificateStatuses.unavailable}, data['certificates'][self.course.id])
+        self.assertEqual([], data['optouts'])
+
+    def test_dashboard_data_invalidated(self):
+        cache.clear()
+        enrollment = CourseEnrollment.enroll(self.user, self.course.id)
+        load_dashboard_data(self.user)
+
+        GeneratedCertificate.objects.create(
+            user=self.user, course_id=self.course.id, status=CertificateStatuses.notpassing, grade='0.4'
+        )
+        self.assertEqual(
+            {'status': CertificateStatuses.notpassing, 'grade': '0.4'},
+            load_dashboard_data(self.user)['certificates'][self.course.id]
+        )
+
+        Optout.objects.create(user=self.user, course_id=self.course.id)
+        self.assertEqual([self.course.id], load_dashboard_data(self.user)['optouts'])
+
+        enrollment.deactivate()
+        self.assertEqual([], load_dashboard_data(self.user)['enrollments'])
+
 
 
 class EnrollInCourseTest(TestCase):
@@ -38,16 +38,20 @@ from ratelimitbackend.exceptions import RateLimitException
 from mitxmako.shortcuts import render_to_response, render_to_string
 
 from course_modes.models import CourseMode
+from course_overviews.models import CourseOverview
 from student.models import (
     Registration, UserProfile, TestCenterUser, TestCenterUserForm,
     TestCenterRegistration, TestCenterRegistrationForm, PendingNameChange,
     PendingEmailChange, CourseEnrollment, unique_id_for_user,
     get_testcenter_registration, CourseEnrollmentAllowed, UserStanding,
+    dashboard_cache_key, DASHBOARD_CACHE_TIMEOUT,
 )
 from student.forms import PasswordResetFormNoActive
 
 from verify_student.models import SoftwareSecurePhotoVerification
-from certificates.models import CertificateStatuses, certificate_status_for_student
+from certificates.models import (
+    CertificateStatuses, certificate_status_for_student, certificate_statuses_for_student
+)
 
 from xmodule.course_module import CourseDescriptor
 from xmodule.modulestore.exceptions import ItemNotFoundError
@@ -157,10 +161,12 @@ def process_survey_link(survey_link, user):
     return survey_link.format(UNIQUE_ID=unique_id_for_user(user))
 
 
-def cert_info(user, course):
+def cert_info(user, course, cert_status=None):
     """
     Get the certificate info needed to render the dashboard section for the given
-    student and course.  Returns a dictionary with keys:
+    student and course.  cert_status is the certificate_status_for_student of the
+    student in the course, which is looked up if it isn't given.  Returns a dictionary
+    with keys:
 
     'status': one of 'generating', 'ready', 'notpassing', 'processing', 'restricted'
     'show_download_url': bool
@@ -173,7 +179,9 @@ def cert_info(user, course):
     if not course.has_ended():
         return {}
 
-    return _cert_info(user, course, certificate_status_for_student(user, course.id))
+    if cert_status is None:
+        cert_status = certificate_status_for_student(user, course.id)
+    return _cert_info(user, course, cert_status)
 
 
 def _cert_info(user, course, cert_status):
@@ -268,16 +276,18 @@ def register_user(request, extra_context=None):
     return render_to_response('register.html', context)
 
 
-def complete_course_mode_info(course_id, enrollment):
+def complete_course_mode_info(course_id, enrollment, modes=None):
     """
     We would like to compute some more information from the given course modes
-    and the user's current enrollment
+    and the user's current enrollment.  modes is the modes_for_course_dict of the
+    course, which is looked up if it isn't given.
 
     Returns the given information:
         - whether to show the course upsell information
         - numbers of days until they can't upsell anymore
     """
-    modes = CourseMode.modes_for_course_dict(course_id)
+    if modes is None:
+        modes = CourseMode.modes_for_course_dict(course_id)
     mode_info = {'show_upsell': False, 'days_for_upsell': None}
     # we want to know if the user is already verified and if verified is an
     # option
@@ -291,23 +301,50 @@ def complete_course_mode_info(course_id, enrollment):
     return mode_info
 
 
+def load_dashboard_data(user):
+    """
+    Returns the data of the dashboard of user that doesn't depend on the content of
+    their courses: a dict with their active 'enrollments', the 'certificates' statuses
+    of the user by course id, and the course ids they 'optouts' of emails of. Each is
+    read with a single query, and the dict is cached until the user's enrollments,
+    certificates or optouts change (see student.models.invalidate_dashboard_cache).
+    """
+    key = dashboard_cache_key(user.id)
+    data = cache.get(key)
+    if data is None:
+        enrollments = list(CourseEnrollment.enrollments_for_user(user))
+        data = {
+            'enrollments': enrollments,
+            'certificates': certificate_statuses_for_student(
+                user, [enrollment.course_id for enrollment in enrollments]
+            ),
+            'optouts': list(Optout.objects.filter(user=user).values_list('course_id', flat=True)),
+        }
+        cache.set(key, data, DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
 @login_required
 @ensure_csrf_cookie
 def dashboard(request):
     user = request.user
+    dashboard_data = load_dashboard_data(user)
 
     # Build our (course, enorllment) list for the user, but ignore any courses that no 
     # longer exist (because the course IDs have changed). Still, we don't delete those
     # enrollments, because it could have been a data push snafu.
+    # The listing only needs the overviews of the courses.
     course_enrollment_pairs = []
-    for enrollment in CourseEnrollment.enrollments_for_user(user):
-        try:
-            course_enrollment_pairs.append((course_from_id(enrollment.course_id), enrollment))
-        except ItemNotFoundError:
+    overviews = CourseOverview.get_many([enrollment.course_id for enrollment in dashboard_data['enrollments']])
+    for enrollment in dashboard_data['enrollments']:
+        if enrollment.course_id in overviews:
+            course_enrollment_pairs.append((overviews[enrollment.course_id], enrollment))
+        else:
             log.error("User {0} enrolled in non-existent course {1}"
                       .format(user.username, enrollment.course_id))
 
-    course_optouts = Optout.objects.filter(user=user).values_list('course_id', flat=True)
+    course_ids = [course.id for course, _enrollment in course_enrollment_pairs]
+    course_optouts = dashboard_data['optouts']
 
     message = ""
     if not user.is_active:
@@ -324,23 +361,35 @@ def dashboard(request):
     show_courseware_links_for = frozenset(course.id for course, _enrollment in course_enrollment_pairs
                                           if has_access(request.user, course, 'load'))
 
-    course_modes = {course.id: complete_course_mode_info(course.id, enrollment) for course, enrollment in course_enrollment_pairs}
-    cert_statuses = {course.id: cert_info(request.user, course) for course, _enrollment in course_enrollment_pairs}
+    # the modes of all the courses, for upsells and refunds
+    all_modes = CourseMode.modes_for_courses(course_ids)
+    course_modes = {
+        course.id: complete_course_mode_info(
+            course.id, enrollment, {mode.slug: mode for mode in all_modes[course.id]}
+        )
+        for course, enrollment in course_enrollment_pairs
+    }
+    cert_statuses = {
+        course.id: cert_info(request.user, course, dashboard_data['certificates'].get(course.id))
+        for course, _enrollment in course_enrollment_pairs
+    }
 
     # only show email settings for Mongo course and when bulk email is turned on
-    show_email_settings_for = frozenset(
-        course.id for course, _enrollment in course_enrollment_pairs if (
-            settings.MITX_FEATURES['ENABLE_INSTRUCTOR_EMAIL'] and
-            modulestore().get_modulestore_type(course.id) == MONGO_MODULESTORE_TYPE and
-            CourseAuthorization.instructor_email_enabled(course.id)
+    show_email_settings_for = frozenset()
+    if settings.MITX_FEATURES['ENABLE_INSTRUCTOR_EMAIL']:
+        show_email_settings_for = frozenset(
+            course_id for course_id in CourseAuthorization.instructor_email_enabled_courses(course_ids)
+            if modulestore().get_modulestore_type(course_id) == MONGO_MODULESTORE_TYPE
         )
-    )
 
     # Verification Attempts
     verification_status, verification_msg = SoftwareSecurePhotoVerification.user_status(user)
 
-    show_refund_option_for = frozenset(course.id for course, _enrollment in course_enrollment_pairs
-                                       if _enrollment.refundable())
+    # as CourseEnrollment.refundable
+    show_refund_option_for = frozenset(
+        course_id for course_id in course_ids
+        if any(mode.slug == 'verified' for mode in all_modes[course_id])
+    )
 
     # get info w.r.t ExternalAuthMap
     external_auth_map = None
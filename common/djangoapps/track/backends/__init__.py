@@ -26,3 +26,14 @@ class BaseBackend(object):
     def send(self, event):
         """Send event to tracker."""
         pass
+
+    def send_batch(self, events):
+        """
+        Send a list of events to tracker.
+
+        Backends that can save several events at once, e.g. with a
+        bulk insert, should override this.
+
+        """
+        for event in events:
+            self.send(event)
@@ -0,0 +1,193 @@
+"""
+Event tracker backend that buffers events in memory and has a background
+thread send them to another backend in batches, so that saving events
+doesn't add to the latency of requests.
+
+The backend that saves the events is configured in the options, e.g.::
+
+  TRACKING_BACKENDS = {
+      'mongo': {
+          'ENGINE': 'track.backends.buffered.BufferedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.mongodb.MongoBackend',
+                  'OPTIONS': {
+                      'database': 'track',
+                      ...
+                  }
+              },
+              'batch_size': 100,
+              'flush_interval': 1.0,
+              'max_queue_size': 10000,
+              'enqueue_timeout': 0,
+          }
+      }
+  }
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import Queue
+import threading
+import time
+
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+
+class FlushRequest(object):
+    """
+    Put on the queue to have the events before it sent right away.
+
+    """
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class BufferedBackend(BaseBackend):
+    """
+    Event tracker backend that sends events to another backend in batches,
+    from a background thread.
+
+    """
+    def __init__(self, backend, batch_size=100, flush_interval=1.0, max_queue_size=10000,
+                 enqueue_timeout=0, shutdown_timeout=5.0, **kwargs):
+        """
+        Event tracker backend that buffers events for another backend.
+
+        :Parameters:
+
+          - `backend`: configuration of the backend the events are sent
+            to, a dict with 'ENGINE' and 'OPTIONS' like the entries of
+            TRACKING_BACKENDS. Its `send_batch` is called with up to
+            `batch_size` events at a time.
+          - `flush_interval`: the longest time, in seconds, an event is
+            buffered for before it is sent.
+          - `max_queue_size`: the most events that can be buffered. When
+            the buffer is full, `send` waits up to `enqueue_timeout`
+            seconds for room, and then drops the event.
+          - `shutdown_timeout`: how long to wait for the buffered events
+            to be sent when the process exits.
+
+        """
+        super(BufferedBackend, self).__init__(**kwargs)
+
+        # imported here because the tracker instantiates backends when it
+        # is imported
+        from track.tracker import _instantiate_backend_from_name
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.enqueue_timeout = enqueue_timeout
+        self.shutdown_timeout = shutdown_timeout
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+
+        atexit.register(self.flush, self.shutdown_timeout)
+
+    def send(self, event):
+        """Buffer event, or drop it if the buffer stays full"""
+        queue = self._get_queue()
+        try:
+            if self.enqueue_timeout:
+                queue.put(event, timeout=self.enqueue_timeout)
+            else:
+                queue.put_nowait(event)
+        except Queue.Full:
+            dog_stats_api.increment('track.buffered.dropped')
+
+    def flush(self, timeout=None):
+        """
+        Send the buffered events now, waiting up to `timeout` seconds
+        (forever if None) for them to be sent. Returns whether they were.
+
+        """
+        if self._pid != os.getpid():
+            # nothing was buffered by this process
+            return True
+
+        request = FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except Queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    def _get_queue(self):
+        """
+        Returns the queue of buffered events, starting the background
+        thread that sends them if it isn't running in this process:
+        threads don't survive forking, e.g. into web server workers.
+
+        """
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = Queue.Queue(self.max_queue_size)
+                    thread = threading.Thread(
+                        target=self._send_buffered_events,
+                        args=(self._queue,),
+                        name='track.backends.buffered'
+                    )
+                    thread.daemon = True
+                    thread.start()
+                    self._pid = os.getpid()
+        return self._queue
+
+    def _send_buffered_events(self, queue):
+        """
+        Send the events of queue in batches, forever. A batch is sent once it
+        has `batch_size` events, once its first event has been buffered for
+        `flush_interval` seconds, or when a flush is requested.
+
+        """
+        batch = []
+        send_at = None
+        while True:
+            flush_request = None
+            try:
+                if send_at is None:
+                    item = queue.get()
+                else:
+                    item = queue.get(timeout=max(send_at - time.time(), 0))
+            except Queue.Empty:
+                item = None
+
+            if isinstance(item, FlushRequest):
+                flush_request = item
+            elif item is not None:
+                batch.append(item)
+                if send_at is None:
+                    send_at = time.time() + self.flush_interval
+                if len(batch) < self.batch_size:
+                    continue
+
+            if batch:
+                dog_stats_api.histogram('track.buffered.queue_size', queue.qsize())
+                self._send_batch(batch)
+                batch = []
+                send_at = None
+
+            if flush_request is not None:
+                flush_request.done.set()
+
+    def _send_batch(self, batch):
+        """Send batch to the backend, without letting errors stop the thread"""
+        try:
+            with dog_stats_api.timer('track.buffered.send_batch'):
+                self.backend.send_batch(batch)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Error sending a batch of %d events', len(batch))
+        dog_stats_api.increment('track.buffered.sent', value=len(batch))
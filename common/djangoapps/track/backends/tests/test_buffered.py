@@ -0,0 +1,70 @@
+from __future__ import absolute_import
+
+import threading
+import time
+
+from mock import patch
+
+from django.test import TestCase
+
+from track.backends.buffered import BufferedBackend
+
+
+DUMMY_BACKEND = {'ENGINE': 'track.tests.test_tracker.DummyBackend'}
+
+
+class TestBufferedBackend(TestCase):
+    def setUp(self):
+        self.stats_patcher = patch('track.backends.buffered.dog_stats_api')
+        self.addCleanup(self.stats_patcher.stop)
+        self.mock_stats = self.stats_patcher.start()
+
+    def test_flush_in_batches(self):
+        backend = BufferedBackend(DUMMY_BACKEND, batch_size=3, flush_interval=60)
+        with patch.object(backend.backend, 'send_batch', wraps=backend.backend.send_batch) as send_batch:
+            for _ in xrange(7):
+                backend.send({})
+            self.assertTrue(backend.flush(timeout=5))
+
+        self.assertEqual(backend.backend.count, 7)
+        self.assertEqual([len(args[0]) for args, _ in send_batch.call_args_list], [3, 3, 1])
+
+    def test_flush_interval(self):
+        backend = BufferedBackend(DUMMY_BACKEND, flush_interval=0.01)
+        backend.send({})
+
+        deadline = time.time() + 5
+        while backend.backend.count == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(backend.backend.count, 1)
+
+    def test_drop_when_full(self):
+        backend = BufferedBackend(DUMMY_BACKEND, batch_size=1, max_queue_size=1)
+        sending = threading.Event()
+        resume = threading.Event()
+
+        def blocked_send_batch(events):
+            sending.set()
+            resume.wait(5)
+            backend.backend.count += len(events)
+
+        with patch.object(backend.backend, 'send_batch', side_effect=blocked_send_batch):
+            backend.send({})
+            self.assertTrue(sending.wait(5))
+            backend.send({})
+            backend.send({})
+            self.mock_stats.increment.assert_called_once_with('track.buffered.dropped')
+
+            resume.set()
+            self.assertTrue(backend.flush(timeout=5))
+        self.assertEqual(backend.backend.count, 2)
+
+    def test_backend_errors(self):
+        backend = BufferedBackend(DUMMY_BACKEND)
+        with patch.object(backend.backend, 'send_batch', side_effect=Exception):
+            backend.send({})
+            self.assertTrue(backend.flush(timeout=5))
+
+        backend.send({})
+        self.assertTrue(backend.flush(timeout=5))
+        self.assertEqual(backend.backend.count, 1)
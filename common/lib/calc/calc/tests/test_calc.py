@@ -558,3 +558,40 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+    def test_parse_cache(self):
+        """
+        Check that expressions are parsed once, and that cached parse trees
+        still check their variables
+        """
+        calc.PARSE_CACHE.clear()
+        self.assertEqual(calc.evaluator({'x': 2.0}, {}, "x^2+sin(x)"), 4.0 + numpy.sin(2.0))
+
+        parse_string = calc.MATH_GRAMMAR.parseString
+        try:
+            calc.MATH_GRAMMAR.parseString = None
+            self.assertEqual(calc.evaluator({'x': 3.0}, {}, "x^2+sin(x)"), 9.0 + numpy.sin(3.0))
+            with self.assertRaisesRegexp(calc.UndefinedVariable, 'x'):
+                calc.evaluator({}, {}, "x^2+sin(x)")
+        finally:
+            calc.MATH_GRAMMAR.parseString = parse_string
+
+    def test_array_samples(self):
+        """
+        Check that arrays of samples are evaluated elementwise, in one pass
+        """
+        samples = numpy.array([0.5, 1.0, 2.0])
+        for expression in ["x^2-3*x/2", "sin(x)*e^x", "x||2", "(x+1)^(x-1)", "-x + 2k"]:
+            expected = [calc.evaluator({'x': sample}, {}, expression) for sample in samples]
+            result = calc.evaluator({'x': samples}, {}, expression)
+            self.assertEqual(result.shape, samples.shape)
+            for value, expected_value in zip(result, expected):
+                self.assertAlmostEqual(value, expected_value)
+
+    def test_array_samples_parallel_with_zero(self):
+        """
+        Check that only the samples with a zero resistor are NaN
+        """
+        result = calc.evaluator({'r': numpy.array([0.0, 1.0])}, {}, "r||1")
+        self.assertTrue(numpy.isnan(result[0]))
+        self.assertEqual(result[1], 0.5)
@@ -13,10 +13,13 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 '''
 
+from collections import OrderedDict
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
+import threading
 
 from lxml import etree
 from xml.sax.saxutils import unescape
@@ -63,6 +66,68 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# how many problem templates each process keeps, see LoncapaProblem._load_template
+PROBLEM_TEMPLATE_CACHE_SIZE = 512
+
+# matches the <include> tags of problem XML, whose problems aren't cached
+INCLUDE_TAG_RE = re.compile(r'<include[\s/>]')
+
+
+class ProblemTemplate(object):
+    """
+    The parts of a capa problem that don't depend on the seed: its XML tree with
+    includes expanded and IDs assigned, and where its responses and their inputs are.
+
+    The tree is shared by all the problems made from the template, which work on
+    their own copies of it, so it must not be modified.
+    """
+    def __init__(self, problem_text, tree, responses):
+        self.problem_text = problem_text
+        self.tree = tree
+        # list of (response class, index of the response element, indices of its input
+        # elements), with indices in the order of tree.iter()
+        self.responses = responses
+
+
+class ProblemTemplateCache(object):
+    """
+    A thread-safe, least-recently-used cache of ProblemTemplates.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the template for key or None, marking it as recently used
+        """
+        with self._lock:
+            template = self._templates.pop(key, None)
+            if template is not None:
+                self._templates[key] = template
+            return template
+
+    def set(self, key, template):
+        """
+        Adds the template for key, evicting the least recently used templates if there are too many
+        """
+        with self._lock:
+            self._templates.pop(key, None)
+            self._templates[key] = template
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all the templates
+        """
+        with self._lock:
+            self._templates.clear()
+
+
+PROBLEM_TEMPLATE_CACHE = ProblemTemplateCache(PROBLEM_TEMPLATE_CACHE_SIZE)
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -113,25 +178,19 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
+        # parse the problem, or get it from the templates of problems parsed before, and
+        # work on a copy of its tree
+        template = self._load_template(problem_text)
+        self.problem_text = template.problem_text
+        self.tree = deepcopy(template.tree)
 
         # construct script processor context (eg for customresponse problems)
         self.context = self._extract_context(self.tree)
 
-        # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
-        # transformations.  This also creates the dict (self.responders) of Response
-        # instances for each question in the problem. The dict has keys = xml subtree of
-        # Response, values = Response instance
-        self._preprocess_problem(self.tree)
+        # Pre-parse the XML tree: perform some in-place transformations.  This creates
+        # the dict (self.responders) of Response instances for each question in the problem.
+        # The dict has keys = xml subtree of Response, values = Response instance
+        self._preprocess_problem(self.tree, template.responses)
 
         if not self.student_answers:  # True when student_answers is an empty dict
             self.set_initial_display()
@@ -406,6 +465,44 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
+    def _load_template(self, problem_text):
+        """
+        Returns the ProblemTemplate of problem_text. Templates are kept in
+        PROBLEM_TEMPLATE_CACHE, so that the problem is only parsed, has its includes
+        expanded and its IDs assigned once per process, rather than for every student,
+        page view and rescore.
+
+        Problems with <include> tags aren't cached, as the included files can change
+        without the problem text changing.
+        """
+        key = None
+        if INCLUDE_TAG_RE.search(problem_text) is None:
+            key = (
+                hashlib.sha1(problem_text.encode('utf-8') if isinstance(problem_text, unicode) else problem_text).hexdigest(),
+                self.problem_id,
+            )
+            template = PROBLEM_TEMPLATE_CACHE.get(key)
+            if template is not None:
+                return template
+
+        # Convert startouttext and endouttext to proper <text></text>
+        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+
+        # parse problem XML file into an element tree
+        self.tree = etree.XML(problem_text)
+
+        # handle any <include file="foo"> tags
+        self._process_includes()
+
+        # add ID's to the responses and their inputs
+        responses = self._assign_ids(self.tree)
+
+        template = ProblemTemplate(problem_text, self.tree, responses)
+        if key is not None:
+            PROBLEM_TEMPLATE_CACHE.set(key, template)
+        return template
+
     def _process_includes(self):
         '''
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
@@ -639,19 +736,19 @@ class LoncapaProblem(object):
 
         return tree
 
-    def _preprocess_problem(self, tree):  # private
+    def _assign_ids(self, tree):  # private
         '''
         Assign IDs to all the responses
         Assign sub-IDs to all entries (textline, schematic, etc.)
-        Annoted correctness and value
         In-place transformation
 
-        Also create capa Response instances for each responsetype and save as self.responders
-
-        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        Returns a list of (Response class, response index, input indices) for the responses,
+        with the indices of their elements in the order of tree.iter()
         '''
+        indices = dict((element, index) for index, element in enumerate(tree.iter()))
+        responses = []
+
         response_id = 1
-        self.responders = {}
         for response in tree.xpath('//' + "|//".join(response_tag_dict)):
             response_id_str = self.problem_id + "_" + str(response_id)
             # create and save ID for this response
@@ -672,9 +769,32 @@ class LoncapaProblem(object):
                 entry.attrib['id'] = "%s_%i_%i" % (self.problem_id, response_id, answer_id)
                 answer_id = answer_id + 1
 
+            responses.append((
+                response_tag_dict[response.tag],
+                indices[response],
+                [indices[entry] for entry in inputfields]
+            ))
+
+        return responses
+
+    def _preprocess_problem(self, tree, responses):  # private
+        '''
+        Annoted correctness and value
+        In-place transformation
+
+        Create capa Response instances for each of responses (as returned by _assign_ids)
+        and save as self.responders
+
+        Obtain all responder answers and save as self.responder_answers dict (key = response)
+        '''
+        elements = list(tree.iter())
+        self.responders = {}
+        for response_class, response_index, inputfield_indices in responses:
+            response = elements[response_index]
+            inputfields = [elements[index] for index in inputfield_indices]
+
             # instantiate capa Response
-            responder = response_tag_dict[response.tag](response, inputfields,
-                                                        self.context, self.system)
+            responder = response_class(response, inputfields, self.context, self.system)
             # save in list in self
             self.responders[response] = responder
 
@@ -1832,7 +1832,14 @@ class FormulaResponse(LoncapaResponse):
         Takes in an answer and a list of dictionaries mapping variables to values.
         Each dictionary represents a test case for the answer.
         Returns a tuple of formula evaluation results.
+
+        The test cases are evaluated all at once if they can be (see
+        `evaluate_samples`), and otherwise one at a time.
         """
+        out = self.evaluate_samples(answer, var_dict_list)
+        if out is not None:
+            return out
+
         out = []
         for var_dict in var_dict_list:
             try:
@@ -1878,6 +1885,34 @@ class FormulaResponse(LoncapaResponse):
                                         cgi.escape(answer))
         return out
 
+    def evaluate_samples(self, answer, var_dict_list):
+        """
+        Evaluates answer for all the test cases in one pass, with numpy arrays
+        of the values each variable takes.
+
+        Returns the list of results, or None if answer can't be evaluated this
+        way (e.g. it uses `fact`) or if a test case doesn't evaluate to a
+        finite number. Evaluating the test cases one at a time then gives the
+        same results as before, or the error to report to the student.
+        """
+        if not var_dict_list:
+            return None
+        samples = dict(
+            (var, numpy.array([var_dict[var] for var_dict in var_dict_list]))
+            for var in var_dict_list[0]
+        )
+        # pylint: disable=W0703
+        try:
+            with numpy.errstate(all='ignore'):
+                results = evaluator(samples, dict(), answer, case_sensitive=self.case_sensitive)
+                # answers that don't use any variable evaluate to a single number
+                results = results + numpy.zeros(len(var_dict_list))
+        except Exception:
+            return None
+        if results.shape != (len(var_dict_list),) or not numpy.all(numpy.isfinite(results)):
+            return None
+        return list(results)
+
     def randomize_variables(self, samples):
         """
         Returns a list of dictionaries mapping variables to random values in range,
@@ -0,0 +1,76 @@
+"""
+Tests of LoncapaProblem construction from cached problem templates
+"""
+import os
+import shutil
+import tempfile
+import textwrap
+import unittest
+
+import fs.osfs
+import mock
+
+from capa.capa_problem import LoncapaProblem, PROBLEM_TEMPLATE_CACHE
+from . import test_system, new_loncapa_problem
+
+
+class ProblemTemplateTest(unittest.TestCase):
+    """
+    Problems made from the same XML share a parsed template, but not its tree
+    """
+    xml_str = textwrap.dedent("""
+        <problem>
+        <script type="loncapa/python">
+        x = 2 + seed % 3
+        </script>
+        <p>startouttext/What is $x?endouttext/</p>
+        <stringresponse answer="$x"><textline size="5"/></stringresponse>
+        <solution><p>It is $x</p></solution>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(ProblemTemplateTest, self).setUp()
+        self.system = test_system()
+        PROBLEM_TEMPLATE_CACHE.clear()
+
+    def test_parsed_once(self):
+        with mock.patch.object(LoncapaProblem, '_process_includes') as mock_process_includes:
+            first = new_loncapa_problem(self.xml_str, system=self.system)
+            second = new_loncapa_problem(self.xml_str, system=self.system)
+        self.assertEqual(mock_process_includes.call_count, 1)
+
+        self.assertEqual(first.get_html(), second.get_html())
+        self.assertEqual(first.get_answer_ids(), [['1_2_1']])
+        self.assertEqual(second.get_question_answers().keys(), first.get_question_answers().keys())
+
+    def test_trees_not_shared(self):
+        first = new_loncapa_problem(self.xml_str, system=self.system)
+        second = new_loncapa_problem(self.xml_str, system=self.system)
+
+        self.assertIsNot(first.tree, second.tree)
+        first.tree.find('.//textline').set('size', '40')
+        self.assertEqual(second.tree.find('.//textline').get('size'), '5')
+        for responder in second.responders.values():
+            self.assertIn(responder.xml, list(second.tree.iter()))
+
+    def test_different_problem_text(self):
+        first = new_loncapa_problem(self.xml_str, system=self.system)
+        second = new_loncapa_problem(self.xml_str.replace('seed % 3', 'seed % 3 + 1'), system=self.system)
+        self.assertEqual(len(PROBLEM_TEMPLATE_CACHE._templates), 2)  # pylint: disable=protected-access
+        self.assertEqual(second.context['x'], first.context['x'] + 1)
+
+    def test_includes_not_cached(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.system.filestore = fs.osfs.OSFS(directory)
+        xml_str = '<problem><include file="question.xml"/></problem>'
+        with open(os.path.join(directory, 'question.xml'), 'w') as included:
+            included.write('<p>What is 2 + 2?</p>')
+        self.assertIn('2 + 2', new_loncapa_problem(xml_str, system=self.system).get_html())
+
+        # the included file changes without the problem changing
+        with open(os.path.join(directory, 'question.xml'), 'w') as included:
+            included.write('<p>What is 3 + 3?</p>')
+        self.assertIn('3 + 3', new_loncapa_problem(xml_str, system=self.system).get_html())
+        self.assertEqual(len(PROBLEM_TEMPLATE_CACHE._templates), 0)  # pylint: disable=protected-access
@@ -164,6 +164,12 @@ class CapaFields(object):
         default=False,
         scope=Scope.settings
     )
+    max_score_depends_on_seed = Boolean(
+        help=("Whether the number of points this problem is worth depends on the randomization seed. "
+              "If not, the max score is computed once and shared by all students."),
+        default=False,
+        scope=Scope.settings
+    )
 
 
 class CapaModule(CapaFields, XModule):
@@ -66,7 +66,8 @@ class MongoContentStore(ContentStore):
                     location, fp.displayname, fp.content_type, fp, last_modified_at=fp.uploadDate,
                     thumbnail_location=getattr(fp, 'thumbnail_location', None),
                     import_path=getattr(fp, 'import_path', None),
-                    length=fp.length, locked=getattr(fp, 'locked', False)
+                    length=fp.length, locked=getattr(fp, 'locked', False),
+                    content_digest=getattr(fp, 'md5', None)
                 )
             else:
                 with self.fs.get(content_id) as fp:
@@ -74,7 +75,8 @@ class MongoContentStore(ContentStore):
                         location, fp.displayname, fp.content_type, fp.read(), last_modified_at=fp.uploadDate,
                         thumbnail_location=getattr(fp, 'thumbnail_location', None),
                         import_path=getattr(fp, 'import_path', None),
-                        length=fp.length, locked=getattr(fp, 'locked', False)
+                        length=fp.length, locked=getattr(fp, 'locked', False),
+                        content_digest=getattr(fp, 'md5', None)
                     )
         except NoFile:
             if throw_on_not_found:
@@ -127,13 +129,21 @@ class MongoContentStore(ContentStore):
         for asset in assets:
             asset_location = Location(asset['_id'])
             self.export(asset_location, output_directory)
-            for attr, value in asset.iteritems():
-                if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize']:
-                    policy.setdefault(asset_location.name, {})[attr] = value
+            policy[asset_location.name] = self.get_asset_policy(asset)
 
         with open(assets_policy_file, 'w') as f:
             json.dump(policy, f)
 
+    def get_asset_policy(self, asset):
+        """
+        Returns the attributes of asset, one of the dicts returned by get_all_content_for_course,
+        that are exported to the policy file of the course's assets.
+        """
+        return dict(
+            (attr, value) for attr, value in asset.iteritems()
+            if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize']
+        )
+
     def get_all_content_thumbnails_for_course(self, location):
         return self._get_all_content_for_course(location, get_thumbnails=True)
 
@@ -336,6 +336,14 @@ class ModuleStoreRead(object):
         '''
         pass
 
+    @abstractmethod
+    def get_course_locations(self):
+        '''
+        Returns a list of the Locations of the courses in this modulestore, without
+        loading the courses. Useful for listing courses whose details come from elsewhere.
+        '''
+        pass
+
     @abstractmethod
     def get_course(self, course_id):
         '''
@@ -352,6 +360,15 @@ class ModuleStoreRead(object):
         '''
         pass
 
+    @abstractmethod
+    def get_parent_chains(self, locations, course_id):
+        '''
+        Returns a dict mapping each of locations to the list of its ancestors in
+        this course, from its parent up to the top of the course, following the
+        first parent of each item. Useful for breadcrumbs and jump_to.
+        '''
+        pass
+
     @abstractmethod
     def get_errored_courses(self):
         """
@@ -478,6 +495,10 @@ class ModuleStoreReadBase(ModuleStoreRead):
         """
         return {}
 
+    def get_course_locations(self):
+        """Default impl--the locations of get_courses"""
+        return [course.location for course in self.get_courses()]
+
     def get_course(self, course_id):
         """Default impl--linear search through course list"""
         for c in self.get_courses():
@@ -485,6 +506,28 @@ class ModuleStoreReadBase(ModuleStoreRead):
                 return c
         return None
 
+    def get_parent_chains(self, locations, course_id):
+        """
+        Default impl--follows get_parent_locations up from each of locations
+        """
+        chains = {}
+        for location in locations:
+            chain = []
+            parents = self.get_parent_locations(location, course_id)
+            while parents and parents[0] not in chain:
+                chain.append(parents[0])
+                parents = self.get_parent_locations(parents[0], course_id)
+            chains[location] = chain
+        return chains
+
+    def get_course_version(self, course_id):
+        """
+        Returns a stamp that changes whenever the content of the course changes,
+        for keying caches of things computed from the course, or None if this
+        store doesn't track course versions.
+        """
+        return None
+
 
 class ModuleStoreWriteBase(ModuleStoreReadBase, ModuleStoreWrite):
     '''
@@ -24,6 +24,10 @@ except ImportError:
 
 _MODULESTORES = {}
 
+# Sent by the modulestores after every write, with the pseudo course id ('org/course') and
+# location written to. Shared by all modulestores, so that apps can connect to it on import.
+modulestore_update_signal = Signal(providing_args=['modulestore', 'course_id', 'location'])
+
 FUNCTION_KEYS = ['render_template']
 
 
@@ -64,7 +68,7 @@ def create_modulestore_instance(engine, doc_store_config, options):
     return class_(
         metadata_inheritance_cache_subsystem=metadata_inheritance_cache,
         request_cache=request_cache,
-        modulestore_update_signal=Signal(providing_args=['modulestore', 'course_id', 'location']),
+        modulestore_update_signal=modulestore_update_signal,
         xblock_mixins=getattr(settings, 'XBLOCK_MIXINS', ()),
         doc_store_config=doc_store_config,
         **_options
@@ -129,8 +133,18 @@ def loc_mapper():
     global _loc_singleton
     # pylint: disable=W0212
     if _loc_singleton is None:
+        try:
+            loc_cache = get_cache('loc_cache')
+        except InvalidCacheBackendError:
+            loc_cache = get_cache('default')
+
+        if HAS_REQUEST_CACHE:
+            request_cache = RequestCache.get_request_cache()
+        else:
+            request_cache = None
+
         # instantiate
-        _loc_singleton = LocMapperStore(**settings.DOC_STORE_CONFIG)
+        _loc_singleton = LocMapperStore(cache=loc_cache, request_cache=request_cache, **settings.DOC_STORE_CONFIG)
     # inject into split mongo modulestore
     if 'split' in _MODULESTORES:
         _MODULESTORES['split'].loc_mapper = _loc_singleton
@@ -25,14 +25,22 @@ class LocMapperStore(object):
 
     The expectation is that the configuration will have this use the same store as whatever is the default
     or dominant store, but that's not a requirement. This store creates its own connection.
+
+    The map entries of each org/course, and which org/courses map to each new-style course_id, are cached in
+    the `cache` shared by all processes, if given, as well as in the `request_cache`, if given. Every write to
+    the location_map deletes the cached copies of what it changes.
     '''
 
     def __init__(
-        self, host, db, collection, port=27017, user=None, password=None,
+        self, host, db, collection, port=27017, user=None, password=None, cache=None, request_cache=None,
         **kwargs
     ):
         '''
         Constructor
+
+        :param cache: a django cache to share the map entries between processes (optional)
+        :param request_cache: an object whose `data` dict holds the map entries used in the current
+        request (optional)
         '''
         self.db = pymongo.database.Database(
             pymongo.MongoClient(
@@ -48,6 +56,8 @@ class LocMapperStore(object):
 
         self.location_map = self.db[collection + '.location_map']
         self.location_map.write_concern = {'w': 1}
+        self.cache = cache
+        self.request_cache = request_cache
 
     # location_map functions
     def create_map_entry(self, course_location, course_id=None, draft_branch='draft', prod_branch='published',
@@ -102,6 +112,7 @@ class LocMapperStore(object):
             'prod_branch': prod_branch,
             'block_map': block_map or {},
         })
+        self._clear_cached_maps(course_location.org, course_location.course, course_id)
         return course_id
 
     def translate_location(self, old_style_course_id, location, published=True, add_entry_if_missing=True):
@@ -128,45 +139,47 @@ class LocMapperStore(object):
         """
         location_id = self._interpret_location_course_id(old_style_course_id, location)
 
-        maps = self.location_map.find(location_id).sort('_id.name', pymongo.ASCENDING)
-        if maps.count() == 0:
-            if add_entry_if_missing:
+        try:
+            entry = self._get_map_entry(location_id)
+            usage_id = self._get_usage_id(entry, location)
+        except ItemNotFoundError:
+            if not add_entry_if_missing:
+                raise
+            # Don't add to a cached map, which may not have what other processes have added to it since.
+            self._clear_cached_maps(location_id['_id.org'], location_id['_id.course'])
+            try:
+                entry = self._get_map_entry(location_id)
+            except ItemNotFoundError:
                 # create a new map
                 course_location = location.replace(category='course', name=location_id['_id.name'])
                 self.create_map_entry(course_location)
-                entry = self.location_map.find_one(location_id)
-            else:
-                raise ItemNotFoundError()
-        elif maps.count() > 1:
-            # if more than one, prefer the one w/o a name if that exists. Otherwise, choose the first (alphabetically)
-            entry = maps[0]
-        else:
-            entry = maps[0]
+                entry = self._get_map_entry(location_id)
+            try:
+                usage_id = self._get_usage_id(entry, location)
+            except ItemNotFoundError:
+                usage_id = self._add_to_block_map(location, location_id, entry['block_map'])
 
         if published:
             branch = entry['prod_branch']
         else:
             branch = entry['draft_branch']
 
-        usage_id = entry['block_map'].get(self._encode_for_mongo(location.name))
-        if usage_id is None:
-            if add_entry_if_missing:
-                usage_id = self._add_to_block_map(location, location_id, entry['block_map'])
-            else:
-                raise ItemNotFoundError(location)
-        elif isinstance(usage_id, dict):
-            # name is not unique, look through for the right category
-            if location.category in usage_id:
-                usage_id = usage_id[location.category]
-            elif add_entry_if_missing:
-                usage_id = self._add_to_block_map(location, location_id, entry['block_map'])
-            else:
-                raise ItemNotFoundError()
-        else:
-            raise InvalidLocationError()
-
         return BlockUsageLocator(course_id=entry['course_id'], branch=branch, usage_id=usage_id)
 
+    def translate_locations(self, old_style_course_id, locations, published=True, add_entry_if_missing=True):
+        """
+        Translate the given module locations to Locators, as translate_location does each of them.
+
+        The map entries of the course are read once for all the locations, unless blocks have to be
+        added to them.
+
+        :param locations: an iterable of Locations
+        """
+        return [
+            self.translate_location(old_style_course_id, location, published, add_entry_if_missing)
+            for location in locations
+        ]
+
     def translate_locator_to_location(self, locator, get_course=False):
         """
         Returns an old style Location for the given Locator if there's an appropriate entry in the
@@ -187,40 +200,43 @@ class LocMapperStore(object):
         """
         # This does not require that the course exist in any modulestore
         # only that it has a mapping entry.
-        maps = self.location_map.find({'course_id': locator.course_id})
-        # look for one which maps to this block usage_id
-        if maps.count() == 0:
-            return None
-        for candidate in maps:
-            for old_name, cat_to_usage in candidate['block_map'].iteritems():
-                for category, usage_id in cat_to_usage.iteritems():
-                    if get_course:
-                        if category == 'course':
-                            return Location(
-                                'i4x',
-                                candidate['_id']['org'],
-                                candidate['_id']['course'],
-                                'course',
-                                self._decode_from_mongo(old_name),
-                                None)
-                    elif usage_id == locator.usage_id:
-                        # figure out revision
-                        # enforce the draft only if category in [..] logic
-                        if category in draft.DIRECT_ONLY_CATEGORIES:
-                            revision = None
-                        elif locator.branch == candidate['draft_branch']:
-                            revision = draft.DRAFT
-                        else:
-                            revision = None
-                        return Location(
-                            'i4x',
-                            candidate['_id']['org'],
-                            candidate['_id']['course'],
-                            category,
-                            self._decode_from_mongo(old_name),
-                            revision)
+        for candidate in self._get_course_id_map_entries(locator.course_id):
+            course_name, usages = self._get_block_index(candidate)
+            if get_course:
+                old_name, category = course_name, 'course'
+            else:
+                old_name, category = usages.get(locator.usage_id, (None, None))
+            if old_name is None:
+                continue
+
+            # figure out revision
+            # enforce the draft only if category in [..] logic
+            if get_course or category in draft.DIRECT_ONLY_CATEGORIES:
+                revision = None
+            elif locator.branch == candidate['draft_branch']:
+                revision = draft.DRAFT
+            else:
+                revision = None
+            return Location(
+                'i4x',
+                candidate['_id']['org'],
+                candidate['_id']['course'],
+                category,
+                self._decode_from_mongo(old_name),
+                revision)
         return None
 
+    def translate_locators_to_locations(self, locators, get_course=False):
+        """
+        Returns the old style Locations for the given Locators, as translate_locator_to_location
+        does for each of them.
+
+        The map entries of each course are read, and indexed, once for all its locators.
+
+        :param locators: an iterable of BlockUsageLocators
+        """
+        return [self.translate_locator_to_location(locator, get_course) for locator in locators]
+
     def add_block_location_translator(self, location, old_course_id=None, usage_id=None):
         """
         Similar to translate_location which adds an entry if none is found, but this cannot create a new
@@ -285,6 +301,7 @@ class LocMapperStore(object):
 
                 map_entry['block_map'].setdefault(encoded_location_name, {})[location.category] = computed_usage_id
                 self.location_map.update({'_id': map_entry['_id']}, {'$set': {'block_map': map_entry['block_map']}})
+                self._clear_cached_maps(location_id['_id.org'], location_id['_id.course'])
 
         return computed_usage_id
 
@@ -323,6 +340,7 @@ class LocMapperStore(object):
             if location.category in map_entry['block_map'].setdefault(encoded_location_name, {}):
                 map_entry['block_map'][encoded_location_name][location.category] = usage_id
                 self.location_map.update({'_id': map_entry['_id']}, {'$set': {'block_map': map_entry['block_map']}})
+                self._clear_cached_maps(location_id['_id.org'], location_id['_id.course'])
 
         return usage_id
 
@@ -344,6 +362,7 @@ class LocMapperStore(object):
                 else:
                     del map_entry['block_map'][encoded_location_name][location.category]
                 self.location_map.update({'_id': map_entry['_id']}, {'$set': {'block_map': map_entry['block_map']}})
+                self._clear_cached_maps(location_id['_id.org'], location_id['_id.course'])
 
     def _add_to_block_map(self, location, location_id, block_map):
         '''add the given location to the block_map and persist it'''
@@ -358,8 +377,141 @@ class LocMapperStore(object):
         encoded_location_name = self._encode_for_mongo(location.name)
         block_map.setdefault(encoded_location_name, {})[location.category] = usage_id
         self.location_map.update(location_id, {'$set': {'block_map': block_map}})
+        self._clear_cached_maps(location_id['_id.org'], location_id['_id.course'])
         return usage_id
 
+    def _get_map_entry(self, location_id):
+        """
+        Returns the map entry to use for the location_id query (see _interpret_location_course_id):
+        if more than one matches, the one w/o a name if that exists. Otherwise, the first (alphabetically).
+
+        Raises ItemNotFoundError if there's none.
+        """
+        maps = self._get_course_map_entries(location_id['_id.org'], location_id['_id.course'])
+        if '_id.name' in location_id:
+            maps = [entry for entry in maps if entry['_id'].get('name') == location_id['_id.name']]
+        if not maps:
+            raise ItemNotFoundError()
+        return maps[0]
+
+    def _get_usage_id(self, entry, location):
+        """
+        Returns the usage_id of location in the map entry. Raises ItemNotFoundError if there's none.
+        """
+        usage_id = entry['block_map'].get(self._encode_for_mongo(location.name))
+        if usage_id is None:
+            raise ItemNotFoundError(location)
+        elif isinstance(usage_id, dict):
+            # name is not unique, look through for the right category
+            if location.category in usage_id:
+                return usage_id[location.category]
+            else:
+                raise ItemNotFoundError()
+        else:
+            raise InvalidLocationError()
+
+    def _get_course_map_entries(self, org, course):
+        """
+        Returns the map entries of all the runs of org/course, sorted by name with the one w/o a name
+        first, from the caches if they have them.
+        """
+        key = self._cache_key('maps', org, course)
+        request_data = self._get_request_data()
+        maps = request_data.get(key)
+        if maps is None and self.cache is not None:
+            maps = self.cache.get(key)
+        if maps is None:
+            maps = list(
+                self.location_map.find({'_id.org': org, '_id.course': course}).sort('_id.name', pymongo.ASCENDING)
+            )
+            if self.cache is not None:
+                self.cache.set(key, maps)
+        request_data[key] = maps
+        return maps
+
+    def _get_course_id_map_entries(self, course_id):
+        """
+        Returns the map entries for the new-style course_id, using the cached index from course_id to the
+        org/courses that map to it.
+        """
+        key = self._cache_key('course_id', course_id)
+        request_data = self._get_request_data()
+        org_courses = request_data.get(key)
+        if org_courses is None and self.cache is not None:
+            org_courses = self.cache.get(key)
+        if org_courses is None:
+            org_courses = []
+            for entry in self.location_map.find({'course_id': course_id}, ['_id']):
+                org_course = (entry['_id']['org'], entry['_id']['course'])
+                if org_course not in org_courses:
+                    org_courses.append(org_course)
+            if self.cache is not None:
+                self.cache.set(key, org_courses)
+        request_data[key] = org_courses
+
+        return [
+            entry
+            for org, course in org_courses
+            for entry in self._get_course_map_entries(org, course)
+            if entry['course_id'] == course_id
+        ]
+
+    def _get_block_index(self, entry):
+        """
+        Returns the old name of the course block of the map entry (or None), and a dict from the usage_ids
+        of its block_map to their (old name, category), which is kept in the request cache.
+        """
+        key = self._cache_key('block_index', entry['_id']['org'], entry['_id']['course'], entry['_id'].get('name'))
+        request_data = self._get_request_data()
+        if key not in request_data:
+            course_name = None
+            usages = {}
+            for old_name, cat_to_usage in entry['block_map'].iteritems():
+                for category, usage_id in cat_to_usage.iteritems():
+                    if category == 'course' and course_name is None:
+                        course_name = old_name
+                    usages.setdefault(usage_id, (old_name, category))
+            request_data[key] = (course_name, usages)
+        return request_data[key]
+
+    def _clear_cached_maps(self, org, course, course_id=None):
+        """
+        Delete the cached map entries of org/course, and the cached org/courses of the new-style course_id.
+        """
+        request_data = self._get_request_data()
+        keys = [self._cache_key('maps', org, course)]
+        if course_id is not None:
+            keys.append(self._cache_key('course_id', course_id))
+        for key in keys:
+            request_data.pop(key, None)
+        block_index_prefix = self._cache_key('block_index', org, course) + '.'
+        for key in request_data.keys():
+            if key.startswith(block_index_prefix):
+                del request_data[key]
+        if self.cache is not None:
+            self.cache.delete_many(keys)
+
+    def _get_request_data(self):
+        """
+        Returns the dict of this store's entries in the request cache, or an empty one if there is none.
+        """
+        if self.request_cache is None:
+            return {}
+        # the request cache's data is only defined once a request has been started on the thread
+        if getattr(self.request_cache, 'data', None) is None:
+            self.request_cache.data = {}
+        return self.request_cache.data.setdefault('loc_mapper', {})
+
+    def _cache_key(self, *parts):
+        """
+        Returns the cache key made of the location_map's name and parts, which are quoted so that it
+        can be used with memcached.
+        """
+        return '.'.join(
+            urllib.quote(unicode(part).encode('utf-8'), safe='')
+            for part in ('loc_mapper', self.location_map.full_name) + parts
+        )
+
     def _interpret_location_course_id(self, course_id, location):
         """
         Take the old style course id (org/course/run) and return a dict for querying the mapping table.
@@ -124,18 +124,49 @@ class MixedModuleStore(ModuleStoreWriteBase):
 
         return courses
 
+    def get_course_locations(self):
+        '''
+        Returns the Locations of the courses of get_courses, without loading them
+        '''
+        locations = []
+        for key in self.modulestores:
+            store_locations = self.modulestores[key].get_course_locations()
+            # as in get_courses, only surface the courses of stores other than the 'default'
+            # one that are mapped to them
+            if key != 'default':
+                locations.extend(
+                    location for location in store_locations
+                    if key == self.mappings.get(location.course_id, 'default')
+                )
+            else:
+                locations.extend(store_locations)
+
+        return locations
+
     def get_course(self, course_id):
         """
         returns the course module associated with the course_id
         """
         return self._get_modulestore_for_courseid(course_id).get_course(course_id)
 
+    def get_course_version(self, course_id):
+        """
+        returns the version stamp of the course associated with the course_id
+        """
+        return self._get_modulestore_for_courseid(course_id).get_course_version(course_id)
+
     def get_parent_locations(self, location, course_id):
         """
         returns the parent locations for a given lcoation and course_id
         """
         return self._get_modulestore_for_courseid(course_id).get_parent_locations(location, course_id)
 
+    def get_parent_chains(self, locations, course_id):
+        """
+        returns the chains of ancestors of the given locations of course_id
+        """
+        return self._get_modulestore_for_courseid(course_id).get_parent_chains(locations, course_id)
+
     def get_modulestore_type(self, course_id):
         """
         Returns a type which identifies which modulestore is servicing the given course_id.
@@ -16,6 +16,8 @@ import pymongo
 import sys
 import logging
 import copy
+from contextlib import contextmanager
+from uuid import uuid4
 
 from bson.son import SON
 from fs.osfs import OSFS
@@ -33,6 +35,8 @@ from xblock.fields import Scope, ScopeIds
 
 from xmodule.modulestore import ModuleStoreWriteBase, Location, MONGO_MODULESTORE_TYPE
 from xmodule.modulestore.exceptions import ItemNotFoundError
+from xmodule.modulestore.mongo.document_cache import CourseVersions, get_document_cache
+from xmodule.modulestore.mongo.parent_index import get_parent_index_cache
 from xmodule.modulestore.inheritance import own_metadata, InheritanceMixin, inherit_metadata, InheritanceKeyValueStore
 import re
 
@@ -246,11 +250,46 @@ def location_to_query(location, wildcard=True):
     return query
 
 
+# How long a writer may hold the lock on the cached inheritance tree of a course, in seconds
+INHERITANCE_LOCK_TIMEOUT = 60
+
+# Categories of the modules that can have children, which are the nodes of the metadata
+# inheritance tree
+# note this is a bit ugly as when we add new categories of containers, we have to add it here
+INHERITANCE_CONTAINER_CATEGORIES = [
+    'course', 'chapter', 'sequential', 'vertical', 'videosequence',
+    'wrapper', 'problemset', 'conditional', 'randomize'
+]
+
+
 def metadata_cache_key(location):
     """Turn a `Location` into a useful cache key."""
     return u"{0.org}/{0.course}".format(location)
 
 
+def inheritance_nodes_cache_key(location):
+    """
+    The cache key of the inheritance nodes of the course of location. Older versions of this
+    module cached the whole tree under metadata_cache_key, so the nodes have a key of their own.
+    """
+    return u"{0}/inheritance_nodes".format(metadata_cache_key(location))
+
+
+def inheritance_version_key(location):
+    """The cache key of the current version of the metadata inheritance tree of the course of location"""
+    return u"{0}/inheritance_version".format(metadata_cache_key(location))
+
+
+def inheritance_lock_key(location):
+    """The cache key of the lock on the cached metadata inheritance tree of the course of location"""
+    return u"{0}/inheritance_lock".format(metadata_cache_key(location))
+
+
+def inherited_metadata_cache_key(location, version, url):
+    """The cache key of the metadata that url inherits in version of the inheritance tree"""
+    return u"{0}/{1}/{2}".format(metadata_cache_key(location), version, url)
+
+
 class MongoModuleStore(ModuleStoreWriteBase):
     """
     A Mongodb backed ModuleStore
@@ -262,9 +301,13 @@ class MongoModuleStore(ModuleStoreWriteBase):
     def __init__(self, doc_store_config, fs_root, render_template,
                  default_class=None,
                  error_tracker=null_error_tracker,
+                 document_cache_size=0,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param document_cache_size: the number of bytes of module documents that get_item may keep in
+            memory between requests, shared by all stores of this class and collection in the process.
+            0 disables that cache.
         """
 
         super(MongoModuleStore, self).__init__(**kwargs)
@@ -295,6 +338,9 @@ class MongoModuleStore(ModuleStoreWriteBase):
         self.collection.ensure_index(
             zip(('_id.' + field for field in Location._fields), repeat(1))
         )
+        # and an index over children, for looking up parents while the parent indexes
+        # aren't available (see get_parent_locations)
+        self.collection.ensure_index('definition.children', background=True)
 
         if default_class is not None:
             module_path, _, class_name = default_class.rpartition('.')
@@ -307,117 +353,259 @@ class MongoModuleStore(ModuleStoreWriteBase):
         self.render_template = render_template
         self.ignore_write_events_on_courses = []
 
-    def compute_metadata_inheritance_tree(self, location):
-        '''
-        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
-        '''
+        self.document_cache = get_document_cache(
+            u'{0}/{1}'.format(self.__class__.__name__, self.collection.full_name),
+            document_cache_size
+        )
+        self.course_versions = CourseVersions(self.metadata_inheritance_cache_subsystem)
+        self.parent_indexes = get_parent_index_cache(self.collection.full_name)
 
-        # get all collections in the course, this query should not return any leaf nodes
-        # note this is a bit ugly as when we add new categories of containers, we have to add it here
-        query = {'_id.org': location.org,
-                 '_id.course': location.course,
-                 '_id.category': {'$in': ['course', 'chapter', 'sequential', 'vertical', 'videosequence',
-                                          'wrapper', 'problemset', 'conditional', 'randomize']}
-                 }
-        # we just want the Location, children, and inheritable metadata
+    def _inheritance_record_filter(self):
+        """
+        Returns the fields of container records needed to compute the metadata inheritance tree:
+        the Location, children, and inheritable metadata
+        """
         record_filter = {'_id': 1, 'definition.children': 1}
 
         # just get the inheritable metadata since that is all we need for the computation
         # this minimizes both data pushed over the wire
         for field_name in InheritanceMixin.fields:
             record_filter['metadata.{0}'.format(field_name)] = 1
+        return record_filter
 
-        # call out to the DB
-        resultset = self.collection.find(query, record_filter)
-
-        results_by_url = {}
+    def _collate_inheritance_nodes(self, resultset, nodes):
+        """
+        Adds the container records in resultset to nodes, a dict mapping location url ->
+        {'metadata': inheritable metadata, 'children': child urls}. Returns the url of the
+        course, if it is in resultset.
+        """
         root = None
-
-        # now go through the results and order them by the location url
         for result in resultset:
             location = Location(result['_id'])
             # We need to collate between draft and non-draft
             # i.e. draft verticals will have draft children but will have non-draft parents currently
             location = location.replace(revision=None)
             location_url = location.url()
-            if location_url in results_by_url:
-                existing_children = results_by_url[location_url].get('definition', {}).get('children', [])
-                additional_children = result.get('definition', {}).get('children', [])
-                total_children = existing_children + additional_children
-                results_by_url[location_url].setdefault('definition', {})['children'] = total_children
-            results_by_url[location.url()] = result
-            if location.category == 'course':
-                root = location.url()
 
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
-
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
             # check for presence of metadata key. Note that a given module may not yet be fully formed.
             # example: update_item -> update_children -> update_metadata sequence on new item create
             # if we get called here without update_metadata called first then 'metadata' hasn't been set
             # as we're not fully transactional at the DB layer. Same comment applies to below key name
             # check
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
+            node = {
+                'metadata': result.get('metadata', {}),
+                'children': result.get('definition', {}).get('children', []),
+            }
+            if location_url in nodes:
+                node['children'] = nodes[location_url]['children'] + node['children']
+            nodes[location_url] = node
+            if location.category == 'course':
+                root = location_url
+        return root
+
+    def _inherit_down(self, nodes, url, metadata, tree):
+        """
+        Records in tree the metadata that each descendent of url inherits, given the metadata
+        that url has with inheritance applied. Returns the list of urls that were recorded.
+        """
+        recorded = []
+        to_process = [(url, metadata)]
+        while to_process:
+            url, metadata = to_process.pop()
+            # go through all the children, and continue with the ones that are
+            # containers. Remember nodes will not contain leaf nodes
+            for child in nodes[url]['children']:
+                if child in nodes:
+                    new_child_metadata = copy.deepcopy(metadata)
+                    new_child_metadata.update(nodes[child]['metadata'])
+                    tree[child] = new_child_metadata
+                    to_process.append((child, new_child_metadata))
                 else:
                     # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata
+                    tree[child] = metadata
+                recorded.append(child)
+        return recorded
 
-        if root is not None:
-            _compute_inherited_metadata(root)
+    def _compute_inheritance_nodes(self, location):
+        """
+        Returns the inheritance nodes of all containers in the course of location, as
+        _collate_inheritance_nodes does, and the url of the course
+        """
+        # get all collections in the course, this query should not return any leaf nodes
+        query = {'_id.org': location.org,
+                 '_id.course': location.course,
+                 '_id.category': {'$in': INHERITANCE_CONTAINER_CATEGORIES}
+                 }
+        nodes = {}
+        root = self._collate_inheritance_nodes(self.collection.find(query, self._inheritance_record_filter()), nodes)
+        return nodes, root
 
+    def compute_metadata_inheritance_tree(self, location):
+        '''
+        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
+        '''
+        nodes, root = self._compute_inheritance_nodes(location)
+        return self._tree_from_inheritance_nodes(nodes, root)
+
+    def _tree_from_inheritance_nodes(self, nodes, root):
+        """
+        Computes the metadata that every item under root inherits from the inheritance nodes
+        """
+        metadata_to_inherit = {}
+        if root is not None:
+            self._inherit_down(nodes, root, nodes[root]['metadata'], metadata_to_inherit)
         return metadata_to_inherit
 
+    def _request_inherited_metadata(self, location):
+        """
+        Returns the dict of inherited metadata by location url that has already been read
+        for the course of location in this request, or None if there is no request cache
+        """
+        if self.request_cache is None:
+            return None
+        # we can't assume the 'inherited_metadata' part of the request cache dict has been
+        # defined
+        return self.request_cache.data.setdefault('inherited_metadata', {}).setdefault(
+            metadata_cache_key(location), {}
+        )
+
+    def _write_inheritance_tree(self, location, version, nodes, root, entries):
+        """
+        Writes the inheritance nodes of the course of location, and the inherited metadata
+        of the urls in entries, to the caching subsystem under version
+        """
+        self.metadata_inheritance_cache_subsystem.set_many(dict(
+            (inherited_metadata_cache_key(location, version, url), metadata)
+            for url, metadata in entries.iteritems()
+        ))
+        self.metadata_inheritance_cache_subsystem.set(
+            inheritance_nodes_cache_key(location),
+            {'version': version, 'nodes': nodes, 'root': root}
+        )
+        # servers still running the older version of this module read the whole tree from
+        # metadata_cache_key, so make them recompute it
+        self.metadata_inheritance_cache_subsystem.delete(metadata_cache_key(location))
+
+    @contextmanager
+    def _inheritance_tree_lock(self, location):
+        """
+        Holds the lock on the cached inheritance tree of the course of location for the
+        with block, unless another writer holds it or there is no caching subsystem.
+        Yields whether the lock is held.
+
+        The caching subsystem has no compare-and-swap, so the writers of the tree take
+        this lock (with an atomic add) before they read and rewrite the cached nodes.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        if cache is None:
+            yield False
+            return
+        key = inheritance_lock_key(location)
+        token = uuid4().hex
+        locked = cache.add(key, token, INHERITANCE_LOCK_TIMEOUT)
+        try:
+            yield locked
+        finally:
+            if locked and cache.get(key) == token:
+                cache.delete(key)
+
+    def _invalidate_inheritance_tree(self, location):
+        """
+        Makes readers recompute the cached inheritance tree of the course of location, by
+        replacing its version with one that nothing is cached under. Writers that can't
+        take the lock do this instead of patching the tree.
+        """
+        self.metadata_inheritance_cache_subsystem.set(inheritance_version_key(location), uuid4().hex)
+
     def get_cached_metadata_inheritance_tree(self, location, force_refresh=False):
         '''
+        Returns the metadata that every item in the course of location inherits.
+
+        The caching subsystem (e.g. memcached) holds the inheritance nodes of the course (see
+        _collate_inheritance_nodes), which writers patch incrementally, and one entry per
+        location url with the metadata it inherits, so that readers only fetch the entries
+        of the items they load (see get_inherited_metadata). All of these are stored under
+        a version that is replaced when the tree is recomputed from scratch.
+
         TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
         '''
-        key = metadata_cache_key(location)
-        tree = {}
-
+        cache = self.metadata_inheritance_cache_subsystem
         if not force_refresh:
-            # see if we are first in the request cache (if present)
-            if self.request_cache is not None and key in self.request_cache.data.get('metadata_inheritance', {}):
-                return self.request_cache.data['metadata_inheritance'][key]
-
-            # then look in any caching subsystem (e.g. memcached)
-            if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(key, {})
+            if cache is not None:
+                cached_nodes = cache.get(inheritance_nodes_cache_key(location))
+                if cached_nodes is not None and cached_nodes['version'] == cache.get(inheritance_version_key(location)):
+                    return self._tree_from_inheritance_nodes(cached_nodes['nodes'], cached_nodes['root'])
             else:
                 logging.warning('Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is OK in localdev and testing environment. Not OK in production.')
 
-        if not tree:
-            # if not in subsystem, or we are on force refresh, then we have to compute
-            tree = self.compute_metadata_inheritance_tree(location)
+        # if not in subsystem, or we are on force refresh, then we have to compute
+        with self._inheritance_tree_lock(location) as locked:
+            if locked:
+                current_version = cache.get(inheritance_version_key(location))
+            nodes, root = self._compute_inheritance_nodes(location)
+            tree = self._tree_from_inheritance_nodes(nodes, root)
+
+            # now write out computed tree to caching subsystem (e.g. memcached), if available.
+            # Only the holder of the lock writes it, and only if no other writer invalidated
+            # the tree while it was read from the DB, as it may miss that writer's changes.
+            if locked and cache.get(inheritance_version_key(location)) == current_version:
+                version = uuid4().hex
+                entries = dict(tree)
+                if root is not None:
+                    entries.setdefault(root, {})
+                self._write_inheritance_tree(location, version, nodes, root, entries)
+                # switch readers to the new version once all its entries are written
+                cache.set(inheritance_version_key(location), version)
+            elif force_refresh and not locked and cache is not None:
+                self._invalidate_inheritance_tree(location)
+
+        # now populate a request_cache, if available
+        request_entries = self._request_inherited_metadata(location)
+        if request_entries is not None:
+            request_entries.clear()
+            request_entries.update(tree)
 
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(key, tree)
+        return tree
 
-        # now populate a request_cache, if available. NOTE, we are outside of the
-        # scope of the above if: statement so that after a memcache hit, it'll get
-        # put into the request_cache
-        if self.request_cache is not None:
-            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
-            # defined
-            if 'metadata_inheritance' not in self.request_cache.data:
-                self.request_cache.data['metadata_inheritance'] = {}
-            self.request_cache.data['metadata_inheritance'][key] = tree
+    def get_inherited_metadata(self, location, urls):
+        """
+        Returns a dict mapping each of urls, the non-draft location urls of items in the
+        course of location, to the metadata the item inherits from its ancestors.
 
-        return tree
+        Only the entries of urls are read from the caching subsystem. If some of them
+        are missing (e.g. evicted, or for items that aren't in the tree) they are
+        computed from the cached inheritance nodes, or from the DB if those are gone too.
+        """
+        # see if we are first in the request cache (if present)
+        request_entries = self._request_inherited_metadata(location)
+        known = request_entries if request_entries is not None else {}
+        missing = [url for url in urls if url not in known]
+
+        cache = self.metadata_inheritance_cache_subsystem
+        if missing and cache is not None:
+            # then look in the caching subsystem
+            version = cache.get(inheritance_version_key(location))
+            if version is not None:
+                keys = dict((inherited_metadata_cache_key(location, version, url), url) for url in missing)
+                for key, metadata in cache.get_many(keys.keys()).iteritems():
+                    known[keys[key]] = metadata
+                missing = [url for url in missing if url not in known]
+
+        if missing:
+            tree = self.get_cached_metadata_inheritance_tree(location)
+            entries = dict((url, tree.get(url, {})) for url in missing)
+            known.update(entries)
+            if cache is not None:
+                # record the missing entries, so that items that aren't in the tree
+                # don't need the inheritance nodes next time
+                cached_nodes = cache.get(inheritance_nodes_cache_key(location))
+                if cached_nodes is not None:
+                    cache.set_many(dict(
+                        (inherited_metadata_cache_key(location, cached_nodes['version'], url), metadata)
+                        for url, metadata in entries.iteritems()
+                    ))
+
+        return dict((url, known.get(url, {})) for url in urls)
 
     def refresh_cached_metadata_inheritance_tree(self, location):
         """
@@ -427,6 +615,130 @@ class MongoModuleStore(ModuleStoreWriteBase):
         pseudo_course_id = '/'.join([location.org, location.course])
         if pseudo_course_id not in self.ignore_write_events_on_courses:
             self.get_cached_metadata_inheritance_tree(location, force_refresh=True)
+            self.course_versions.bump(location)
+
+    def update_cached_metadata_inheritance_tree(self, location):
+        """
+        Update the cached metadata inheritance tree of the course of location after location
+        was written to. Only the container at location is re-read from the DB (with any
+        containers newly added under it), and only the inherited metadata of its descendents
+        is recomputed. Writes to leaf items don't affect the tree.
+
+        If the inheritance nodes of the course aren't cached, the whole tree is refreshed.
+        If another writer is updating the tree at the same time, the tree is invalidated
+        instead, so that it's recomputed by the next reader.
+        """
+        pseudo_course_id = get_course_id_no_run(location)
+        if pseudo_course_id in self.ignore_write_events_on_courses:
+            return
+        self.course_versions.bump(location)
+
+        if self.metadata_inheritance_cache_subsystem is None:
+            self.get_cached_metadata_inheritance_tree(location, force_refresh=True)
+            return
+
+        with self._inheritance_tree_lock(location) as locked:
+            if locked:
+                patched = self._patch_inheritance_tree(location)
+            else:
+                self._invalidate_inheritance_tree(location)
+                patched = True
+        if not patched:
+            self.get_cached_metadata_inheritance_tree(location, force_refresh=True)
+
+    def _patch_inheritance_tree(self, location):
+        """
+        Patches the cached inheritance tree of the course of location after location was
+        written to (see update_cached_metadata_inheritance_tree), holding the lock on it.
+        Returns False if the tree must be refreshed instead.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        cached_nodes = cache.get(inheritance_nodes_cache_key(location))
+        if cached_nodes is None or cached_nodes['version'] != cache.get(inheritance_version_key(location)):
+            return False
+
+        location = Location(location).replace(revision=None)
+        if location.category not in INHERITANCE_CONTAINER_CATEGORIES:
+            return True
+
+        url = location.url()
+        nodes = cached_nodes['nodes']
+        root = cached_nodes['root']
+
+        # the descendents of location, which may no longer be under it after this write
+        old_descendents = self._inherit_down(nodes, url, {}, {}) if url in nodes else []
+        nodes.pop(url, None)
+
+        # read all revisions of the container, since drafts and non-drafts are collated, and
+        # then any containers that were newly added under it
+        record_filter = self._inheritance_record_filter()
+        to_fetch = [location]
+        while to_fetch:
+            queries = []
+            for fetch_location in to_fetch:
+                query = location_to_query(fetch_location)
+                del query['_id.revision']
+                queries.append(query)
+            root = self._collate_inheritance_nodes(
+                self.collection.find({'$or': queries}, record_filter), nodes
+            ) or root
+            to_fetch = [
+                Location(child)
+                for fetch_location in to_fetch if fetch_location.url() in nodes
+                for child in nodes[fetch_location.url()]['children']
+                if child not in nodes and Location(child).category in INHERITANCE_CONTAINER_CATEGORIES
+            ]
+
+        if url == root and url not in nodes:
+            # the course itself was deleted
+            return False
+
+        # now re-propagate the inherited metadata of location down its subtree
+        parents = dict((child, parent) for parent, node in nodes.iteritems() for child in node['children'])
+        entries = {}
+        if url == root:
+            metadata = nodes[root]['metadata']
+        else:
+            metadata = self._inherited_metadata(nodes, parents, root, url)
+            entries[url] = metadata or {}
+        if url in nodes and metadata is not None:
+            self._inherit_down(nodes, url, metadata, entries)
+
+        # descendents that were moved away or deleted
+        for descendent in old_descendents:
+            if descendent not in entries:
+                entries[descendent] = self._inherited_metadata(nodes, parents, root, descendent) or {}
+
+        self._write_inheritance_tree(location, cached_nodes['version'], nodes, root, entries)
+        request_entries = self._request_inherited_metadata(location)
+        if request_entries is not None:
+            request_entries.update(entries)
+        return True
+
+    def _inherited_metadata(self, nodes, parents, root, url):
+        """
+        Returns the metadata that url inherits, computed by walking up the inheritance nodes
+        with parents, a dict mapping child url -> parent url. Returns None if url isn't
+        under root.
+        """
+        ancestors = []
+        ancestor = parents.get(url)
+        while ancestor is not None and ancestor not in ancestors:
+            ancestors.append(ancestor)
+            if ancestor == root:
+                break
+            ancestor = parents.get(ancestor)
+        if not ancestors or ancestors[-1] != root:
+            return None
+
+        metadata = {}
+        for ancestor in reversed(ancestors):
+            metadata = copy.deepcopy(metadata)
+            metadata.update(nodes[ancestor]['metadata'])
+        if url in nodes:
+            metadata = copy.deepcopy(metadata)
+            metadata.update(nodes[url]['metadata'])
+        return metadata
 
     def _clean_item_data(self, item):
         """
@@ -490,7 +802,10 @@ class MongoModuleStore(ModuleStoreWriteBase):
 
         cached_metadata = {}
         if apply_cached_metadata:
-            cached_metadata = self.get_cached_metadata_inheritance_tree(Location(item['location']))
+            cached_metadata = self.get_inherited_metadata(
+                Location(item['location']),
+                [data_location.replace(revision=None).url() for data_location in data_cache]
+            )
 
         # TODO (cdodge): When the 'split module store' work has been completed, we should remove
         # the 'metadata_inheritance_tree' parameter
@@ -534,6 +849,21 @@ class MongoModuleStore(ModuleStoreWriteBase):
             )
         ]
 
+    def get_course_locations(self):
+        '''
+        Returns the Locations of the courses of get_courses, reading only their ids.
+        '''
+        course_filter = Location("i4x", category="course")
+        locations = (
+            Location(item['_id'])
+            for item in self.collection.find(location_to_query(course_filter), fields=['_id'])
+        )
+        return [
+            location
+            for location in locations
+            if not (location.org == 'edx' and location.course == 'templates')
+        ]
+
     def _find_one(self, location):
         '''Look for a given location in the collection.  If revision is not
         specified, returns the latest.  If the item is not present, raise
@@ -574,9 +904,43 @@ class MongoModuleStore(ModuleStoreWriteBase):
             calls to get_children() to cache. None indicates to cache all descendents.
         """
         location = Location.ensure_fully_specified(location)
-        item = self._find_one(location)
-        module = self._load_items([item], depth)[0]
-        return module
+        item, data_cache = self._find_item_data(location, depth)
+        return self._load_item(
+            item, data_cache,
+            apply_cached_metadata=(item['location']['category'] != 'course' or depth != 0)
+        )
+
+    def _find_item_data(self, location, depth):
+        """
+        Returns the document of the item at location, and the dict of the
+        documents of its descendents up to depth, as _cache_children does.
+
+        The documents are kept in self.document_cache until the course is
+        written to, except while writes to the course are being ignored (during
+        imports), when the cache isn't used at all.
+        """
+        pseudo_course_id = get_course_id_no_run(location)
+        if not self.document_cache.max_size or pseudo_course_id in self.ignore_write_events_on_courses:
+            item = self._find_one(location)
+            return item, self._cache_children([item], depth)
+
+        key = (location.url(), depth)
+        version = self.course_versions.get(location)
+        try:
+            item, data_cache = self.document_cache.get(key, version)
+        except KeyError:
+            try:
+                item = self._find_one(location)
+            except ItemNotFoundError:
+                item = data_cache = None
+            else:
+                data_cache = self._cache_children([item], depth)
+            documents = data_cache.values() if data_cache is not None else []
+            self.document_cache.set(key, version, (item, data_cache), documents)
+
+        if item is None:
+            raise ItemNotFoundError(location)
+        return item, data_cache
 
     def get_instance(self, course_id, location, depth=0):
         """
@@ -661,8 +1025,8 @@ class MongoModuleStore(ModuleStoreWriteBase):
                     'children': xmodule.children if xmodule.has_children else []
                 }
             })
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(xmodule.location)
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(xmodule.location)
         self.fire_updated_modulestore_signal(get_course_id_no_run(xmodule.location), xmodule.location)
 
     def create_and_save_xmodule(self, location, definition_data=None, metadata=None, system=None):
@@ -768,6 +1132,10 @@ class MongoModuleStore(ModuleStoreWriteBase):
         except ItemNotFoundError:
             if not allow_not_found:
                 raise
+        else:
+            # content changes don't affect the inheritance tree, but cached documents are stale
+            if get_course_id_no_run(Location(location)) not in self.ignore_write_events_on_courses:
+                self.course_versions.bump(Location(location))
 
     def update_children(self, location, children):
         """
@@ -779,8 +1147,8 @@ class MongoModuleStore(ModuleStoreWriteBase):
         """
 
         self._update_single_item(location, {'definition.children': children})
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(Location(location))
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(Location(location))
         # fire signal that we've written to DB
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
@@ -809,10 +1177,59 @@ class MongoModuleStore(ModuleStoreWriteBase):
             self.update_metadata(course.location, own_metadata(course))
 
         self._update_single_item(location, {'metadata': metadata})
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(loc)
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(loc)
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
+    def bulk_update_items(self, items, batch_size=500):
+        """
+        Write many items with a few round trips to the DB, e.g. when importing a course:
+        items are inserted `batch_size` at a time, replacing any items already at their
+        locations.
+
+        items: an iterable of (location, data, children, metadata) tuples, which are the
+            arguments that update_item, update_children and update_metadata would be called
+            with for each item. It is consumed as the items are written, so it can be a generator.
+
+        Unlike update_metadata, this doesn't update the tabs of the course when static_tabs
+        are written. The metadata inheritance trees of the courses written to are refreshed
+        once at the end, unless write events are ignored on them.
+        """
+        course_locations = {}
+
+        def write_batch(batch):
+            """Replaces the items of batch"""
+            # Must include safe to avoid the django debug toolbar (which defines the deprecated "safe=False")
+            # from overriding our default value set in the init method.
+            self.collection.remove(
+                {'_id': {'$in': [namedtuple_to_son(Location(item['_id'])) for item in batch]}},
+                safe=self.collection.safe
+            )
+            self.collection.insert(batch, safe=self.collection.safe)
+
+        batch = []
+        for location, data, children, metadata in items:
+            location = Location(location)
+            batch.append({
+                '_id': location.dict(),
+                'metadata': metadata,
+                'definition': {
+                    'data': data,
+                    'children': children,
+                },
+            })
+            course_locations.setdefault(get_course_id_no_run(location), location)
+            if len(batch) >= batch_size:
+                write_batch(batch)
+                batch = []
+        if batch:
+            write_batch(batch)
+
+        for pseudo_course_id, location in course_locations.iteritems():
+            if pseudo_course_id not in self.ignore_write_events_on_courses:
+                self.refresh_cached_metadata_inheritance_tree(location)
+                self.fire_updated_modulestore_signal(pseudo_course_id, location)
+
     def delete_item(self, location, delete_all_versions=False):
         """
         Delete an item from this modulestore
@@ -835,18 +1252,92 @@ class MongoModuleStore(ModuleStoreWriteBase):
         # Must include this to avoid the django debug toolbar (which defines the deprecated "safe=False")
         # from overriding our default value set in the init method.
         self.collection.remove({'_id': Location(location).dict()}, safe=self.collection.safe)
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(Location(location))
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(Location(location))
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
+    def _get_parent_index(self, location):
+        """
+        Returns the index of the parents of the items in the course of location, a dict
+        mapping the url of each child to the Locations of its parents, or None while the
+        course is being imported, as its version isn't changed until the import is done.
+
+        The index is kept in self.parent_indexes until the course is written to.
+        """
+        if get_course_id_no_run(location) in self.ignore_write_events_on_courses:
+            return None
+
+        key = metadata_cache_key(location)
+        # read the version before the items, so that an index built from items read
+        # before a write is never stored under the version after it
+        version = self.course_versions.get(location)
+        index = self.parent_indexes.get(key, version)
+        if index is None:
+            index = {}
+            query = {
+                '_id.tag': location.tag,
+                '_id.org': location.org,
+                '_id.course': location.course,
+                'definition.children.0': {'$exists': True},
+            }
+            for item in self.collection.find(query, {'_id': True, 'definition.children': True}):
+                parent = Location(item['_id'])
+                for child in item['definition']['children']:
+                    index.setdefault(child, []).append(parent)
+            self.parent_indexes.set(key, version, index)
+        return index
+
+    def _find_parent_locations(self, location, index):
+        """
+        Returns the Locations of the parents of the fully specified location, from index,
+        the parent index of its course, or from the DB if index is None.
+        """
+        if index is None:
+            items = self.collection.find({'definition.children': location.url()},
+                                         {'_id': True})
+            return [Location(i['_id']) for i in items]
+        return list(index.get(location.url(), []))
+
     def get_parent_locations(self, location, course_id):
         '''Find all locations that are the parents of this location in this
         course.  Needed for path_to_location().
         '''
         location = Location.ensure_fully_specified(location)
-        items = self.collection.find({'definition.children': location.url()},
-                                     {'_id': True})
-        return [i['_id'] for i in items]
+        return self._find_parent_locations(location, self._get_parent_index(location))
+
+    def get_parent_chains(self, locations, course_id):
+        """
+        Returns a dict mapping each of locations to the list of the Locations of its
+        ancestors, from its parent up to the top of the course, following the first
+        parent of each item. The parent index of each course is only read once.
+        """
+        chains = {}
+        indexes = {}
+        for location in locations:
+            full_location = Location.ensure_fully_specified(location)
+            key = metadata_cache_key(full_location)
+            if key not in indexes:
+                indexes[key] = self._get_parent_index(full_location)
+
+            chain = []
+            parents = self._find_parent_locations(full_location, indexes[key])
+            while parents and parents[0] not in chain:
+                chain.append(parents[0])
+                # children are non-draft urls, even for draft parents
+                parents = self._find_parent_locations(parents[0].replace(revision=None), indexes[key])
+            chains[location] = chain
+        return chains
+
+    def get_course_version(self, course_id):
+        """
+        Returns the edit version stamp of the course, which changes on every write
+        to the course (see CourseVersions), or None while the course is being
+        imported, as its version isn't changed until the import is done.
+        """
+        org, course, name = course_id.split('/')
+        if '/'.join([org, course]) in self.ignore_write_events_on_courses:
+            return None
+        return self.course_versions.get(Location('i4x', org, course, 'course', name))
 
     def get_modulestore_type(self, course_id):
         """
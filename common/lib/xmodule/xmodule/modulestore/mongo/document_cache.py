@@ -0,0 +1,154 @@
+"""
+A process-wide cache of the Mongo documents that MongoModuleStore.get_item
+loads descriptors from.
+
+Loading a descriptor tree costs one Mongo query per level of depth. The LMS
+loads the same published courses over and over, so the documents of each
+(location, depth) lookup are kept in memory, tagged with the edit version of
+the course they belong to. The version of a course is a random stamp stored
+in a shared cache (e.g. memcached), which every write to the course replaces,
+so that all processes of a deployment stop using their copies of the
+documents as soon as one of them writes to the course.
+
+Descriptors themselves aren't cached, because the LMS binds them to the
+student in place. Each hit returns a copy of the documents, from which a new
+descriptor tree is built without going to Mongo.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from uuid import uuid4
+
+from bson import BSON
+
+# Approximate memory used by an entry besides its documents, so that entries
+# of missing items count towards the budget too
+ENTRY_OVERHEAD = 256
+
+
+# How long versions are kept in the shared cache, in seconds. A version that
+# expires makes every process drop the documents of its course, so versions are
+# kept for as long as the cache can keep them. (Django 1.4 takes a timeout of 0 to
+# be the default timeout of the cache, rather than no expiry.)
+VERSION_TIMEOUT = 60 * 60 * 24 * 365
+
+# Course versions of processes without a shared cache
+_LOCAL_VERSIONS = {}
+
+
+def course_version_key(location):
+    """Returns the shared cache key of the edit version of the course of `location`"""
+    return u"descriptor_version/{0.org}/{0.course}".format(location)
+
+
+class CourseVersions(object):
+    """
+    Edit version stamps of courses, kept in `shared_cache` so that they are
+    the same in every process. If there is no shared cache, the versions
+    are only valid in this process.
+
+    Versions are read from the shared cache on every lookup, rather than
+    once per request, so that long running processes without a request
+    cycle (e.g. celery workers) see writes too.
+    """
+    def __init__(self, shared_cache=None):
+        self.shared_cache = shared_cache
+
+    def get(self, location):
+        """
+        Returns the version of the course of `location`, creating one if the
+        course has none yet.
+        """
+        key = course_version_key(location)
+        if self.shared_cache is None:
+            version = _LOCAL_VERSIONS.setdefault(key, uuid4().hex)
+        else:
+            version = self.shared_cache.get(key)
+            if version is None:
+                # Another process may be creating a version at the same time, so
+                # only add ours if there still isn't one
+                self.shared_cache.add(key, uuid4().hex, VERSION_TIMEOUT)
+                version = self.shared_cache.get(key)
+        return version
+
+    def bump(self, location):
+        """
+        Gives the course of `location` a new version, which makes every cached
+        document of the course stale.
+        """
+        key = course_version_key(location)
+        version = uuid4().hex
+        if self.shared_cache is None:
+            _LOCAL_VERSIONS[key] = version
+        else:
+            self.shared_cache.set(key, version, VERSION_TIMEOUT)
+
+
+class DocumentCache(object):
+    """
+    A thread safe LRU cache of the documents of get_item lookups, holding at
+    most `max_size` bytes worth of BSON. A `max_size` of 0 disables the cache.
+    """
+    def __init__(self, max_size=0):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """
+        Returns a copy of the value stored for `key` with `version`, or
+        raises KeyError if there is none.
+        """
+        with self._lock:
+            entry_version, value, size = self._entries.pop(key)
+            if entry_version != version:
+                self.size -= size
+                raise KeyError(key)
+            # Move the entry to the most recently used end
+            self._entries[key] = (entry_version, value, size)
+        return copy.deepcopy(value)
+
+    def set(self, key, version, value, documents):
+        """
+        Stores a copy of `value` for `key` and `version`. `documents` are the
+        Mongo documents in `value`, which determine the size of the entry.
+        """
+        if not self.max_size:
+            return
+        size = ENTRY_OVERHEAD + sum(len(BSON.encode(document)) for document in documents)
+        if size > self.max_size:
+            return
+
+        value = copy.deepcopy(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[2]
+            self._entries[key] = (version, value, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self):
+        """Removes all entries"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+# One cache per collection and store class, shared by all stores of the process
+_DOCUMENT_CACHES = {}
+_DOCUMENT_CACHES_LOCK = threading.Lock()
+
+
+def get_document_cache(name, max_size):
+    """
+    Returns the process-wide DocumentCache called `name`, creating it with a
+    budget of `max_size` bytes if it doesn't exist yet.
+    """
+    with _DOCUMENT_CACHES_LOCK:
+        if name not in _DOCUMENT_CACHES:
+            _DOCUMENT_CACHES[name] = DocumentCache(max_size)
+        return _DOCUMENT_CACHES[name]
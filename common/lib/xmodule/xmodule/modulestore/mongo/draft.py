@@ -152,7 +152,7 @@ class DraftModuleStore(MongoModuleStore):
         except pymongo.errors.DuplicateKeyError:
             raise DuplicateItemError(original['_id'])
 
-        self.refresh_cached_metadata_inheritance_tree(draft_location)
+        self.update_cached_metadata_inheritance_tree(draft_location)
         self.fire_updated_modulestore_signal(get_course_id_no_run(draft_location), draft_location)
 
         return self._load_items([original])[0]
@@ -254,9 +254,12 @@ class DraftModuleStore(MongoModuleStore):
                 # see if children were deleted. 2 reasons for children lists to differ:
                 #   1) child deleted
                 #   2) child moved
+                # deleting a child doesn't change the parents of the others, so the parent
+                # index is only read once
+                parent_index = self._get_parent_index(Location(location))
                 for child in original_published.children:
                     if child not in draft.children:
-                        rents = [Location(mom) for mom in self.get_parent_locations(child, None)]
+                        rents = self._find_parent_locations(Location(child), parent_index)
                         if (len(rents) == 1 and rents[0] == Location(location)):  # the 1 is this original_published
                             self.delete_item(child, True)
             super(DraftModuleStore, self).update_children(location, draft.children)
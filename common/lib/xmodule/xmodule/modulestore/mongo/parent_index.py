@@ -0,0 +1,73 @@
+"""
+A process-wide index of the parents of the items of Mongo courses.
+
+MongoModuleStore.get_parent_locations used to query Mongo for the items whose
+children include an item, once per lookup, and callers such as path_to_location
+and DraftModuleStore.publish look up many parents in a row. Instead, the
+parents of every item of a course are read with a single query for the items of
+the course that have children, and kept in memory, tagged with the edit version
+of the course (see document_cache.CourseVersions). Every write to the course
+replaces its version, so the index of a course is rebuilt on the first lookup
+after a write, in every process.
+"""
+
+import threading
+from collections import OrderedDict
+
+# The number of courses whose parent indexes are kept in memory by default
+DEFAULT_MAX_COURSES = 100
+
+
+class ParentIndexCache(object):
+    """
+    A thread safe LRU cache of the parent indexes of at most `max_courses`
+    courses. Indexes are dicts mapping the url of each child to the list of
+    the Locations of its parents, which must not be modified once stored.
+    """
+    def __init__(self, max_courses=DEFAULT_MAX_COURSES):
+        self.max_courses = max_courses
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """
+        Returns the index stored for `key` with `version`, or None if there is none.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] != version:
+                return None
+            # Move the entry to the most recently used end
+            self._entries[key] = entry
+        return entry[1]
+
+    def set(self, key, version, index):
+        """
+        Stores `index` for `key` and `version`
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (version, index)
+            while len(self._entries) > self.max_courses:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Removes all entries"""
+        with self._lock:
+            self._entries.clear()
+
+
+# One cache per collection, shared by all stores of the process
+_PARENT_INDEX_CACHES = {}
+_PARENT_INDEX_CACHES_LOCK = threading.Lock()
+
+
+def get_parent_index_cache(name):
+    """
+    Returns the process-wide ParentIndexCache called `name`, creating it if it
+    doesn't exist yet.
+    """
+    with _PARENT_INDEX_CACHES_LOCK:
+        if name not in _PARENT_INDEX_CACHES:
+            _PARENT_INDEX_CACHES[name] = ParentIndexCache()
+        return _PARENT_INDEX_CACHES[name]
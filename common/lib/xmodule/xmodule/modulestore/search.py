@@ -81,10 +81,23 @@ def path_to_location(modulestore, course_id, location):
         # If we're here, there is no path
         return None
 
+    def first_parents_to_course():
+        '''Find the path up the first parents of location, which is
+        usually the only path, in a single call to the modulestore.
+
+        If it doesn't lead to the course, return None.
+        '''
+        loc = Location(location)
+        chain = modulestore.get_parent_chains([loc], course_id)[loc]
+        path = [Location(parent) for parent in reversed(chain)] + [loc]
+        if path[0].category == "course" and course_id == CourseDescriptor.location_to_id(path[0]):
+            return path
+        return None
+
     if not modulestore.has_item(course_id, location):
         raise ItemNotFoundError
 
-    path = find_path_to_course()
+    path = first_parents_to_course() or find_path_to_course()
     if path is None:
         raise NoPathToItem(location)
 
@@ -0,0 +1,101 @@
+"""
+Tests of the process-wide document cache of the Mongo modulestore
+"""
+import unittest
+
+from xmodule.modulestore import Location
+from xmodule.modulestore.mongo.document_cache import (
+    CourseVersions, DocumentCache, ENTRY_OVERHEAD, VERSION_TIMEOUT, course_version_key
+)
+
+
+class TestDocumentCache(unittest.TestCase):
+    """
+    Tests of the LRU of item documents
+    """
+    def setUp(self):
+        self.document = {'location': {'name': 'problem'}, 'definition': {'data': 'x' * 100}}
+        self.cache = DocumentCache(max_size=10000)
+
+    def test_get_returns_copy(self):
+        self.cache.set('key', 'v1', (self.document, {}), [self.document])
+        self.document['definition']['data'] = 'changed'
+        value = self.cache.get('key', 'v1')
+        self.assertEqual('x' * 100, value[0]['definition']['data'])
+
+        value[0]['metadata'] = {}
+        self.assertNotIn('metadata', self.cache.get('key', 'v1')[0])
+
+    def test_stale_version(self):
+        self.cache.set('key', 'v1', (self.document, {}), [self.document])
+        self.assertRaises(KeyError, self.cache.get, 'key', 'v2')
+        # Stale entries are dropped
+        self.assertRaises(KeyError, self.cache.get, 'key', 'v1')
+        self.assertEqual(0, self.cache.size)
+
+    def test_eviction(self):
+        entry_size = self.cache.max_size // 3
+        document = {'data': 'x' * (entry_size - ENTRY_OVERHEAD - 20)}
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, 'v1', document, [document])
+        # Using 'a' makes 'b' the least recently used entry
+        self.cache.get('a', 'v1')
+        self.cache.set('d', 'v1', document, [document])
+
+        self.assertRaises(KeyError, self.cache.get, 'b', 'v1')
+        for key in ('a', 'c', 'd'):
+            self.assertEqual(document, self.cache.get(key, 'v1'))
+        self.assertTrue(self.cache.size <= self.cache.max_size)
+
+    def test_disabled(self):
+        cache = DocumentCache()
+        cache.set('key', 'v1', self.document, [self.document])
+        self.assertRaises(KeyError, cache.get, 'key', 'v1')
+
+
+class DictCache(dict):
+    """
+    The parts of the Django cache API that CourseVersions uses
+    """
+    def __init__(self):
+        super(DictCache, self).__init__()
+        self.timeouts = {}
+
+    def set(self, key, value, timeout=None):
+        self[key] = value
+        self.timeouts[key] = timeout
+
+    def add(self, key, value, timeout=None):
+        if key not in self:
+            self.set(key, value, timeout)
+
+
+class TestCourseVersions(unittest.TestCase):
+    """
+    Tests of the course version stamps shared between processes
+    """
+    def setUp(self):
+        shared_cache = self.shared_cache = DictCache()
+        self.versions = CourseVersions(shared_cache)
+        self.other_process = CourseVersions(shared_cache)
+        self.location = Location('i4x', 'edX', 'versions', 'problem', 'problem')
+
+    def test_shared_version(self):
+        self.assertEqual(self.versions.get(self.location), self.other_process.get(self.location))
+
+    def test_bump(self):
+        version = self.versions.get(self.location)
+        other_course = Location('i4x', 'edX', 'other', 'course', 'run')
+        other_version = self.versions.get(other_course)
+
+        self.other_process.bump(self.location.replace(category='html', name='html'))
+        self.assertNotEqual(version, self.versions.get(self.location))
+        self.assertEqual(other_version, self.versions.get(other_course))
+
+    def test_versions_kept(self):
+        # versions aren't left to expire with the default timeout of the cache
+        self.versions.get(self.location)
+        key = course_version_key(self.location)
+        self.assertEqual(self.shared_cache.timeouts[key], VERSION_TIMEOUT)
+        self.versions.bump(self.location)
+        self.assertEqual(self.shared_cache.timeouts[key], VERSION_TIMEOUT)
@@ -3,8 +3,10 @@ Created on Aug 5, 2013
 
 @author: dmitchell
 '''
+import copy
 import unittest
 import uuid
+from mock import patch
 from xmodule.modulestore import Location
 from xmodule.modulestore.locator import BlockUsageLocator
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateItemError
@@ -530,6 +532,100 @@ class TestLocationMapper(unittest.TestCase):
         self.assertEqual(locator.usage_id, 'problem3')
 
 
+class DictCache(object):
+    """
+    Stands in for the django cache shared by the processes using the location mapper.
+    """
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return copy.deepcopy(self.values.get(key))
+
+    def set(self, key, value):
+        self.values[key] = copy.deepcopy(value)
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.values.pop(key, None)
+
+
+class RequestCache(object):
+    """
+    Stands in for the request cache.
+    """
+    def __init__(self):
+        self.data = {}
+
+
+class TestCachedLocationMapper(TestLocationMapper):
+    """
+    Test the location to locator mapper, with its map entries cached
+    """
+
+    def setUp(self):
+        self.modulestore_options = {
+            'host': 'localhost',
+            'db': 'test_xmodule',
+            'collection': 'modulestore{0}'.format(uuid.uuid4().hex),
+            'cache': DictCache(),
+        }
+
+        # pylint: disable=W0142
+        TestLocationMapper.loc_store = LocMapperStore(request_cache=RequestCache(), **self.modulestore_options)
+
+    def test_translate_location_cached(self):
+        org = 'foo_org'
+        course = 'bar_course'
+        old_style_course_id = '{}/{}/{}'.format(org, course, 'baz_run')
+        location = Location('i4x', org, course, 'problem', 'abc123')
+        loc_mapper().create_map_entry(
+            Location('i4x', org, course, 'course', 'baz_run'),
+            block_map={'abc123': {'problem': 'problem2'}}
+        )
+        locator = loc_mapper().translate_location(old_style_course_id, location, add_entry_if_missing=False)
+        loc_mapper().translate_locator_to_location(locator)
+
+        with patch.object(loc_mapper().location_map, 'find') as mock_find:
+            locator = loc_mapper().translate_location(old_style_course_id, location, add_entry_if_missing=False)
+            self.assertEqual(locator.usage_id, 'problem2')
+            self.assertEqual(
+                loc_mapper().translate_locator_to_location(locator),
+                Location('i4x', org, course, 'problem', 'abc123', None)
+            )
+            # another process, with a request cache of its own, finds the map in the shared cache
+            other_store = LocMapperStore(request_cache=RequestCache(), **self.modulestore_options)
+            self.assertEqual(other_store.translate_location(old_style_course_id, location).usage_id, 'problem2')
+        self.assertEqual(mock_find.call_count, 0)
+
+        # changes made by another process are seen in the next request
+        other_store.update_block_location_translator(location, 'problem3', old_style_course_id)
+        loc_mapper().request_cache.data = {}
+        locator = loc_mapper().translate_location(old_style_course_id, location, add_entry_if_missing=False)
+        self.assertEqual(locator.usage_id, 'problem3')
+
+    def test_bulk_translate(self):
+        org = 'foo_org'
+        course = 'bar_course'
+        old_style_course_id = '{}/{}/{}'.format(org, course, 'baz_run')
+        locations = [Location('i4x', org, course, 'problem', 'problem{}'.format(index)) for index in range(100)]
+        locators = loc_mapper().translate_locations(old_style_course_id, locations, published=False)
+        self.assertEqual([locator.usage_id for locator in locators], [location.name for location in locations])
+        # the maps are read again once blocks have been added to them
+        loc_mapper().translate_locators_to_locations(locators)
+
+        with patch.object(loc_mapper().location_map, 'find') as mock_find:
+            self.assertEqual(
+                loc_mapper().translate_locations(old_style_course_id, locations, published=False),
+                locators
+            )
+            self.assertEqual(
+                loc_mapper().translate_locators_to_locations(locators),
+                [location.replace(revision='draft') for location in locations]
+            )
+        self.assertEqual(mock_find.call_count, 0)
+
+
 #==================================
 # functions to mock existing services
 def loc_mapper():
@@ -217,6 +217,12 @@ class TestMixedModuleStore(object):
         assert_true(XML_COURSEID1 in course_ids)
         assert_true(XML_COURSEID2 in course_ids)
 
+    def test_get_course_locations(self):
+        assert_equals(
+            sorted(course.location.url() for course in self.store.get_courses()),
+            sorted(location.url() for location in self.store.get_course_locations())
+        )
+
     def test_get_course(self):
         module = self.store.get_course(IMPORT_COURSEID)
         assert_equals(module.location.course, self.import_course)
@@ -7,6 +7,7 @@ from itertools import ifilter
 import pymongo
 import logging
 from uuid import uuid4
+from mock import patch
 
 from xblock.fields import Scope
 from xblock.runtime import KeyValueStore
@@ -195,6 +196,12 @@ class TestMongoModuleStore(object):
                 '{0} is a template course'.format(course)
             )
 
+    def test_get_course_locations(self):
+        assert_equals(
+            sorted(course.location for course in self.store.get_courses()),
+            sorted(self.store.get_course_locations())
+        )
+
     def test_static_tab_names(self):
 
         def get_tab_name(index):
@@ -269,6 +276,147 @@ class TestMongoModuleStore(object):
         )
 
 
+class TestBulkImport(object):
+    """
+    Importing with bulk writes stores the same items and content as importing a module at a time
+    """
+    @classmethod
+    def setupClass(cls):
+        cls.connection = pymongo.connection.Connection(HOST, PORT)
+        cls.db = 'test_mongo_bulk_%s' % uuid4().hex
+
+    @classmethod
+    def teardownClass(cls):
+        cls.connection.drop_database(cls.db)
+
+    def _import(self, collection, **kwargs):
+        """
+        Imports courses into collection, and their static content into the bucket of the same name
+        """
+        doc_store_config = {
+            'host': HOST,
+            'db': self.db,
+            'collection': collection,
+        }
+        store = MongoModuleStore(doc_store_config, FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS)
+        content_store = MongoContentStore(HOST, self.db, bucket=collection)
+        import_from_xml(store, DATA_DIR, ['toy', 'simple'], static_content_store=content_store, **kwargs)
+
+        items = {}
+        for item in self.connection[self.db][collection].find():
+            # items imported a module at a time only have children if they aren't empty
+            item['definition'].setdefault('children', [])
+            items[Location(item['_id']).url()] = item
+        files = dict(
+            (item['_id'], (item['md5'], item.get('thumbnail_location')))
+            for item in self.connection[self.db][collection + '.files'].find()
+        )
+        return items, files
+
+    def test_same_as_per_item(self):
+        items, files = self._import('per_item')
+        bulk_items, bulk_files = self._import('bulk', bulk_write=True, static_content_workers=4)
+
+        assert_equals(sorted(items.keys()), sorted(bulk_items.keys()))
+        for url, item in items.iteritems():
+            assert_equals(item, bulk_items[url])
+        assert_equals(files, bulk_files)
+
+    def test_bulk_update_items_batches(self):
+        store = MongoModuleStore(
+            {'host': HOST, 'db': self.db, 'collection': 'batches'}, FS_ROOT, RENDER_TEMPLATE,
+            default_class=DEFAULT_CLASS
+        )
+        locations = [Location('i4x', 'edX', 'bulk', 'html', 'html_{0}'.format(index)) for index in range(5)]
+        store.bulk_update_items(
+            ((location, '<p>old</p>', [], {}) for location in locations), batch_size=2
+        )
+        store.bulk_update_items(
+            ((location, '<p>new</p>', [], {'display_name': location.name}) for location in locations[:3]),
+            batch_size=2
+        )
+
+        assert_equals(5, store.collection.find().count())
+        for index, location in enumerate(locations):
+            item = store.collection.find_one({'_id': location.dict()})
+            assert_equals('<p>new</p>' if index < 3 else '<p>old</p>', item['definition']['data'])
+            assert_equals({'display_name': location.name} if index < 3 else {}, item['metadata'])
+
+
+class TestParentIndex(object):
+    """
+    Parents are looked up in an index of the parents of the items of each course, which is
+    rebuilt after writes to the course
+    """
+    @classmethod
+    def setupClass(cls):
+        cls.connection = pymongo.connection.Connection(HOST, PORT)
+        cls.db = 'test_mongo_parents_%s' % uuid4().hex
+
+    @classmethod
+    def teardownClass(cls):
+        cls.connection.drop_database(cls.db)
+
+    def setUp(self):
+        self.store = MongoModuleStore(
+            {'host': HOST, 'db': self.db, 'collection': uuid4().hex}, FS_ROOT, RENDER_TEMPLATE,
+            default_class=DEFAULT_CLASS
+        )
+        self.course = Location('i4x', 'edX', 'parents', 'course', 'run')
+        self.chapter = Location('i4x', 'edX', 'parents', 'chapter', 'chapter')
+        self.sequential = Location('i4x', 'edX', 'parents', 'sequential', 'sequential')
+        self.problem = Location('i4x', 'edX', 'parents', 'problem', 'problem')
+        self.store.bulk_update_items([
+            (self.course, {}, [self.chapter.url()], {}),
+            (self.chapter, {}, [self.sequential.url()], {}),
+            (self.sequential, {}, [self.problem.url()], {}),
+            (self.problem, '<problem/>', [], {}),
+        ])
+
+    def test_get_parent_locations(self):
+        assert_equals([self.sequential], self.store.get_parent_locations(self.problem, None))
+        assert_equals([self.course], self.store.get_parent_locations(self.chapter.url(), None))
+        assert_equals([], self.store.get_parent_locations(self.course, None))
+
+    def test_index_read_once(self):
+        self.store.get_parent_locations(self.problem, None)
+        with patch.object(self.store.collection, 'find') as mock_find:
+            assert_equals([self.chapter], self.store.get_parent_locations(self.sequential, None))
+            assert_equals(0, mock_find.call_count)
+
+    def test_index_rebuilt_after_writes(self):
+        assert_equals([self.sequential], self.store.get_parent_locations(self.problem, None))
+
+        other_sequential = Location('i4x', 'edX', 'parents', 'sequential', 'other')
+        self.store.update_children(self.sequential, [])
+        self.store.update_children(self.chapter, [self.sequential.url(), other_sequential.url()])
+        self.store.update_children(other_sequential, [self.problem.url()])
+        assert_equals([other_sequential], self.store.get_parent_locations(self.problem, None))
+
+        self.store.delete_item(other_sequential)
+        assert_equals([], self.store.get_parent_locations(self.problem, None))
+
+    def test_importing(self):
+        self.store.get_parent_locations(self.problem, None)
+        # items written while a course is imported don't change its version
+        self.store.ignore_write_events_on_courses.append('edX/parents')
+        self.store.collection.update(
+            {'_id': self.sequential.dict()}, {'$set': {'definition.children': []}}
+        )
+        assert_equals([], self.store.get_parent_locations(self.problem, None))
+        assert_equals({self.problem: []}, self.store.get_parent_chains([self.problem], None))
+
+    def test_get_parent_chains(self):
+        assert_equals(
+            {
+                self.problem: [self.sequential, self.chapter, self.course],
+                self.chapter: [self.course],
+                self.course: [],
+            },
+            self.store.get_parent_chains([self.problem, self.chapter, self.course], None)
+        )
+
+
 class TestMongoKeyValueStore(object):
     """
     Tests for MongoKeyValueStore.
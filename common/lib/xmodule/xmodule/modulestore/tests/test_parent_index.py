@@ -0,0 +1,38 @@
+"""
+Tests of the process-wide parent indexes of the Mongo modulestore
+"""
+import unittest
+
+from xmodule.modulestore import Location
+from xmodule.modulestore.mongo.parent_index import ParentIndexCache
+
+
+class TestParentIndexCache(unittest.TestCase):
+    """
+    Tests of the LRU of parent indexes
+    """
+    def setUp(self):
+        self.index = {'i4x://edX/toy/chapter/Overview': [Location('i4x', 'edX', 'toy', 'course', '2012_Fall')]}
+        self.cache = ParentIndexCache(max_courses=3)
+
+    def test_get(self):
+        self.cache.set('edX/toy', 'v1', self.index)
+        self.assertIs(self.index, self.cache.get('edX/toy', 'v1'))
+        self.assertIsNone(self.cache.get('edX/other', 'v1'))
+
+    def test_stale_version(self):
+        self.cache.set('edX/toy', 'v1', self.index)
+        self.assertIsNone(self.cache.get('edX/toy', 'v2'))
+        # Stale entries are dropped
+        self.assertIsNone(self.cache.get('edX/toy', 'v1'))
+
+    def test_eviction(self):
+        for key in ('a', 'b', 'c'):
+            self.cache.set(key, 'v1', self.index)
+        # Using 'a' makes 'b' the least recently used entry
+        self.cache.get('a', 'v1')
+        self.cache.set('d', 'v1', self.index)
+
+        self.assertIsNone(self.cache.get('b', 'v1'))
+        for key in ('a', 'c', 'd'):
+            self.assertIs(self.index, self.cache.get(key, 'v1'))
@@ -0,0 +1,46 @@
+"""
+Tests of the helpers of xml_importer
+"""
+import threading
+import unittest
+
+from xmodule.modulestore.xml_importer import _run_in_workers  # pylint: disable=protected-access
+
+
+class RunInWorkersTestCase(unittest.TestCase):
+    """
+    Tests of calling a function with items from a pool of threads
+    """
+    def test_all_items(self):
+        for num_workers in (1, 4):
+            results = []
+            _run_in_workers(results.append, iter(range(20)), num_workers)
+            self.assertEqual(range(20), sorted(results))
+
+    def test_workers_in_parallel(self):
+        started = threading.Event()
+
+        def wait_for_other(item):
+            # only returns if the other item is processed at the same time
+            if item == 0:
+                self.assertTrue(started.wait(5))
+            else:
+                started.set()
+
+        _run_in_workers(wait_for_other, iter([0, 1]), 2)
+
+    def test_items_read_as_needed(self):
+        read = []
+
+        def items():
+            for item in range(100):
+                read.append(item)
+                yield item
+
+        def fail(item):
+            if item == 3:
+                raise ValueError(item)
+
+        with self.assertRaises(ValueError):
+            _run_in_workers(fail, items(), 2)
+        self.assertLess(len(read), 100)
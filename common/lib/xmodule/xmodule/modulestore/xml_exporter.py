@@ -3,6 +3,9 @@ Methods for exporting course data to XML
 """
 
 import logging
+import os
+import tarfile
+import time
 from xmodule.modulestore import Location
 from xmodule.modulestore.inheritance import own_metadata
 from fs.osfs import OSFS
@@ -33,6 +36,104 @@ class EdxJSONEncoder(json.JSONEncoder):
             return super(EdxJSONEncoder, self).default(obj)
 
 
+class TarFileWriter(object):
+    """
+    A file being written to a `TarExportFS`, which adds it to the tar file when it is closed.
+    """
+    def __init__(self, export_fs, path):
+        self.export_fs = export_fs
+        self.path = path
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def close(self):
+        if self.chunks is not None:
+            self.export_fs.add_file(self.path, ''.join(self.chunks))
+            self.chunks = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ChunksReader(object):
+    """
+    A file-like object reading from an iterable of chunks of data.
+    """
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.chunks)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class TarExportFS(object):
+    """
+    Write-only stand-in for the filesystem that courses are exported to, which adds each
+    file to a tar file as soon as it's written, so that exports can be streamed. It only
+    has the methods that exports use.
+    """
+    def __init__(self, tar_file, root, parent=None):
+        """
+        `tar_file`: the `tarfile.TarFile` to add files to
+        `root`: the directory of the tar file that paths are relative to
+        `parent`: the `TarExportFS` of the directory containing root, if any
+        """
+        self.tar_file = tar_file
+        self.root = root
+        self.parent = parent
+        # the number of files written under root
+        self.files_written = 0
+
+    def makedir(self, path, recursive=False, allow_recreate=False):  # pylint: disable=unused-argument
+        """Directories are implied by the paths of the files of the tar file"""
+        pass
+
+    def makeopendir(self, path):
+        """Returns the TarExportFS of the directory at path"""
+        return TarExportFS(self.tar_file, os.path.join(self.root, path), parent=self)
+
+    def open(self, path, mode='w'):
+        """Returns a file that is added to the tar file at path once it's closed"""
+        if 'w' not in mode:
+            raise ValueError('TarExportFS files can only be written')
+        return TarFileWriter(self, path)
+
+    def add_file(self, path, data):
+        """Adds a file at path with data to the tar file"""
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        self.add_stream(path, len(data), [data])
+
+    def add_stream(self, path, length, chunks):
+        """Adds a file at path of length bytes, which are read from the iterable chunks"""
+        name = os.path.join(self.root, path)
+        if isinstance(name, unicode):
+            name = name.encode('utf-8')
+        tar_info = tarfile.TarInfo(name)
+        tar_info.size = length
+        tar_info.mtime = time.time()
+        self.tar_file.addfile(tar_info, ChunksReader(chunks))
+
+        export_fs = self
+        while export_fs is not None:
+            export_fs.files_written += 1
+            export_fs = export_fs.parent
+
+
 def export_to_xml(modulestore, contentstore, course_location, root_dir, course_dir, draft_modulestore=None):
     """
     Export all modules from `modulestore` and content from `contentstore` as xml to `root_dir`.
@@ -45,25 +146,79 @@ def export_to_xml(modulestore, contentstore, course_location, root_dir, course_d
     `draft_modulestore`: An optional `DraftModuleStore` that contains draft content, which will be exported
         alongside the public content in the course.
     """
+    fs = OSFS(root_dir)
+    export_fs = fs.makeopendir(course_dir)
+
+    def export_static_content():
+        """Writes the static content files and their policies to the course directory"""
+        contentstore.export_all_for_course(
+            course_location,
+            root_dir + '/' + course_dir + '/static/',
+            root_dir + '/' + course_dir + '/policies/assets.json',
+        )
+
+    _export_course(modulestore, contentstore and export_static_content, course_location, export_fs, draft_modulestore)
+
+
+def export_to_tar(modulestore, contentstore, course_location, fileobj, course_dir, draft_modulestore=None,
+                  progress_callback=None):
+    """
+    Export all modules from `modulestore` and content from `contentstore` as a tar.gz of xml to
+    the file object `fileobj`, which is written to sequentially, so it can be e.g. a pipe. Files
+    are added to the archive as they are exported, so it isn't written to disk first.
+
+    `course_dir`: The name of the directory of the tar file to write the course content to
+    `progress_callback`: if given, is called with the numbers of module files and of static files
+        exported so far after each static file is exported.
+
+    The other arguments are as for `export_to_xml`.
+    """
+    with tarfile.open(fileobj=fileobj, mode='w|gz') as tar_file:
+        export_fs = TarExportFS(tar_file, course_dir)
+        static_fs = export_fs.makeopendir('static')
+
+        def export_static_content():
+            """Adds the static content files, as they're read, and their policies to the tar file"""
+            policy = {}
+            for asset in contentstore.get_all_content_for_course(course_location):
+                asset_location = Location(asset['_id'])
+                content = contentstore.find(asset_location, as_stream=True)
+                path = content.name
+                if content.import_path is not None:
+                    path = os.path.join(os.path.dirname(content.import_path), path)
+                try:
+                    static_fs.add_stream(path, content.length, content.stream_data())
+                finally:
+                    content.close()
+                policy[asset_location.name] = contentstore.get_asset_policy(asset)
+                if progress_callback is not None:
+                    progress_callback(export_fs.files_written - static_fs.files_written, static_fs.files_written)
 
+            with export_fs.open('policies/assets.json', 'w') as assets_policy:
+                assets_policy.write(dumps(policy))
+
+        _export_course(modulestore, contentstore and export_static_content, course_location, export_fs, draft_modulestore)
+        if progress_callback is not None:
+            progress_callback(export_fs.files_written - static_fs.files_written, static_fs.files_written)
+
+
+def _export_course(modulestore, export_static_content, course_location, export_fs, draft_modulestore=None):
+    """
+    Export the course at `course_location` in `modulestore`, and the draft content of
+    `draft_modulestore`, to `export_fs`. The static content is exported by calling
+    `export_static_content`, unless it's None.
+    """
     course_id = course_location.course_id
     course = modulestore.get_course(course_id)
 
-    fs = OSFS(root_dir)
-    export_fs = fs.makeopendir(course_dir)
-
     xml = course.export_to_xml(export_fs)
     with export_fs.open('course.xml', 'w') as course_xml:
         course_xml.write(xml)
 
     # export the static assets
     policies_dir = export_fs.makeopendir('policies')
-    if contentstore:
-        contentstore.export_all_for_course(
-            course_location,
-            root_dir + '/' + course_dir + '/static/',
-            root_dir + '/' + course_dir + '/policies/assets.json',
-        )
+    if export_static_content:
+        export_static_content()
 
     # export the static tabs
     export_extra_content(export_fs, modulestore, course_id, course_location, 'static_tab', 'tabs', '.html')
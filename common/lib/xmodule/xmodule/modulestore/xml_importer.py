@@ -1,6 +1,9 @@
 import logging
 import os
 import mimetypes
+import Queue
+import sys
+import threading
 from path import path
 import json
 
@@ -16,9 +19,60 @@ from .store_utilities import rewrite_nonportable_content_links
 log = logging.getLogger(__name__)
 
 
-def import_static_content(modules, course_loc, course_data_path, static_content_store, target_location_namespace,
-                          subpath='static', verbose=False):
+def _run_in_workers(function, items, num_workers):
+    """
+    Calls function with each of items, from num_workers threads. items is only
+    iterated as fast as the threads take them, so it can be a generator reading
+    large items. The first exception raised by function stops the iteration and
+    is re-raised once all threads are done.
+    """
+    if num_workers <= 1:
+        for item in items:
+            function(item)
+        return
+
+    queue = Queue.Queue(num_workers)
+    done = object()
+    errors = []
+
+    def work():
+        """Calls function with the items of queue until done is put on it"""
+        while True:
+            item = queue.get()
+            if item is done:
+                return
+            if errors:
+                continue
+            try:
+                function(item)
+            except Exception:  # pylint: disable=broad-except
+                errors.append(sys.exc_info())
+
+    threads = [threading.Thread(target=work) for _ in xrange(num_workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        for item in items:
+            if errors:
+                break
+            queue.put(item)
+    finally:
+        for _ in threads:
+            queue.put(done)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0][0], errors[0][1], errors[0][2]
+
 
+def import_static_content(modules, course_loc, course_data_path, static_content_store, target_location_namespace,
+                          subpath='static', verbose=False, num_workers=1, saved_callback=None):
+    """
+    Saves the files under subpath of course_data_path to static_content_store, from
+    num_workers threads, and returns a dict mapping their paths to their names.
+    saved_callback, if given, is called by the thread that saved each file.
+    """
     remap_dict = {}
 
     # now import all static assets
@@ -33,52 +87,61 @@ def import_static_content(modules, course_loc, course_data_path, static_content_
 
     verbose = True
 
-    for dirname, _, filenames in os.walk(static_dir):
-        for filename in filenames:
+    def read_static_content():
+        """Yields the StaticContent of each file under static_dir"""
+        for dirname, _, filenames in os.walk(static_dir):
+            for filename in filenames:
 
-            content_path = os.path.join(dirname, filename)
-            if verbose:
-                log.debug('importing static content %s...', content_path)
+                content_path = os.path.join(dirname, filename)
+                if verbose:
+                    log.debug('importing static content %s...', content_path)
 
-            try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
-            except IOError:
-                if filename.startswith('._'):
-                    # OS X "companion files". See http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
-                    continue
-                # Not a 'hidden file', then re-raise exception
-                raise
-
-            fullname_with_subpath = content_path.replace(static_dir, '')  # strip away leading path from the name
-            if fullname_with_subpath.startswith('/'):
-                fullname_with_subpath = fullname_with_subpath[1:]
-            content_loc = StaticContent.compute_location(target_location_namespace.org, target_location_namespace.course, fullname_with_subpath)
-
-
-            policy_ele = policy.get(content_loc.name, {})
-            displayname = policy_ele.get('displayname', filename)
-            locked = policy_ele.get('locked', False)
-            mime_type = policy_ele.get('contentType', mimetypes.guess_type(filename)[0])
-            content = StaticContent(
-                content_loc, displayname, mime_type, data,
-                import_path=fullname_with_subpath, locked=locked
-            )
+                try:
+                    with open(content_path, 'rb') as f:
+                        data = f.read()
+                except IOError:
+                    if filename.startswith('._'):
+                        # OS X "companion files". See http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
+                        continue
+                    # Not a 'hidden file', then re-raise exception
+                    raise
+
+                fullname_with_subpath = content_path.replace(static_dir, '')  # strip away leading path from the name
+                if fullname_with_subpath.startswith('/'):
+                    fullname_with_subpath = fullname_with_subpath[1:]
+                content_loc = StaticContent.compute_location(target_location_namespace.org, target_location_namespace.course, fullname_with_subpath)
+
+                policy_ele = policy.get(content_loc.name, {})
+                displayname = policy_ele.get('displayname', filename)
+                locked = policy_ele.get('locked', False)
+                mime_type = policy_ele.get('contentType', mimetypes.guess_type(filename)[0])
+
+                #store the remapping information which will be needed to subsitute in the module data
+                remap_dict[fullname_with_subpath] = content_loc.name
+
+                yield StaticContent(
+                    content_loc, displayname, mime_type, data,
+                    import_path=fullname_with_subpath, locked=locked
+                )
 
-            # first let's save a thumbnail so we can get back a thumbnail location
-            (thumbnail_content, thumbnail_location) = static_content_store.generate_thumbnail(content)
+    def save_static_content(content):
+        """Saves content, with its thumbnail, to static_content_store"""
+        # first let's save a thumbnail so we can get back a thumbnail location
+        (thumbnail_content, thumbnail_location) = static_content_store.generate_thumbnail(content)
 
-            if thumbnail_content is not None:
-                content.thumbnail_location = thumbnail_location
+        if thumbnail_content is not None:
+            content.thumbnail_location = thumbnail_location
 
-            #then commit the content
-            try:
-                static_content_store.save(content)
-            except Exception as err:
-                log.exception('Error importing {0}, error={1}'.format(fullname_with_subpath, err))
+        #then commit the content
+        try:
+            static_content_store.save(content)
+        except Exception as err:
+            log.exception('Error importing {0}, error={1}'.format(content.import_path, err))
+
+        if saved_callback is not None:
+            saved_callback()
 
-            #store the remapping information which will be needed to subsitute in the module data
-            remap_dict[fullname_with_subpath] = content_loc.name
+    _run_in_workers(save_static_content, read_static_content(), num_workers)
 
     return remap_dict
 
@@ -87,7 +150,7 @@ def import_from_xml(store, data_dir, course_dirs=None,
                     default_class='xmodule.raw_module.RawDescriptor',
                     load_error_modules=True, static_content_store=None, target_location_namespace=None,
                     verbose=False, draft_store=None,
-                    do_import_static=True):
+                    do_import_static=True, bulk_write=False, static_content_workers=1, progress_callback=None):
     """
     Import the specified xml data_dir into the "store" modulestore,
     using org and course as the location org and course.
@@ -104,6 +167,14 @@ def import_from_xml(store, data_dir, course_dirs=None,
                       have substantial unchanging static content, which is to inefficient to import every time the course is loaded.
                       Static content for some courses may also be served directly by nginx, instead of going through django.
 
+    bulk_write: if True, and the store supports it, the modules of each course other than the course module are written
+                with a few bulk inserts (see bulk_update_items) rather than with several writes each.
+
+    static_content_workers: the number of threads that save static content to static_content_store in parallel.
+
+    progress_callback: if given, is called with the numbers of modules and of static files imported so far each
+                       time one is imported, possibly from several threads (but one at a time).
+
     """
 
     xml_module_store = XMLModuleStore(
@@ -118,6 +189,17 @@ def import_from_xml(store, data_dir, course_dirs=None,
     # to enumerate the entire collection of course modules. It will be left as a TBD to implement that
     # method on XmlModuleStore.
     course_items = []
+
+    progress = {'modules': 0, 'static': 0}
+    progress_lock = threading.Lock()
+
+    def count_progress(kind):
+        """Counts the import of one more item of kind, 'modules' or 'static'"""
+        with progress_lock:
+            progress[kind] += 1
+            if progress_callback is not None:
+                progress_callback(progress['modules'], progress['static'])
+
     for course_id in xml_module_store.modules.keys():
 
         if target_location_namespace is not None:
@@ -129,12 +211,14 @@ def import_from_xml(store, data_dir, course_dirs=None,
         try:
             # turn off all write signalling while importing as this is a high volume operation
             # on stores that need it
-            if (hasattr(store, 'ignore_write_events_on_courses') and
-                    pseudo_course_id not in store.ignore_write_events_on_courses):
-                store.ignore_write_events_on_courses.append(pseudo_course_id)
+            for write_store in (store, draft_store):
+                if (hasattr(write_store, 'ignore_write_events_on_courses') and
+                        pseudo_course_id not in write_store.ignore_write_events_on_courses):
+                    write_store.ignore_write_events_on_courses.append(pseudo_course_id)
 
             course_data_path = None
             course_location = None
+            course_module = None
 
             if verbose:
                 log.debug("Scanning {0} for course module...".format(course_id))
@@ -171,6 +255,8 @@ def import_from_xml(store, data_dir, course_dirs=None,
                                   target_location_namespace or course_location, do_import_static=do_import_static)
 
                     course_items.append(module)
+                    course_module = module
+                    count_progress('modules')
 
             # then import all the static content
             if static_content_store is not None and do_import_static:
@@ -178,7 +264,9 @@ def import_from_xml(store, data_dir, course_dirs=None,
 
                 # first pass to find everything in /static/
                 import_static_content(xml_module_store.modules[course_id], course_location, course_data_path, static_content_store,
-                                      _namespace_rename, subpath='static', verbose=verbose)
+                                      _namespace_rename, subpath='static', verbose=verbose,
+                                      num_workers=static_content_workers,
+                                      saved_callback=lambda: count_progress('static'))
 
             elif verbose and not do_import_static:
                 log.debug('Skipping import of static content, since do_import_static={0}'.format(do_import_static))
@@ -195,25 +283,38 @@ def import_from_xml(store, data_dir, course_dirs=None,
                 _namespace_rename = target_location_namespace if target_location_namespace is not None else course_location
 
                 import_static_content(xml_module_store.modules[course_id], course_location, course_data_path, static_content_store,
-                                      _namespace_rename, subpath=simport, verbose=verbose)
+                                      _namespace_rename, subpath=simport, verbose=verbose,
+                                      num_workers=static_content_workers,
+                                      saved_callback=lambda: count_progress('static'))
 
             # finally loop through all the modules
-            for module in xml_module_store.modules[course_id].itervalues():
-                if module.scope_ids.block_type == 'course':
-                    # we've already saved the course module up at the top of the loop
-                    # so just skip over it in the inner loop
-                    continue
-
-                # remap module to the new namespace
-                if target_location_namespace is not None:
-                    module = remap_namespace(module, target_location_namespace)
-
-                if verbose:
-                    log.debug('importing module location {0}'.format(module.location))
-
-                import_module(module, store, course_data_path, static_content_store, course_location,
-                              target_location_namespace if target_location_namespace else course_location,
-                              do_import_static=do_import_static)
+            def modules_to_import():
+                """Yields the modules of the course other than the course module, in the new namespace"""
+                for module in xml_module_store.modules[course_id].itervalues():
+                    if module.scope_ids.block_type == 'course':
+                        # we've already saved the course module up at the top of the loop
+                        # so just skip over it in the inner loop
+                        continue
+
+                    # remap module to the new namespace
+                    if target_location_namespace is not None:
+                        module = remap_namespace(module, target_location_namespace)
+
+                    if verbose:
+                        log.debug('importing module location {0}'.format(module.location))
+
+                    yield module
+                    count_progress('modules')
+
+            if bulk_write and hasattr(store, 'bulk_update_items'):
+                import_modules_in_bulk(modules_to_import(), store, course_module, course_location,
+                                       target_location_namespace if target_location_namespace else course_location,
+                                       do_import_static=do_import_static)
+            else:
+                for module in modules_to_import():
+                    import_module(module, store, course_data_path, static_content_store, course_location,
+                                  target_location_namespace if target_location_namespace else course_location,
+                                  do_import_static=do_import_static)
 
             # now import any 'draft' items
             if draft_store is not None:
@@ -229,12 +330,19 @@ def import_from_xml(store, data_dir, course_dirs=None,
 
         finally:
             # turn back on all write signalling on stores that need it
+            if (hasattr(draft_store, 'ignore_write_events_on_courses') and
+                    pseudo_course_id in draft_store.ignore_write_events_on_courses):
+                draft_store.ignore_write_events_on_courses.remove(pseudo_course_id)
+            # drafts and non-drafts share the metadata inheritance tree, so it's refreshed once for both
             if (hasattr(store, 'ignore_write_events_on_courses') and
                     pseudo_course_id in store.ignore_write_events_on_courses):
                 store.ignore_write_events_on_courses.remove(pseudo_course_id)
-                store.refresh_cached_metadata_inheritance_tree(
+                imported_location = Location(
                     target_location_namespace if target_location_namespace is not None else course_location
                 )
+                store.refresh_cached_metadata_inheritance_tree(imported_location)
+                # the writes of the import didn't signal, so signal the whole course was written
+                store.fire_updated_modulestore_signal(pseudo_course_id, imported_location.replace(category='course'))
 
     return xml_module_store, course_items
 
@@ -245,6 +353,59 @@ def import_module(module, store, course_data_path, static_content_store,
 
     logging.debug('processing import of module {0}...'.format(module.location.url()))
 
+    module_data, children, metadata = get_module_import_fields(
+        module, source_course_location, dest_course_location, do_import_static=do_import_static
+    )
+
+    if allow_not_found:
+        store.update_item(module.location, module_data, allow_not_found=allow_not_found)
+    else:
+        store.update_item(module.location, module_data)
+
+    if children:
+        store.update_children(module.location, children)
+
+    store.update_metadata(module.location, metadata)
+
+
+def import_modules_in_bulk(modules, store, course_module, source_course_location, dest_course_location,
+                           do_import_static=True):
+    """
+    Writes modules, an iterable of the modules of course_module other than itself, to store
+    with its bulk_update_items, which writes a batch of modules at a time. Then updates the
+    names of the tabs of course_module to the names of its static_tabs, which update_metadata
+    does when importing a module at a time.
+    """
+    static_tab_names = {}
+
+    def import_fields():
+        """Yields the (location, data, children, metadata) of each of modules"""
+        for module in modules:
+            logging.debug('processing import of module {0}...'.format(module.location.url()))
+            module_data, children, metadata = get_module_import_fields(
+                module, source_course_location, dest_course_location, do_import_static=do_import_static
+            )
+            if module.location.category == 'static_tab' and 'display_name' in metadata:
+                static_tab_names[module.location.name] = metadata['display_name']
+            yield module.location, module_data, children or [], metadata
+
+    store.bulk_update_items(import_fields())
+
+    if static_tab_names:
+        existing_tabs = course_module.tabs or []
+        for tab in existing_tabs:
+            if tab.get('url_slug') in static_tab_names:
+                tab['name'] = static_tab_names[tab['url_slug']]
+        course_module.tabs = existing_tabs
+        course_module.save()
+        store.update_metadata(course_module.location, dict(own_metadata(course_module)))
+
+
+def get_module_import_fields(module, source_course_location, dest_course_location, do_import_static=True):
+    """
+    Returns the (data, children, metadata) of module to write to the store a course is
+    imported into, with the links in its data rewritten for the destination course.
+    """
     content = {}
     for field in module.fields.values():
         if field.scope != Scope.content:
@@ -267,13 +428,7 @@ def import_module(module, store, course_data_path, static_content_store,
         module_data = rewrite_nonportable_content_links(
             source_course_location.course_id, dest_course_location.course_id, module_data)
 
-    if allow_not_found:
-        store.update_item(module.location, module_data, allow_not_found=allow_not_found)
-    else:
-        store.update_item(module.location, module_data)
-
-    if hasattr(module, 'children') and module.children != []:
-        store.update_children(module.location, module.children)
+    children = module.children if hasattr(module, 'children') else []
 
     # NOTE: It's important to use own_metadata here to avoid writing
     # inherited metadata everywhere.
@@ -286,7 +441,7 @@ def import_module(module, store, course_data_path, static_content_store,
         del module.xml_attributes['index_in_children_list']
     module.save()
 
-    store.update_metadata(module.location, dict(own_metadata(module)))
+    return module_data, children, dict(own_metadata(module))
 
 
 def import_course_draft(xml_module_store, store, draft_store, course_data_path, static_content_store, source_location_namespace, target_location_namespace):
@@ -1,5 +1,6 @@
 import unittest
-from xmodule.contentstore.content import StaticContent
+from StringIO import StringIO
+from xmodule.contentstore.content import StaticContent, StaticContentStream, STREAM_DATA_CHUNK_SIZE
 from xmodule.contentstore.content import ContentStore
 from xmodule.modulestore import Location
 
@@ -36,3 +37,13 @@ class ContentTest(unittest.TestCase):
         # still happen.
         asset_location = StaticContent.compute_location('mitX', '400', 'subs__1eo_jXvZnE .srt.sjson')
         self.assertEqual(Location(u'c4x', u'mitX', u'400', u'asset', u'subs__1eo_jXvZnE_.srt.sjson', None), asset_location)
+
+    def test_stream_data_in_range(self):
+        data = 'x' * STREAM_DATA_CHUNK_SIZE + '0123456789'
+        content = StaticContentStream('loc', 'name', 'content_type', StringIO(data), length=len(data))
+        chunks = list(content.stream_data_in_range(5, STREAM_DATA_CHUNK_SIZE + 3))
+        self.assertEqual(2, len(chunks))
+        self.assertEqual(data[5:STREAM_DATA_CHUNK_SIZE + 4], ''.join(chunks))
+
+        in_mem = StaticContent('loc', 'name', 'content_type', data)
+        self.assertEqual('0123', ''.join(in_mem.stream_data_in_range(STREAM_DATA_CHUNK_SIZE, STREAM_DATA_CHUNK_SIZE + 3)))
@@ -3,9 +3,11 @@ Tests of XML export
 """
 
 from datetime import datetime, timedelta, tzinfo
+from StringIO import StringIO
 from tempfile import mkdtemp
 import unittest
 import shutil
+import tarfile
 from textwrap import dedent
 import mock
 
@@ -15,7 +17,7 @@ from path import path
 
 from xmodule.modulestore import Location
 from xmodule.modulestore.xml import XMLModuleStore
-from xmodule.modulestore.xml_exporter import EdxJSONEncoder
+from xmodule.modulestore.xml_exporter import EdxJSONEncoder, TarExportFS
 from xmodule.tests import DATA_DIR
 
 
@@ -46,7 +48,7 @@ class RoundTripTestCase(unittest.TestCase):
     """
 
     @mock.patch('xmodule.course_module.requests.get')
-    def check_export_roundtrip(self, data_dir, course_dir, mock_get):
+    def check_export_roundtrip(self, data_dir, course_dir, mock_get, through_tar=False):
 
         # Patch network calls to retrieve the textbook TOC
         mock_get.return_value.text = dedent("""
@@ -71,12 +73,24 @@ class RoundTripTestCase(unittest.TestCase):
         # export to the same directory--that way things like the custom_tags/ folder
         # will still be there.
         print("Starting export")
-        fs = OSFS(root_dir)
-        export_fs = fs.makeopendir(course_dir)
-
-        xml = initial_course.export_to_xml(export_fs)
-        with export_fs.open('course.xml', 'w') as course_xml:
-            course_xml.write(xml)
+        if through_tar:
+            tar_data = StringIO()
+            with tarfile.open(fileobj=tar_data, mode='w|gz') as tar_file:
+                export_fs = TarExportFS(tar_file, course_dir)
+                xml = initial_course.export_to_xml(export_fs)
+                with export_fs.open('course.xml', 'w') as course_xml:
+                    course_xml.write(xml)
+
+            tar_data.seek(0)
+            with tarfile.open(fileobj=tar_data) as tar_file:
+                tar_file.extractall(root_dir)
+        else:
+            fs = OSFS(root_dir)
+            export_fs = fs.makeopendir(course_dir)
+
+            xml = initial_course.export_to_xml(export_fs)
+            with export_fs.open('course.xml', 'w') as course_xml:
+                course_xml.write(xml)
 
         print("Starting second import")
         second_import = XMLModuleStore(root_dir, course_dirs=[course_dir])
@@ -114,6 +128,9 @@ class RoundTripTestCase(unittest.TestCase):
     def test_toy_roundtrip(self):
         self.check_export_roundtrip(DATA_DIR, "toy")
 
+    def test_toy_roundtrip_through_tar(self):
+        self.check_export_roundtrip(DATA_DIR, "toy", through_tar=True)
+
     def test_simple_roundtrip(self):
         self.check_export_roundtrip(DATA_DIR, "simple")
 
@@ -136,6 +153,44 @@ class RoundTripTestCase(unittest.TestCase):
         self.check_export_roundtrip(DATA_DIR, "word_cloud")
 
 
+class TarExportFSTestCase(unittest.TestCase):
+    """
+    Tests of streaming exported files to a tar file
+    """
+    def test_files_added(self):
+        tar_data = StringIO()
+        with tarfile.open(fileobj=tar_data, mode='w|gz') as tar_file:
+            export_fs = TarExportFS(tar_file, 'toy')
+            with export_fs.open('course.xml', 'w') as course_xml:
+                course_xml.write('<course/>')
+            policies_fs = export_fs.makeopendir('policies')
+            policies_fs.makedir('2012_Fall', recursive=True, allow_recreate=True)
+            with policies_fs.open('2012_Fall/policy.json', 'w') as policy:
+                policy.write(u'{"display_name": "\u00e9"}')
+            static_fs = export_fs.makeopendir('static')
+            static_fs.add_stream('images/course_image.jpg', 6, iter(['abc', 'def']))
+
+        self.assertEquals(3, export_fs.files_written)
+        self.assertEquals(1, static_fs.files_written)
+
+        tar_data.seek(0)
+        with tarfile.open(fileobj=tar_data) as tar_file:
+            self.assertEquals(
+                ['toy/course.xml', 'toy/policies/2012_Fall/policy.json', 'toy/static/images/course_image.jpg'],
+                tar_file.getnames()
+            )
+            self.assertEquals(
+                u'{"display_name": "\u00e9"}'.encode('utf-8'),
+                tar_file.extractfile('toy/policies/2012_Fall/policy.json').read()
+            )
+            self.assertEquals('abcdef', tar_file.extractfile('toy/static/images/course_image.jpg').read())
+
+    def test_read_only(self):
+        with tarfile.open(fileobj=StringIO(), mode='w|gz') as tar_file:
+            with self.assertRaises(ValueError):
+                TarExportFS(tar_file, 'toy').open('course.xml', 'r')
+
+
 class TestEdxJsonEncoder(unittest.TestCase):
     """
     Tests for xml_exporter.EdxJSONEncoder
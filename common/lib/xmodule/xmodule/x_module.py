@@ -116,6 +116,13 @@ class XModuleMixin(XBlockMixin):
     # student interacts with the module on the page.  A specific example is
     # FoldIt, which posts grade-changing updates through a separate API.
     always_recalculate_grades = False
+
+    # True if max_score() can differ between students with the same version of
+    # this descriptor, for example because it depends on the randomization seed.
+    # Otherwise graders can compute the max score once per descriptor version
+    # and reuse it for every student.
+    max_score_depends_on_seed = False
+
     # The default implementation of get_icon_class returns the icon_class
     # attribute of the class
     #
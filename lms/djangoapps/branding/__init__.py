@@ -1,7 +1,7 @@
-from xmodule.modulestore.django import modulestore
-from xmodule.course_module import CourseDescriptor
 from django.conf import settings
 
+from course_overviews.models import CourseOverview
+
 
 def pick_subdomain(domain, options, default='default'):
     for option in options:
@@ -12,13 +12,10 @@ def pick_subdomain(domain, options, default='default'):
 
 def get_visible_courses(domain=None):
     """
-    Return the set of CourseDescriptors that should be visible in this branded instance
+    Return the set of CourseOverviews of the courses that should be visible in this
+    branded instance
     """
-    _courses = modulestore().get_courses()
-
-    courses = [c for c in _courses
-               if isinstance(c, CourseDescriptor)]
-    courses = sorted(courses, key=lambda course: course.number)
+    courses = CourseOverview.get_all()
 
     if domain and settings.MITX_FEATURES.get('SUBDOMAIN_COURSE_LISTINGS'):
         subdomain = pick_subdomain(domain, settings.COURSE_LISTINGS.keys())
@@ -0,0 +1,134 @@
+"""
+Benchmark of sending bulk email to a local SMTP sink.
+
+Starts an SMTP server on localhost that discards what it receives, and sends
+the email of a synthetic course to --recipients recipients over it, as
+send_course_email tasks do, rendering the messages from the course email
+template of the fixture.  Times rendering each message from the template, as
+well as sending over 1, 2, 4... up to --connections connections in parallel.
+No database access is involved.
+"""
+from __future__ import division
+
+import asyncore
+import json
+import os
+import smtpd
+import threading
+import time
+from optparse import make_option
+from textwrap import dedent
+
+from django.core.management.base import BaseCommand
+from django.core.mail import EmailMultiAlternatives
+from django.test.utils import override_settings
+
+from bulk_email.models import CourseEmailTemplate
+from bulk_email.tasks import send_in_parallel
+
+
+class SinkServer(smtpd.SMTPServer):
+    """
+    SMTP server that counts, and discards, the messages it receives.
+    """
+    received = 0
+
+    def process_message(self, peer, mailfrom, rcpttos, data):
+        self.received += 1
+
+
+class Command(BaseCommand):
+    """
+    Benchmark sending bulk email to a local SMTP sink.
+    """
+    help = dedent(__doc__).strip()
+    option_list = BaseCommand.option_list + (
+        make_option('--recipients', type='int', default=2000,
+                    help='Number of recipients to send to'),
+        make_option('--connections', type='int', default=8,
+                    help='Most connections to send over in parallel'),
+    )
+
+    def handle(self, *args, **options):
+        num_recipients = options['recipients']
+
+        fixture = os.path.join(os.path.dirname(__file__), '..', '..', 'fixtures', 'course_email_template.json')
+        with open(fixture) as fixture_file:
+            template = CourseEmailTemplate(**json.load(fixture_file)[0]['fields'])
+        context = {
+            'course_title': 'Benchmark Course',
+            'course_url': 'https://localhost/courses/edX/benchmark/now/',
+            'course_image_url': 'https://localhost/static/images/course.jpg',
+            'account_settings_url': 'https://localhost/dashboard',
+            'platform_name': 'edX',
+        }
+        html_message = '<p>Dear students,</p>' + '<p>This is the email of this week.</p>' * 20
+        text_message = 'Dear students,\n' + 'This is the email of this week.\n' * 20
+        recipients = [
+            {'profile__name': 'Student {0}'.format(index), 'email': 'student{0}@localhost'.format(index)}
+            for index in xrange(num_recipients)
+        ]
+
+        start = time.time()
+        for recipient in recipients:
+            recipient_context = dict(context, name=recipient['profile__name'], email=recipient['email'])
+            template.render_plaintext(text_message, recipient_context)
+            template.render_htmltext(html_message, recipient_context)
+        self._report('render per recipient', start, num_recipients)
+
+        start = time.time()
+        render_plaintext = template.compile_plaintext(text_message, context)
+        render_htmltext = template.compile_htmltext(html_message, context)
+        for recipient in recipients:
+            recipient_context = {'name': recipient['profile__name'], 'email': recipient['email']}
+            render_plaintext(recipient_context)
+            render_htmltext(recipient_context)
+        self._report('compiled template', start, num_recipients)
+
+        def send_to_recipient(connection, recipient):
+            """Sends the email to `recipient` as send_course_email does."""
+            recipient_context = {'name': recipient['profile__name'], 'email': recipient['email']}
+            email_msg = EmailMultiAlternatives(
+                '[Benchmark Course] Benchmark',
+                render_plaintext(recipient_context),
+                'benchmark-no-reply@localhost',
+                [recipient['email']],
+                connection=connection
+            )
+            email_msg.attach_alternative(render_htmltext(recipient_context), 'text/html')
+            connection.send_messages([email_msg])
+
+        server = SinkServer(('localhost', 0), None)
+        port = server.socket.getsockname()[1]
+        thread = threading.Thread(target=asyncore.loop, kwargs={'timeout': 0.1})
+        thread.daemon = True
+        thread.start()
+
+        email_settings = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='localhost',
+            EMAIL_PORT=port,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+            EMAIL_USE_TLS=False,
+        )
+        with email_settings:
+            num_connections = 1
+            while num_connections <= options['connections']:
+                start = time.time()
+                send_in_parallel(list(recipients), num_connections, send_to_recipient)
+                self._report('send over {0} connections'.format(num_connections), start, num_recipients, num_connections)
+                num_connections *= 2
+
+        server.close()
+        self.stdout.write("{0} messages received\n".format(server.received))
+
+    def _report(self, name, start, num_recipients, num_connections=1):
+        """
+        Writes the time taken since `start` for `num_recipients` recipients.
+        """
+        elapsed = time.time() - start
+        rate = num_recipients / elapsed if elapsed else float('inf')
+        self.stdout.write("{0:<28} {1:8.3f}s  {2:10.0f} recipients/s  {3:10.0f} per connection\n".format(
+            name, elapsed, rate, rate / num_connections
+        ))
@@ -12,12 +12,19 @@ file and check it in at the same time as your model changes. To do that,
 
 """
 import logging
+import re
+from uuid import uuid4
+
 from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from html_to_text import html_to_text
 
 from django.conf import settings
 
+from student.models import invalidate_dashboard_cache
+
 log = logging.getLogger(__name__)
 
 # Bulk email to_options - the send to options that users can
@@ -132,10 +139,23 @@ class Optout(models.Model):
         unique_together = ('user', 'course_id')
 
 
+@receiver(post_save, sender=Optout)
+@receiver(post_delete, sender=Optout)
+def invalidate_optout_dashboard_cache(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Invalidates the dashboard of the user after they opted in or out of the emails of a course
+    """
+    if instance.user_id is not None:
+        invalidate_dashboard_cache(instance.user_id)
+
+
 # Defines the tag that must appear in a template, to indicate
 # the location where the email message body is to be inserted.
 COURSE_EMAIL_MESSAGE_BODY_TAG = '{{message_body}}'
 
+# The fields of the template context that differ between the recipients of an email.
+RECIPIENT_CONTEXT_FIELDS = ('name', 'email')
+
 
 class CourseEmailTemplate(models.Model):
     """
@@ -195,6 +215,35 @@ class CourseEmailTemplate(models.Model):
         # finally, return the result, without converting to an encoded byte array.
         return result
 
+    @staticmethod
+    def _compile(format_string, message_body, context):
+        """
+        Create a function that renders a text message like _render() does.
+
+        The function takes a dict with the RECIPIENT_CONTEXT_FIELDS ('name' and 'email')
+        of a recipient, and returns the message _render() would for `context` updated with
+        them.  The template is formatted and the message body inserted only once, with
+        markers in place of the recipient's values, so that rendering the message of each
+        recipient only joins strings.
+        """
+        marker = uuid4().hex
+        context = dict(context)
+        for field in RECIPIENT_CONTEXT_FIELDS:
+            context[field] = u'{0}{1}{0}'.format(marker, field)
+        message = CourseEmailTemplate._render(format_string, message_body, context)
+
+        # The names of the recipient fields are at the odd indices of the parts.
+        parts = re.split(u'{0}({1}){0}'.format(marker, '|'.join(RECIPIENT_CONTEXT_FIELDS)), message)
+
+        def render(recipient_context):
+            """Render the message with the values of the recipient fields in `recipient_context`."""
+            rendered = list(parts)
+            for index in xrange(1, len(parts), 2):
+                rendered[index] = recipient_context[parts[index]]
+            return u''.join(rendered)
+
+        return render
+
     def render_plaintext(self, plaintext, context):
         """
         Create plain text message.
@@ -213,6 +262,24 @@ class CourseEmailTemplate(models.Model):
         """
         return CourseEmailTemplate._render(self.html_template, htmltext, context)
 
+    def compile_plaintext(self, plaintext, context):
+        """
+        Create a function that renders plain text messages.
+
+        As render_plaintext(), but the function takes a dict of the 'name' and 'email'
+        of a recipient, which aren't in the `context` dict.
+        """
+        return CourseEmailTemplate._compile(self.plain_template, plaintext, context)
+
+    def compile_htmltext(self, htmltext, context):
+        """
+        Create a function that renders HTML text messages.
+
+        As render_htmltext(), but the function takes a dict of the 'name' and 'email'
+        of a recipient, which aren't in the `context` dict.
+        """
+        return CourseEmailTemplate._compile(self.html_template, htmltext, context)
+
 
 class CourseAuthorization(models.Model):
     """
@@ -242,6 +309,19 @@ class CourseAuthorization(models.Model):
         except cls.DoesNotExist:
             return False
 
+    @classmethod
+    def instructor_email_enabled_courses(cls, course_ids):
+        """
+        Returns the set of the course_ids that email is enabled for, as
+        instructor_email_enabled does, with a single query.
+        """
+        if not settings.MITX_FEATURES['REQUIRE_COURSE_EMAIL_AUTH']:
+            return set(course_ids)
+
+        return set(
+            cls.objects.filter(course_id__in=list(course_ids), email_enabled=True).values_list('course_id', flat=True)
+        )
+
     def __unicode__(self):
         not_en = "Not "
         if self.email_enabled:
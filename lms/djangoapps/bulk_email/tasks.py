@@ -5,6 +5,8 @@ to a course.
 import re
 import random
 import json
+import sys
+import threading
 from time import sleep
 
 from dogapi import dog_stats_api
@@ -430,82 +432,79 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
     from_addr = _get_source_address(course_email.course_id, course_title)
 
     course_email_template = CourseEmailTemplate.get_template()
-    try:
-        connection = get_connection()
-        connection.open()
-
-        # Define context values to use in all course emails:
-        email_context = {'name': '', 'email': ''}
-        email_context.update(global_email_context)
-
-        while to_list:
-            # Update context with user-specific values from the user at the end of the list.
-            # At the end of processing this user, they will be popped off of the to_list.
-            # That way, the to_list will always contain the recipients remaining to be emailed.
-            # This is convenient for retries, which will need to send to those who haven't
-            # yet been emailed, but not send to those who have already been sent to.
-            current_recipient = to_list[-1]
-            email = current_recipient['email']
-            email_context['email'] = email
-            email_context['name'] = current_recipient['profile__name']
-
-            # Construct message content using templates and context:
-            plaintext_msg = course_email_template.render_plaintext(course_email.text_message, email_context)
-            html_msg = course_email_template.render_htmltext(course_email.html_message, email_context)
-
-            # Create email:
-            email_msg = EmailMultiAlternatives(
-                subject,
-                plaintext_msg,
-                from_addr,
-                [email],
-                connection=connection
-            )
-            email_msg.attach_alternative(html_msg, 'text/html')
-
-            # Throttle if we have gotten the rate limiter.  This is not very high-tech,
-            # but if a task has been retried for rate-limiting reasons, then we sleep
-            # for a period of time between all emails within this task.  Choice of
-            # the value depends on the number of workers that might be sending email in
-            # parallel, and what the SES throttle rate is.
-            if subtask_status.retried_nomax > 0:
-                sleep(settings.BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
-
-            try:
-                log.debug('Email with id %s to be sent to %s', email_id, email)
-
-                with dog_stats_api.timer('course_email.single_send.time.overall', tags=[_statsd_tag(course_title)]):
-                    connection.send_messages([email_msg])
-
-            except SMTPDataError as exc:
-                # According to SMTP spec, we'll retry error codes in the 4xx range.  5xx range indicates hard failure.
-                if exc.smtp_code >= 400 and exc.smtp_code < 500:
-                    # This will cause the outer handler to catch the exception and retry the entire task.
-                    raise exc
-                else:
-                    # This will fall through and not retry the message.
-                    log.warning('Task %s: email with id %s not delivered to %s due to error %s', task_id, email_id, email, exc.smtp_error)
-                    dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
-                    subtask_status.increment(failed=1)
 
-            except SINGLE_EMAIL_FAILURE_ERRORS as exc:
+    # Throttle if we have gotten the rate limiter.  This is not very high-tech,
+    # but if a task has been retried for rate-limiting reasons, then we halve the
+    # number of connections we send over in parallel each time, and sleep for a
+    # period of time between all emails within this task.  Choice of the value
+    # depends on the number of workers that might be sending email in parallel,
+    # and what the SES throttle rate is.
+    num_connections = max(settings.BULK_EMAIL_CONNECTIONS_PER_TASK >> subtask_status.retried_nomax, 1)
+    status_lock = threading.Lock()
+
+    def send_to_recipient(connection, current_recipient):
+        """Sends the email to `current_recipient` over `connection`, and counts the result."""
+        email = current_recipient['email']
+        recipient_context = {'email': email, 'name': current_recipient['profile__name']}
+
+        # Create email:
+        email_msg = EmailMultiAlternatives(
+            subject,
+            render_plaintext(recipient_context),
+            from_addr,
+            [email],
+            connection=connection
+        )
+        email_msg.attach_alternative(render_htmltext(recipient_context), 'text/html')
+
+        if subtask_status.retried_nomax > 0:
+            sleep(settings.BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
+
+        try:
+            log.debug('Email with id %s to be sent to %s', email_id, email)
+
+            with dog_stats_api.timer('course_email.single_send.time.overall', tags=[_statsd_tag(course_title)]):
+                connection.send_messages([email_msg])
+
+        except SMTPDataError as exc:
+            # According to SMTP spec, we'll retry error codes in the 4xx range.  5xx range indicates hard failure.
+            if exc.smtp_code >= 400 and exc.smtp_code < 500:
+                # This will cause the outer handler to catch the exception and retry the entire task.
+                raise exc
+            else:
                 # This will fall through and not retry the message.
-                log.warning('Task %s: email with id %s not delivered to %s due to error %s', task_id, email_id, email, exc)
+                log.warning('Task %s: email with id %s not delivered to %s due to error %s', task_id, email_id, email, exc.smtp_error)
                 dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
+                with status_lock:
+                    subtask_status.increment(failed=1)
+
+        except SINGLE_EMAIL_FAILURE_ERRORS as exc:
+            # This will fall through and not retry the message.
+            log.warning('Task %s: email with id %s not delivered to %s due to error %s', task_id, email_id, email, exc)
+            dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
+            with status_lock:
                 subtask_status.increment(failed=1)
 
+        else:
+            dog_stats_api.increment('course_email.sent', tags=[_statsd_tag(course_title)])
+            if settings.BULK_EMAIL_LOG_SENT_EMAILS:
+                log.info('Email with id %s sent to %s', email_id, email)
             else:
-                dog_stats_api.increment('course_email.sent', tags=[_statsd_tag(course_title)])
-                if settings.BULK_EMAIL_LOG_SENT_EMAILS:
-                    log.info('Email with id %s sent to %s', email_id, email)
-                else:
-                    log.debug('Email with id %s sent to %s', email_id, email)
+                log.debug('Email with id %s sent to %s', email_id, email)
+            with status_lock:
                 subtask_status.increment(succeeded=1)
 
-            # Pop the user that was emailed off the end of the list only once they have
-            # successfully been processed.  (That way, if there were a failure that
-            # needed to be retried, the user is still on the list.)
-            to_list.pop()
+    try:
+        # Construct message content using templates and context.  The templates are
+        # compiled once: only the 'name' and 'email' of the recipient vary.
+        render_plaintext = course_email_template.compile_plaintext(course_email.text_message, global_email_context)
+        render_htmltext = course_email_template.compile_htmltext(course_email.html_message, global_email_context)
+
+        # The recipients are popped off of the to_list as they are processed.
+        # That way, the to_list will always contain the recipients remaining to be emailed.
+        # This is convenient for retries, which will need to send to those who haven't
+        # yet been emailed, but not send to those who have already been sent to.
+        send_in_parallel(to_list, num_connections, send_to_recipient)
 
     except INFINITE_RETRY_ERRORS as exc:
         dog_stats_api.increment('course_email.infinite_retry', tags=[_statsd_tag(course_title)])
@@ -559,9 +558,56 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         subtask_status.increment(state=SUCCESS)
         # Successful completion is marked by an exception value of None.
         return subtask_status, None
-    finally:
-        # Clean up at the end.
-        connection.close()
+
+
+def send_in_parallel(to_list, num_connections, send_to_recipient):
+    """
+    Sends email to the recipients in `to_list` over `num_connections` connections in parallel.
+
+    Each connection is opened once, and used by a thread of its own (one of them the current
+    thread) to call `send_to_recipient(connection, recipient)` for the recipients it pops off
+    of the end of the `to_list`, until there are none left.
+
+    If opening a connection or sending to a recipient raises an exception, the other threads
+    stop once they are done with their current recipient, and the exception is raised.  The
+    recipient is put back on the `to_list`, which then contains the recipients that have not
+    been processed.
+    """
+    lock = threading.Lock()
+    errors = []
+
+    def send_over_connection():
+        """Opens a connection, and sends over it until there are no recipients, or an error."""
+        connection = get_connection()
+        current_recipient = None
+        try:
+            connection.open()
+            while True:
+                with lock:
+                    if errors or not to_list:
+                        return
+                    current_recipient = to_list.pop()
+                send_to_recipient(connection, current_recipient)
+                current_recipient = None
+        except Exception:  # pylint: disable=broad-except
+            with lock:
+                if current_recipient is not None:
+                    to_list.append(current_recipient)
+                errors.append(sys.exc_info())
+        finally:
+            # Clean up at the end.
+            connection.close()
+
+    threads = [threading.Thread(target=send_over_connection) for _ in xrange(min(num_connections, len(to_list)) - 1)]
+    for thread in threads:
+        thread.start()
+    send_over_connection()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        exc_type, exc_value, exc_traceback = errors[0]
+        raise exc_type, exc_value, exc_traceback
 
 
 def _get_current_task():
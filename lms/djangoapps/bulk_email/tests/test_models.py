@@ -103,6 +103,27 @@ class CourseEmailTemplateTest(TestCase):
         context = self._get_sample_plain_context()
         template.render_plaintext("My new plain text.", context)
 
+    def test_compile_plain(self):
+        template = CourseEmailTemplate.get_template()
+        context = self._get_sample_plain_context()
+        del context['email']
+        render = template.compile_plaintext("Dear {name}: my new plain text.", context)
+        for recipient_context in ({'name': u'Jos\xe9', 'email': 'jose@test.com'}, {'name': '{email}', 'email': ''}):
+            context.update(recipient_context)
+            self.assertEquals(
+                render(recipient_context),
+                template.render_plaintext("Dear {name}: my new plain text.", context)
+            )
+
+    def test_compile_html(self):
+        template = CourseEmailTemplate.get_template()
+        context = self._get_sample_html_context()
+        del context['email']
+        render = template.compile_htmltext("<p>My new html text.</p>", context)
+        recipient_context = {'name': 'Bogus Name', 'email': 'your-email@test.com'}
+        context.update(recipient_context)
+        self.assertEquals(render(recipient_context), template.render_htmltext("<p>My new html text.</p>", context))
+
 
 class CourseAuthorizationTest(TestCase):
     """Test the CourseAuthorization model."""
@@ -145,3 +166,15 @@ class CourseAuthorizationTest(TestCase):
 
         # Now, course should STILL be authorized!
         self.assertTrue(CourseAuthorization.instructor_email_enabled(course_id))
+
+    @patch.dict(settings.MITX_FEATURES, {'REQUIRE_COURSE_EMAIL_AUTH': True})
+    def test_enabled_courses(self):
+        CourseAuthorization(course_id='abc/123/doremi', email_enabled=True).save()
+        CourseAuthorization(course_id='abc/123/fasola', email_enabled=False).save()
+        course_ids = ['abc/123/doremi', 'abc/123/fasola', 'abc/123/tido']
+        with self.assertNumQueries(1):
+            enabled = CourseAuthorization.instructor_email_enabled_courses(course_ids)
+        self.assertEquals(set(['abc/123/doremi']), enabled)
+
+        with patch.dict(settings.MITX_FEATURES, {'REQUIRE_COURSE_EMAIL_AUTH': False}):
+            self.assertEquals(set(course_ids), CourseAuthorization.instructor_email_enabled_courses(course_ids))
@@ -27,8 +27,10 @@ from celery.states import SUCCESS, FAILURE
 
 from django.conf import settings
 from django.core.management import call_command
+from django.test.utils import override_settings
 
 from bulk_email.models import CourseEmail, Optout, SEND_TO_ALL
+from bulk_email.tasks import send_in_parallel
 
 from instructor_task.tasks import send_bulk_course_email
 from instructor_task.subtasks import update_subtask_status, SubtaskStatus
@@ -211,6 +213,50 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
         self.assertEquals(parent_status.get('succeeded'), num_emails)
         self.assertEquals(parent_status.get('failed'), 0)
 
+    @override_settings(BULK_EMAIL_CONNECTIONS_PER_TASK=4)
+    def test_successful_over_connections(self):
+        num_emails = settings.BULK_EMAIL_EMAILS_PER_TASK
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            get_conn.return_value.send_messages.side_effect = cycle([None])
+            self._test_run_with_task(send_bulk_course_email, 'emailed', num_emails, num_emails)
+        self.assertEquals(get_conn.call_count, 4)
+        self.assertEquals(get_conn.return_value.close.call_count, 4)
+
+    @override_settings(BULK_EMAIL_CONNECTIONS_PER_TASK=4)
+    def test_address_failures_over_connections(self):
+        num_emails = settings.BULK_EMAIL_EMAILS_PER_TASK
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        expected_fails = int((num_emails + 3) / 4.0)
+        expected_succeeds = num_emails - expected_fails
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            # have every fourth email fail, whichever connection sends it:
+            get_conn.return_value.send_messages.side_effect = cycle([SMTPDataError(554, "Email address is blacklisted"), None, None, None])
+            self._test_run_with_task(send_bulk_course_email, 'emailed', num_emails, expected_succeeds, failed=expected_fails)
+
+    @override_settings(BULK_EMAIL_CONNECTIONS_PER_TASK=2)
+    def test_fewer_connections_after_throttling(self):
+        num_emails = 8
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        task_entry = self._create_input_entry()
+        exception = SESMaxSendingRateExceededError(455, "Throttling: Sending rate exceeded")
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            get_conn.return_value.send_messages.side_effect = cycle([exception, None])
+            with patch('bulk_email.tasks.send_in_parallel', wraps=send_in_parallel) as mock_send:
+                self._run_task_with_mock_celery(send_bulk_course_email, task_entry.id, task_entry.task_id)
+
+        # Only the first attempt sends over two connections:
+        num_connections = [args[1] for args, _ in mock_send.call_args_list]
+        self.assertEquals(num_connections[0], 2)
+        self.assertEquals(set(num_connections[1:]), set([1]))
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        status = json.loads(entry.task_output)
+        self.assertEquals(status.get('succeeded'), num_emails)
+        self.assertEquals(status.get('failed'), 0)
+
     def test_unactivated_user(self):
         # Select number of emails to fit into a single subtask.
         num_emails = settings.BULK_EMAIL_EMAILS_PER_TASK
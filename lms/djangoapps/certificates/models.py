@@ -1,7 +1,11 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from datetime import datetime
 
+from student.models import invalidate_dashboard_cache
+
 """
 Certificates are created for a student and an offering of a course.
 
@@ -129,13 +133,45 @@ def certificate_status_for_student(student, course_id):
     try:
         generated_certificate = GeneratedCertificate.objects.get(
                 user=student, course_id=course_id)
-        d = {'status': generated_certificate.status}
-        if generated_certificate.grade:
-            d['grade'] = generated_certificate.grade
-        if generated_certificate.status == CertificateStatuses.downloadable:
-            d['download_url'] = generated_certificate.download_url
-
-        return d
+        return _certificate_status(generated_certificate)
     except GeneratedCertificate.DoesNotExist:
         pass
     return {'status': CertificateStatuses.unavailable}
+
+
+def certificate_statuses_for_student(student, course_ids):
+    '''
+    Returns a dict mapping each of course_ids to the status of the certificate of
+    the student in that course, as certificate_status_for_student returns it,
+    with a single query.
+    '''
+    statuses = dict(
+        (course_id, {'status': CertificateStatuses.unavailable}) for course_id in course_ids
+    )
+    generated_certificates = GeneratedCertificate.objects.filter(
+        user=student, course_id__in=list(statuses)
+    )
+    for generated_certificate in generated_certificates:
+        statuses[generated_certificate.course_id] = _certificate_status(generated_certificate)
+    return statuses
+
+
+def _certificate_status(generated_certificate):
+    '''
+    Returns the status dict of generated_certificate, for certificate_status_for_student
+    '''
+    d = {'status': generated_certificate.status}
+    if generated_certificate.grade:
+        d['grade'] = generated_certificate.grade
+    if generated_certificate.status == CertificateStatuses.downloadable:
+        d['download_url'] = generated_certificate.download_url
+    return d
+
+
+@receiver(post_save, sender=GeneratedCertificate)
+@receiver(post_delete, sender=GeneratedCertificate)
+def invalidate_certificate_dashboard_cache(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    '''
+    Invalidates the dashboard of the student after a change to one of their certificates
+    '''
+    invalidate_dashboard_cache(instance.user_id)
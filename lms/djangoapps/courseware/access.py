@@ -13,11 +13,12 @@ from xmodule.error_module import ErrorDescriptor
 from xmodule.modulestore import Location
 from xmodule.x_module import XModule, XModuleDescriptor
 
+from course_overviews.models import CourseOverview
 from student.models import CourseEnrollmentAllowed
 from external_auth.models import ExternalAuthMap
 from courseware.masquerade import is_masquerading_as_student
 from django.utils.timezone import UTC
-from student.models import CourseEnrollment
+from student.models import AccessContext
 from courseware.roles import (
     GlobalStaff, CourseStaffRole, CourseInstructorRole,
     OrgStaffRole, OrgInstructorRole, CourseBetaTesterRole
@@ -63,7 +64,8 @@ def has_access(user, obj, action, course_context=None):
     """
     # delegate the work to type-specific functions.
     # (start with more specific types, then get more general)
-    if isinstance(obj, CourseDescriptor):
+    # course overviews have the attributes of courses that access checks use
+    if isinstance(obj, (CourseDescriptor, CourseOverview)):
         return _has_access_course_desc(user, obj, action)
 
     if isinstance(obj, ErrorDescriptor):
@@ -116,7 +118,7 @@ def _has_access_course_desc(user, course, action):
         Can this user access the forums in this course?
         """
         return (can_load() and \
-            (CourseEnrollment.is_enrolled(user, course.id) or \
+            (AccessContext.for_user(user).is_enrolled(course.id) or \
                 _has_staff_access_to_descriptor(user, course)
             ))
 
@@ -0,0 +1,347 @@
+"""
+Grade every student of a course in batches.
+
+grades.grade() builds a FieldDataCache per student and may instantiate modules
+to find out the max score of problems that the student hasn't attempted. For
+instructor exports that call it once per enrolled student this adds up to
+hours on large courses. The functions here instead read the StudentModule
+scores of a block of students at a time into NumPy arrays
+(students x problems), compute the section totals of the whole block with a
+few array operations, and only then run the course grader for each student.
+The result is the same gradeset that grades.grade() returns.
+
+Students that can see content that regular students can't (course staff,
+instructors, beta testers) and courses whose graded sections have student
+dependent content (dynamic children, always recalculated problems) are graded
+through grades.grade().
+"""
+# Compute grades using real division, with no integer truncation
+from __future__ import division
+
+import logging
+
+import numpy
+
+from django.conf import settings
+
+from courseware import grades
+from courseware.access import has_access
+from courseware.model_data import FieldDataCache, chunks
+from courseware.models import StudentModule
+from courseware.module_render import get_module_for_descriptor
+from courseware.roles import (
+    CourseBetaTesterRole, CourseInstructorRole, CourseStaffRole, OrgInstructorRole, OrgStaffRole
+)
+from xmodule.graders import Score
+
+log = logging.getLogger("mitx.courseware")
+
+# Number of students whose scores are loaded into memory at the same time.
+# Together with LOCATION_CHUNK_SIZE this also has to stay below the sqlite
+# limit on the number of query parameters.
+STUDENT_BATCH_SIZE = 400
+LOCATION_CHUNK_SIZE = 500
+
+
+def section_totals(earned, possible, weights, graded, membership):
+    """
+    Vectorized version of aggregating the problem scores of many students
+    into graded section totals, as grades.grade() does with get_score and
+    graders.aggregate_scores for a single student.
+
+    All problem arrays have one column per problem:
+        earned: float (students x problems), raw points earned
+        possible: float (students x problems), raw points possible, NaN for
+            problems that have no score for a student
+        weights: float (problems), problem weights, NaN for unweighted problems
+        graded: bool (problems), the graded flag of the problems
+        membership: float (problems x sections), 1 where a problem belongs to
+            a section
+
+    Returns a tuple (earned, possible, scored_earned, scored_possible) where
+    earned and possible are the weighted problem scores, and scored_* are the
+    (students x sections) graded section totals.
+    """
+    has_score = ~numpy.isnan(possible)
+    possible = numpy.where(has_score, possible, 0.0)
+    earned = numpy.where(has_score, earned, 0.0)
+
+    # Re-weight problems that have a weight and a non zero total
+    reweight = ~numpy.isnan(weights) & (possible != 0)
+    safe_possible = numpy.where(possible != 0, possible, 1.0)
+    earned = numpy.where(reweight, earned * weights / safe_possible, earned)
+    possible = numpy.where(reweight, weights, possible)
+
+    # Problems that are 12/0 can't be graded, because we might need them as a percentage
+    counted = has_score & graded & (possible > 0)
+
+    scored_earned = numpy.dot(numpy.where(counted, earned, 0.0), membership)
+    scored_possible = numpy.dot(numpy.where(counted, possible, 0.0), membership)
+
+    return earned, numpy.where(has_score, possible, numpy.nan), scored_earned, scored_possible
+
+
+def grade_from_section_totals(course, totaled_scores, raw_scores=None):
+    """
+    Runs the course grader over the totaled scores of one student, and
+    returns the gradeset in the format of grades.grade().
+    """
+    grade_summary = course.grader.grade(totaled_scores, generate_random_scores=settings.GENERATE_PROFILE_SCORES)
+
+    # We round the grade here, to make sure that the grade is an whole percentage and
+    # doesn't get displayed differently than it gets grades
+    grade_summary['percent'] = round(grade_summary['percent'] * 100 + 0.05) / 100
+
+    grade_summary['grade'] = grades.grade_for_percentage(course.grade_cutoffs, grade_summary['percent'])
+    grade_summary['totaled_scores'] = totaled_scores
+    if raw_scores is not None:
+        grade_summary['raw_scores'] = raw_scores
+    return grade_summary
+
+
+class CourseGradebook(object):
+    """
+    The layout of the graded problems of a course, as arrays that the scores
+    of a batch of students can be mapped onto.
+    """
+    def __init__(self, course, request_for_student):
+        self.course = course
+        # returns the request to instantiate the modules of a student with
+        self.request_for_student = request_for_student
+
+        # One entry per graded section, in the order of course.grading_context
+        self.sections = []
+        # Problem descriptors, in the column order of the score arrays
+        self.problems = []
+        self.columns = {}
+
+        graded_sections = course.grading_context['graded_sections']
+        self.batchable = all(
+            grades.section_is_storable(section['section_descriptor'])
+            for sections in graded_sections.itervalues()
+            for section in sections
+        )
+        if not self.batchable:
+            return
+
+        for section_format, sections in graded_sections.iteritems():
+            for section in sections:
+                section_descriptor = section['section_descriptor']
+
+                # The problems of the section, in the order grades.grade() walks them
+                section_columns = []
+                for descriptor in grades.yield_dynamic_descriptor_descendents(section_descriptor, None):
+                    if not descriptor.has_score:
+                        continue
+                    location = descriptor.location.url()
+                    if location not in self.columns:
+                        self.columns[location] = len(self.problems)
+                        self.problems.append(descriptor)
+                    section_columns.append(self.columns[location])
+
+                # Sections are considered seen if the student has state for any of these
+                seen_columns = []
+                for descriptor in section['xmoduledescriptors']:
+                    location = descriptor.location.url()
+                    if location not in self.columns:
+                        self.columns[location] = len(self.problems)
+                        self.problems.append(descriptor)
+                    seen_columns.append(self.columns[location])
+
+                self.sections.append({
+                    'format': section_format,
+                    'descriptor': section_descriptor,
+                    'name': section_descriptor.display_name_with_default,
+                    'columns': section_columns,
+                    'seen_columns': seen_columns,
+                })
+
+        self.locations = [descriptor.location.url() for descriptor in self.problems]
+        self.weights = numpy.array(
+            [descriptor.weight if descriptor.weight is not None else numpy.nan for descriptor in self.problems],
+            dtype=float,
+        )
+        self.graded = numpy.array([bool(descriptor.graded) for descriptor in self.problems], dtype=bool)
+
+        self.membership = numpy.zeros((len(self.problems), len(self.sections)))
+        self.seen_membership = numpy.zeros((len(self.problems), len(self.sections)))
+        for index, section in enumerate(self.sections):
+            self.membership[section['columns'], index] = 1
+            self.seen_membership[section['seen_columns'], index] = 1
+
+        # Max scores of problems a student hasn't been graded on yet, loaded on demand
+        self._default_max_scores = None
+
+    def default_max_scores(self, student):
+        """
+        Returns an array of the max scores of all problems, as reported by the
+        problem modules, using `student` to instantiate them. Problems that
+        can't be loaded have a max score of NaN.
+
+        This is only done once per gradebook, so `student` must not be a user
+        with privileged access to the course.
+        """
+        if self._default_max_scores is None:
+            # Most max scores are cached per problem version, so the
+            # FieldDataCache is only built if a module has to be instantiated
+            field_data_caches = []
+
+            def create_module(descriptor):
+                """Instantiates a problem module for `student`"""
+                if not field_data_caches:
+                    field_data_caches.append(FieldDataCache(self.problems, self.course.id, student))
+                return get_module_for_descriptor(
+                    student, self.request_for_student(student), descriptor, field_data_caches[0], self.course.id
+                )
+
+            max_scores = []
+            for descriptor in self.problems:
+                if not has_access(student, descriptor, 'load', self.course.id):
+                    max_scores.append(numpy.nan)
+                    continue
+                max_score = grades.get_max_score(descriptor, create_module)
+                max_scores.append(max_score if max_score is not None else numpy.nan)
+            self._default_max_scores = numpy.array(max_scores, dtype=float)
+        return self._default_max_scores
+
+    def load_scores(self, students):
+        """
+        Reads the StudentModule scores of `students` into
+        (students x problems) arrays of earned points, possible points (NaN
+        when the student has no max_grade for a problem) and seen flags.
+        """
+        rows = dict((student.id, index) for index, student in enumerate(students))
+        shape = (len(students), len(self.problems))
+        earned = numpy.zeros(shape)
+        possible = numpy.empty(shape)
+        possible.fill(numpy.nan)
+        seen = numpy.zeros(shape, dtype=bool)
+
+        for location_chunk in chunks(self.locations, LOCATION_CHUNK_SIZE):
+            student_modules = StudentModule.objects.filter(
+                course_id=self.course.id,
+                student__in=rows.keys(),
+                module_state_key__in=location_chunk,
+            ).values_list('student_id', 'module_state_key', 'grade', 'max_grade')
+
+            for student_id, location, grade, max_grade in student_modules.iterator():
+                row = rows[student_id]
+                column = self.columns[location]
+                seen[row, column] = True
+                if max_grade is not None:
+                    earned[row, column] = grade if grade is not None else 0
+                    possible[row, column] = max_grade
+
+        return earned, possible, seen
+
+    def grade_batch(self, students, keep_raw_scores=False):
+        """
+        Grades a list of regular (non privileged) students. Yields
+        (student, gradeset) pairs in the order of `students`.
+        """
+        earned, possible, seen = self.load_scores(students)
+
+        missing = numpy.isnan(possible)
+        if missing.any():
+            # Students that haven't been graded on a problem get 0 out of its max score
+            default_max_scores = self.default_max_scores(students[0])
+            possible = numpy.where(missing, default_max_scores, possible)
+
+        earned, possible, scored_earned, scored_possible = section_totals(
+            earned, possible, self.weights, self.graded, self.membership
+        )
+        # If we haven't seen a single problem in a section, we can assume 0%
+        section_seen = numpy.dot(seen.astype(float), self.seen_membership) > 0
+
+        for row, student in enumerate(students):
+            totaled_scores = dict((section['format'], []) for section in self.sections)
+            raw_scores = [] if keep_raw_scores else None
+
+            for index, section in enumerate(self.sections):
+                if not section_seen[row, index]:
+                    totaled_scores[section['format']].append(Score(0.0, 1.0, True, section['name']))
+                    continue
+
+                if keep_raw_scores:
+                    for column in section['columns']:
+                        if numpy.isnan(possible[row, column]):
+                            continue
+                        descriptor = self.problems[column]
+                        total = possible[row, column]
+                        raw_scores.append(Score(
+                            earned[row, column],
+                            total,
+                            descriptor.graded and total > 0,
+                            descriptor.display_name_with_default
+                        ))
+
+                if scored_possible[row, index] > 0:
+                    totaled_scores[section['format']].append(
+                        Score(scored_earned[row, index], scored_possible[row, index], True, section['name'])
+                    )
+                else:
+                    log.error("Unable to grade a section with a total possible score of zero. " +
+                              str(section['descriptor'].location))
+
+            yield student, grade_from_section_totals(self.course, totaled_scores, raw_scores)
+
+
+def privileged_user_ids(course):
+    """
+    Returns the ids of the users that have staff or beta tester access to
+    `course`, and so may see content that regular students can't.
+    """
+    roles = [
+        CourseStaffRole(course.location),
+        CourseInstructorRole(course.location),
+        CourseBetaTesterRole(course.location),
+        OrgStaffRole(course.location),
+        OrgInstructorRole(course.location),
+    ]
+    user_ids = set()
+    for role in roles:
+        user_ids.update(role.users_with_role().values_list('id', flat=True))
+    return user_ids
+
+
+def iterate_grades_for(course, students, request, keep_raw_scores=False, request_for_student=None):
+    """
+    Grades all `students` of `course`, yielding (student, gradeset) pairs in
+    the order of `students`. Each gradeset is what
+    grades.grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    returns.
+
+    Callers that have no request of their own, such as the offline grade
+    calculation, pass `request_for_student` instead: a function returning the
+    request to grade a student with.
+    """
+    if request_for_student is None:
+        request_for_student = lambda student: request
+    gradebook = CourseGradebook(course, request_for_student)
+    if not gradebook.batchable or settings.GENERATE_PROFILE_SCORES:
+        log.info("Grading students of %s one at a time", course.id)
+        for student in students:
+            yield student, grades.grade(
+                student, request_for_student(student), course, keep_raw_scores=keep_raw_scores
+            )
+        return
+
+    privileged = privileged_user_ids(course)
+
+    for batch in chunks(students, STUDENT_BATCH_SIZE):
+        regular_students = [
+            student for student in batch
+            if not student.is_staff and student.id not in privileged
+        ]
+        gradesets = dict(
+            (student.id, gradeset)
+            for student, gradeset in gradebook.grade_batch(regular_students, keep_raw_scores)
+        ) if regular_students else {}
+
+        for student in batch:
+            if student.id in gradesets:
+                yield student, gradesets.pop(student.id)
+            else:
+                yield student, grades.grade(
+                    student, request_for_student(student), course, keep_raw_scores=keep_raw_scores
+                )
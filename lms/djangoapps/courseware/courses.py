@@ -13,6 +13,7 @@ from xmodule.modulestore import Location, XML_MODULESTORE_TYPE
 from xmodule.modulestore.django import modulestore, loc_mapper
 from xmodule.contentstore.content import StaticContent
 from xmodule.modulestore.exceptions import ItemNotFoundError, InvalidLocationError
+from course_overviews.models import CourseOverview
 from courseware.model_data import FieldDataCache
 from static_replace import replace_static_urls
 from courseware.access import has_access
@@ -157,6 +158,15 @@ def get_course_about_section(course, section_key):
     # good format for defining so many snippets of text/html.
 
 # TODO: Remove number, instructors from this list
+    if section_key == 'short_description' and isinstance(course, CourseOverview):
+        # overviews hold the short description, for the course listings
+        if course.short_description is None:
+            return None
+        return replace_static_urls(
+            course.short_description, course.data_dir, course_id=course.id,
+            static_asset_path=course.static_asset_path
+        )
+
     if section_key in ['short_description', 'description', 'key_dates', 'video',
                        'course_staff_short', 'course_staff_extended',
                        'requirements', 'syllabus', 'textbook', 'faq', 'more_info',
@@ -292,7 +302,7 @@ def get_courses_by_university(user, domain=None):
 
 def get_courses(user, domain=None):
     '''
-    Returns a list of courses available, sorted by course.number
+    Returns a list of the CourseOverviews of the courses available, sorted by course.number
     '''
     courses = branding.get_visible_courses(domain)
     courses = [c for c in courses if has_access(user, c, 'see_exists')]
@@ -7,17 +7,22 @@ import logging
 from collections import defaultdict
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 
-from courseware.model_data import FieldDataCache, DjangoKeyValueStore
+from courseware.access import has_access
+from courseware.model_data import FieldDataCache, DjangoKeyValueStore, chunks
 from xblock.fields import Scope
 from .module_render import get_module, get_module_for_descriptor
 from xmodule import graders
 from xmodule.capa_module import CapaModule
 from xmodule.graders import Score
-from .models import StudentModule
+from .models import StudentModule, StudentSectionScore
 
 log = logging.getLogger("mitx.courseware")
 
+# Max scores are keyed by the version of the problem, so they never go stale
+MAX_SCORE_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
 
 def yield_module_descendents(module):
     stack = module.get_display_items()
@@ -121,6 +126,50 @@ def answer_distributions(request, course):
     return counts
 
 
+def use_section_score_store():
+    """
+    Returns True if the raw scores of graded sections should be read from and
+    written to StudentSectionScore, instead of being recomputed from the
+    modules on every call to grade().
+    """
+    return settings.MITX_FEATURES.get('ENABLE_PERSISTENT_SECTION_SCORES', False)
+
+
+def section_is_storable(section_descriptor):
+    """
+    Returns True if the scores of a section can be stored in StudentSectionScore.
+    This excludes sections whose problems depend on the student (dynamic
+    children), and sections with problems that have to be rescored on every read.
+    """
+    stack = [section_descriptor]
+    while len(stack) > 0:
+        descriptor = stack.pop()
+        if descriptor.always_recalculate_grades or descriptor.has_dynamic_children():
+            return False
+        stack.extend(descriptor.get_children())
+    return True
+
+
+def _seen_locations(student, course_id, sections):
+    """
+    Returns the set of location urls of the scored modules in `sections` for
+    which `student` has a StudentModule.
+    """
+    locations = [
+        descriptor.location.url()
+        for section in sections
+        for descriptor in section['xmoduledescriptors']
+    ]
+    seen = set()
+    for chunk in chunks(locations, 500):
+        seen.update(StudentModule.objects.filter(
+            student=student,
+            course_id=course_id,
+            module_state_key__in=chunk,
+        ).values_list('module_state_key', flat=True))
+    return seen
+
+
 def grade(student, request, course, field_data_cache=None, keep_raw_scores=False):
     """
     This grades a student as quickly as possible. It returns the
@@ -138,13 +187,51 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores for every graded module
 
     More information on the format is in the docstring for CourseGrader.
+
+    If the ENABLE_PERSISTENT_SECTION_SCORES feature is on, the scores of the
+    sections the student has already been graded on are read from
+    StudentSectionScore, and modules are only loaded for the other sections.
     """
 
     grading_context = course.grading_context
     raw_scores = []
 
-    if field_data_cache is None:
-        field_data_cache = FieldDataCache(grading_context['all_descriptors'], course.id, student)
+    use_store = use_section_score_store() and student.is_authenticated()
+    stored_sections = StudentSectionScore.scores_for_course(student, course.id) if use_store else {}
+
+    # The FieldDataCache is only needed for sections that can't be graded
+    # from stored scores, so it is built the first time it is asked for
+    field_data_caches = [field_data_cache]
+
+    def get_field_data_cache():
+        """Returns the FieldDataCache used to grade this student"""
+        if field_data_caches[0] is None:
+            field_data_caches[0] = FieldDataCache(grading_context['all_descriptors'], course.id, student)
+        return field_data_caches[0]
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        # TODO: We need the request to pass into here. If we could forego that, our arguments
+        # would be simpler
+        return get_module_for_descriptor(student, request, descriptor, get_field_data_cache(), course.id)
+
+    if use_store:
+        all_sections = [
+            section
+            for sections in grading_context['graded_sections'].itervalues()
+            for section in sections
+        ]
+        storable_sections = set(
+            section['section_descriptor'].location.url()
+            for section in all_sections
+            if section_is_storable(section['section_descriptor'])
+        )
+        seen_locations = _seen_locations(student, course.id, [
+            section
+            for section in all_sections
+            if section['section_descriptor'].location.url() not in storable_sections or
+            section['section_descriptor'].location.url() not in stored_sections
+        ])
 
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
@@ -154,16 +241,28 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
         for section in sections:
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default
+            section_location = section_descriptor.location.url()
+
+            storable = use_store and section_location in storable_sections
+            stored_scores = stored_sections.get(section_location) if storable else None
 
-            should_grade_section = False
+            # A stored section has been seen by the student
+            should_grade_section = stored_scores is not None
             # If we haven't seen a single problem in the section, we don't have to grade it at all! We can assume 0%
             for moduledescriptor in section['xmoduledescriptors']:
+                if should_grade_section:
+                    break
+
                 # some problems have state that is updated independently of interaction
                 # with the LMS, so they need to always be scored. (E.g. foldit.)
                 if moduledescriptor.always_recalculate_grades:
                     should_grade_section = True
                     break
 
+                if use_store:
+                    should_grade_section = moduledescriptor.location.url() in seen_locations
+                    continue
+
                 # Create a fake key to pull out a StudentModule object from the FieldDataCache
 
                 key = DjangoKeyValueStore.Key(
@@ -172,25 +271,33 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
                     moduledescriptor.location,
                     None
                 )
-                if field_data_cache.find(key):
+                if get_field_data_cache().find(key):
                     should_grade_section = True
                     break
 
             if should_grade_section:
                 scores = []
-
-                def create_module(descriptor):
-                    '''creates an XModule instance given a descriptor'''
-                    # TODO: We need the request to pass into here. If we could forego that, our arguments
-                    # would be simpler
-                    return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
+                section_raw_scores = {}
 
                 for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
 
-                    (correct, total) = get_score(course.id, student, module_descriptor, create_module, field_data_cache)
+                    location = module_descriptor.location.url()
+                    version = StudentSectionScore.problem_version(module_descriptor) if storable else None
+                    stored_score = stored_scores.get(location) if stored_scores is not None else None
+                    if stored_score is not None and stored_score[2] == version:
+                        (correct, total, _) = stored_score
+                    elif module_descriptor.has_score or module_descriptor.always_recalculate_grades:
+                        (correct, total) = get_raw_score(
+                            course.id, student, module_descriptor, create_module, get_field_data_cache()
+                        )
+                    else:
+                        continue
                     if correct is None and total is None:
                         continue
 
+                    section_raw_scores[location] = (correct, total, version)
+                    (correct, total) = weight_score(module_descriptor, correct, total)
+
                     if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
                         if total > 1:
                             correct = random.randrange(max(total - 2, 1), total + 1)
@@ -204,6 +311,9 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
 
                     scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
 
+                if storable and section_raw_scores != stored_scores:
+                    StudentSectionScore.save_section(student, course.id, section_location, section_raw_scores)
+
                 _, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
                     raw_scores += scores
@@ -279,6 +389,9 @@ def progress_summary(student, request, course, field_data_cache):
     If the student does not have access to load the course module, this function
     will return None.
 
+    If the ENABLE_PERSISTENT_SECTION_SCORES feature is on, scores stored in
+    StudentSectionScore are used instead of loading the problems.
+
     """
 
     # TODO: We need the request to pass into here. If we could forego that, our arguments
@@ -288,6 +401,11 @@ def progress_summary(student, request, course, field_data_cache):
         # This student must not have access to the course.
         return None
 
+    if use_section_score_store() and student.is_authenticated():
+        stored_sections = StudentSectionScore.scores_for_course(student, course.id)
+    else:
+        stored_sections = {}
+
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
     for chapter_module in course_module.get_display_items():
@@ -306,11 +424,16 @@ def progress_summary(student, request, course, field_data_cache):
             scores = []
 
             module_creator = section_module.xmodule_runtime.get_module
+            stored_scores = stored_sections.get(section_module.location.url(), {})
 
             for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
 
-                course_id = course.id
-                (correct, total) = get_score(course_id, student, module_descriptor, module_creator, field_data_cache)
+                stored_score = stored_scores.get(module_descriptor.location.url())
+                if stored_score is not None and stored_score[2] == StudentSectionScore.problem_version(module_descriptor):
+                    (correct, total) = weight_score(module_descriptor, *stored_score[:2])
+                else:
+                    course_id = course.id
+                    (correct, total) = get_score(course_id, student, module_descriptor, module_creator, field_data_cache)
                 if correct is None and total is None:
                     continue
 
@@ -353,6 +476,19 @@ def get_score(course_id, user, problem_descriptor, module_creator, field_data_ca
            Can return None if user doesn't have access, or if something else went wrong.
     cache: A FieldDataCache
     """
+    (correct, total) = get_raw_score(course_id, user, problem_descriptor, module_creator, field_data_cache)
+    if correct is None and total is None:
+        return (None, None)
+
+    return weight_score(problem_descriptor, correct, total)
+
+
+def get_raw_score(course_id, user, problem_descriptor, module_creator, field_data_cache):
+    """
+    Return the score for a user on a problem as a tuple (correct, total), before
+    the problem weight is applied. Arguments and return values are the same
+    as for get_score.
+    """
     if not user.is_authenticated():
         return (None, None)
 
@@ -387,25 +523,74 @@ def get_score(course_id, user, problem_descriptor, module_creator, field_data_ca
         total = student_module.max_grade
     else:
         # If the problem was not in the cache, or hasn't been graded yet,
-        # we need to instantiate the problem.
-        # Otherwise, the max score (cached in student_module) won't be available
-        problem = module_creator(problem_descriptor)
-        if problem is None:
+        # the max score (cached in student_module) isn't available, so
+        # we need the max score of the problem itself.
+        # Modules the student can't load aren't counted.
+        if not has_access(user, problem_descriptor, 'load', course_id):
             return (None, None)
 
         correct = 0.0
-        total = problem.max_score()
+        total = get_max_score(problem_descriptor, module_creator)
 
         # Problem may be an error module (if something in the problem builder failed)
         # In which case total might be None
         if total is None:
             return (None, None)
 
-    # Now we re-weight the problem, if specified
+    return (correct, total)
+
+
+def max_score_cache_key(problem_descriptor):
+    """
+    Returns the cache key of the max score of a problem. The key changes with
+    every edit of the content or settings of the problem.
+    """
+    return u'courseware.grades.max_score.{0}.{1}'.format(
+        problem_descriptor.location.url(), StudentSectionScore.problem_version(problem_descriptor)
+    )
+
+
+def get_max_score(problem_descriptor, module_creator):
+    """
+    Returns the max score of a problem, or None if it can't be loaded.
+
+    Unless the problem declares that its max score depends on the
+    randomization seed, the max score is computed once per version of the
+    problem and shared by all students through the cache, so that the problem
+    doesn't have to be instantiated for every student who hasn't attempted it.
+
+    module_creator: a function that takes a descriptor, and returns the corresponding XModule for this user.
+    """
+    if problem_descriptor.max_score_depends_on_seed:
+        problem = module_creator(problem_descriptor)
+        return problem.max_score() if problem is not None else None
+
+    key = max_score_cache_key(problem_descriptor)
+    total = cache.get(key)
+    if total is None:
+        problem = module_creator(problem_descriptor)
+        if problem is None:
+            return None
+
+        total = problem.max_score()
+        if total is not None:
+            cache.set(key, total, MAX_SCORE_CACHE_TIMEOUT)
+    return total
+
+
+def weight_score(problem_descriptor, correct, total):
+    """
+    Re-weight a raw (correct, total) score of a problem, if the problem
+    specifies a weight.
+    """
+    # Problems that are always recalculated report their own final score
+    if problem_descriptor.always_recalculate_grades:
+        return (correct, total)
+
     weight = problem_descriptor.weight
     if weight is not None:
         if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
+            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(problem_descriptor.location))
             return (correct, total)
         correct = correct * weight / total
         total = weight
@@ -0,0 +1,109 @@
+"""
+Benchmark of the batch grading engine on a synthetic course.
+
+Generates random StudentModule-like scores for a course of --students
+students and --sections homework sections with --problems problems each, and
+times computing the section totals one student at a time with
+graders.aggregate_scores (as grades.grade() does) against
+batch_grades.section_totals, as well as running the course grader over the
+results. No database or modulestore access is involved, so this measures the
+in-memory part of grading only.
+"""
+from __future__ import division
+
+import time
+from optparse import make_option
+from textwrap import dedent
+
+import numpy
+
+from django.core.management.base import BaseCommand
+
+from courseware.batch_grades import section_totals, STUDENT_BATCH_SIZE
+from xmodule import graders
+from xmodule.graders import Score
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the batch grading engine on a synthetic course.
+    """
+    help = dedent(__doc__).strip()
+    option_list = BaseCommand.option_list + (
+        make_option('--students', type='int', default=100000,
+                    help='Number of students in the synthetic course'),
+        make_option('--sections', type='int', default=12,
+                    help='Number of graded sections'),
+        make_option('--problems', type='int', default=10,
+                    help='Number of problems per section'),
+        make_option('--seen', type='float', default=0.6,
+                    help='Fraction of problems each student has attempted'),
+    )
+
+    def handle(self, *args, **options):
+        num_students = options['students']
+        num_sections = options['sections']
+        num_problems = num_sections * options['problems']
+
+        grader = graders.grader_from_conf([{
+            'type': 'Homework',
+            'min_count': num_sections,
+            'drop_count': 2,
+            'short_label': 'HW',
+            'weight': 1.0,
+        }])
+
+        random = numpy.random.RandomState(0)
+        possible = random.randint(1, 5, (num_students, num_problems)).astype(float)
+        earned = numpy.floor(possible * random.random_sample((num_students, num_problems)))
+        seen = random.random_sample((num_students, num_problems)) < options['seen']
+        earned = numpy.where(seen, earned, 0.0)
+        weights = numpy.where(random.random_sample(num_problems) < 0.2, 2.0, numpy.nan)
+        graded = numpy.ones(num_problems, dtype=bool)
+        membership = numpy.zeros((num_problems, num_sections))
+        for problem in range(num_problems):
+            membership[problem, problem // options['problems']] = 1
+
+        self.stdout.write("{0} students, {1} sections, {2} problems\n".format(
+            num_students, num_sections, num_problems
+        ))
+
+        start = time.time()
+        for row in xrange(num_students):
+            for section in xrange(num_sections):
+                scores = []
+                for problem in numpy.flatnonzero(membership[:, section]):
+                    correct, total = earned[row, problem], possible[row, problem]
+                    if not numpy.isnan(weights[problem]):
+                        correct, total = correct * weights[problem] / total, weights[problem]
+                    scores.append(Score(correct, total, True, 'problem'))
+                graders.aggregate_scores(scores, 'section')
+        self._report('per student aggregate_scores', start, num_students)
+
+        start = time.time()
+        totals = []
+        for batch_start in xrange(0, num_students, STUDENT_BATCH_SIZE):
+            batch = slice(batch_start, batch_start + STUDENT_BATCH_SIZE)
+            _, _, scored_earned, scored_possible = section_totals(
+                earned[batch], possible[batch], weights, graded, membership
+            )
+            totals.append((scored_earned, scored_possible))
+        self._report('vectorized section_totals', start, num_students)
+
+        start = time.time()
+        for scored_earned, scored_possible in totals:
+            for row in xrange(scored_earned.shape[0]):
+                grader.grade({'Homework': [
+                    Score(scored_earned[row, section], scored_possible[row, section], True, 'section')
+                    for section in xrange(num_sections)
+                ]})
+        self._report('course grader', start, num_students)
+
+    def _report(self, name, start, num_students):
+        """
+        Writes the time taken since `start` for `num_students` students.
+        """
+        elapsed = time.time() - start
+        self.stdout.write("{0:<32} {1:8.3f}s  {2:10.0f} students/s\n".format(
+            name, elapsed, num_students / elapsed if elapsed else float('inf')
+        ))
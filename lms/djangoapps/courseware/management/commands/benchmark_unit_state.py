@@ -0,0 +1,165 @@
+"""
+Benchmark of reading and writing the student state of the problems of a unit.
+
+Rendering a unit reads every user_state field of each of its problems through
+DjangoKeyValueStore, and answering a problem writes several of them at once.
+Creates a throwaway user with a StudentModule, holding the state of an answered
+capa problem of --responses responses, for each of --problems problems (30 by
+default, a large vertical). Then times, --repeat times over, loading the
+FieldDataCache of the unit and reading all of the user_state fields of its
+problems, as rendering it does, against the same reads decoding the state
+of the StudentModule on every access, as DjangoKeyValueStore used to, and
+times writing the fields that checking each problem writes, a problem at a
+time and with the saves deferred to the end of the unit. The user and their
+state are deleted afterwards.
+"""
+from __future__ import division
+
+import json
+import time
+from optparse import make_option
+from textwrap import dedent
+from uuid import uuid4
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from xblock.fields import Scope
+
+from courseware.model_data import DjangoKeyValueStore, FieldDataCache
+from courseware.models import StudentModule
+from xmodule.capa_module import CapaDescriptor, CapaModule
+from xmodule.modulestore import Location
+
+COURSE_ID = 'benchmark/unit_state/run'
+
+# The fields that checking a problem writes
+CHECK_FIELDS = ('attempts', 'correct_map', 'done', 'input_state', 'last_submission_time', 'student_answers')
+
+
+class BenchmarkProblem(object):
+    """
+    The parts of a problem descriptor that a FieldDataCache uses.
+    """
+    fields = CapaDescriptor.fields
+    module_class = CapaModule
+
+    def __init__(self, location):
+        self.location = location
+
+
+class Command(BaseCommand):
+    """
+    Benchmark reading and writing the student state of the problems of a unit.
+    """
+    help = dedent(__doc__).strip()
+    option_list = BaseCommand.option_list + (
+        make_option('--problems', type='int', default=30,
+                    help='Number of problems in the unit'),
+        make_option('--responses', type='int', default=3,
+                    help='Number of responses of each problem'),
+        make_option('--repeat', type='int', default=20,
+                    help='Number of times the unit is rendered and checked'),
+    )
+
+    def handle(self, *args, **options):
+        problems = [
+            BenchmarkProblem(Location('i4x', 'benchmark', 'unit_state', 'problem', 'problem_{0}'.format(index)))
+            for index in xrange(options['problems'])
+        ]
+        field_names = [
+            field.name for field in CapaDescriptor.fields.values() if field.scope == Scope.user_state
+        ]
+        user = User.objects.create_user('benchmark_{0}'.format(uuid4().hex[:20]), 'benchmark@example.com')
+        try:
+            for problem in problems:
+                StudentModule.objects.create(
+                    student=user,
+                    course_id=COURSE_ID,
+                    module_state_key=problem.location.url(),
+                    state=json.dumps(self._problem_state(problem.location, options['responses'])),
+                )
+            self.stdout.write("{0} problems of {1} responses, {2} state bytes each\n".format(
+                len(problems), options['responses'], len(StudentModule.objects.filter(student=user)[0].state)
+            ))
+
+            start = time.time()
+            for _ in xrange(options['repeat']):
+                field_data_cache = FieldDataCache(problems, COURSE_ID, user)
+                kvs = DjangoKeyValueStore(field_data_cache)
+                for problem in problems:
+                    for field_name in field_names:
+                        key = DjangoKeyValueStore.Key(Scope.user_state, user.id, problem.location, field_name)
+                        if kvs.has(key):
+                            kvs.get(key)
+            self._report('render, decoded once', start, options['repeat'])
+
+            start = time.time()
+            for _ in xrange(options['repeat']):
+                field_data_cache = FieldDataCache(problems, COURSE_ID, user)
+                for problem in problems:
+                    for field_name in field_names:
+                        key = DjangoKeyValueStore.Key(Scope.user_state, user.id, problem.location, field_name)
+                        student_module = field_data_cache.find(key)
+                        if field_name in json.loads(student_module.state):
+                            json.loads(student_module.state)[field_name]  # pylint: disable=expression-not-assigned
+            self._report('render, decoded per access', start, options['repeat'])
+
+            start = time.time()
+            for _ in xrange(options['repeat']):
+                self._check_problems(problems, user, options['responses'], FieldDataCache(problems, COURSE_ID, user))
+            self._report('check every problem', start, options['repeat'])
+
+            start = time.time()
+            for _ in xrange(options['repeat']):
+                field_data_cache = FieldDataCache(problems, COURSE_ID, user)
+                with field_data_cache.deferred_saves():
+                    self._check_problems(problems, user, options['responses'], field_data_cache)
+            self._report('check every problem, deferred', start, options['repeat'])
+        finally:
+            user.delete()
+
+    def _check_problems(self, problems, user, num_responses, field_data_cache):
+        """
+        Writes the fields that checking each of problems writes, through field_data_cache.
+        """
+        kvs = DjangoKeyValueStore(field_data_cache)
+        for problem in problems:
+            state = self._problem_state(problem.location, num_responses)
+            kvs.set_many(dict(
+                (DjangoKeyValueStore.Key(Scope.user_state, user.id, problem.location, field_name), state[field_name])
+                for field_name in CHECK_FIELDS
+            ))
+
+    def _problem_state(self, location, num_responses):
+        """
+        Returns the state of the answered capa problem at location, with num_responses responses.
+        """
+        answer_ids = ['{0}_{1}_1'.format(location.html_id(), index + 2) for index in xrange(num_responses)]
+        return {
+            'attempts': 2,
+            'done': True,
+            'seed': 1,
+            'last_submission_time': '2013-11-01T12:00:00Z',
+            'student_answers': dict((answer_id, 'benchmark answer') for answer_id in answer_ids),
+            'input_state': dict((answer_id, {}) for answer_id in answer_ids),
+            'correct_map': dict(
+                (answer_id, {
+                    'correctness': 'correct',
+                    'npoints': None,
+                    'msg': '<p>Well done, that is the expected answer.</p>',
+                    'hint': '',
+                    'hintmode': None,
+                    'queuestate': None,
+                })
+                for answer_id in answer_ids
+            ),
+        }
+
+    def _report(self, name, start, repeat):
+        """
+        Writes the time taken per unit since `start` for `repeat` units.
+        """
+        elapsed = time.time() - start
+        self.stdout.write("{0:<32} {1:8.3f}s  {2:8.2f}ms/unit\n".format(
+            name, elapsed, elapsed * 1000 / repeat
+        ))
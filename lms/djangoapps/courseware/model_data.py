@@ -2,18 +2,21 @@
 Classes to provide the LMS runtime data storage to XBlocks
 """
 
+import copy
 import json
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from contextlib import contextmanager
 from itertools import chain
 from .models import (
     StudentModule,
+    StudentModuleHistory,
     XModuleUserStateSummaryField,
     XModuleStudentPrefsField,
     XModuleStudentInfoField
 )
 import logging
 
-from django.db import DatabaseError
+from django.db import DatabaseError, IntegrityError, transaction
 
 from xblock.runtime import KeyValueStore
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
@@ -21,6 +24,14 @@ from xblock.fields import Scope
 
 log = logging.getLogger(__name__)
 
+# The scope of the fields stored by each of the model classes
+_MODEL_SCOPES = {
+    StudentModule: Scope.user_state,
+    XModuleUserStateSummaryField: Scope.user_state_summary,
+    XModuleStudentPrefsField: Scope.preferences,
+    XModuleStudentInfoField: Scope.user_info,
+}
+
 
 class InvalidWriteError(Exception):
     """
@@ -37,6 +48,16 @@ def chunks(items, chunk_size):
     return (items[i:i + chunk_size] for i in xrange(0, len(items), chunk_size))
 
 
+def _copy_value(value):
+    """
+    Returns a copy of value, a field value of a decoded state, that can be changed
+    without changing the state, as if it had been decoded on its own
+    """
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
 class FieldDataCache(object):
     """
     A cache of django model objects needed to supply the data
@@ -56,6 +77,15 @@ class FieldDataCache(object):
         select_for_update: True if rows should be locked until end of transaction
         '''
         self.cache = {}
+        # maps the cache keys of StudentModules to (the state they were decoded
+        # from, the decoded state), for the StudentModules whose state was read
+        self._states = {}
+        # the cache keys of the StudentModules whose decoded state was changed
+        # since it was last serialized
+        self._dirty_states = set()
+        # while saves are deferred, maps the cache keys of the model data objects
+        # to save to the objects, in the order they were first saved
+        self._pending_saves = None
         self.descriptors = descriptors
         self.select_for_update = select_for_update
         self.course_id = course_id
@@ -226,37 +256,289 @@ class FieldDataCache(object):
         if field_object is not None:
             return field_object
 
+        defaults = {}
         if key.scope == Scope.user_state:
-            field_object, _ = StudentModule.objects.get_or_create(
-                course_id=self.course_id,
-                student=self.user,
-                module_state_key=key.block_scope_id.url(),
-                defaults={
-                    'state': json.dumps({}),
-                    'module_type': key.block_scope_id.category,
-                },
-            )
+            model_class = StudentModule
+            lookup = {
+                'course_id': self.course_id,
+                'student': self.user,
+                'module_state_key': key.block_scope_id.url(),
+            }
+            defaults = {
+                'state': json.dumps({}),
+                'module_type': key.block_scope_id.category,
+            }
         elif key.scope == Scope.user_state_summary:
-            field_object, _ = XModuleUserStateSummaryField.objects.get_or_create(
-                field_name=key.field_name,
-                usage_id=key.block_scope_id.url()
-            )
+            model_class = XModuleUserStateSummaryField
+            lookup = {
+                'field_name': key.field_name,
+                'usage_id': key.block_scope_id.url(),
+            }
         elif key.scope == Scope.preferences:
-            field_object, _ = XModuleStudentPrefsField.objects.get_or_create(
-                field_name=key.field_name,
-                module_type=key.block_scope_id,
-                student=self.user,
-            )
+            model_class = XModuleStudentPrefsField
+            lookup = {
+                'field_name': key.field_name,
+                'module_type': key.block_scope_id,
+                'student': self.user,
+            }
         elif key.scope == Scope.user_info:
-            field_object, _ = XModuleStudentInfoField.objects.get_or_create(
-                field_name=key.field_name,
-                student=self.user,
-            )
+            model_class = XModuleStudentInfoField
+            lookup = {
+                'field_name': key.field_name,
+                'student': self.user,
+            }
+
+        if self._pending_saves is None:
+            field_object, _ = model_class.objects.get_or_create(defaults=defaults, **lookup)
+        else:
+            # The row is inserted along with the other new rows when the saves are flushed
+            field_object = model_class(**dict(lookup, **defaults))
 
         cache_key = self._cache_key_from_kvs_key(key)
         self.cache[cache_key] = field_object
         return field_object
 
+    def get_state(self, student_module):
+        '''
+        Returns the state of student_module, a StudentModule of this cache, as a
+        dict. The state is only decoded the first time it's asked for; changes
+        to the dict must be reported with `mark_state_dirty`.
+        '''
+        cache_key = self._cache_key_from_field_object(Scope.user_state, student_module)
+        entry = self._states.get(cache_key)
+        if entry is not None and (cache_key in self._dirty_states or entry[0] is student_module.state):
+            return entry[1]
+
+        # the state wasn't decoded yet, or was replaced since
+        state = json.loads(student_module.state) if student_module.state else {}
+        self._states[cache_key] = (student_module.state, state)
+        self._dirty_states.discard(cache_key)
+        return state
+
+    def mark_state_dirty(self, student_module):
+        '''
+        Records that the dict returned by `get_state` for student_module was changed
+        '''
+        self._dirty_states.add(self._cache_key_from_field_object(Scope.user_state, student_module))
+
+    def serialize_state(self, student_module):
+        '''
+        Stores the changes to the state dict of student_module in its `state`, so
+        that it can be saved
+        '''
+        cache_key = self._cache_key_from_field_object(Scope.user_state, student_module)
+        if cache_key in self._dirty_states:
+            self._dirty_states.discard(cache_key)
+            state = self._states.pop(cache_key)[1]
+            # if the state can't be serialized, it's decoded from its last stored
+            # value again by the next `get_state`
+            student_module.state = json.dumps(state)
+            self._states[cache_key] = (student_module.state, state)
+
+    def save(self, field_object):
+        '''
+        Saves field_object, a model data object of this cache, now, or when the
+        saves are flushed if they are deferred (see `deferred_saves`).
+        '''
+        scope = _MODEL_SCOPES[type(field_object)]
+        if self._pending_saves is not None:
+            self._pending_saves.setdefault(self._cache_key_from_field_object(scope, field_object), field_object)
+            return
+
+        if scope == Scope.user_state:
+            self.serialize_state(field_object)
+        field_object.save()
+
+    def delete(self, key):
+        '''
+        Deletes the model data object of key, which must be a field that's
+        stored in its own row, i.e. not in Scope.user_state.
+        '''
+        cache_key = self._cache_key_from_kvs_key(key)
+        field_object = self.cache.pop(cache_key)
+        if self._pending_saves is not None:
+            self._pending_saves.pop(cache_key, None)
+        if field_object.pk is not None:
+            field_object.delete()
+
+    @contextmanager
+    def deferred_saves(self):
+        '''
+        Defers the saves of model data objects, and the inserts of the new ones,
+        until the end of the with block, where they are flushed (see `flush`).
+        Saves that are still pending when the block raises an exception are
+        dropped, as the rest of the request's writes are rolled back then.
+        '''
+        self._pending_saves = OrderedDict()
+        try:
+            yield self
+            self.flush()
+        finally:
+            self._pending_saves = None
+
+    def flush(self):
+        '''
+        Writes the model data objects whose saves were deferred, all or none of
+        them (see _atomic_writes). Each object is written once however many
+        times it was saved, and the new ones are inserted in bulk, with one
+        query per model.
+
+        Raises KeyValueMultiSaveError if the objects can't be written.
+        '''
+        if not self._pending_saves:
+            return
+        pending = self._pending_saves.items()
+        self._pending_saves = OrderedDict()
+
+        new_objects = defaultdict(list)
+        try:
+            with self._atomic_writes():
+                for cache_key, field_object in pending:
+                    scope = cache_key[0]
+                    if scope == Scope.user_state:
+                        self.serialize_state(field_object)
+                    if field_object.pk is None:
+                        new_objects[scope].append(field_object)
+                    else:
+                        field_object.save()
+                for scope, field_objects in new_objects.items():
+                    self._insert_field_objects(scope, field_objects)
+        except DatabaseError:
+            log.error('Error saving %r', [field_object for _, field_object in pending])
+            for field_objects in new_objects.itervalues():
+                for field_object in field_objects:
+                    field_object.pk = None
+            raise KeyValueMultiSaveError([])
+
+    @contextmanager
+    def _atomic_writes(self):
+        '''
+        Makes the writes of the with block all or nothing. Outside of a managed
+        transaction they are committed in a transaction of their own. Inside one,
+        such as the transaction of each request that TransactionMiddleware
+        manages, they are made in a savepoint instead, and the transaction
+        commits them with the rest of the request: committing or rolling it back
+        here would end the transaction of the request early.
+
+        Django 1.4 doesn't make savepoints on MySQL, so there a failed write
+        only rolls back its own statement, and the rest of the block is rolled
+        back with the transaction of the request, when the error it raises
+        fails the request.
+        '''
+        if transaction.is_managed():
+            savepoint = transaction.savepoint()
+            try:
+                yield
+            except DatabaseError:
+                transaction.savepoint_rollback(savepoint)
+                raise
+            transaction.savepoint_commit(savepoint)
+        else:
+            with transaction.commit_on_success():
+                yield
+
+    def _insert_field_objects(self, scope, field_objects):
+        '''
+        Inserts the new model data objects field_objects, of fields in scope, and
+        sets their ids. The objects whose rows were inserted by another request
+        since this cache was loaded update those rows instead.
+
+        Recovering from the IntegrityError of such a row relies on the failed
+        bulk insert writing no rows: on PostgreSQL the savepoint around it is
+        rolled back, and on MySQL, where Django 1.4 makes no savepoints, InnoDB
+        rolls back the failed statement by itself.
+        '''
+        model_class = type(field_objects[0])
+        savepoint = transaction.savepoint()
+        try:
+            model_class.objects.bulk_create(field_objects)
+        except IntegrityError:
+            transaction.savepoint_rollback(savepoint)
+            existing = self._existing_field_objects(scope, field_objects)
+            inserts = []
+            for field_object in field_objects:
+                row = existing.get(self._cache_key_from_field_object(scope, field_object))
+                if row is None:
+                    inserts.append(field_object)
+                else:
+                    self._merge_into_row(scope, field_object, row)
+                    field_object.save()
+            model_class.objects.bulk_create(inserts)
+        else:
+            transaction.savepoint_commit(savepoint)
+
+        inserted = [field_object for field_object in field_objects if field_object.pk is None]
+        ids = dict(
+            (cache_key, row.pk)
+            for cache_key, row in self._existing_field_objects(scope, inserted).iteritems()
+        )
+        for field_object in inserted:
+            field_object.pk = ids[self._cache_key_from_field_object(scope, field_object)]
+
+        # bulk inserts don't send post_save, which records the history of StudentModules
+        if scope == Scope.user_state:
+            StudentModuleHistory.objects.bulk_create([
+                StudentModuleHistory.entry_for(student_module)
+                for student_module in inserted
+                if student_module.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES
+            ])
+
+    def _existing_field_objects(self, scope, field_objects):
+        '''
+        Returns a dict mapping the cache keys of those of the model data objects
+        field_objects, of fields in scope, that are stored in the database, to
+        their rows.
+        '''
+        if not field_objects:
+            return {}
+        if scope == Scope.user_state:
+            rows = self._chunked_query(
+                StudentModule,
+                'module_state_key__in',
+                [field_object.module_state_key for field_object in field_objects],
+                course_id=self.course_id,
+                student=self.user.pk,
+            )
+        elif scope == Scope.user_state_summary:
+            rows = self._chunked_query(
+                XModuleUserStateSummaryField,
+                'usage_id__in',
+                set(field_object.usage_id for field_object in field_objects),
+                field_name__in=set(field_object.field_name for field_object in field_objects),
+            )
+        elif scope == Scope.preferences:
+            rows = self._chunked_query(
+                XModuleStudentPrefsField,
+                'module_type__in',
+                set(field_object.module_type for field_object in field_objects),
+                student=self.user.pk,
+                field_name__in=set(field_object.field_name for field_object in field_objects),
+            )
+        elif scope == Scope.user_info:
+            rows = self._query(
+                XModuleStudentInfoField,
+                student=self.user.pk,
+                field_name__in=set(field_object.field_name for field_object in field_objects),
+            )
+        return dict((self._cache_key_from_field_object(scope, row), row) for row in rows)
+
+    def _merge_into_row(self, scope, field_object, row):
+        '''
+        Makes the new model data object field_object, of fields in scope, update
+        row, which holds the same fields. The fields of a StudentModule state
+        that weren't set in field_object keep their values of row.
+        '''
+        field_object.pk = row.pk
+        field_object.created = row.created
+        if scope == Scope.user_state:
+            state = json.loads(row.state) if row.state else {}
+            state.update(self.get_state(field_object))
+            field_object.state = json.dumps(state)
+            self._states[self._cache_key_from_field_object(scope, field_object)] = (field_object.state, state)
+            if field_object.max_grade is None:
+                field_object.grade = row.grade
+                field_object.max_grade = row.max_grade
+
 
 class DjangoKeyValueStore(KeyValueStore):
     """
@@ -296,7 +578,7 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            return json.loads(field_object.state)[key.field_name]
+            return _copy_value(self._field_data_cache.get_state(field_object)[key.field_name])
         else:
             return json.loads(field_object.value)
 
@@ -315,8 +597,10 @@ class DjangoKeyValueStore(KeyValueStore):
 
         """
         saved_fields = []
-        # field_objects maps a field_object to a list of associated fields
-        field_objects = dict()
+        # field_objects maps the id of a field_object to the field_object and a
+        # list of associated fields. Model objects that aren't saved yet are
+        # all equal, so they can't be keys themselves.
+        field_objects = {}
         for field in kv_dict:
             # Check field for validity
             if field.scope not in self._allowed_scopes:
@@ -324,30 +608,30 @@ class DjangoKeyValueStore(KeyValueStore):
 
             # If the field is valid and isn't already in the dictionary, add it.
             field_object = self._field_data_cache.find_or_create(field)
-            if field_object not in field_objects.keys():
-                field_objects[field_object] = []
             # Update the list of associated fields
-            field_objects[field_object].append(field)
+            field_objects.setdefault(id(field_object), (field_object, []))[1].append(field)
 
             # Special case when scope is for the user state, because this scope saves fields in a single row
             if field.scope == Scope.user_state:
-                state = json.loads(field_object.state)
-                state[field.field_name] = kv_dict[field]
-                field_object.state = json.dumps(state)
+                self._field_data_cache.get_state(field_object)[field.field_name] = _copy_value(kv_dict[field])
+                self._field_data_cache.mark_state_dirty(field_object)
             else:
             # The remaining scopes save fields on different rows, so
             # we don't have to worry about conflicts
                 field_object.value = json.dumps(kv_dict[field])
 
-        for field_object in field_objects:
+        # Existing rows are saved in the order they were created, then new ones
+        field_objects = sorted(field_objects.values(), key=lambda entry: (entry[0].pk is None, entry[0].pk))
+        for field_object, fields in field_objects:
             try:
-                # Save the field object that we made above
-                field_object.save()
+                # Save the field object that we made above. Its state is
+                # serialized once, however many of its fields were set.
+                self._field_data_cache.save(field_object)
                 # If save is successful on this scope, add the saved fields to
                 # the list of successful saves
-                saved_fields.extend([field.field_name for field in field_objects[field_object]])
+                saved_fields.extend([field.field_name for field in fields])
             except DatabaseError:
-                log.error('Error saving fields %r', field_objects[field_object])
+                log.error('Error saving fields %r', fields)
                 raise KeyValueMultiSaveError(saved_fields)
 
     def delete(self, key):
@@ -359,12 +643,11 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            state = json.loads(field_object.state)
-            del state[key.field_name]
-            field_object.state = json.dumps(state)
-            field_object.save()
+            del self._field_data_cache.get_state(field_object)[key.field_name]
+            self._field_data_cache.mark_state_dirty(field_object)
+            self._field_data_cache.save(field_object)
         else:
-            field_object.delete()
+            self._field_data_cache.delete(key)
 
     def has(self, key):
         if key.scope not in self._allowed_scopes:
@@ -375,6 +658,6 @@ class DjangoKeyValueStore(KeyValueStore):
             return False
 
         if key.scope == Scope.user_state:
-            return key.field_name in json.loads(field_object.state)
+            return key.field_name in self._field_data_cache.get_state(field_object)
         else:
             return True
@@ -12,10 +12,14 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import hashlib
+import json
+
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models.signals import post_save
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from xblock.fields import Scope
 
 
 class StudentModule(models.Model):
@@ -90,16 +94,151 @@ class StudentModuleHistory(models.Model):
     grade = models.FloatField(null=True, blank=True)
     max_grade = models.FloatField(null=True, blank=True)
 
+    @classmethod
+    def entry_for(cls, student_module):
+        """
+        Returns a new, unsaved, history entry of the current state of student_module
+        """
+        return cls(student_module=student_module,
+                   version=None,
+                   created=student_module.modified,
+                   state=student_module.state,
+                   grade=student_module.grade,
+                   max_grade=student_module.max_grade)
+
     @receiver(post_save, sender=StudentModule)
     def save_history(sender, instance, **kwargs):
         if instance.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES:
-            history_entry = StudentModuleHistory(student_module=instance,
-                                                 version=None,
-                                                 created=instance.modified,
-                                                 state=instance.state,
-                                                 grade=instance.grade,
-                                                 max_grade=instance.max_grade)
-            history_entry.save()
+            StudentModuleHistory.entry_for(instance).save()
+
+
+class StudentSectionScore(models.Model):
+    """
+    Persisted raw scores for the scored problems in one graded section
+    (sequential) of a course, for a single student.
+
+    `scores` is a JSON dict mapping problem location urls to unweighted
+    [correct, total, version] triples, where version is the problem_version of
+    the problem that was scored. Rows are written by courseware.grades.grade()
+    the first time it grades a section that the student has seen, and are kept
+    up to date by the grade events published from module_render. A stored
+    score whose version isn't the one of the problem being graded, e.g. after
+    the problem was edited in Studio, is recomputed. Problem weights and the
+    graded flag are applied when the scores are read, so they can change
+    without invalidating stored rows.
+    """
+
+    class Meta:
+        unique_together = (('student', 'course_id', 'section_location'),)
+
+    student = models.ForeignKey(User, db_index=True)
+    course_id = models.CharField(max_length=255, db_index=True)
+    section_location = models.CharField(max_length=255)
+
+    scores = models.TextField(default='{}')
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __repr__(self):
+        return 'StudentSectionScore<%r>' % ({
+            'course_id': self.course_id,
+            'student': self.student.username,
+            'section_location': self.section_location,
+            'scores': str(self.scores)[:20],
+        },)
+
+    def __unicode__(self):
+        return unicode(repr(self))
+
+    @staticmethod
+    def problem_version(problem_descriptor):
+        """
+        Returns a stamp of the version of a problem, which changes with every
+        edit of its content or settings.
+        """
+        return hashlib.md5(json.dumps(
+            [
+                problem_descriptor.get_explicitly_set_fields_by_scope(Scope.content),
+                problem_descriptor.get_explicitly_set_fields_by_scope(Scope.settings),
+            ],
+            sort_keys=True,
+            default=unicode,
+        )).hexdigest()
+
+    @classmethod
+    def scores_for_course(cls, student, course_id):
+        """
+        Returns a dict mapping section location urls to the stored
+        {problem location url: (correct, total, version)} dicts for every
+        section of `course_id` that has been stored for `student`. Scores
+        stored without a version have the version None.
+        """
+        rows = cls.objects.filter(student=student, course_id=course_id)
+        return dict(
+            (
+                row.section_location,
+                dict((key, (tuple(value) + (None,))[:3]) for key, value in json.loads(row.scores).iteritems())
+            )
+            for row in rows
+        )
+
+    @classmethod
+    def save_section(cls, student, course_id, section_location, scores):
+        """
+        Creates or replaces the stored scores for a single section.
+
+        scores: dict mapping problem location urls to unweighted (correct, total, version)
+        """
+        row, created = cls.objects.get_or_create(
+            student=student,
+            course_id=course_id,
+            section_location=section_location,
+            defaults={'scores': json.dumps(scores)},
+        )
+        if not created:
+            row.scores = json.dumps(scores)
+            row.save()
+
+    @classmethod
+    @transaction.commit_on_success
+    def update_problem_score(cls, student_id, course_id, problem_location, correct, total, version):
+        """
+        Updates the stored score of `problem_location`, scored at `version` of
+        the problem, in every stored section that contains it. Sections that
+        haven't been stored yet are left alone: they are computed from
+        StudentModule the next time the student is graded.
+
+        If `total` is None, the problem is removed from the stored sections,
+        so that its score is recomputed from the module on the next read.
+        """
+        rows = cls.objects.select_for_update().filter(student=student_id, course_id=course_id)
+        for row in rows:
+            scores = json.loads(row.scores)
+            if problem_location not in scores:
+                continue
+
+            if total is None:
+                del scores[problem_location]
+            else:
+                scores[problem_location] = [correct if correct is not None else 0, total, version]
+            row.scores = json.dumps(scores)
+            row.save()
+
+    @classmethod
+    def clear(cls, student_id, course_id):
+        """
+        Removes all stored section scores of a student in a course.
+        """
+        cls.objects.filter(student=student_id, course_id=course_id).delete()
+
+    @receiver(post_delete, sender=StudentModule)
+    def clear_deleted_module_scores(sender, instance, **kwargs):
+        """
+        Deleting student state (e.g. from the instructor dashboard) can make a
+        section unseen again, so drop the stored scores for the whole course.
+        """
+        StudentSectionScore.clear(instance.student_id, instance.course_id)
 
 
 class XModuleUserStateSummaryField(models.Model):
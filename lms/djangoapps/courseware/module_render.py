@@ -20,6 +20,7 @@ from capa.xqueue_interface import XQueueInterface
 from courseware.access import has_access
 from courseware.masquerade import setup_masquerade
 from courseware.model_data import FieldDataCache, DjangoKeyValueStore
+from courseware.models import StudentSectionScore
 from lms.lib.xblock.field_data import LmsFieldData
 from lms.lib.xblock.runtime import LmsModuleSystem, handler_prefix, unquote_slashes
 from mitxmako.shortcuts import render_to_string
@@ -303,7 +304,18 @@ def get_module_for_descriptor_internal(user, descriptor, field_data_cache, cours
         student_module.grade = event.get('value')
         student_module.max_grade = event.get('max_value')
         # Save all changes to the underlying KeyValueStore
-        student_module.save()
+        field_data_cache.save(student_module)
+
+        # Keep the stored section scores used by grades.grade() in sync
+        if settings.MITX_FEATURES.get('ENABLE_PERSISTENT_SECTION_SCORES'):
+            StudentSectionScore.update_problem_score(
+                user.id,
+                course_id,
+                descriptor.location.url(),
+                student_module.grade,
+                student_module.max_grade,
+                StudentSectionScore.problem_version(descriptor),
+            )
 
         # Bin score into range and increment stats
         score_bucket = get_score_bucket(student_module.grade, student_module.max_grade)
@@ -537,28 +549,30 @@ def handle_xblock_callback(request, course_id, usage_id, handler, suffix=None):
         raise Http404
 
     req = django_to_webob_request(request)
-    try:
-        resp = instance.handle(handler, req, suffix)
+    # The state the handler saves is written at once when it's done
+    with field_data_cache.deferred_saves():
+        try:
+            resp = instance.handle(handler, req, suffix)
 
-    except NoSuchHandlerError:
-        log.exception("XBlock %s attempted to access missing handler %r", instance, handler)
-        raise Http404
+        except NoSuchHandlerError:
+            log.exception("XBlock %s attempted to access missing handler %r", instance, handler)
+            raise Http404
 
-    # If we can't find the module, respond with a 404
-    except NotFoundError:
-        log.exception("Module indicating to user that request doesn't exist")
-        raise Http404
+        # If we can't find the module, respond with a 404
+        except NotFoundError:
+            log.exception("Module indicating to user that request doesn't exist")
+            raise Http404
 
-    # For XModule-specific errors, we log the error and respond with an error message
-    except ProcessingError as err:
-        log.warning("Module encountered an error while processing AJAX call",
-                    exc_info=True)
-        return JsonResponse(object={'success': err.args[0]}, status=200)
+        # For XModule-specific errors, we log the error and respond with an error message
+        except ProcessingError as err:
+            log.warning("Module encountered an error while processing AJAX call",
+                        exc_info=True)
+            return JsonResponse(object={'success': err.args[0]}, status=200)
 
-    # If any other error occurred, re-raise it to trigger a 500 response
-    except Exception:
-        log.exception("error executing xblock handler")
-        raise
+        # If any other error occurred, re-raise it to trigger a 500 response
+        except Exception:
+            log.exception("error executing xblock handler")
+            raise
 
     return webob_to_django_response(resp)
 
@@ -8,6 +8,7 @@ from functools import partial
 
 from django.contrib.auth.models import User, Group
 
+from student.models import AccessContext, clear_access_context
 from xmodule.modulestore import Location
 
 
@@ -94,14 +95,10 @@ class GroupBasedRole(AccessRole):
         """
         Return whether the supplied django user has access to this role.
         """
-        # pylint: disable=protected-access
         if not user.is_authenticated():
             return False
 
-        if not hasattr(user, '_groups'):
-            user._groups = set(name.lower() for name in user.groups.values_list('name', flat=True))
-
-        return len(user._groups.intersection(self._group_names)) > 0
+        return AccessContext.for_user(user).in_any_group(self._group_names)
 
     def add_users(self, *users):
         """
@@ -110,8 +107,7 @@ class GroupBasedRole(AccessRole):
         group, _ = Group.objects.get_or_create(name=self._group_names[0])
         group.user_set.add(*users)
         for user in users:
-            if hasattr(user, '_groups'):
-                del user._groups
+            clear_access_context(user)
 
     def remove_users(self, *users):
         """
@@ -120,8 +116,7 @@ class GroupBasedRole(AccessRole):
         group, _ = Group.objects.get_or_create(name=self._group_names[0])
         group.user_set.remove(*users)
         for user in users:
-            if hasattr(user, '_groups'):
-                del user._groups
+            clear_access_context(user)
 
     def users_with_role(self):
         """
@@ -0,0 +1,148 @@
+"""
+Tests that grading students in batches gives the same results as grading them
+one at a time.
+"""
+import numpy
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from courseware import grades
+from courseware.batch_grades import iterate_grades_for, section_totals
+from courseware.roles import CourseStaffRole
+from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
+from courseware.tests.test_submitting_problems import TestSubmittingProblems
+from xmodule.modulestore.django import editable_modulestore
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestBatchGradesParity(TestSubmittingProblems):
+    """
+    Compares the gradesets of batch_grades.iterate_grades_for with the ones of
+    grades.grade.
+    """
+
+    def setUp(self):
+        super(TestBatchGradesParity, self).setUp()
+
+        grading_policy = {
+            "GRADER": [{
+                "type": "Homework",
+                "min_count": 3,
+                "drop_count": 1,
+                "short_label": "HW",
+                "weight": 0.25
+            }, {
+                "type": "Final",
+                "name": "Final Section",
+                "short_label": "Final",
+                "weight": 0.75
+            }],
+            "GRADE_CUTOFFS": {
+                'A': .9,
+                'B': .33
+            }
+        }
+        store = editable_modulestore('direct')
+        store.update_item(self.course.location, {'grading_policy': grading_policy})
+        self.refresh_course()
+
+        self.homework1 = self.add_graded_section_to_course('homework1')
+        self.add_dropdown_to_section(self.homework1.location, 'h1p1', 1)
+        self.add_dropdown_to_section(self.homework1.location, 'h1p2', 2)
+        self.homework2 = self.add_graded_section_to_course('homework2')
+        self.add_dropdown_to_section(self.homework2.location, 'h2p1', 3)
+        self.final = self.add_graded_section_to_course('Final Section', 'Final')
+        self.add_dropdown_to_section(self.final.location, 'FinalQuestion', 2)
+
+        self.students = [self.student_user]
+        for index in range(2, 5):
+            email = 'view{0}@test.com'.format(index)
+            self.create_account('u{0}'.format(index), email, self.password)
+            self.activate_user(email)
+            self.students.append(User.objects.get(email=email))
+
+    def submit_as(self, student, problem_url_name, responses):
+        """
+        Logs in as `student` and submits `responses` to a problem.
+        """
+        self.logout()
+        self.login(student.email, self.password)
+        self.enroll(self.course)
+        self.submit_question_answer(problem_url_name, responses)
+
+    def assert_parity(self, keep_raw_scores=False):
+        """
+        Asserts that every student gets the same grades from both graders.
+        """
+        request = self.factory.get(reverse('progress', kwargs={'course_id': self.course.id}))
+        batch = list(iterate_grades_for(self.course, self.students, request, keep_raw_scores=keep_raw_scores))
+        self.assertEqual(self.students, [student for student, _ in batch])
+
+        for student, gradeset in batch:
+            expected = grades.grade(student, request, self.course, keep_raw_scores=keep_raw_scores)
+            self.assertAlmostEqual(expected['percent'], gradeset['percent'])
+            self.assertEqual(expected['grade'], gradeset['grade'])
+            self.assertEqual(
+                [(section['label'], section['detail']) for section in expected['section_breakdown']],
+                [(section['label'], section['detail']) for section in gradeset['section_breakdown']],
+            )
+            for expected_section, section in zip(expected['section_breakdown'], gradeset['section_breakdown']):
+                self.assertAlmostEqual(expected_section['percent'], section['percent'])
+            self.assertEqual(
+                [detail['detail'] for detail in expected['grade_breakdown']],
+                [detail['detail'] for detail in gradeset['grade_breakdown']],
+            )
+            if keep_raw_scores:
+                self.assertEqual(
+                    [(score.earned, score.possible, score.graded, score.section) for score in expected['raw_scores']],
+                    [(score.earned, score.possible, score.graded, score.section) for score in gradeset['raw_scores']],
+                )
+
+    def test_no_submissions(self):
+        self.assert_parity()
+
+    def test_mixed_submissions(self):
+        self.submit_as(self.students[0], 'h1p1', {'2_1': 'Correct'})
+        self.submit_as(self.students[0], 'FinalQuestion', {'2_1': 'Correct', '2_2': 'Incorrect'})
+        self.submit_as(self.students[1], 'h1p2', {'2_1': 'Incorrect', '2_2': 'Correct'})
+        self.submit_as(self.students[1], 'h2p1', {'2_1': 'Correct', '2_2': 'Correct', '2_3': 'Correct'})
+        self.submit_as(self.students[2], 'FinalQuestion', {'2_1': 'Correct', '2_2': 'Correct'})
+        self.assert_parity()
+
+    def test_raw_scores(self):
+        self.submit_as(self.students[0], 'h1p2', {'2_1': 'Correct', '2_2': 'Correct'})
+        self.submit_as(self.students[1], 'h2p1', {'2_1': 'Correct', '2_2': 'Incorrect', '2_3': 'Correct'})
+        self.assert_parity(keep_raw_scores=True)
+
+    def test_privileged_students(self):
+        CourseStaffRole(self.course.location).add_users(self.students[3])
+        self.submit_as(self.students[3], 'h1p1', {'2_1': 'Correct'})
+        self.assert_parity()
+
+
+class TestSectionTotals(TestCase):
+    """
+    Tests of the vectorized section aggregation
+    """
+    def test_section_totals(self):
+        nan = numpy.nan
+        # Two students, three problems in two sections
+        earned = numpy.array([[1.0, 2.0, 0.0], [0.0, 0.0, 3.0]])
+        possible = numpy.array([[2.0, 4.0, nan], [2.0, 0.0, 3.0]])
+        weights = numpy.array([nan, 1.0, 6.0])
+        graded = numpy.array([True, True, False])
+        membership = numpy.array([[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+
+        earned, possible, scored_earned, scored_possible = section_totals(
+            earned, possible, weights, graded, membership
+        )
+
+        # The second problem is reweighted to 1 point
+        self.assertEqual([1.0, 0.5, 0.0], list(earned[0]))
+        self.assertTrue(numpy.isnan(possible[0, 2]))
+        # 0 point problems and ungraded problems don't count
+        self.assertEqual([[1.5, 0.0], [0.0, 0.0]], scored_earned.tolist())
+        self.assertEqual([[3.0, 0.0], [2.0, 0.0]], scored_possible.tolist())
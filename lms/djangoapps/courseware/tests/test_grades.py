@@ -0,0 +1,252 @@
+"""
+Tests for the stored section scores and cached max scores used by courseware.grades
+"""
+from functools import partial
+from mock import Mock, patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from capa.tests.response_xml_factory import OptionResponseXMLFactory
+from courseware import grades
+from courseware.grades import get_max_score, max_score_cache_key, weight_score
+from courseware.models import StudentSectionScore
+from courseware.tests.factories import StudentModuleFactory, UserFactory
+from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
+from courseware.tests.test_submitting_problems import TestSubmittingProblems
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import editable_modulestore
+
+location = partial(Location, 'i4x', 'edX', 'test_course')
+course_id = 'edX/test_course/test'
+
+
+class TestStudentSectionScore(TestCase):
+    """
+    Tests of reading and incrementally updating StudentSectionScore rows
+    """
+    def setUp(self):
+        self.user = UserFactory.create()
+        self.section = location('sequential', 'section').url()
+        self.other_section = location('sequential', 'other_section').url()
+        self.problem = location('problem', 'problem').url()
+        self.other_problem = location('problem', 'other_problem').url()
+
+        StudentSectionScore.save_section(self.user, course_id, self.section, {self.problem: (0, 2, 'v1')})
+        StudentSectionScore.save_section(self.user, course_id, self.other_section, {self.other_problem: (1, 3, 'v1')})
+
+    def test_scores_for_course(self):
+        self.assertEquals(
+            {
+                self.section: {self.problem: (0, 2, 'v1')},
+                self.other_section: {self.other_problem: (1, 3, 'v1')},
+            },
+            StudentSectionScore.scores_for_course(self.user, course_id)
+        )
+        self.assertEquals({}, StudentSectionScore.scores_for_course(self.user, 'edX/other_course/test'))
+
+    def test_scores_without_version(self):
+        StudentSectionScore.save_section(self.user, course_id, self.section, {self.problem: (2, 2)})
+        self.assertEquals(
+            {self.problem: (2, 2, None)},
+            StudentSectionScore.scores_for_course(self.user, course_id)[self.section]
+        )
+
+    def test_save_section_replaces_scores(self):
+        StudentSectionScore.save_section(self.user, course_id, self.section, {self.problem: (2, 2, 'v2')})
+        self.assertEquals(
+            {self.problem: (2, 2, 'v2')},
+            StudentSectionScore.scores_for_course(self.user, course_id)[self.section]
+        )
+
+    def test_update_problem_score(self):
+        StudentSectionScore.update_problem_score(self.user.id, course_id, self.problem, 1, 2, 'v2')
+        scores = StudentSectionScore.scores_for_course(self.user, course_id)
+        self.assertEquals({self.problem: (1, 2, 'v2')}, scores[self.section])
+        self.assertEquals({self.other_problem: (1, 3, 'v1')}, scores[self.other_section])
+
+    def test_update_problem_score_without_grade(self):
+        StudentSectionScore.update_problem_score(self.user.id, course_id, self.problem, None, 2, 'v1')
+        self.assertEquals(
+            {self.problem: (0, 2, 'v1')},
+            StudentSectionScore.scores_for_course(self.user, course_id)[self.section]
+        )
+
+    def test_update_problem_score_without_max_grade(self):
+        StudentSectionScore.update_problem_score(self.user.id, course_id, self.problem, 1, None, 'v1')
+        self.assertEquals({}, StudentSectionScore.scores_for_course(self.user, course_id)[self.section])
+
+    def test_update_unstored_problem(self):
+        StudentSectionScore.update_problem_score(self.user.id, course_id, location('problem', 'new').url(), 1, 1, 'v1')
+        scores = StudentSectionScore.scores_for_course(self.user, course_id)
+        self.assertEquals({self.problem: (0, 2, 'v1')}, scores[self.section])
+        self.assertEquals({self.other_problem: (1, 3, 'v1')}, scores[self.other_section])
+
+    def test_deleting_state_clears_scores(self):
+        student_module = StudentModuleFactory.create(
+            student=self.user,
+            course_id=course_id,
+            module_state_key=self.problem,
+        )
+        student_module.delete()
+        self.assertEquals({}, StudentSectionScore.scores_for_course(self.user, course_id))
+
+    def test_problem_version(self):
+        fields = {'data': '<problem/>'}
+        descriptor = Mock()
+        descriptor.get_explicitly_set_fields_by_scope.side_effect = lambda scope: dict(fields)
+        version = StudentSectionScore.problem_version(descriptor)
+        self.assertEquals(version, StudentSectionScore.problem_version(descriptor))
+        fields['data'] = '<problem><p/></problem>'
+        self.assertNotEquals(version, StudentSectionScore.problem_version(descriptor))
+
+
+class TestWeightScore(TestCase):
+    """
+    Tests of applying problem weights to raw scores
+    """
+    def descriptor(self, weight, always_recalculate_grades=False):
+        descriptor = Mock()
+        descriptor.weight = weight
+        descriptor.always_recalculate_grades = always_recalculate_grades
+        return descriptor
+
+    def test_no_weight(self):
+        self.assertEquals((1, 4), weight_score(self.descriptor(None), 1, 4))
+
+    def test_weight(self):
+        self.assertEquals((5, 10), weight_score(self.descriptor(10), 2, 4))
+
+    def test_zero_total(self):
+        self.assertEquals((0, 0), weight_score(self.descriptor(10), 0, 0))
+
+    def test_always_recalculated(self):
+        self.assertEquals((1, 4), weight_score(self.descriptor(10, always_recalculate_grades=True), 1, 4))
+
+
+class TestMaxScoreCache(TestCase):
+    """
+    Tests of sharing the max score of problems between students
+    """
+    def setUp(self):
+        cache.clear()
+        self.fields = {'data': '<problem/>'}
+        self.problem = Mock()
+        self.problem.max_score.return_value = 3
+        self.module_creator = Mock(return_value=self.problem)
+
+    def descriptor(self, max_score_depends_on_seed=False):
+        descriptor = Mock()
+        descriptor.location = location('problem', 'problem')
+        descriptor.max_score_depends_on_seed = max_score_depends_on_seed
+        descriptor.get_explicitly_set_fields_by_scope.side_effect = lambda scope: dict(self.fields)
+        return descriptor
+
+    def test_max_score_is_cached(self):
+        descriptor = self.descriptor()
+        self.assertEquals(3, get_max_score(descriptor, self.module_creator))
+        self.assertEquals(3, get_max_score(descriptor, self.module_creator))
+        self.assertEquals(1, self.module_creator.call_count)
+
+    def test_edit_changes_key(self):
+        descriptor = self.descriptor()
+        key = max_score_cache_key(descriptor)
+        self.fields['data'] = '<problem><p/></problem>'
+        self.assertNotEquals(key, max_score_cache_key(descriptor))
+
+    def test_depends_on_seed(self):
+        descriptor = self.descriptor(max_score_depends_on_seed=True)
+        get_max_score(descriptor, self.module_creator)
+        get_max_score(descriptor, self.module_creator)
+        self.assertEquals(2, self.module_creator.call_count)
+
+    def test_unloadable_problem(self):
+        self.assertIsNone(get_max_score(self.descriptor(), Mock(return_value=None)))
+        self.problem.max_score.return_value = None
+        self.assertIsNone(get_max_score(self.descriptor(), self.module_creator))
+        self.assertIsNone(cache.get(max_score_cache_key(self.descriptor())))
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestPersistentSectionScoresParity(TestSubmittingProblems):
+    """
+    Compares grading with the stored section scores to grading from the modules
+    """
+    def setUp(self):
+        super(TestPersistentSectionScoresParity, self).setUp()
+        self.login(self.student, self.password)
+        self.homework = self.add_graded_section_to_course('homework')
+        self.add_dropdown_to_section(self.homework.location, 'p1', 1)
+        self.add_dropdown_to_section(self.homework.location, 'p2', 2)
+        self.final = self.add_graded_section_to_course('Final Section', 'Final')
+        self.add_dropdown_to_section(self.final.location, 'FinalQuestion', 2)
+
+    def grade(self, persistent):
+        """
+        Grades the student with the ENABLE_PERSISTENT_SECTION_SCORES feature on or off.
+        """
+        request = self.factory.get(reverse('progress', kwargs={'course_id': self.course.id}))
+        with patch.dict(settings.MITX_FEATURES, {'ENABLE_PERSISTENT_SECTION_SCORES': persistent}):
+            return grades.grade(self.student_user, request, self.course, keep_raw_scores=True)
+
+    def assert_parity(self):
+        """
+        Asserts that the student gets the same grades with the feature off as with it on,
+        both when the scores are stored and when they are read back.
+        """
+        expected = self.grade(False)
+        for _ in xrange(2):
+            gradeset = self.grade(True)
+            self.assertAlmostEqual(expected['percent'], gradeset['percent'])
+            self.assertEqual(expected['grade'], gradeset['grade'])
+            self.assertEqual(
+                [(section['label'], section['detail']) for section in expected['section_breakdown']],
+                [(section['label'], section['detail']) for section in gradeset['section_breakdown']],
+            )
+            self.assertEqual(
+                [(score.earned, score.possible, score.graded, score.section) for score in expected['raw_scores']],
+                [(score.earned, score.possible, score.graded, score.section) for score in gradeset['raw_scores']],
+            )
+
+    def stored_homework_scores(self):
+        """Returns the stored scores of the homework section of the student"""
+        stored_sections = StudentSectionScore.scores_for_course(self.student_user, self.course.id)
+        return stored_sections[self.homework.location.url()]
+
+    def test_no_submissions(self):
+        self.assert_parity()
+
+    def test_submissions(self):
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.assert_parity()
+        self.assertIn(self.problem_location('p1'), self.stored_homework_scores())
+
+        # the grade events of these update the stored scores
+        with patch.dict(settings.MITX_FEATURES, {'ENABLE_PERSISTENT_SECTION_SCORES': True}):
+            self.submit_question_answer('p2', {'2_1': 'Correct', '2_2': 'Incorrect'})
+            self.submit_question_answer('FinalQuestion', {'2_1': 'Correct', '2_2': 'Correct'})
+        self.assert_parity()
+
+    def test_edited_problem_regraded(self):
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.assert_parity()
+        stored_version = self.stored_homework_scores()[self.problem_location('p1')][2]
+
+        # publishing the problem with more responses changes its total
+        editable_modulestore('direct').update_item(
+            Location(self.problem_location('p1')),
+            OptionResponseXMLFactory().build_xml(
+                question_text='The correct answer is Correct',
+                num_inputs=3,
+                weight=3,
+                options=['Correct', 'Incorrect'],
+                correct_option='Correct'
+            )
+        )
+        self.refresh_course()
+        # the stored score of the old version isn't used, and is replaced
+        self.assert_parity()
+        self.assertNotEquals(stored_version, self.stored_homework_scores()[self.problem_location('p1')][2])
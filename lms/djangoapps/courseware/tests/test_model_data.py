@@ -7,7 +7,7 @@ from functools import partial
 
 from courseware.model_data import DjangoKeyValueStore
 from courseware.model_data import InvalidScopeError, FieldDataCache
-from courseware.models import StudentModule, XModuleUserStateSummaryField
+from courseware.models import StudentModule, StudentModuleHistory, XModuleUserStateSummaryField
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
 from student.tests.factories import UserFactory
@@ -148,6 +148,32 @@ class TestStudentModuleStorage(TestCase):
                 self.kvs.set_many(kv_dict)
         self.assertEquals(len(exception_context.exception.saved_field_names), 0)
 
+    def test_state_decoded_once(self):
+        "Test that the state of a StudentModule is decoded once, however many of its fields are read"
+        with patch('courseware.model_data.json.loads', wraps=json.loads) as mock_loads:
+            self.assertEquals('a_value', self.kvs.get(user_state_key('a_field')))
+            self.assertTrue(self.kvs.has(user_state_key('b_field')))
+            self.assertEquals('b_value', self.kvs.get(user_state_key('b_field')))
+        self.assertEquals(1, mock_loads.call_count)
+
+    def test_state_serialized_once(self):
+        "Test that setting many fields of a StudentModule serializes its state once"
+        with patch('courseware.model_data.json.dumps', wraps=json.dumps) as mock_dumps:
+            self.kvs.set_many(self.construct_kv_dict())
+        self.assertEquals(1, mock_dumps.call_count)
+
+    def test_changing_value_read(self):
+        "Test that changing a value read from the state doesn't change the state"
+        self.kvs.set(user_state_key('a_field'), {'answers': ['one']})
+        self.kvs.get(user_state_key('a_field'))['answers'].append('two')
+        self.assertEquals({'answers': ['one']}, self.kvs.get(user_state_key('a_field')))
+
+    def test_state_replaced(self):
+        "Test that the state is decoded again after the `state` of the StudentModule was replaced"
+        self.kvs.get(user_state_key('a_field'))
+        self.field_data_cache.find(user_state_key('a_field')).state = json.dumps({'a_field': 'replaced'})
+        self.assertEquals('replaced', self.kvs.get(user_state_key('a_field')))
+
 
 class TestMissingStudentModule(TestCase):
     def setUp(self):
@@ -184,6 +210,105 @@ class TestMissingStudentModule(TestCase):
         self.assertFalse(self.kvs.has(user_state_key('a_field')))
 
 
+class TestDeferredSaves(TestCase):
+    """
+    Tests of deferring the saves of a FieldDataCache until the end of a block
+    """
+    def setUp(self):
+        student_module = StudentModuleFactory(state=json.dumps({'a_field': 'a_value'}))
+        self.user = student_module.student
+        self.field_data_cache = FieldDataCache([mock_descriptor([mock_field(Scope.user_state, 'a_field')])], course_id, self.user)
+        self.kvs = DjangoKeyValueStore(self.field_data_cache)
+        self.other_key = partial(DjangoKeyValueStore.Key, Scope.user_state, 'user', location('other_id'))
+
+    def stored_state(self, module_location):
+        "Returns the stored state of the StudentModule at module_location"
+        return json.loads(StudentModule.objects.get(module_state_key=module_location.url()).state)
+
+    def test_saves_deferred(self):
+        "Test that the saves are only written at the end of the block"
+        with self.field_data_cache.deferred_saves():
+            with self.assertNumQueries(0):
+                self.kvs.set(user_state_key('a_field'), 'new_value')
+                self.kvs.set(self.other_key('a_field'), 'other_value')
+            self.assertEquals({'a_field': 'a_value'}, self.stored_state(location('def_id')))
+        self.assertEquals({'a_field': 'new_value'}, self.stored_state(location('def_id')))
+        self.assertEquals({'a_field': 'other_value'}, self.stored_state(location('other_id')))
+
+    def test_saves_coalesced(self):
+        "Test that a row saved many times is written once, with one history entry"
+        history_count = StudentModuleHistory.objects.count()
+        with self.field_data_cache.deferred_saves():
+            self.kvs.set(user_state_key('a_field'), 'new_value')
+            self.kvs.set(user_state_key('b_field'), 'b_value')
+            self.kvs.delete(user_state_key('a_field'))
+        self.assertEquals({'b_field': 'b_value'}, self.stored_state(location('def_id')))
+        self.assertEquals(history_count + 1, StudentModuleHistory.objects.count())
+
+    def test_new_rows_inserted_together(self):
+        "Test that the new rows are inserted with their history in bulk, and can be saved again"
+        history_count = StudentModuleHistory.objects.count()
+        with self.field_data_cache.deferred_saves():
+            for name in ('one', 'two', 'three'):
+                self.kvs.set(DjangoKeyValueStore.Key(Scope.user_state, 'user', location(name), 'a_field'), name)
+            bulk_create = patch.object(StudentModule.objects, 'bulk_create', wraps=StudentModule.objects.bulk_create)
+            with bulk_create as mock_bulk_create:
+                self.field_data_cache.flush()
+        self.assertEquals(1, mock_bulk_create.call_count)
+        self.assertEquals(4, StudentModule.objects.count())
+        self.assertEquals(history_count + 3, StudentModuleHistory.objects.count())
+
+        self.kvs.set(DjangoKeyValueStore.Key(Scope.user_state, 'user', location('one'), 'a_field'), 'again')
+        self.assertEquals(4, StudentModule.objects.count())
+        self.assertEquals({'a_field': 'again'}, self.stored_state(location('one')))
+
+    def test_row_inserted_meanwhile(self):
+        "Test that a row inserted by another request since the cache was loaded is updated"
+        with self.field_data_cache.deferred_saves():
+            self.kvs.set(self.other_key('a_field'), 'a_value')
+            StudentModuleFactory(
+                student=self.user, module_state_key=location('other_id').url(),
+                state=json.dumps({'a_field': 'old_value', 'b_field': 'b_value'})
+            )
+        self.assertEquals({'a_field': 'a_value', 'b_field': 'b_value'}, self.stored_state(location('other_id')))
+
+    def test_saves_dropped_on_error(self):
+        "Test that the saves pending when the block raises aren't written"
+        with self.assertRaises(ValueError):
+            with self.field_data_cache.deferred_saves():
+                self.kvs.set(user_state_key('a_field'), 'new_value')
+                raise ValueError
+        self.assertEquals({'a_field': 'a_value'}, self.stored_state(location('def_id')))
+
+    def test_flush_failure(self):
+        "Test that a failure to write the saves raises a KeyValueMultiSaveError"
+        with self.assertRaises(KeyValueMultiSaveError) as exception_context:
+            with self.field_data_cache.deferred_saves():
+                self.kvs.set(user_state_key('a_field'), 'new_value')
+                self.kvs.set(self.other_key('a_field'), 'other_value')
+                with patch('django.db.models.Model.save', side_effect=DatabaseError):
+                    self.field_data_cache.flush()
+        self.assertEquals(0, len(exception_context.exception.saved_field_names))
+
+    def test_flush_in_managed_transaction(self):
+        "Test that the saves are written in the managed transaction of the request, without ending it"
+        with patch('courseware.model_data.transaction.is_managed', return_value=True):
+            with patch('courseware.model_data.transaction.commit_on_success') as mock_commit_on_success:
+                with self.field_data_cache.deferred_saves():
+                    self.kvs.set(user_state_key('a_field'), 'new_value')
+        self.assertFalse(mock_commit_on_success.called)
+        self.assertEquals({'a_field': 'new_value'}, self.stored_state(location('def_id')))
+
+    def test_flush_outside_managed_transaction(self):
+        "Test that the saves are committed in a transaction of their own outside of a managed transaction"
+        with patch('courseware.model_data.transaction.is_managed', return_value=False):
+            with patch('courseware.model_data.transaction.commit_on_success') as mock_commit_on_success:
+                with self.field_data_cache.deferred_saves():
+                    self.kvs.set(user_state_key('a_field'), 'new_value')
+        self.assertEquals(1, mock_commit_on_success.call_count)
+        self.assertEquals({'a_field': 'new_value'}, self.stored_state(location('def_id')))
+
+
 class StorageTestBase(object):
     """
     A base class for that gets subclassed when testing each of the scopes.
@@ -270,6 +395,26 @@ class StorageTestBase(object):
         for key in kv_dict:
             self.assertEquals(self.kvs.get(key), kv_dict[key])
 
+    def test_set_many_deferred(self):
+        """Test that new fields set while saves are deferred are inserted in bulk"""
+        with self.field_data_cache.deferred_saves():
+            self.kvs.set_many({
+                self.key_factory('missing_field'): 'new_value',
+                self.key_factory('other_missing_field'): 'other_value',
+            })
+        self.assertEquals(3, self.storage_class.objects.all().count())
+        self.assertEquals('other_value', self.kvs.get(self.key_factory('other_missing_field')))
+        self.assertEquals('other_value', json.loads(self.storage_class.objects.get(field_name='other_missing_field').value))
+
+    def test_delete_deferred(self):
+        """Test that a field deleted after being set while saves are deferred isn't stored"""
+        with self.field_data_cache.deferred_saves():
+            self.kvs.set(self.key_factory('missing_field'), 'new_value')
+            self.kvs.delete(self.key_factory('missing_field'))
+            self.kvs.delete(self.key_factory('existing_field'))
+        self.assertEquals(0, self.storage_class.objects.all().count())
+        self.assertFalse(self.kvs.has(self.key_factory('existing_field')))
+
     def test_set_many_failure(self):
         """Test that setting many regular fields with a DB error """
         kv_dict = self.construct_kv_dict()
@@ -558,7 +558,7 @@ def search_similar_threads(request, course_id, commentable_id):
         threads = cc.search_similar_threads(course_id, recursive=False, query_params=query_params)
     else:
         theads = []
-    context = {'threads': map(utils.extend_content, threads)}
+    context = {'threads': utils.extend_content_list(threads)}
     return JsonResponse({
         'html': render_to_string('discussion/_similar_posts.html', context)
     })
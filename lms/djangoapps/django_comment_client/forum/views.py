@@ -11,7 +11,8 @@ import newrelic.agent
 from mitxmako.shortcuts import render_to_response
 from courseware.courses import get_course_with_access
 from course_groups.cohorts import (is_course_cohorted, get_cohort_id, is_commentable_cohorted,
-                                   get_cohorted_commentables, get_course_cohorts, get_cohort_by_id)
+                                   get_cohorted_commentables, get_course_cohorts, get_cohort_by_id,
+                                   get_cohort_names)
 from courseware.access import has_access
 
 from django_comment_client.permissions import cached_has_permission
@@ -26,6 +27,16 @@ escapedict = {'"': '&quot;'}
 log = logging.getLogger("edx.discussions")
 
 
+def _get_cohort_name(course_id, cohort_id, cohort_names):
+    """
+    Returns the name of the cohort, from cohort_names (the result of
+    get_cohort_names) if it's there.
+    """
+    if cohort_id in cohort_names:
+        return cohort_names[cohort_id]
+    return get_cohort_by_id(course_id, cohort_id).name
+
+
 @newrelic.agent.function_trace()
 def get_threads(request, course_id, discussion_id=None, per_page=THREADS_PER_PAGE):
     """
@@ -85,10 +96,11 @@ def get_threads(request, course_id, discussion_id=None, per_page=THREADS_PER_PAG
     threads, page, num_pages = cc.Thread.search(query_params)
 
     #now add the group name if the thread has a group id
+    cohort_names = get_cohort_names(course_id, [thread['group_id'] for thread in threads if thread.get('group_id')])
     for thread in threads:
 
         if thread.get('group_id'):
-            thread['group_name'] = get_cohort_by_id(course_id, thread.get('group_id')).name
+            thread['group_name'] = _get_cohort_name(course_id, thread['group_id'], cohort_names)
             thread['group_string'] = "This post visible only to Group %s." % (thread['group_name'])
         else:
             thread['group_name'] = ""
@@ -240,9 +252,10 @@ def single_thread(request, course_id, discussion_id, thread_id):
 
     course = get_course_with_access(request.user, course_id, 'load_forum')
     cc_user = cc.User.from_django_user(request.user)
-    user_info = cc_user.to_dict()
-
-    thread = cc.Thread.find(thread_id).retrieve(recursive=True, user_id=request.user.id)
+    user_info, thread = cc.utils.run_concurrently(
+        cc_user.to_dict,
+        lambda: cc.Thread.find(thread_id).retrieve(recursive=True, user_id=request.user.id),
+    )
 
     if request.is_ajax():
         with newrelic.agent.FunctionTrace(nr_transaction, "get_annotated_content_infos"):
@@ -271,9 +284,12 @@ def single_thread(request, course_id, discussion_id, thread_id):
         with newrelic.agent.FunctionTrace(nr_transaction, "add_courseware_context"):
             add_courseware_context(threads, course)
 
+        cohort_names = get_cohort_names(course_id, [
+            thread['group_id'] for thread in threads if thread.get('group_id') and not thread.get('group_name')
+        ])
         for thread in threads:
             if thread.get('group_id') and not thread.get('group_name'):
-                thread['group_name'] = get_cohort_by_id(course_id, thread.get('group_id')).name
+                thread['group_name'] = _get_cohort_name(course_id, thread['group_id'], cohort_names)
 
             #patch for backward compatibility with comments service
             if not "pinned" in thread:
@@ -339,10 +355,12 @@ def user_profile(request, course_id, user_id):
             'per_page': THREADS_PER_PAGE,   # more than threads_per_page to show more activities
         }
 
-        threads, page, num_pages = profiled_user.active_threads(query_params)
+        (threads, page, num_pages), user_info = cc.utils.run_concurrently(
+            lambda: profiled_user.active_threads(query_params),
+            cc.User.from_django_user(request.user).to_dict,
+        )
         query_params['page'] = page
         query_params['num_pages'] = num_pages
-        user_info = cc.User.from_django_user(request.user).to_dict()
 
         with newrelic.agent.FunctionTrace(nr_transaction, "get_metadata_for_threads"):
             annotated_content_info = utils.get_metadata_for_threads(course_id, threads, request.user, user_info)
@@ -386,10 +404,12 @@ def followed_threads(request, course_id, user_id):
             'sort_order': request.GET.get('sort_order', 'desc'),
         }
 
-        threads, page, num_pages = profiled_user.subscribed_threads(query_params)
+        (threads, page, num_pages), user_info = cc.utils.run_concurrently(
+            lambda: profiled_user.subscribed_threads(query_params),
+            cc.User.from_django_user(request.user).to_dict,
+        )
         query_params['page'] = page
         query_params['num_pages'] = num_pages
-        user_info = cc.User.from_django_user(request.user).to_dict()
 
         with newrelic.agent.FunctionTrace(nr_transaction, "get_metadata_for_threads"):
             annotated_content_info = utils.get_metadata_for_threads(course_id, threads, request.user, user_info)
@@ -1,4 +1,5 @@
 from lms.lib.comment_client import CommentClientRequestError
+from lms.lib.comment_client.utils import set_cache_scope
 from django_comment_client.utils import JsonError
 import json
 import logging
@@ -22,3 +23,20 @@ class AjaxExceptionMiddleware(object):
             except ValueError:
                 return JsonError(exception.message, exception.status_code)
         return None
+
+
+class CommentClientCacheScopeMiddleware(object):
+    """
+    Middleware that takes the comment service requests of the views of a course to be
+    about that course, so that writing to the discussions of one course only makes the
+    cached responses of that course stale
+    """
+    def process_request(self, request):
+        set_cache_scope(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        set_cache_scope(view_kwargs.get('course_id'))
+
+    def process_response(self, request, response):
+        set_cache_scope(None)
+        return response
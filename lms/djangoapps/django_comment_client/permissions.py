@@ -5,6 +5,10 @@ Module for checking permissions with the comment_client backend
 import logging
 from django.core import cache
 
+from django_comment_common.models import Permission, FORUM_ROLE_STUDENT
+from xmodule.course_module import CourseDescriptor
+from xmodule.modulestore.django import modulestore
+
 
 CACHE = cache.get_cache('default')
 CACHE_LIFESPAN = 60
@@ -12,15 +16,56 @@ CACHE_LIFESPAN = 60
 
 def cached_has_permission(user, permission, course_id=None):
     """
-    Call has_permission if it's not cached. A change in a user's role or
-    a role's permissions will only become effective after CACHE_LIFESPAN seconds.
+    Check permission against the permissions of the user in the course, as
+    returned by get_permissions. A change in a user's role or a role's
+    permissions will only become effective after CACHE_LIFESPAN seconds.
+    """
+    return permission in get_permissions(user, course_id=course_id)
+
+
+def get_permissions(user, course_id=None):
+    """
+    Return the set of the names of all the permissions user has in the course.
+
+    They are loaded with a single query, and then kept in the cache for
+    CACHE_LIFESPAN seconds and on the user object, so that rendering a page of
+    threads and comments checks all their permissions in memory.
+    """
+    permissions_by_course = getattr(user, '_forum_permissions', None)
+    if permissions_by_course is None:
+        permissions_by_course = user._forum_permissions = {}
+
+    if course_id not in permissions_by_course:
+        key = "permissions_%d_%s" % (user.id, str(course_id))
+        permissions = CACHE.get(key, None)
+        if permissions is None:
+            permissions = _load_permissions(user, course_id)
+            CACHE.set(key, permissions, CACHE_LIFESPAN)
+        permissions_by_course[course_id] = permissions
+    return permissions_by_course[course_id]
+
+
+def _load_permissions(user, course_id):
+    """
+    Return the set of the names of the permissions of all the roles of user in
+    the course, leaving out those that Role.has_permission denies to students of
+    courses that don't allow forum posts.
     """
-    key = "permission_%d_%s_%s" % (user.id, str(course_id), permission)
-    val = CACHE.get(key, None)
-    if val not in [True, False]:
-        val = has_permission(user, permission, course_id=course_id)
-        CACHE.set(key, val, CACHE_LIFESPAN)
-    return val
+    role_permissions = Permission.roles.through.objects.filter(
+        role__users=user, role__course_id=course_id
+    ).values_list('role__name', 'permission')
+
+    permissions = set()
+    forum_posts_allowed = None
+    for role_name, permission in role_permissions:
+        if role_name == FORUM_ROLE_STUDENT and permission.startswith(('edit', 'update', 'create')):
+            if forum_posts_allowed is None:
+                course = modulestore().get_instance(course_id, CourseDescriptor.id_to_location(course_id))
+                forum_posts_allowed = course.forum_posts_allowed
+            if not forum_posts_allowed:
+                continue
+        permissions.add(permission)
+    return frozenset(permissions)
 
 
 def has_permission(user, permission, course_id=None):
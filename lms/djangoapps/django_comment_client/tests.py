@@ -5,7 +5,7 @@ from django.contrib.auth.models import User
 from django.test import TestCase
 
 from student.models import CourseEnrollment
-from django_comment_client.permissions import has_permission
+from django_comment_client.permissions import has_permission, get_permissions, CACHE
 from django_comment_common.models import Role
 
 
@@ -48,3 +48,20 @@ class PermissionsTestCase(TestCase):
 
         self.student_role.add_permission(name)
         self.assertTrue(has_permission(self.student, name, self.course_id))
+
+    def testGetPermissions(self):
+        CACHE.clear()
+        name = self.random_str()
+        self.moderator_role.add_permission(name)
+
+        moderator = User.objects.get(id=self.moderator.id)
+        with self.assertNumQueries(1):
+            permissions = get_permissions(moderator, self.course_id)
+            self.assertIn(name, permissions)
+            self.assertEqual(get_permissions(moderator, self.course_id), permissions)
+        self.assertNotIn(name, get_permissions(self.student, self.course_id))
+
+        # other requests share the permissions through the cache
+        moderator = User.objects.get(id=self.moderator.id)
+        with self.assertNumQueries(0):
+            self.assertIn(name, get_permissions(moderator, self.course_id))
@@ -0,0 +1,125 @@
+"""
+Tests of the connection pooling, concurrency and caching of the comment client
+"""
+import threading
+
+from django.core.cache import cache
+from django.test import TestCase
+from mock import patch
+
+from lms.lib.comment_client import utils
+
+
+@patch('lms.lib.comment_client.utils.requests.Session.request')
+class PerformRequestTestCase(TestCase):
+    url = 'http://localhost:4567/api/v1/users/1'
+
+    def setUp(self):
+        cache.clear()
+
+    def set_response(self, mock_request, text):
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.text = text
+
+    def test_session_reused(self, mock_request):
+        self.set_response(mock_request, '{}')
+        utils.perform_request('get', self.url)
+        self.assertIs(utils.get_session(), utils.get_session())
+
+    def test_not_cached(self, mock_request):
+        self.set_response(mock_request, '{"id": "1"}')
+        with patch('lms.lib.comment_client.settings.CACHE_TIMEOUT', 60):
+            utils.perform_request('get', self.url, {'course_id': 'edX/toy/2012_Fall'})
+            utils.perform_request('get', self.url, {'course_id': 'edX/toy/2012_Fall'})
+        self.assertEqual(mock_request.call_count, 2)
+
+    def test_cached_until_write(self, mock_request):
+        self.set_response(mock_request, '{"id": "1"}')
+        with patch('lms.lib.comment_client.settings.CACHE_TIMEOUT', 60):
+            first = utils.perform_request('get', self.url, {'course_id': 'edX/toy/2012_Fall'}, cache=True)
+            self.set_response(mock_request, '{"id": "1", "default_sort_key": "votes"}')
+            second = utils.perform_request('get', self.url, {'course_id': 'edX/toy/2012_Fall'}, cache=True)
+            self.assertEqual(mock_request.call_count, 1)
+            self.assertEqual(first, second)
+
+            utils.perform_request('get', self.url, {'course_id': 'edX/toy/2013_Spring'}, cache=True)
+            self.assertEqual(mock_request.call_count, 2)
+
+            utils.perform_request('put', self.url, {'default_sort_key': 'votes'})
+            third = utils.perform_request('get', self.url, {'course_id': 'edX/toy/2012_Fall'}, cache=True)
+        self.assertEqual(mock_request.call_count, 4)
+        self.assertEqual(third['default_sort_key'], 'votes')
+
+    def test_writes_scoped_to_course(self, mock_request):
+        self.set_response(mock_request, '{"id": "1"}')
+        with patch('lms.lib.comment_client.settings.CACHE_TIMEOUT', 60):
+            utils.perform_request('get', self.url, {'course_id': 'edX/toy/2012_Fall'}, cache=True)
+            utils.perform_request('get', self.url, {'course_id': 'edX/toy/2013_Spring'}, cache=True)
+            self.assertEqual(mock_request.call_count, 2)
+
+            utils.perform_request('put', self.url, {'course_id': 'edX/toy/2013_Spring'})
+            utils.perform_request('get', self.url, {'course_id': 'edX/toy/2012_Fall'}, cache=True)
+            self.assertEqual(mock_request.call_count, 3)
+            utils.perform_request('get', self.url, {'course_id': 'edX/toy/2013_Spring'}, cache=True)
+            self.assertEqual(mock_request.call_count, 4)
+
+    def test_cache_scope(self, mock_request):
+        self.set_response(mock_request, '{"id": "1"}')
+        with patch('lms.lib.comment_client.settings.CACHE_TIMEOUT', 60):
+            utils.set_cache_scope('edX/toy/2012_Fall')
+            try:
+                utils.perform_request('get', self.url, cache=True)
+                # made in a pool thread, in the scope of the caller
+                utils.run_concurrently(lambda: utils.perform_request('put', self.url, {}))
+                utils.perform_request('get', self.url, cache=True)
+            finally:
+                utils.set_cache_scope(None)
+            self.assertEqual(mock_request.call_count, 3)
+
+            utils.set_cache_scope('edX/toy/2013_Spring')
+            try:
+                utils.perform_request('get', self.url, cache=True)
+                utils.perform_request('put', self.url, {'course_id': 'edX/toy/2012_Fall'})
+                utils.perform_request('get', self.url, cache=True)
+            finally:
+                utils.set_cache_scope(None)
+        self.assertEqual(mock_request.call_count, 5)
+
+    def test_errors_not_cached(self, mock_request):
+        mock_request.return_value.status_code = 500
+        mock_request.return_value.text = 'error'
+        with patch('lms.lib.comment_client.settings.CACHE_TIMEOUT', 60):
+            for _ in range(2):
+                with self.assertRaises(utils.CommentClient500Error):
+                    utils.perform_request('get', self.url, cache=True)
+        self.assertEqual(mock_request.call_count, 2)
+
+
+class RunConcurrentlyTestCase(TestCase):
+
+    def test_results_in_order(self):
+        started = threading.Event()
+
+        def first():
+            # only returns if the second call runs at the same time
+            self.assertTrue(started.wait(5))
+            return 1
+
+        def second():
+            started.set()
+            return 2
+
+        self.assertEqual(utils.run_concurrently(first, second), [1, 2])
+
+    def test_error_raised(self):
+        def fail():
+            raise utils.CommentClientRequestError('not found', 404)
+
+        with self.assertRaises(utils.CommentClientRequestError):
+            utils.run_concurrently(lambda: 1, fail)
+
+    def test_nested(self):
+        def nested():
+            return utils.run_concurrently(*[lambda: 1] * 10)
+
+        self.assertEqual(utils.run_concurrently(*[nested] * 10), [[1] * 10] * 10)
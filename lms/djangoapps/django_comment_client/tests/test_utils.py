@@ -1,4 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from mock import patch
+import pytz
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.test import TestCase
 from django.test.utils import override_settings
@@ -58,6 +61,34 @@ class AccessUtilsTestCase(TestCase):
         expected = {u'Moderator': [3], u'Community TA': [4, 5]}
         self.assertEqual(ret, expected)
 
+    def test_get_user_roles(self):
+        user_ids = [self.student1.id, self.student2.id, self.moderator.id, self.community_ta1.id, 1000]
+        with self.assertNumQueries(2):
+            ret = utils.get_user_roles(self.course_id, user_ids)
+        expected = {
+            self.student1.id: {'name': 'student'},
+            self.student2.id: {},
+            self.moderator.id: {'name': 'moderator'},
+            self.community_ta1.id: {'name': 'community ta'},
+        }
+        self.assertEqual(ret, expected)
+
+    @patch('django_comment_client.utils.permalink')
+    def test_extend_content_list(self, mock_permalink):
+        def content(content_id, user, children=()):
+            return {
+                'id': content_id, 'user_id': str(user.id), 'course_id': self.course_id,
+                'created_at': '2013-10-01', 'updated_at': '2013-10-01', 'children': list(children),
+            }
+        threads = [
+            content('t1', self.student1, [content('c1', self.moderator, [content('c2', self.community_ta1)])]),
+            content('t2', self.student2),
+            content('t3', self.community_ta2),
+        ]
+        with self.assertNumQueries(2):
+            extended = utils.extend_content_list(threads)
+        self.assertEqual([thread['roles'] for thread in extended], [{'name': 'student'}, {}, {'name': 'community ta'}])
+
     def test_has_forum_access(self):
         ret = utils.has_forum_access('student', self.course_id, 'Student')
         self.assertTrue(ret)
@@ -134,6 +165,7 @@ class CategoryMapTestCase(ModuleStoreTestCase):
         self.course.save()
         self.discussion_num = 0
         self.maxDiff = None #pylint: disable=C0103
+        cache.clear()
 
     def create_discussion(self, discussion_category, discussion_target, **kwargs):
         self.discussion_num += 1
@@ -489,3 +521,34 @@ class CategoryMapTestCase(ModuleStoreTestCase):
                 "children": ["Chapter A", "Chapter B", "Chapter C"]
             }
         )
+
+    def test_cached_per_version(self):
+        self.create_discussion("Chapter", "Discussion 1")
+        with patch('django_comment_client.utils._get_discussion_modules',
+                   wraps=utils._get_discussion_modules) as mock_get_modules:
+            first = utils.get_discussion_category_map(self.course)
+            self.assertEqual(utils.get_discussion_category_map(self.course), first)
+            self.assertEqual(mock_get_modules.call_count, 1)
+
+            # adding a discussion changes the version of the course
+            self.create_discussion("Chapter", "Discussion 2")
+            second = utils.get_discussion_category_map(self.course)
+            self.assertEqual(mock_get_modules.call_count, 2)
+        self.assertEqual(second["subcategories"]["Chapter"]["children"], ["Discussion 1", "Discussion 2"])
+
+    def test_filter_start_date_boundary(self):
+        now = datetime.now(pytz.UTC).replace(microsecond=0)
+        soon = now + timedelta(hours=1)
+        later = now + timedelta(days=1)
+        self.create_discussion("Chapter 1", "Discussion 1", start=now - timedelta(days=1))
+        self.create_discussion("Chapter 1", "Discussion 2", start=soon)
+        self.create_discussion("Chapter 2", "Discussion", start=later)
+
+        category_map = utils._build_discussion_category_map(self.course)  # pylint: disable=protected-access
+        filtered_map, next_start_date = utils._filter_unstarted_categories(category_map, now)  # pylint: disable=protected-access
+        self.assertEqual(filtered_map["subcategories"]["Chapter 1"]["children"], ["Discussion 1"])
+        self.assertEqual(next_start_date, soon)
+
+        filtered_map, next_start_date = utils._filter_unstarted_categories(category_map, soon)  # pylint: disable=protected-access
+        self.assertEqual(filtered_map["subcategories"]["Chapter 1"]["children"], ["Discussion 1", "Discussion 2"])
+        self.assertEqual(next_start_date, later)
@@ -1,10 +1,12 @@
 import pytz
 from collections import defaultdict
+import hashlib
 import logging
 import urllib
 from datetime import datetime
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import connection
 from django.http import HttpResponse
@@ -20,6 +22,10 @@ from django.utils.timezone import UTC
 
 log = logging.getLogger(__name__)
 
+# How long category maps are cached for. They're cached by course version,
+# so this only bounds how long the maps of old versions are kept around.
+CATEGORY_MAP_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 def extract(dic, keys):
     return {k: dic.get(k) for k in keys}
@@ -80,11 +86,17 @@ def _get_discussion_id_map(course):
     return dict(map(get_entry, _get_discussion_modules(course)))
 
 
-def _filter_unstarted_categories(category_map):
-
-    now = datetime.now(UTC())
+def _filter_unstarted_categories(category_map, now=None):
+    """
+    Returns category_map without the entries and subcategories that haven't
+    started by now, and the earliest start date of those, i.e. the time until
+    which the result stays the same (datetime.max if there are none).
+    """
+    if now is None:
+        now = datetime.now(UTC())
 
     result_map = {}
+    next_start_date = datetime.max.replace(tzinfo=pytz.UTC)
 
     unfiltered_queue = [category_map]
     filtered_queue = [result_map]
@@ -108,14 +120,17 @@ def _filter_unstarted_categories(category_map):
                             filtered_map["entries"][child][key] = unfiltered_map["entries"][child][key]
                 else:
                     print "filtering %s" % child, unfiltered_map["entries"][child]["start_date"]
+                    next_start_date = min(next_start_date, unfiltered_map["entries"][child]["start_date"])
             else:
                 if unfiltered_map["subcategories"][child]["start_date"] < now:
                     filtered_map["children"].append(child)
                     filtered_map["subcategories"][child] = {}
                     unfiltered_queue.append(unfiltered_map["subcategories"][child])
                     filtered_queue.append(filtered_map["subcategories"][child])
+                else:
+                    next_start_date = min(next_start_date, unfiltered_map["subcategories"][child]["start_date"])
 
-    return result_map
+    return result_map, next_start_date
 
     
 def _sort_map_entries(category_map, sort_alpha):
@@ -130,9 +145,11 @@ def _sort_map_entries(category_map, sort_alpha):
     category_map["children"] = [x[0] for x in sorted(things, key=lambda x: x[1]["sort_key"])]
 
 
-def get_discussion_category_map(course):
-    course_id = course.id
-
+def _build_discussion_category_map(course):
+    """
+    Returns the sorted category map of all the discussions of the course,
+    including the ones that haven't started yet.
+    """
     unexpanded_category_map = defaultdict(list)
 
     modules = _get_discussion_modules(course)
@@ -193,7 +210,46 @@ def get_discussion_category_map(course):
 
     _sort_map_entries(category_map, course.discussion_sort_alpha)
 
-    return _filter_unstarted_categories(category_map)
+    return category_map
+
+
+def _category_map_cache_key(course, version):
+    """
+    Returns the cache key of the category map of the given version of the
+    course. The course settings it depends on are part of the key too.
+    """
+    settings_digest = hashlib.md5(
+        simplejson.dumps([course.discussion_topics, course.discussion_sort_alpha], sort_keys=True)
+    ).hexdigest()
+    return u'discussion_category_map/{0}/{1}/{2}'.format(course.id, version, settings_digest)
+
+
+def get_discussion_category_map(course):
+    """
+    Returns the category map of the discussions of the course that have
+    started.
+
+    The map of all of the discussions is cached for each version of the
+    course, along with the last filtered map and the time until which it
+    stays the same, so the modulestore is only searched for discussions
+    after the course changes, and the map only filtered again when one of
+    its discussions starts.
+    """
+    version = modulestore().get_course_version(course.id)
+    if version is None:
+        return _filter_unstarted_categories(_build_discussion_category_map(course))[0]
+
+    cache_key = _category_map_cache_key(course, version)
+    now = datetime.now(UTC())
+    cached = cache.get(cache_key)
+    if cached is None:
+        cached = {'category_map': _build_discussion_category_map(course)}
+    elif now < cached['filtered_until']:
+        return cached['filtered_map']
+
+    cached['filtered_map'], cached['filtered_until'] = _filter_unstarted_categories(cached['category_map'], now)
+    cache.set(cache_key, cached, CATEGORY_MAP_CACHE_TIMEOUT)
+    return cached['filtered_map']
 
 
 class JsonResponse(HttpResponse):
@@ -323,13 +379,61 @@ def permalink(content):
                        args=[content['course_id'], content['commentable_id'], content['thread_id']]) + '#' + content['id']
 
 
-def extend_content(content):
+def get_user_roles(course_id, user_ids):
+    """
+    Returns a dict mapping each of user_ids that is the id of a user in our DB
+    to the 'roles' of their content in the course, with a query for the users
+    and one for their roles, however many there are.
+    """
+    user_ids = set(int(user_id) for user_id in user_ids)
+    if not user_ids:
+        return {}
+    user_roles = dict((user_id, {}) for user_id in User.objects.filter(pk__in=user_ids).values_list('id', flat=True))
+    memberships = Role.users.through.objects.filter(
+        user__in=user_roles.keys(),
+        role__course_id=course_id
+    ).order_by('role').values_list('user', 'role__name')
+    for user_id, role_name in memberships:
+        user_roles[user_id]['name'] = role_name.lower()
+    return user_roles
+
+
+def _content_user_ids(content_list):
+    """
+    Returns the set of the ids of the authors of content_list and their children
+    """
+    user_ids = set()
+    for content in content_list:
+        if content.get('user_id'):
+            user_ids.add(int(content['user_id']))
+        user_ids.update(_content_user_ids(content.get('children', [])))
+    return user_ids
+
+
+def extend_content_list(content_list):
+    """
+    Returns the list of content_list extended by extend_content, looking up the
+    roles of all of their authors at once
+    """
+    if not content_list:
+        return []
+    user_roles = get_user_roles(content_list[0]['course_id'], _content_user_ids(content_list))
+    return [extend_content(content, user_roles) for content in content_list]
+
+
+def extend_content(content, user_roles=None):
+    """
+    Returns content with the information used to render it added. user_roles
+    is the result of get_user_roles for (at least) the author of content, if
+    it's already known.
+    """
     roles = {}
     if content.get('user_id'):
+        if user_roles is None:
+            user_roles = get_user_roles(content['course_id'], [content['user_id']])
         try:
-            user = User.objects.get(pk=content['user_id'])
-            roles = dict(('name', role.name.lower()) for role in user.roles.filter(course_id=content['course_id']))
-        except User.DoesNotExist:
+            roles = user_roles[int(content['user_id'])]
+        except KeyError:
             log.error('User ID {0} in comment content {1} but not in our DB.'.format(content.get('user_id'), content.get('id')))
 
     content_info = {
@@ -10,6 +10,7 @@ import time
 
 from json import JSONEncoder
 from courseware import grades, models
+from courseware.batch_grades import iterate_grades_for
 from courseware.courses import get_course_by_id
 from django.contrib.auth.models import User
 
@@ -50,12 +51,17 @@ def offline_grade_calculation(course_id):
     print "%d enrolled students" % len(enrolled_students)
     course = get_course_by_id(course_id)
 
-    for student in enrolled_students:
+    def request_for_student(student):
+        """Returns a request to grade student with, as if they had made it"""
         request = DummyRequest()
         request.user = student
         request.session = {}
+        return request
 
-        gradeset = grades.grade(student, request, course, keep_raw_scores=True)
+    gradesets = iterate_grades_for(
+        course, enrolled_students, None, keep_raw_scores=True, request_for_student=request_for_student
+    )
+    for student, gradeset in gradesets:
         gs = enc.encode(gradeset)
         ocg, created = models.OfflineComputedGrade.objects.get_or_create(user=student, course_id=course_id)
         ocg.gradeset = gs
@@ -98,3 +104,17 @@ def student_grades(student, request, course, keep_raw_scores=False, use_offline=
                     msg='Error: no offline gradeset available for %s, %s' % (student, course.id))
 
     return json.loads(ocg.gradeset)
+
+
+def iterate_student_grades(students, request, course, keep_raw_scores=False, use_offline=False):
+    '''
+    Returns an iterator of (student, gradeset) pairs for all `students`, with
+    the gradesets student_grades() would return. Unless use_offline is True,
+    the students are graded in batches.
+    '''
+    if use_offline:
+        return (
+            (student, student_grades(student, request, course, keep_raw_scores=keep_raw_scores, use_offline=True))
+            for student in students
+        )
+    return iterate_grades_for(course, students, request, keep_raw_scores=keep_raw_scores)
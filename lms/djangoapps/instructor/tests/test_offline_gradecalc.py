@@ -0,0 +1,64 @@
+"""
+Tests of the offline grade calculation
+"""
+import json
+
+from django.core.management import call_command
+from django.test.utils import override_settings
+
+from capa.tests.response_xml_factory import StringResponseXMLFactory
+from courseware.models import OfflineComputedGrade
+from courseware.roles import CourseStaffRole
+from courseware.tests.factories import StudentModuleFactory
+from courseware.tests.tests import TEST_DATA_MIXED_MODULESTORE
+from student.tests.factories import CourseEnrollmentFactory, UserFactory
+from xmodule.modulestore import Location
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestOfflineGradeCalculation(ModuleStoreTestCase):
+    """
+    Tests of the compute_grades command
+    """
+    def setUp(self):
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        section = ItemFactory.create(
+            parent_location=chapter.location,
+            category='sequential',
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.problems = [
+            ItemFactory.create(
+                parent_location=section.location,
+                category='problem',
+                data=StringResponseXMLFactory().build_xml(answer='foo'),
+            )
+            for _ in xrange(2)
+        ]
+
+        self.student = UserFactory.create()
+        self.staff = UserFactory.create()
+        CourseStaffRole(self.course.location).add_users(self.staff)
+        for user in (self.student, self.staff):
+            CourseEnrollmentFactory.create(user=user, course_id=self.course.id)
+            StudentModuleFactory.create(
+                grade=1,
+                max_grade=1,
+                student=user,
+                course_id=self.course.id,
+                module_state_key=Location(self.problems[0].location).url()
+            )
+
+    def gradeset(self, user):
+        """Returns the stored offline gradeset of user"""
+        return json.loads(OfflineComputedGrade.objects.get(user=user, course_id=self.course.id).gradeset)
+
+    def test_compute_grades(self):
+        call_command('compute_grades', self.course.id)
+
+        # the staff member is graded one at a time, with a request of their own
+        for user in (self.student, self.staff):
+            self.assertAlmostEqual(0.5, self.gradeset(user)['section_breakdown'][0]['percent'])
@@ -41,7 +41,7 @@ from django_comment_common.models import (Role,
                                           FORUM_ROLE_MODERATOR,
                                           FORUM_ROLE_COMMUNITY_TA)
 from django_comment_client.utils import has_forum_access
-from instructor.offline_gradecalc import student_grades, offline_grades_available
+from instructor.offline_gradecalc import iterate_student_grades, offline_grades_available
 from instructor.views.tools import strip_if_string
 from instructor_task.api import (get_running_instructor_tasks,
                                  get_instructor_task_history,
@@ -1107,20 +1107,25 @@ def get_student_grade_summary_data(request, course, course_id, get_grades=True,
 
     header = ['ID', 'Username', 'Full Name', 'edX email', 'External email']
     assignments = []
-    if get_grades and enrolled_students.count() > 0:
-        # just to construct the header
-        gradeset = student_grades(enrolled_students[0], request, course, keep_raw_scores=get_raw_scores, use_offline=use_offline)
-        # log.debug('student {0} gradeset {1}'.format(enrolled_students[0], gradeset))
-        if get_raw_scores:
-            assignments += [score.section for score in gradeset['raw_scores']]
-        else:
-            assignments += [x['label'] for x in gradeset['section_breakdown']]
-    header += assignments
 
     datatable = {'header': header, 'assignments': assignments, 'students': enrolled_students}
     data = []
 
-    for student in enrolled_students:
+    if get_grades:
+        gradesets = iterate_student_grades(enrolled_students, request, course,
+                                           keep_raw_scores=get_raw_scores, use_offline=use_offline)
+    else:
+        gradesets = ((student, None) for student in enrolled_students)
+
+    for index, (student, gradeset) in enumerate(gradesets):
+        if get_grades and index == 0:
+            # the first student's gradeset is used to construct the header
+            if get_raw_scores:
+                assignments += [score.section for score in gradeset['raw_scores']]
+            else:
+                assignments += [x['label'] for x in gradeset['section_breakdown']]
+            header += assignments
+
         datarow = [student.id, student.username, student.profile.name, student.email]
         try:
             datarow.append(student.externalauthmap.external_email)
@@ -1128,7 +1133,6 @@ def get_student_grade_summary_data(request, course, course_id, get_grades=True,
             datarow.append('')
 
         if get_grades:
-            gradeset = student_grades(student, request, course, keep_raw_scores=get_raw_scores, use_offline=use_offline)
             log.debug('student={0}, gradeset={1}'.format(student, gradeset))
             if get_raw_scores:
                 # TODO (ichuang) encode Score as dict instead of as list, so score[0] -> score['earned']
@@ -1165,10 +1169,10 @@ def gradebook(request, course_id):
     student_info = [{'username': student.username,
                      'id': student.id,
                      'email': student.email,
-                     'grade_summary': student_grades(student, request, course),
+                     'grade_summary': grade_summary,
                      'realname': student.profile.name,
                      }
-                    for student in enrolled_students]
+                    for student, grade_summary in iterate_student_grades(enrolled_students, request, course)]
 
     return render_to_response('courseware/gradebook.html', {
         'students': student_info,
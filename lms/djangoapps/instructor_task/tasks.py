@@ -18,6 +18,10 @@ object contains a 'task_input' row which is a JSON-encoded dict containing
 a problem URL and optionally a student.  These are used to set up the initial value
 of the query for traversing StudentModule objects.
 
+When there are many StudentModule objects to traverse, the traversal function splits
+them among update_problem_module_state subtasks, which look up the update and filter
+functions of the task by name in MODULE_STATE_UPDATES.
+
 """
 from django.utils.translation import ugettext_noop
 from celery import task
@@ -26,6 +30,7 @@ from instructor_task.tasks_helper import (
     run_main_task,
     BaseInstructorTask,
     perform_module_state_update,
+    perform_module_state_subtask_update,
     rescore_problem_module_state,
     reset_attempts_module_state,
     delete_problem_module_state,
@@ -33,6 +38,48 @@ from instructor_task.tasks_helper import (
 from bulk_email.tasks import perform_delegate_email_batches
 
 
+def _filter_done_modules(modules_to_update):
+    """Filter that matches problems which are marked as being done"""
+    return modules_to_update.filter(state__contains='"done": true')
+
+
+# The update function and filter function of each task that updates StudentModules,
+# by task name.
+MODULE_STATE_UPDATES = {
+    'rescore_problem': (rescore_problem_module_state, _filter_done_modules),
+    'reset_problem_attempts': (reset_attempts_module_state, None),
+    'delete_problem_state': (delete_problem_module_state, None),
+}
+
+
+def _get_module_state_visit_fcn(update_name, xmodule_instance_args):
+    """
+    Returns the visit function that run_main_task() calls to perform the `update_name`
+    updates, which queues update_problem_module_state subtasks for large updates.
+    """
+    update_fcn, filter_fcn = MODULE_STATE_UPDATES[update_name]
+
+    def _create_update_subtask(entry_id, module_list, initial_subtask_status):
+        """Creates a subtask to update a given list of StudentModules."""
+        return update_problem_module_state.subtask(
+            (
+                entry_id,
+                update_name,
+                xmodule_instance_args,
+                [module['pk'] for module in module_list],
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+        )
+
+    return partial(
+        perform_module_state_update,
+        partial(update_fcn, xmodule_instance_args),
+        filter_fcn,
+        create_subtask_fcn=_create_update_subtask,
+    )
+
+
 @task(base=BaseInstructorTask)  # pylint: disable=E1102
 def rescore_problem(entry_id, xmodule_instance_args):
     """Rescores a problem in a course, for all students or one specific student.
@@ -54,13 +101,7 @@ def rescore_problem(entry_id, xmodule_instance_args):
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('rescored')
-    update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
-
-    def filter_fcn(modules_to_update):
-        """Filter that matches problems which are marked as being done"""
-        return modules_to_update.filter(state__contains='"done": true')
-
-    visit_fcn = partial(perform_module_state_update, update_fcn, filter_fcn)
+    visit_fcn = _get_module_state_visit_fcn('rescore_problem', xmodule_instance_args)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
@@ -81,8 +122,7 @@ def reset_problem_attempts(entry_id, xmodule_instance_args):
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('reset')
-    update_fcn = partial(reset_attempts_module_state, xmodule_instance_args)
-    visit_fcn = partial(perform_module_state_update, update_fcn, None)
+    visit_fcn = _get_module_state_visit_fcn('reset_problem_attempts', xmodule_instance_args)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
@@ -103,11 +143,34 @@ def delete_problem_state(entry_id, xmodule_instance_args):
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('deleted')
-    update_fcn = partial(delete_problem_module_state, xmodule_instance_args)
-    visit_fcn = partial(perform_module_state_update, update_fcn, None)
+    visit_fcn = _get_module_state_visit_fcn('delete_problem_state', xmodule_instance_args)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
+@task  # pylint: disable=E1102
+def update_problem_module_state(entry_id, update_name, xmodule_instance_args, module_ids, subtask_status_dict):
+    """Performs the updates of a rescore_problem, reset_problem_attempts or delete_problem_state
+    task on a subset of the StudentModules of the problem.
+
+    `entry_id` is the id value of the InstructorTask entry of the task, which the counts of the
+    subtask are added to.  `update_name` is the name of the task, in MODULE_STATE_UPDATES.
+
+    `module_ids` are the ids of the StudentModules to update, and `subtask_status_dict` is the
+    dict of the subtask's initial SubtaskStatus.
+
+    `xmodule_instance_args` provides information needed by _get_module_instance_for_task()
+    to instantiate an xmodule instance.
+    """
+    update_fcn, filter_fcn = MODULE_STATE_UPDATES[update_name]
+    return perform_module_state_subtask_update(
+        partial(update_fcn, xmodule_instance_args),
+        filter_fcn,
+        entry_id,
+        module_ids,
+        subtask_status_dict,
+    )
+
+
 @task(base=BaseInstructorTask)  # pylint: disable=E1102
 def send_bulk_course_email(entry_id, _xmodule_instance_args):
     """Sends emails to recipients enrolled in a course.
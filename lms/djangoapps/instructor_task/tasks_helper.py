@@ -4,12 +4,14 @@ running state of a course.
 
 """
 import json
+from functools import partial
 from time import time
 
 from celery import Task, current_task
 from celery.utils.log import get_task_logger
 from celery.states import SUCCESS, FAILURE
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import transaction, reset_queries
 from dogapi import dog_stats_api
@@ -22,6 +24,12 @@ from courseware.models import StudentModule
 from courseware.model_data import FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
 from instructor_task.models import InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    queue_subtasks_for_query,
+    check_subtask_is_valid,
+    update_subtask_status,
+)
 
 # define different loggers for use within tasks and on client side
 TASK_LOG = get_task_logger(__name__)
@@ -204,7 +212,8 @@ def run_main_task(entry_id, task_fcn, action_name):
     return task_progress
 
 
-def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name):
+def perform_module_state_update(update_fcn, filter_fcn, entry_id, course_id, task_input, action_name,
+                                create_subtask_fcn=None):
     """
     Performs generic update by visiting StudentModule instances with the update_fcn provided.
 
@@ -222,6 +231,14 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     the update is successful; False indicates the update on the particular student module failed.
     A raised exception indicates a fatal condition -- that no other student modules should be considered.
 
+    If `create_subtask_fcn` is not None and there are more than settings.INSTRUCTOR_TASK_MODULES_PER_TASK
+    StudentModules to update, they are split into chunks of that many, by pk, that are updated by subtasks
+    running in parallel, and whose progress is recorded in the InstructorTask entry.  `create_subtask_fcn`
+    takes the `entry_id`, the list of dicts (with a 'pk' key) of the StudentModules of a chunk, and the
+    SubtaskStatus of the subtask, and returns the subtask to run, which should call
+    perform_module_state_subtask_update.  Otherwise the StudentModules are updated here, and the task's
+    progress is sent to the broker at most every settings.INSTRUCTOR_TASK_PROGRESS_UPDATE_INTERVAL seconds.
+
     The return value is a dict containing the task's results, with the following keys:
 
           'attempted': number of attempts made
@@ -288,8 +305,27 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
                     }
         return progress
 
+    if (create_subtask_fcn is not None and student is None and
+            num_total > settings.INSTRUCTOR_TASK_MODULES_PER_TASK):
+        entry = InstructorTask.objects.get(pk=entry_id)
+        # If the task has been requeued after its subtasks were queued, don't queue them again
+        if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+            TASK_LOG.warning("Task %s has already queued its subtasks!  InstructorTask = %s", entry.task_id, entry)
+            return json.loads(entry.task_output)
+
+        return queue_subtasks_for_query(
+            entry,
+            action_name,
+            partial(create_subtask_fcn, entry_id),
+            modules_to_update.order_by('pk'),
+            [],
+            settings.INSTRUCTOR_TASK_MODULES_PER_QUERY,
+            settings.INSTRUCTOR_TASK_MODULES_PER_TASK
+        )
+
     task_progress = get_task_progress()
     _get_current_task().update_state(state=PROGRESS, meta=task_progress)
+    last_update_time = time()
     for module_to_update in modules_to_update:
         num_attempted += 1
         # There is no try here:  if there's an error, we let it throw, and the task will
@@ -307,11 +343,74 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
             else:
                 raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
 
-        # update task status:
-        task_progress = get_task_progress()
-        _get_current_task().update_state(state=PROGRESS, meta=task_progress)
+        # update task status, but not more often than every update interval, as
+        # each update is a round trip to the broker:
+        if time() - last_update_time >= settings.INSTRUCTOR_TASK_PROGRESS_UPDATE_INTERVAL:
+            task_progress = get_task_progress()
+            _get_current_task().update_state(state=PROGRESS, meta=task_progress)
+            last_update_time = time()
 
-    return task_progress
+    return get_task_progress()
+
+
+def perform_module_state_subtask_update(update_fcn, filter_fcn, entry_id, module_ids, subtask_status_dict):
+    """
+    Performs the part of a perform_module_state_update() split into subtasks that updates the
+    StudentModules with pk in `module_ids`, with the `update_fcn` and `filter_fcn` of the task.
+
+    The subtask's counts are recorded in the InstructorTask entry (see update_subtask_status()) once it
+    is done, and once its last subtask is done, the entry's state is SUCCESS.  As in
+    perform_module_state_update(), skipped updates count as attempted, and an exception stops the
+    updates; the StudentModules that were left to update are then counted as failed (all of `module_ids`
+    if the exception came before they were filtered), and the exception is raised.
+
+    `subtask_status_dict` is the dict of the subtask's initial SubtaskStatus.  Returns the dict of its
+    final SubtaskStatus.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+
+    # Raises a DuplicateTaskException if the subtask isn't one of the entry's, or has already been run.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    num_to_update = len(module_ids)
+    num_processed = 0
+    try:
+        entry = InstructorTask.objects.get(pk=entry_id)
+        task_input = json.loads(entry.task_input)
+        action_name = json.loads(entry.task_output)['action_name']
+        module_descriptor = modulestore().get_instance(entry.course_id, task_input.get('problem_url'))
+
+        # StudentModules that have been deleted, or no longer pass the filter, since the subtask was
+        # queued, aren't attempted
+        modules_to_update = StudentModule.objects.filter(pk__in=module_ids)
+        if filter_fcn is not None:
+            modules_to_update = filter_fcn(modules_to_update)
+        modules_to_update = list(modules_to_update)
+        num_to_update = len(modules_to_update)
+
+        for module_to_update in modules_to_update:
+            with dog_stats_api.timer('instructor_tasks.module.time.step', tags=['action:{name}'.format(name=action_name)]):
+                update_status = update_fcn(module_descriptor, module_to_update)
+            if update_status == UPDATE_STATUS_SUCCEEDED:
+                subtask_status.increment(succeeded=1)
+            elif update_status == UPDATE_STATUS_FAILED:
+                subtask_status.increment(failed=1)
+            elif update_status == UPDATE_STATUS_SKIPPED:
+                subtask_status.increment(skipped=1)
+                subtask_status.attempted += 1
+            else:
+                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+            num_processed += 1
+    except Exception:
+        TASK_LOG.exception("Subtask %s of instructor task %d: failed unexpectedly!", current_task_id, entry_id)
+        subtask_status.increment(failed=num_to_update - num_processed, state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status)
+        raise
+
+    subtask_status.increment(state=SUCCESS)
+    update_subtask_status(entry_id, current_task_id, subtask_status)
+    return subtask_status.to_dict()
 
 
 def _get_task_id_from_xmodule_args(xmodule_instance_args):
@@ -12,6 +12,8 @@ from mock import Mock, MagicMock, patch
 
 from celery.states import SUCCESS, FAILURE
 
+from django.test.utils import override_settings
+
 from xmodule.modulestore.exceptions import ItemNotFoundError
 
 from courseware.models import StudentModule
@@ -21,8 +23,11 @@ from student.tests.factories import UserFactory, CourseEnrollmentFactory
 from instructor_task.models import InstructorTask
 from instructor_task.tests.test_base import InstructorTaskModuleTestCase
 from instructor_task.tests.factories import InstructorTaskFactory
-from instructor_task.tasks import rescore_problem, reset_problem_attempts, delete_problem_state
-from instructor_task.tasks_helper import UpdateProblemModuleStateError
+from instructor_task.subtasks import SubtaskStatus, initialize_subtask_info
+from instructor_task.tasks import (
+    MODULE_STATE_UPDATES, rescore_problem, reset_problem_attempts, delete_problem_state
+)
+from instructor_task.tasks_helper import UpdateProblemModuleStateError, perform_module_state_subtask_update
 
 PROBLEM_URL_NAME = "test_urlname"
 
@@ -112,6 +117,25 @@ class TestInstructorTasks(InstructorTaskModuleTestCase):
         self.assertEquals(json.loads(entry.task_output), status)
         self.assertEquals(entry.task_state, SUCCESS)
 
+    def _test_run_with_subtasks(self, task_class, action_name, expected_num_subtasks,
+                                expected_num_succeeded, expected_num_skipped=0):
+        """Run a task that splits its updates among subtasks, and check the counts they recorded."""
+        task_entry = self._create_input_entry()
+        self._run_task_with_mock_celery(task_class, task_entry.id, task_entry.task_id)
+        # compare with entry in table, which the subtasks have updated:
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        self.assertEquals(entry.task_state, SUCCESS)
+        subtasks = json.loads(entry.subtasks)
+        self.assertEquals(subtasks['total'], expected_num_subtasks)
+        self.assertEquals(subtasks['succeeded'], expected_num_subtasks)
+        output = json.loads(entry.task_output)
+        self.assertEquals(output.get('attempted'), expected_num_succeeded + expected_num_skipped)
+        self.assertEquals(output.get('succeeded'), expected_num_succeeded)
+        self.assertEquals(output.get('skipped'), expected_num_skipped)
+        self.assertEquals(output.get('failed'), 0)
+        self.assertEquals(output.get('total'), expected_num_succeeded + expected_num_skipped)
+        self.assertEquals(output.get('action_name'), action_name)
+
     def _test_run_with_no_state(self, task_class, action_name):
         """Run with no StudentModules defined for the current problem."""
         self.define_option_problem(PROBLEM_URL_NAME)
@@ -298,6 +322,42 @@ class TestRescoreInstructorTask(TestInstructorTasks):
         self.assertGreater(output.get('duration_ms'), 0)
 
 
+    @override_settings(INSTRUCTOR_TASK_MODULES_PER_TASK=3)
+    def test_rescore_with_subtasks(self):
+        num_students = 10
+        students = self._create_students_with_state(num_students, json.dumps({'done': True}))
+        # problems that aren't done are filtered out:
+        StudentModule.objects.filter(student=students[0]).update(state=json.dumps({'done': False}))
+        mock_instance = Mock()
+        mock_instance.rescore_problem = Mock(return_value={'success': 'correct'})
+        with patch('instructor_task.tasks_helper.get_module_for_descriptor_internal') as mock_get_module:
+            mock_get_module.return_value = mock_instance
+            self._test_run_with_subtasks(rescore_problem, 'rescored', 3, num_students - 1)
+        self.assertEquals(mock_instance.rescore_problem.call_count, num_students - 1)
+
+    def test_rescore_subtask_failure(self):
+        num_students = 4
+        students = self._create_students_with_state(num_students, json.dumps({'done': True}))
+        # no longer done since the subtask was queued:
+        StudentModule.objects.filter(student=students[0]).update(state=json.dumps({'done': False}))
+        task_entry = self._create_input_entry()
+        subtask_id = str(uuid4())
+        initialize_subtask_info(task_entry, 'rescored', num_students, [subtask_id])
+        module_ids = list(StudentModule.objects.filter(module_state_key=self.problem_url).values_list('pk', flat=True))
+
+        update_fcn = Mock(side_effect=TestTaskFailure('We expected this to fail'))
+        _, filter_fcn = MODULE_STATE_UPDATES['rescore_problem']
+        with self.assertRaises(TestTaskFailure):
+            perform_module_state_subtask_update(
+                update_fcn, filter_fcn, task_entry.id, module_ids, SubtaskStatus.create(subtask_id).to_dict()
+            )
+        # only the problems that were left to rescore count as failed
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        subtask_status = json.loads(entry.subtasks)['status'][subtask_id]
+        self.assertEquals(subtask_status['failed'], num_students - 1)
+        self.assertEquals(subtask_status['state'], FAILURE)
+
+
 class TestResetAttemptsInstructorTask(TestInstructorTasks):
     """Tests instructor task that resets problem attempts."""
 
@@ -346,6 +406,26 @@ class TestResetAttemptsInstructorTask(TestInstructorTasks):
         # check that entries were reset
         self._assert_num_attempts(students, 0)
 
+    @override_settings(INSTRUCTOR_TASK_MODULES_PER_TASK=3)
+    def test_reset_with_subtasks(self):
+        input_state = json.dumps({'attempts': 3})
+        num_students = 10
+        students = self._create_students_with_state(num_students, input_state)
+        # zero attempts are skipped:
+        StudentModule.objects.filter(student=students[0]).update(state=json.dumps({'attempts': 0}))
+        self._test_run_with_subtasks(reset_problem_attempts, 'reset', 4, num_students - 1, expected_num_skipped=1)
+        self._assert_num_attempts(students, 0)
+
+    @override_settings(INSTRUCTOR_TASK_PROGRESS_UPDATE_INTERVAL=60)
+    def test_reset_progress_updates_throttled(self):
+        input_state = json.dumps({'attempts': 3})
+        num_students = 10
+        students = self._create_students_with_state(num_students, input_state)
+        self._test_run_with_task(reset_problem_attempts, 'reset', num_students)
+        self._assert_num_attempts(students, 0)
+        # only the progress before the first update is sent:
+        self.assertEquals(self.current_task.update_state.call_count, 1)
+
     def _test_reset_with_student(self, use_email):
         """Run a reset task for one student, with several StudentModules for the problem defined."""
         num_students = 10
@@ -437,3 +517,10 @@ class TestDeleteStateInstructorTask(TestInstructorTasks):
                 StudentModule.objects.get(course_id=self.course.id,
                                           student=student,
                                           module_state_key=self.problem_url)
+
+    @override_settings(INSTRUCTOR_TASK_MODULES_PER_TASK=4)
+    def test_delete_with_subtasks(self):
+        num_students = 10
+        students = self._create_students_with_state(num_students)
+        self._test_run_with_subtasks(delete_problem_state, 'deleted', 3, num_students)
+        self.assertFalse(StudentModule.objects.filter(student__in=students).exists())
@@ -192,6 +192,10 @@ MITX_FEATURES = {
     # Disable instructor dash buttons for downloading course data
     # when enrollment exceeds this number
     'MAX_ENROLLMENT_INSTR_BUTTONS': 200,
+
+    # Store the raw scores of graded sections per student (StudentSectionScore),
+    # updated on every grade change, so that grading doesn't have to load modules
+    'ENABLE_PERSISTENT_SECTION_SCORES': False,
 }
 
 # Used for A/B testing
@@ -382,6 +386,11 @@ MODULESTORE = {
 CONTENTSTORE = None
 DOC_STORE_CONFIG = None
 
+# Node-local disk cache for static content too large for memcached, served by
+# contentserver.middleware.StaticContentServer. Disabled if None, otherwise e.g.
+# {'DIRECTORY': '/var/tmp/contentserver', 'MAX_SIZE': 10 * 1024 ** 3}
+CONTENTSERVER_DISK_CACHE = None
+
 # Should we initialize the modulestores at startup, or wait until they are
 # needed?
 INIT_MODULESTORE_ON_STARTUP = True
@@ -618,6 +627,7 @@ MIDDLEWARE_CLASSES = (
     # 'debug_toolbar.middleware.DebugToolbarMiddleware',
 
     'django_comment_client.utils.ViewNameMiddleware',
+    'django_comment_client.middleware.CommentClientCacheScopeMiddleware',
     'codejail.django_integration.ConfigureCodeJailMiddleware',
 
     # catches any uncaught RateLimitExceptions and returns a 403 instead of a 500
@@ -899,6 +909,22 @@ BULK_EMAIL_LOG_SENT_EMAILS = False
 # parallel, and what the SES rate is.
 BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = 0.02
 
+# Number of SMTP connections each subtask sends email over in parallel, from a
+# thread per connection.  This is halved each time a subtask is retried for
+# exceeding the sending rate.
+BULK_EMAIL_CONNECTIONS_PER_TASK = 1
+
+############################# Instructor Tasks ################################
+
+# Rescoring, resetting attempts and deleting the state of a problem for more
+# StudentModules than this are split into subtasks of this many modules
+INSTRUCTOR_TASK_MODULES_PER_TASK = 100
+INSTRUCTOR_TASK_MODULES_PER_QUERY = 1000
+
+# Least time in seconds between the progress updates a task sends to the
+# broker while it updates StudentModules itself
+INSTRUCTOR_TASK_PROGRESS_UPDATE_INTERVAL = 1.0
+
 ################################### APPS ######################################
 INSTALLED_APPS = (
     # Standard ones that are always installed...
@@ -937,6 +963,7 @@ INSTALLED_APPS = (
     'psychometrics',
     'licenses',
     'course_groups',
+    'course_overviews',
     'bulk_email',
 
     # External auth (OpenID, shib)
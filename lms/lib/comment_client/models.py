@@ -62,7 +62,7 @@ class Model(object):
 
     def _retrieve(self, *args, **kwargs):
         url = self.url(action='get', params=self.attributes)
-        response = perform_request('get', url, self.default_retrieve_params)
+        response = perform_request('get', url, self.default_retrieve_params, cache=True)
         self.update_attributes(**response)
 
     @classmethod
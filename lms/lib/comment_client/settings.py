@@ -11,3 +11,22 @@ if hasattr(settings, "COMMENTS_SERVICE_KEY"):
     API_KEY = settings.COMMENTS_SERVICE_KEY
 else:
     API_KEY = "PUT_YOUR_API_KEY_HERE"
+
+# The most connections to the comment service each process keeps open
+if hasattr(settings, "COMMENTS_SERVICE_POOL_SIZE"):
+    POOL_SIZE = settings.COMMENTS_SERVICE_POOL_SIZE
+else:
+    POOL_SIZE = 10
+
+# The most requests each process makes at the same time with utils.submit
+if hasattr(settings, "COMMENTS_SERVICE_CONCURRENCY"):
+    CONCURRENCY = settings.COMMENTS_SERVICE_CONCURRENCY
+else:
+    CONCURRENCY = 4
+
+# How long, in seconds, responses to GETs that allow it are cached for, or 0
+# for them not to be cached
+if hasattr(settings, "COMMENTS_SERVICE_CACHE_TIMEOUT"):
+    CACHE_TIMEOUT = settings.COMMENTS_SERVICE_CACHE_TIMEOUT
+else:
+    CACHE_TIMEOUT = 0
@@ -63,7 +63,7 @@ class User(models.Model):
         url = _url_for_user_active_threads(self.id)
         params = {'course_id': self.course_id}
         params = merge_dict(params, query_params)
-        response = perform_request('get', url, params)
+        response = perform_request('get', url, params, cache=True)
         return response.get('collection', []), response.get('page', 1), response.get('num_pages', 1)
 
     def subscribed_threads(self, query_params={}):
@@ -72,7 +72,7 @@ class User(models.Model):
         url = _url_for_user_subscribed_threads(self.id)
         params = {'course_id': self.course_id}
         params = merge_dict(params, query_params)
-        response = perform_request('get', url, params)
+        response = perform_request('get', url, params, cache=True)
         return response.get('collection', []), response.get('page', 1), response.get('num_pages', 1)
 
     def _retrieve(self, *args, **kwargs):
@@ -80,7 +80,7 @@ class User(models.Model):
         retrieve_params = self.default_retrieve_params
         if self.attributes.get('course_id'):
             retrieve_params['course_id'] = self.course_id
-        response = perform_request('get', url, retrieve_params)
+        response = perform_request('get', url, retrieve_params, cache=True)
         self.update_attributes(**response)
 
 
@@ -1,10 +1,17 @@
 from contextlib import contextmanager
 from dogapi import dog_stats_api
+from django.core.cache import cache
+import hashlib
 import json
 import logging
+from multiprocessing.pool import ThreadPool
+import os
 import requests
+from requests.adapters import HTTPAdapter
 import settings
+import threading
 from time import time
+import urllib
 from uuid import uuid4
 
 log = logging.getLogger(__name__)
@@ -33,23 +40,210 @@ def merge_dict(dic1, dic2):
 
 @contextmanager
 def request_timer(request_id, method, url):
+    """
+    Times the request in the block, which can add tags (e.g. 'cache:hit')
+    to the list it is given for the metric and log line.
+    """
+    tags = ['method:{0}'.format(method)]
     start = time()
-    yield
+    yield tags
     end = time()
     duration = end - start
-    dog_stats_api.histogram('comment_client.request.time', duration, end)
+    dog_stats_api.histogram('comment_client.request.time', duration, end, tags=tags)
     log.info(
         "comment_client_request_log: request_id={request_id}, method={method}, "
-        "url={url}, duration={duration}".format(
+        "url={url}, duration={duration}, tags={tags}".format(
             request_id=request_id,
             method=method,
             url=url,
-            duration=duration
+            duration=duration,
+            tags=",".join(tags)
         )
     )
 
 
+_process_lock = threading.Lock()
+_session = {'pid': None, 'session': None}
+_thread_pool = {'pid': None, 'pool': None}
+_pool_worker = threading.local()
+
+
+def get_session():
+    """
+    Returns the requests Session of this process, whose connections to the
+    comment service are kept alive and reused by later requests. Sessions
+    aren't shared with forked processes, e.g. web server workers, as their
+    sockets would be.
+    """
+    if _session['pid'] != os.getpid():
+        with _process_lock:
+            if _session['pid'] != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session['session'] = session
+                _session['pid'] = os.getpid()
+    return _session['session']
+
+
+def _get_thread_pool():
+    """
+    Returns the pool of threads of this process that make concurrent requests
+    """
+    if _thread_pool['pid'] != os.getpid():
+        with _process_lock:
+            if _thread_pool['pid'] != os.getpid():
+                _thread_pool['pool'] = ThreadPool(settings.CONCURRENCY)
+                _thread_pool['pid'] = os.getpid()
+    return _thread_pool['pool']
+
+
+def _call_in_pool(func, args, kwargs, course_id):
+    """Calls func in a pool thread, marked as such, in the cache scope of course_id"""
+    _pool_worker.active = True
+    set_cache_scope(course_id)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _pool_worker.active = False
+        set_cache_scope(None)
+
+
+class _Result(object):
+    """
+    The result of a call made right away, with the interface of an AsyncResult
+    """
+    def __init__(self, func, args, kwargs):
+        try:
+            self._value = func(*args, **kwargs)
+            self._error = None
+        except Exception as error:  # pylint: disable=broad-except
+            self._error = error
+
+    def wait(self, timeout=None):
+        pass
+
+    def get(self, timeout=None):
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+def submit(func, *args, **kwargs):
+    """
+    Calls func(*args, **kwargs), which should make comment service requests,
+    in a background thread. Returns an AsyncResult whose `get` returns what func
+    returned, or raises what it raised.
+
+    Calls submitted from a background thread are made right away instead, so
+    that they can't wait for a thread held by their caller. Calls are made in
+    the cache scope of their caller.
+    """
+    if getattr(_pool_worker, 'active', False):
+        return _Result(func, args, kwargs)
+    return _get_thread_pool().apply_async(_call_in_pool, (func, args, kwargs, get_cache_scope()))
+
+
+def run_concurrently(*funcs):
+    """
+    Calls each of funcs, which take no arguments, at the same time, and
+    returns the list of their results. Raises the first error any of them
+    raised, once all of them are done.
+    """
+    results = [submit(func) for func in funcs]
+    for result in results:
+        result.wait()
+    return [result.get() for result in results]
+
+
+GENERATION_CACHE_KEY = 'comment_client.generation'
+GENERATION_TIMEOUT = 60 * 60 * 24
+
+_cache_scope = threading.local()
+
+
+def set_cache_scope(course_id):
+    """
+    Takes the requests made by this thread that don't have a course_id parameter
+    to be about the course with course_id, or about no course if it's None
+    """
+    _cache_scope.course_id = course_id
+
+
+def get_cache_scope():
+    """Returns the course_id set by set_cache_scope for this thread, or None"""
+    return getattr(_cache_scope, 'course_id', None)
+
+
+def _generation_cache_keys(course_id):
+    """
+    Returns the cache keys of the generations of the responses about the course
+    with course_id: the generation shared by all courses, and the one of the
+    course, unless course_id is None.
+    """
+    keys = [GENERATION_CACHE_KEY]
+    if course_id:
+        keys.append('{0}.{1}'.format(
+            GENERATION_CACHE_KEY, hashlib.md5(unicode(course_id).encode('utf-8')).hexdigest()
+        ))
+    return keys
+
+
+def _response_cache_key(url, params, course_id):
+    """
+    Returns the cache key of the response to a GET of url with params about
+    the course with course_id
+    """
+    query = urllib.urlencode(sorted(
+        (key, unicode(value).encode('utf-8')) for key, value in params.iteritems()
+    ))
+    scope = unicode(course_id or '').encode('utf-8')
+    return 'comment_client.response.{0}'.format(hashlib.md5(scope + ' ' + url + '?' + query).hexdigest())
+
+
+def _get_cached_response(cache_key, course_id):
+    """
+    Returns the text of the cached response at cache_key if it was cached
+    since the last write about the course with course_id, or None, and the
+    current generation of the responses about the course.
+    """
+    generation_keys = _generation_cache_keys(course_id)
+    cached = cache.get_many(generation_keys + [cache_key])
+    missing = [key for key in generation_keys if key not in cached]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid4().hex, GENERATION_TIMEOUT)
+        cached.update(cache.get_many(missing))
+        cached.pop(cache_key, None)
+    generation = tuple(cached.get(key) for key in generation_keys)
+
+    entry = cached.get(cache_key)
+    if entry is not None and entry[0] == generation:
+        return entry[1], generation
+    return None, generation
+
+
+def invalidate_cached_responses(course_id=None):
+    """
+    Makes the responses about the course with course_id cached so far stale,
+    or those about all courses if course_id is None, as the comment service
+    may now return different ones
+    """
+    cache.set(_generation_cache_keys(course_id)[-1], uuid4().hex, GENERATION_TIMEOUT)
+
+
 def perform_request(method, url, data_or_params=None, *args, **kwargs):
+    """
+    Makes a request to the comment service and returns its decoded response.
+
+    GETs with a true `cache` keyword argument can be answered from a cache
+    of responses, for settings.CACHE_TIMEOUT seconds or until the next
+    request that isn't a GET about the same course, as the service may change
+    its data then. A request is about the course of its course_id parameter,
+    or else about the one set by set_cache_scope. Requests that aren't GETs
+    about no course make the cached responses of all courses stale.
+    """
     if data_or_params is None:
         data_or_params = {}
     headers = {'X-Edx-Api-Key': settings.API_KEY}
@@ -62,15 +256,32 @@ def perform_request(method, url, data_or_params=None, *args, **kwargs):
     else:
         data = None
         params = merge_dict(data_or_params, request_id_dict)
-    with request_timer(request_id, method, url):
-        response = requests.request(
-            method,
-            url,
-            data=data,
-            params=params,
-            headers=headers,
-            timeout=5
-        )
+
+    course_id = data_or_params.get('course_id') or get_cache_scope()
+    cache_key = None
+    if method == 'get' and kwargs.get('cache', False) and settings.CACHE_TIMEOUT:
+        cache_key = _response_cache_key(url, data_or_params, course_id)
+
+    with request_timer(request_id, method, url) as tags:
+        if cache_key is not None:
+            response_text, generation = _get_cached_response(cache_key, course_id)
+            if response_text is not None:
+                tags.append('cache:hit')
+                return _decode_response(response_text, kwargs)
+            tags.append('cache:miss')
+
+        try:
+            response = get_session().request(
+                method,
+                url,
+                data=data,
+                params=params,
+                headers=headers,
+                timeout=5
+            )
+        finally:
+            if method != 'get' and settings.CACHE_TIMEOUT:
+                invalidate_cached_responses(course_id)
 
     if 200 < response.status_code < 500:
         raise CommentClientRequestError(response.text, response.status_code)
@@ -80,10 +291,16 @@ def perform_request(method, url, data_or_params=None, *args, **kwargs):
     elif response.status_code == 500:
         raise CommentClient500Error(response.text)
     else:
-        if kwargs.get("raw", False):
-            return response.text
-        else:
-            return json.loads(response.text)
+        if cache_key is not None and None not in generation:
+            cache.set(cache_key, (generation, response.text), settings.CACHE_TIMEOUT)
+        return _decode_response(response.text, kwargs)
+
+
+def _decode_response(response_text, kwargs):
+    if kwargs.get("raw", False):
+        return response_text
+    else:
+        return json.loads(response_text)
 
 
 class CommentClientError(Exception):